@@ -0,0 +1,215 @@
+# anecdote_index.py
+"""
+Индекс файла анекдотов: байтовые границы анекдотов (<файл>.idx) и битовая карта выданных (<файл>.used).
+Выдача и подсчёт анекдотов не перезаписывают сам файл.
+"""
+
+import os
+import json
+import mmap
+import random
+import logging
+import threading
+
+# Уплотнять файл, если выданные анекдоты составляют не меньше этой доли
+COMPACT_MIN_USED_RATIO = 0.25
+
+def scan_offsets(path: str, separator: bytes):
+    """
+    Находит байтовые границы непустых анекдотов в файле (без пробелов по краям).
+
+    Args:
+        path: Путь к файлу анекдотов
+        separator: Разделитель анекдотов в кодировке файла
+
+    Returns:
+        tuple: (список начал, список концов)
+    """
+    starts, ends = [], []
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0:
+            return starts, ends
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            position = 0
+            while position <= size:
+                found = mm.find(separator, position)
+                end = size if found == -1 else found
+                # Убираем пробелы и переводы строк по краям части
+                start = position
+                while start < end and mm[start] in b" \t\r\n":
+                    start += 1
+                stop = end
+                while stop > start and mm[stop - 1] in b" \t\r\n":
+                    stop -= 1
+                if start < stop:
+                    starts.append(start)
+                    ends.append(stop)
+                if found == -1:
+                    break
+                position = found + len(separator)
+    return starts, ends
+
+class AnecdoteIndex:
+    """
+    Индекс анекдотов одного файла: границы анекдотов и битовая карта выданных.
+
+    В памяти хранится список индексов невыданных анекдотов, поэтому выбор
+    случайного анекдота и подсчёт остатка выполняются за O(1).
+    """
+
+    def __init__(self, separator: str):
+        self.separator = separator.encode("utf-8")
+        self._lock = threading.RLock()
+        self._path = None       # файл анекдотов, для которого загружен индекс
+        self._source = None     # (mtime_ns, размер) файла, по которому построен индекс
+        self._starts = []
+        self._ends = []
+        self._used = bytearray()
+        self._live = []         # индексы невыданных анекдотов (порядок не важен)
+
+    @staticmethod
+    def _signature(path):
+        stat = os.stat(path)
+        return [stat.st_mtime_ns, stat.st_size]
+
+    def _is_used(self, number: int) -> bool:
+        return bool(self._used[number // 8] & (1 << (number % 8)))
+
+    def _save_index(self):
+        """Атомарно записывает индекс границ и заново записывает битовую карту выданных."""
+        path = f"{self._path}.idx"
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": self._source, "starts": self._starts, "ends": self._ends}, f)
+        os.replace(tmp_path, path)
+        with open(f"{self._path}.used", "wb") as f:
+            f.write(self._used)
+
+    def _rebuild(self, path: str, old_starts: list):
+        """
+        Пересчитывает границы анекдотов после изменения файла.
+        Если в файл только дописали анекдоты (начала прежних анекдотов не сдвинулись),
+        отметки о выданных сохраняются, иначе битовая карта начинается заново.
+        """
+        starts, ends = scan_offsets(path, self.separator)
+        used = bytearray((len(starts) + 7) // 8)
+        if old_starts and starts[:len(old_starts)] == old_starts:
+            kept = self._used[:len(used)]
+            used[:len(kept)] = kept
+        elif old_starts:
+            logging.info(f"Файл анекдотов {path} изменён, отметки о выданных анекдотах сброшены")
+        self._starts, self._ends, self._used = starts, ends, used
+        self._source = self._signature(path)
+        self._save_index()
+
+    def _load(self, path: str):
+        """Загружает индекс файла и сверяет его с файлом на диске."""
+        path = os.fspath(path)
+        if self._path == path and self._source == self._signature(path):
+            return
+        if self._path != path:
+            self._path = path
+            self._source = None
+            self._starts, self._ends, self._used = [], [], bytearray()
+            try:
+                with open(f"{path}.idx", "r", encoding="utf-8") as f:
+                    index = json.load(f)
+                self._starts, self._ends = index["starts"], index["ends"]
+                self._source = index["source"]
+                try:
+                    with open(f"{path}.used", "rb") as f:
+                        self._used = bytearray(f.read())
+                    self._used.extend(bytes((len(self._starts) + 7) // 8 - len(self._used)))
+                except FileNotFoundError:
+                    # Без битовой карты индекс пересобирается: все анекдоты считаются невыданными
+                    self._source = None
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logging.error(f"Ошибка при чтении индекса анекдотов {path}: {e}")
+                self._starts, self._ends, self._used, self._source = [], [], bytearray(), None
+        if self._source != self._signature(path):
+            self._rebuild(path, self._starts)
+        self._live = [number for number in range(len(self._starts)) if not self._is_used(number)]
+
+    def _mark_used(self, number: int):
+        """Отмечает анекдот выданным: меняет в битовой карте на диске один байт."""
+        byte = number // 8
+        self._used[byte] |= 1 << (number % 8)
+        with open(f"{self._path}.used", "r+b") as f:
+            f.seek(byte)
+            f.write(self._used[byte:byte + 1])
+
+    def pop_random(self, path):
+        """
+        Выдаёт случайный невыданный анекдот и отмечает его выданным.
+
+        Args:
+            path: Путь к файлу анекдотов
+
+        Returns:
+            str|None: Текст анекдота или None, если анекдоты закончились
+        """
+        with self._lock:
+            self._load(path)
+            if not self._live:
+                return None
+            position = random.randrange(len(self._live))
+            # Удаление из списка перестановкой с последним элементом - O(1)
+            self._live[position], self._live[-1] = self._live[-1], self._live[position]
+            number = self._live.pop()
+            with open(self._path, "rb") as f:
+                f.seek(self._starts[number])
+                text = f.read(self._ends[number] - self._starts[number]).decode("utf-8").strip()
+            self._mark_used(number)
+            return text
+
+    def count(self, path) -> int:
+        """
+        Возвращает количество невыданных анекдотов.
+
+        Args:
+            path: Путь к файлу анекдотов
+        """
+        with self._lock:
+            self._load(path)
+            return len(self._live)
+
+    def compact(self, path, min_used_ratio: float = COMPACT_MIN_USED_RATIO) -> bool:
+        """
+        Вырезает выданные анекдоты из файла (запись во временный файл и атомарная замена).
+
+        Args:
+            path: Путь к файлу анекдотов
+            min_used_ratio: Минимальная доля выданных анекдотов, при которой файл переписывается
+
+        Returns:
+            bool: True, если файл был уплотнён
+        """
+        with self._lock:
+            self._load(path)
+            total = len(self._starts)
+            if not total or (total - len(self._live)) < total * min_used_ratio:
+                return False
+            live = sorted(self._live)
+            separator = b"\n" + self.separator + b"\n"
+            tmp_path = f"{self._path}.tmp"
+            with open(self._path, "rb") as src, open(tmp_path, "wb") as dst:
+                for i, number in enumerate(live):
+                    if i:
+                        dst.write(separator)
+                    src.seek(self._starts[number])
+                    dst.write(src.read(self._ends[number] - self._starts[number]))
+            os.replace(tmp_path, self._path)
+            logging.info(f"Файл анекдотов уплотнён: удалено {total - len(live)} выданных анекдотов")
+            self._rebuild(self._path, [])
+            self._live = list(range(len(self._starts)))
+            return True
+
+    def invalidate(self):
+        """Сбрасывает индекс в памяти: при следующем обращении он будет загружен заново."""
+        with self._lock:
+            self._path = None
+            self._source = None
+            self._live = []
@@ -3,90 +3,902 @@
 Модуль для управления балансом монет пользователей.
 Обеспечивает сохранение, загрузку и обновление баланса пользователей,
 который используется для ставок в казино и получения наград за викторины.
+
+Балансы хранятся в памяти процесса (BalanceLedger): файл читается один раз,
+изменения помечаются как "грязные" и сбрасываются на диск отложенно,
+одной записью на пачку изменений, а также при завершении работы бота.
+
+Каждое изменение баланса записывается в журнал (BALANCE_JOURNAL_FILE):
+пользователь, изменение, причина (slots/roulette/quiz/betting) и время.
+На диск журнал только дописывается, а файл балансов служит снимком, который
+периодически пересобирается из журнала (compact_balances). При запуске снимок
+загружается и поверх него проигрываются записи журнала.
+Вместо файлов может использоваться SQLite-хранилище (см. storage.py).
+
+Для игр и ставок предназначены асинхронные транзакции try_debit/credit/transfer:
+проверка и изменение баланса выполняются одной операцией под блокировкой
+реестра балансов, функции сразу возвращают новый баланс.
 """
 
 import os
 import json
+import copy
+import atexit
+import asyncio
+import bisect
+import datetime
 import logging
+import threading
+
+from storage import get_storage
 
 BALANCE_FILE = "state_data/balance.json"
+BALANCE_JOURNAL_FILE = "state_data/balance_journal.jsonl"
+# Сюда переносятся записи журнала, уже вошедшие в снимок (история начислений)
+BALANCE_JOURNAL_ARCHIVE_FILE = "state_data/balance_journal.archive.jsonl"
 
-def load_balances() -> dict:
+# Ключ снимка с номером последней вошедшей в него записи журнала
+JOURNAL_SEQ_KEY = "_journal_seq"
+# Ключ снимка со ссылками пакетов (ref), записи которых уже перенесены в архив журнала
+JOURNAL_REFS_KEY = "_journal_refs"
+
+# Интервал (в секундах) фоновой пересборки снимка из журнала
+COMPACT_INTERVAL = 600
+
+# Задержка (в секундах) между первым изменением и записью на диск.
+# Все изменения, накопленные за это время, сохраняются одной записью.
+FLUSH_DELAY = 2.0
+
+def _read_balance_file(path: str = BALANCE_FILE) -> dict:
     """
-    Загружает словарь балансов пользователей из файла.
-    
+    Читает словарь балансов напрямую из файла.
+
+    Args:
+        path: Путь к файлу балансов
+
     Returns:
         dict: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
         Если файл пуст или не существует, возвращается пустой словарь.
     """
-    if not os.path.exists(BALANCE_FILE):
+    if not os.path.exists(path):
         return {}
     try:
-        with open(BALANCE_FILE, "r", encoding="utf-8") as f:
+        with open(path, "r", encoding="utf-8") as f:
             data = json.load(f)
             if isinstance(data, dict):
                 return data
     except Exception as e:
-        logging.error(f"Ошибка при чтении {BALANCE_FILE}: {e}")
+        logging.error(f"Ошибка при чтении {path}: {e}")
     return {}
 
-def save_balances(balances: dict):
+def _write_balance_file(balances: dict, path: str = BALANCE_FILE) -> bool:
     """
-    Сохраняет словарь балансов в файл BALANCE_FILE.
-    
+    Записывает словарь балансов напрямую в файл.
+
     Args:
         balances: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
+        path: Путь к файлу балансов
+
+    Returns:
+        bool: True, если запись прошла успешно
     """
     try:
-        with open(BALANCE_FILE, "w", encoding="utf-8") as f:
+        with open(path, "w", encoding="utf-8") as f:
             json.dump(balances, f, ensure_ascii=False, indent=4)
+        return True
+    except Exception as e:
+        logging.error(f"Ошибка при записи {path}: {e}")
+        return False
+
+def _read_journal(path: str = BALANCE_JOURNAL_FILE) -> list:
+    """
+    Читает записи журнала балансов.
+    Повреждённые строки (например, недописанная при сбое последняя строка) пропускаются.
+
+    Args:
+        path: Путь к файлу журнала
+
+    Returns:
+        list: Список записей вида { 'seq', 'user_id', 'delta', 'reason', 'time' }
+    """
+    if not os.path.exists(path):
+        return []
+    entries = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    logging.warning(f"Пропущена повреждённая строка {line_number} журнала {path}")
+    except Exception as e:
+        logging.error(f"Ошибка при чтении {path}: {e}")
+    return entries
+
+def _append_journal(entries: list, path: str = BALANCE_JOURNAL_FILE) -> bool:
+    """
+    Дописывает записи в конец журнала балансов.
+
+    Args:
+        entries: Список записей журнала
+        path: Путь к файлу журнала
+
+    Returns:
+        bool: True, если запись прошла успешно
+    """
+    try:
+        with open(path, "a", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        return True
     except Exception as e:
-        logging.error(f"Ошибка при записи {BALANCE_FILE}: {e}")
+        logging.error(f"Ошибка при записи {path}: {e}")
+        return False
+
+def _archive_journal(path: str = BALANCE_JOURNAL_FILE,
+                     archive_path: str = BALANCE_JOURNAL_ARCHIVE_FILE) -> bool:
+    """
+    Переносит содержимое журнала в архив и очищает журнал.
+
+    Args:
+        path: Путь к файлу журнала
+        archive_path: Путь к архиву журнала
+
+    Returns:
+        bool: True, если перенос прошёл успешно
+    """
+    if not os.path.exists(path):
+        return True
+    try:
+        with open(path, "r", encoding="utf-8") as src, open(archive_path, "a", encoding="utf-8") as dst:
+            for line in src:
+                dst.write(line)
+        os.remove(path)
+        return True
+    except Exception as e:
+        logging.error(f"Ошибка при архивировании {path}: {e}")
+        return False
+
+class Leaderboard:
+    """
+    Рейтинг пользователей по балансу, обновляемый при каждом изменении.
+
+    Хранит отсортированный список ключей (-баланс, user_id), поэтому место
+    пользователя находится двоичным поиском, а страница рейтинга - срезом,
+    без загрузки и сортировки всех балансов.
+    """
+
+    def __init__(self):
+        self._keys = []  # Отсортированные ключи (-balance, user_id)
+        self._balances = {}  # { user_id: balance } для поиска ключа пользователя
+
+    def rebuild(self, balances: dict):
+        """
+        Перестраивает рейтинг целиком (при загрузке или замене данных).
+
+        Args:
+            balances: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
+        """
+        self._balances = {uid: entry.get("balance", 0) for uid, entry in balances.items()}
+        self._keys = sorted((-balance, uid) for uid, balance in self._balances.items())
+
+    def update(self, user_id: str, balance: int):
+        """
+        Обновляет позицию пользователя после изменения баланса.
+
+        Args:
+            user_id: ID пользователя (строка)
+            balance: Новый баланс
+        """
+        old_balance = self._balances.get(user_id)
+        if old_balance == balance:
+            return
+        if old_balance is not None:
+            index = bisect.bisect_left(self._keys, (-old_balance, user_id))
+            del self._keys[index]
+        bisect.insort(self._keys, (-balance, user_id))
+        self._balances[user_id] = balance
+
+    def remove(self, user_id: str):
+        """
+        Удаляет пользователя из рейтинга.
+
+        Args:
+            user_id: ID пользователя (строка)
+        """
+        balance = self._balances.pop(user_id, None)
+        if balance is not None:
+            del self._keys[bisect.bisect_left(self._keys, (-balance, user_id))]
+
+    def top(self, offset: int = 0, limit: int = 10) -> list:
+        """
+        Возвращает участок рейтинга.
+
+        Args:
+            offset: Сколько первых мест пропустить
+            limit: Сколько мест вернуть
+
+        Returns:
+            list: Список пар (user_id, balance) по убыванию баланса
+        """
+        return [(uid, -neg_balance) for neg_balance, uid in self._keys[offset:offset + limit]]
+
+    def rank(self, user_id: str) -> int | None:
+        """
+        Возвращает место пользователя в рейтинге (начиная с 1).
+
+        Args:
+            user_id: ID пользователя (строка)
+
+        Returns:
+            int|None: Место пользователя или None, если его нет в рейтинге
+        """
+        balance = self._balances.get(user_id)
+        if balance is None:
+            return None
+        return bisect.bisect_left(self._keys, (-balance, user_id)) + 1
+
+    def __len__(self):
+        return len(self._keys)
+
+class BalanceLedger:
+    """
+    Резидентный реестр балансов с отложенной записью на диск.
+
+    Файл читается при первом обращении, дальше все чтения обслуживаются из памяти.
+    Каждое изменение порождает запись журнала; накопленные записи дописываются
+    в журнал по таймеру: все изменения за FLUSH_DELAY секунд - одной записью.
+    Снимок балансов пересобирается из журнала методом compact().
+    Если задано SQLite-хранилище, при сбросе обновляются только изменённые строки,
+    а записи журнала сохраняются в ту же базу.
+    """
+
+    def __init__(self, path: str = BALANCE_FILE, flush_delay: float = FLUSH_DELAY, storage=None,
+                 journal_path: str = BALANCE_JOURNAL_FILE,
+                 archive_path: str = BALANCE_JOURNAL_ARCHIVE_FILE):
+        self.path = path
+        self.flush_delay = flush_delay
+        self.storage = storage
+        self.journal_path = journal_path
+        self.archive_path = archive_path
+        self._data = None
+        self._dirty = set()
+        self._pending = []  # Записи журнала, ещё не сохранённые на диск
+        self._seq = 0  # Номер последней записи журнала
+        self._refs = set()  # Ссылки пакетов, сохранённых через commit_bulk
+        self._needs_snapshot = False  # Данные заменены целиком - нужен новый снимок
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+        self._board = Leaderboard()
+
+    def _ensure_loaded(self) -> dict:
+        """Загружает балансы при первом обращении: снимок и записи журнала поверх него."""
+        if self._data is None:
+            if self.storage is not None:
+                self._data = self.storage.load_balances()
+                self._board.rebuild(self._data)
+            else:
+                data = _read_balance_file(self.path)
+                self._seq = data.pop(JOURNAL_SEQ_KEY, 0)
+                self._refs = set(data.pop(JOURNAL_REFS_KEY, []))
+                self._data = data
+                self._board.rebuild(self._data)
+                self._replay_journal()
+        return self._data
+
+    def _replay_journal(self):
+        """Применяет к снимку записи журнала, которые в него ещё не вошли."""
+        replayed = 0
+        for entry in _read_journal(self.journal_path):
+            seq = entry.get("seq", 0)
+            if seq <= self._seq:
+                continue  # Запись уже учтена в снимке
+            self._change(str(entry["user_id"]), entry.get("delta", 0))
+            self._seq = seq
+            if entry.get("ref") is not None:
+                self._refs.add(entry["ref"])
+            replayed += 1
+        if replayed:
+            logging.info(f"Из журнала {self.journal_path} восстановлено {replayed} изменений балансов")
+
+    def _change(self, user_id_str: str, delta: int) -> tuple[int, int]:
+        """
+        Изменяет баланс в памяти без записи в журнал.
+
+        Returns:
+            tuple[int, int]: Новый баланс и фактическое изменение (с учётом ограничения нулём)
+        """
+        data = self._data
+        if user_id_str in data:
+            old_balance = data[user_id_str].get("balance", 0)
+            new_balance = old_balance + delta
+            if new_balance < 0:
+                new_balance = 0  # Не даем упасть ниже нуля
+            data[user_id_str]["balance"] = new_balance
+        else:
+            old_balance = 0
+            new_balance = delta if delta > 0 else 0
+            data[user_id_str] = {"balance": new_balance, "name": "Unknown"}
+        self._board.update(user_id_str, new_balance)
+        return new_balance, new_balance - old_balance
+
+    def get(self, user_id) -> int:
+        """
+        Возвращает баланс пользователя из памяти.
+
+        Args:
+            user_id: ID пользователя Telegram
+
+        Returns:
+            int: Текущий баланс пользователя или 0, если пользователь не найден
+        """
+        with self._lock:
+            entry = self._ensure_loaded().get(str(user_id))
+            if entry is None:
+                return 0
+            return entry.get("balance", 0)
+
+    def apply(self, user_id, delta: int, reason: str = None) -> int:
+        """
+        Изменяет баланс пользователя в памяти и планирует запись на диск.
+
+        Args:
+            user_id: ID пользователя Telegram
+            delta: Изменение баланса (положительное или отрицательное число)
+            reason: Причина изменения для журнала (slots/roulette/quiz/betting)
+
+        Returns:
+            int: Новый баланс пользователя
+        """
+        with self._lock:
+            self._ensure_loaded()
+            new_balance = self._record(str(user_id), delta, reason, datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            self._schedule_flush()
+            return new_balance
+
+    def _record(self, user_id_str: str, delta: int, reason: str, time: str) -> int:
+        """
+        Изменяет баланс в памяти и добавляет запись в очередь журнала (вызывается под блокировкой).
+
+        Returns:
+            int: Новый баланс пользователя
+        """
+        new_balance, applied = self._change(user_id_str, delta)
+        self._seq += 1
+        # В журнал пишется фактическое изменение, чтобы проигрывание давало тот же результат
+        self._pending.append({
+            "seq": self._seq,
+            "user_id": user_id_str,
+            "delta": applied,
+            "reason": reason,
+            "time": time
+        })
+        self._dirty.add(user_id_str)
+        return new_balance
+
+    def apply_bulk(self, deltas: dict, reason: str = None) -> dict:
+        """
+        Изменяет балансы нескольких пользователей одной операцией.
+        Все изменения сохраняются на диск одной записью.
+
+        Args:
+            deltas: Словарь { user_id: delta }
+            reason: Причина изменения для журнала
+
+        Returns:
+            dict: Словарь { user_id: новый баланс }
+        """
+        with self._lock:
+            self._ensure_loaded()
+            # Одна метка времени и один сброс на диск на весь пакет
+            time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            new_balances = {
+                user_id: self._record(str(user_id), delta, reason, time)
+                for user_id, delta in deltas.items()
+            }
+            if new_balances:
+                self._schedule_flush()
+            return new_balances
+
+    def commit_bulk(self, deltas: dict, reason: str = None, ref: str = None, save=None) -> dict | None:
+        """
+        Изменяет балансы нескольких пользователей и сразу сохраняет изменения
+        (без отложенной записи). Если сохранить не удалось, изменения отменяются.
+        Записи журнала помечаются ссылкой ref (например, на событие ставок): по ней
+        has_ref() проверяет, сохранён ли пакет, чтобы повтор операции не начислил его ещё раз.
+
+        Args:
+            deltas: Словарь { user_id: delta }
+            reason: Причина изменения для журнала
+            ref: Ссылка на операцию, к которой относится пакет
+            save: Для SQLite-хранилища - функция save(balances, user_ids, journal) -> bool,
+                  которая сохраняет изменения вместе с другими данными одной транзакцией
+                  (по умолчанию storage.save_balances)
+
+        Returns:
+            dict|None: Словарь { user_id: новый баланс } или None, если сохранить не удалось
+        """
+        with self._write_lock, self._lock:
+            data = self._ensure_loaded()
+            previous = {str(user_id): copy.deepcopy(data.get(str(user_id))) for user_id in deltas}
+            start = len(self._pending)
+            time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            new_balances = {
+                user_id: self._record(str(user_id), delta, reason, time)
+                for user_id, delta in deltas.items()
+            }
+            entries = self._pending[start:]
+            if ref is not None:
+                for entry in entries:
+                    entry["ref"] = ref
+
+            if self.storage is not None:
+                rows = {user_id: dict(data[user_id]) for user_id in previous}
+                saved = (save or self.storage.save_balances)(rows, set(rows), entries)
+                if saved:
+                    del self._pending[start:]
+            else:
+                # Накопленные ранее записи дописываются вместе с пакетом, чтобы номера в журнале шли по порядку
+                saved = _append_journal(self._pending, self.journal_path) if self._pending else True
+                if saved:
+                    self._pending = []
+                    self._dirty = set()
+
+            if not saved:
+                del self._pending[start:]
+                for user_id, entry in previous.items():
+                    if entry is None:
+                        data.pop(user_id, None)
+                        self._board.remove(user_id)
+                    else:
+                        data[user_id] = entry
+                        self._board.update(user_id, entry.get("balance", 0))
+                return None
+            if ref is not None:
+                self._refs.add(ref)
+            return new_balances
+
+    def has_ref(self, ref: str) -> bool:
+        """
+        Проверяет, сохранён ли пакет изменений с этой ссылкой (см. commit_bulk).
+
+        Args:
+            ref: Ссылка на операцию
+
+        Returns:
+            bool: True, если пакет уже записан в журнал
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return ref in self._refs
+
+    def try_debit(self, user_id, amount: int, reason: str = None) -> int | None:
+        """
+        Атомарно списывает сумму, если на балансе достаточно средств.
+
+        Args:
+            user_id: ID пользователя Telegram
+            amount: Сумма списания (положительное число)
+            reason: Причина списания для журнала
+
+        Returns:
+            int|None: Новый баланс или None, если средств недостаточно
+        """
+        if amount <= 0:
+            return None
+        with self._lock:
+            if self.get(user_id) < amount:
+                return None
+            return self.apply(user_id, -amount, reason)
+
+    def transfer(self, from_user_id, to_user_id, amount: int, reason: str = None) -> tuple[int, int] | None:
+        """
+        Атомарно переводит сумму между пользователями.
+
+        Args:
+            from_user_id: ID отправителя
+            to_user_id: ID получателя
+            amount: Сумма перевода (положительное число)
+            reason: Причина перевода для журнала
+
+        Returns:
+            tuple[int, int]|None: Новые балансы (отправителя, получателя)
+            или None, если у отправителя недостаточно средств
+        """
+        with self._lock:
+            from_balance = self.try_debit(from_user_id, amount, reason)
+            if from_balance is None:
+                return None
+            return from_balance, self.apply(to_user_id, amount, reason)
+
+    def top(self, offset: int = 0, limit: int = 10) -> list:
+        """
+        Возвращает участок рейтинга по балансу.
+
+        Args:
+            offset: Сколько первых мест пропустить
+            limit: Сколько мест вернуть
+
+        Returns:
+            list: Список пар (user_id, { 'balance': int, 'name': str }) по убыванию баланса
+        """
+        with self._lock:
+            data = self._ensure_loaded()
+            return [(uid, dict(data[uid])) for uid, _ in self._board.top(offset, limit)]
+
+    def rank(self, user_id) -> int | None:
+        """
+        Возвращает место пользователя в рейтинге по балансу (начиная с 1).
+
+        Args:
+            user_id: ID пользователя Telegram
+
+        Returns:
+            int|None: Место пользователя или None, если у него нет баланса
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._board.rank(str(user_id))
+
+    def count(self) -> int:
+        """Возвращает количество пользователей с балансом."""
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._board)
+
+    def snapshot(self) -> dict:
+        """Возвращает копию всех балансов (изменение копии не влияет на реестр)."""
+        with self._lock:
+            return copy.deepcopy(self._ensure_loaded())
+
+    def replace(self, balances: dict):
+        """
+        Полностью заменяет содержимое реестра.
+
+        Args:
+            balances: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
+        """
+        with self._lock:
+            # Старые записи тоже помечаются, чтобы удалённые пользователи удалились из хранилища
+            self._dirty.update(self._ensure_loaded().keys())
+            self._data = copy.deepcopy(balances)
+            self._board.rebuild(self._data)
+            self._dirty.update(self._data.keys())
+            self._needs_snapshot = True
+            self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Запускает таймер записи, если он ещё не запущен."""
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_delay, self.flush)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self) -> bool:
+        """
+        Немедленно сохраняет накопленные изменения: дописывает журнал
+        (или обновляет строки в SQLite-хранилище).
+
+        Returns:
+            bool: True, если изменений не было или запись прошла успешно
+        """
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if self._data is None:
+                    return True
+                needs_snapshot = self.storage is None and self._needs_snapshot
+            if needs_snapshot:
+                return self._compact_locked()
+
+            with self._lock:
+                if not self._dirty and not self._pending:
+                    return True
+                dirty, pending = self._dirty, self._pending
+                self._dirty, self._pending = set(), []
+                if self.storage is not None:
+                    # В базу пишутся только изменённые строки
+                    rows = {uid: dict(self._data[uid]) for uid in dirty if uid in self._data}
+
+            if self.storage is not None:
+                saved = self.storage.save_balances(rows, dirty, pending)
+            else:
+                saved = _append_journal(pending, self.journal_path)
+            if saved:
+                logging.debug(f"Сохранено {len(pending)} изменений балансов")
+                return True
+
+            # Запись не удалась - возвращаем изменения, чтобы повторить позже
+            with self._lock:
+                self._dirty.update(dirty)
+                self._pending[:0] = pending
+                self._schedule_flush()
+            return False
+
+    def compact(self) -> bool:
+        """
+        Пересобирает снимок балансов из журнала: записывает текущие балансы
+        в файл снимка и переносит журнал в архив.
+        Для SQLite-хранилища снимок не нужен - выполняется обычный сброс.
+
+        Returns:
+            bool: True, если пересборка прошла успешно
+        """
+        if self.storage is not None:
+            return self.flush()
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if self._data is None:
+                    return True
+            return self._compact_locked()
+
+    def _compact_locked(self) -> bool:
+        """Пересборка снимка; вызывается под блокировкой записи."""
+        with self._lock:
+            pending = self._pending
+            self._pending = []
+            self._dirty = set()
+            self._needs_snapshot = False
+            snapshot = copy.deepcopy(self._data)
+            snapshot[JOURNAL_SEQ_KEY] = self._seq
+            if self._refs:
+                # Записи журнала уходят в архив, поэтому ссылки пакетов сохраняются в снимке
+                snapshot[JOURNAL_REFS_KEY] = sorted(self._refs)
+
+        # Сначала журнал дописывается, чтобы все изменения попали в архив
+        if pending and not _append_journal(pending, self.journal_path):
+            with self._lock:
+                self._pending[:0] = pending
+                self._needs_snapshot = True
+                self._schedule_flush()
+            return False
+
+        # Снимок пишется во временный файл и атомарно подменяет старый
+        tmp_path = self.path + ".tmp"
+        saved = _write_balance_file(snapshot, tmp_path)
+        if saved:
+            try:
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.error(f"Ошибка при замене {self.path}: {e}")
+                saved = False
+        if not saved:
+            # Записи уже в журнале: повторно ставить их в очередь нельзя, иначе они задвоятся
+            with self._lock:
+                self._needs_snapshot = True
+                self._schedule_flush()
+            return False
+
+        # Записи журнала уже вошли в снимок (номер записан в снимке),
+        # поэтому сбой при архивации не приведёт к повторному применению
+        _archive_journal(self.journal_path, self.archive_path)
+        logging.debug(f"Снимок балансов пересобран до записи журнала №{snapshot[JOURNAL_SEQ_KEY]}")
+        return True
+
+# Общий реестр балансов процесса
+_ledger = BalanceLedger(storage=get_storage())
+
+def flush_balances() -> bool:
+    """
+    Принудительно сохраняет накопленные изменения балансов на диск.
+    Вызывается при завершении работы бота.
+
+    Returns:
+        bool: True, если сохранение прошло успешно
+    """
+    return _ledger.flush()
+
+atexit.register(flush_balances)
+
+def compact_balances() -> bool:
+    """
+    Пересобирает снимок балансов из журнала и переносит журнал в архив.
+
+    Returns:
+        bool: True, если пересборка прошла успешно
+    """
+    return _ledger.compact()
+
+async def compact_balances_job(context):
+    """
+    Фоновая задача планировщика: периодическая пересборка снимка балансов.
+    Запись файлов выполняется в отдельном потоке, чтобы не блокировать бота.
+    """
+    await asyncio.to_thread(compact_balances)
+
+def commit_balances_bulk(deltas: dict, reason: str = None, ref: str = None, save=None) -> dict | None:
+    """
+    Изменяет балансы нескольких пользователей и сразу сохраняет изменения.
+    Если сохранить не удалось, изменения отменяются (см. BalanceLedger.commit_bulk).
+
+    Args:
+        deltas: Словарь { user_id: delta }
+        reason: Причина изменения для журнала
+        ref: Ссылка на операцию (например, "betting:<ID события>")
+        save: Функция сохранения вместе с другими данными одной транзакцией (только SQLite)
+
+    Returns:
+        dict|None: Словарь { user_id: новый баланс } или None, если сохранить не удалось
+    """
+    return _ledger.commit_bulk(deltas, reason, ref, save)
+
+def has_balance_ref(ref: str) -> bool:
+    """
+    Проверяет, сохранён ли пакет изменений балансов с этой ссылкой.
+
+    Args:
+        ref: Ссылка на операцию
+
+    Returns:
+        bool: True, если пакет уже записан в журнал
+    """
+    return _ledger.has_ref(ref)
+
+async def try_debit(user_id: int, amount: int, reason: str = None) -> int | None:
+    """
+    Списывает ставку, только если на балансе достаточно средств.
+    Проверка и списание выполняются одной операцией под блокировкой реестра балансов.
+
+    Args:
+        user_id: ID пользователя Telegram
+        amount: Сумма списания (положительное число)
+        reason: Причина списания для журнала (slots/roulette/betting)
+
+    Returns:
+        int|None: Новый баланс или None, если средств недостаточно
+    """
+    new_balance = _ledger.try_debit(user_id, amount, reason)
+    logging.debug(f"Списание {amount} у {user_id}: новый баланс {new_balance}")
+    return new_balance
+
+async def credit(user_id: int, amount: int, reason: str = None) -> int:
+    """
+    Начисляет выигрыш под блокировкой реестра балансов.
+
+    Args:
+        user_id: ID пользователя Telegram
+        amount: Сумма начисления
+        reason: Причина начисления для журнала (slots/roulette/quiz/betting)
+
+    Returns:
+        int: Новый баланс пользователя
+    """
+    new_balance = _ledger.apply(user_id, amount, reason)
+    logging.debug(f"Начисление {amount} пользователю {user_id}: новый баланс {new_balance}")
+    return new_balance
+
+async def transfer(from_user_id: int, to_user_id: int, amount: int, reason: str = None) -> tuple[int, int] | None:
+    """
+    Переводит монеты от одного пользователя другому.
+    Проверка, списание и начисление выполняются одной операцией под блокировкой реестра балансов.
+
+    Args:
+        from_user_id: ID отправителя
+        to_user_id: ID получателя
+        amount: Сумма перевода (положительное число)
+        reason: Причина перевода для журнала
+
+    Returns:
+        tuple[int, int]|None: Новые балансы (отправителя, получателя)
+        или None, если у отправителя недостаточно средств
+    """
+    return _ledger.transfer(from_user_id, to_user_id, amount, reason)
+
+def load_balances() -> dict:
+    """
+    Возвращает словарь балансов пользователей.
+    Оставлена для совместимости: данные берутся из резидентного реестра.
+
+    Returns:
+        dict: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
+        Если балансов нет, возвращается пустой словарь.
+    """
+    return _ledger.snapshot()
+
+def save_balances(balances: dict):
+    """
+    Заменяет все балансы и сразу сохраняет их снимок в файл BALANCE_FILE.
+    Оставлена для совместимости с кодом, работающим со словарём целиком.
+
+    Args:
+        balances: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
+    """
+    _ledger.replace(balances)
+    _ledger.flush()
 
 def get_balance(user_id: int) -> int:
     """
     Возвращает текущий баланс пользователя.
-    
+
     Args:
         user_id: ID пользователя Telegram
-        
+
     Returns:
         int: Текущий баланс пользователя или 0, если пользователь не найден
     """
-    data = load_balances()
-    user_id_str = str(user_id)
-    
-    if user_id_str in data:
-        logging.debug(f"Получение баланса пользователя {user_id}: {data[user_id_str].get('balance', 0)}")
-        return data[user_id_str].get("balance", 0)
-    return 0
+    balance = _ledger.get(user_id)
+    logging.debug(f"Получение баланса пользователя {user_id}: {balance}")
+    return balance
 
-def update_balance(user_id: int, delta: int):
+def update_balance(user_id: int, delta: int, reason: str = None) -> int:
     """
     Изменяет баланс пользователя на указанную величину.
-    
+
     Args:
         user_id: ID пользователя Telegram
         delta: Изменение баланса (положительное или отрицательное число)
-        
+        reason: Причина изменения для журнала (slots/roulette/quiz/betting)
+
+    Returns:
+        int: Новый баланс пользователя
+
     Note:
         Если delta отрицательная и превышает текущий баланс, баланс будет установлен на 0.
         Если пользователь не существует, будет создана новая запись.
+        Запись на диск выполняется отложенно (см. BalanceLedger).
+    """
+    new_balance = _ledger.apply(user_id, delta, reason)
+    logging.debug(f"Обновление баланса для {user_id}: новый баланс {new_balance}")
+    return new_balance
+
+def get_top_balances(offset: int = 0, limit: int = 10) -> list:
+    """
+    Возвращает участок рейтинга пользователей по балансу.
+
+    Args:
+        offset: Сколько первых мест пропустить
+        limit: Сколько мест вернуть
+
+    Returns:
+        list: Список пар (str(user_id), { 'balance': int, 'name': str }) по убыванию баланса
+    """
+    return _ledger.top(offset, limit)
+
+def get_balance_rank(user_id: int) -> int | None:
+    """
+    Возвращает место пользователя в рейтинге по балансу.
+
+    Args:
+        user_id: ID пользователя Telegram
+
+    Returns:
+        int|None: Место (начиная с 1) или None, если у пользователя нет баланса
     """
-    data = load_balances()  # Загружаем все данные
-    user_id_str = str(user_id)
-    
-    if user_id_str in data:
-        # Обновляем баланс существующего пользователя
-        current_balance = data[user_id_str].get("balance", 0)
-        new_balance = current_balance + delta
-        if new_balance < 0:
-            new_balance = 0  # Не даем упасть ниже нуля
-        data[user_id_str]["balance"] = new_balance
-        logging.debug(f"Обновление баланса для {user_id}: новый баланс {new_balance}")
-    else:
-        # Если пользователя нет, создаём его с начальным балансом
-        data[user_id_str] = {"balance": delta if delta > 0 else 0, "name": "Unknown"}
-        logging.debug(f"Создание баланса для {user_id}: новый баланс {data[user_id_str]}")
-    
-    save_balances(data)  # Сохраняем изменения
+    return _ledger.rank(user_id)
+
+def count_balances() -> int:
+    """
+    Возвращает количество пользователей с балансом.
+
+    Returns:
+        int: Количество пользователей
+    """
+    return _ledger.count()
+
+def update_balances_bulk(deltas: dict, reason: str = None) -> dict:
+    """
+    Изменяет балансы сразу нескольких пользователей (например, выплаты по событию).
+    Все изменения применяются под одной блокировкой и сохраняются одной записью.
+
+    Args:
+        deltas: Словарь { user_id: delta }
+        reason: Причина изменения для журнала (slots/roulette/quiz/betting)
+
+    Returns:
+        dict: Словарь { user_id: новый баланс }
+    """
+    if not deltas:
+        return {}
+    new_balances = _ledger.apply_bulk(deltas, reason)
+    logging.debug(f"Пакетное обновление балансов ({reason}): {len(new_balances)} пользователей")
+    return new_balances
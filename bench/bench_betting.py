@@ -0,0 +1,367 @@
+#!/usr/bin/env python3
+"""
+Тест производительности системы ставок на синтетических данных.
+Запускать из корня проекта: python bench/bench_betting.py [--users 10000] [--bets 100000] [--history-years 3]
+
+Во временном каталоге генерируются данные, похожие на данные бота за несколько лет:
+betting_events.json (события с опубликованными результатами и открытые события),
+betting_data.json (серии побед), разделы активных ставок state_data/betting_bets/
+и журнал истории ставок. Затем замеряется время операций:
+- place_bet - приём ставки на открытое событие;
+- process_event_results - подведение итогов открытого события со всеми его ставками;
+- get_betting_history - чтение случайной страницы истории;
+- history_command - формирование ответа на /history (без отправки в Telegram).
+
+Результаты выводятся таблицей и сравниваются с сохранённым базовым замером
+(bench/baseline_betting.json): если медианное время операции выросло больше
+допустимого (--tolerance), скрипт завершается с кодом 1. Новый базовый замер
+сохраняется ключом --save-baseline.
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import datetime
+import tempfile
+import statistics
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import betting
+import docstore
+import betting_history
+from balance import BalanceLedger
+from betting import place_bet, process_event_results, get_betting_history, build_event_pool
+from handlers.betting_commands import history_command, HISTORY_PAGE_SIZE
+from bench.bench_concurrency import percentile
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline_betting.json")
+
+OPERATIONS = ["place_bet", "process_event_results", "get_betting_history", "history_command"]
+
+# Параметры, от которых зависит размер данных: базовый замер сравним только при их совпадении
+WORKLOAD_PARAMS = ["users", "bets", "active_events", "history_years", "events_per_day", "seed"]
+
+# Участников в одной записи истории (победители и проигравшие)
+HISTORY_PARTICIPANTS = 20
+
+BET_AMOUNTS = [10, 50, 100, 500, 1000]
+
+def make_event(event_id, options_count=3, **fields):
+    """Создаёт событие в формате betting_events.json."""
+    event = {
+        "id": event_id,
+        "description": f"Событие {event_id}",
+        "question": f"Кто победит в событии {event_id}?",
+        "options": [{"id": option_id, "text": f"Вариант {option_id}"} for option_id in range(1, options_count + 1)],
+        "is_active": True,
+        "winner_option_id": 1,
+        "results_published": False,
+    }
+    event.update(fields)
+    return event
+
+def make_history_entry(event, rng, users, date):
+    """Создаёт запись истории для события с опубликованными результатами."""
+    participants = rng.sample(range(1, users + 1), min(HISTORY_PARTICIPANTS, users))
+    split = rng.randint(1, len(participants))
+    winners = [
+        {"user_id": user_id, "user_name": f"user{user_id}", "win_amount": rng.choice(BET_AMOUNTS) * 2,
+         "bet_amount": rng.choice(BET_AMOUNTS), "streak": rng.randint(1, 5)}
+        for user_id in participants[:split]
+    ]
+    losers = [
+        {"user_id": user_id, "user_name": f"user{user_id}", "loss_amount": rng.choice(BET_AMOUNTS)}
+        for user_id in participants[split:]
+    ]
+    total_bets = sum(w["bet_amount"] for w in winners) + sum(l["loss_amount"] for l in losers)
+    return {
+        "event_id": event["id"],
+        "description": event["description"],
+        "question": event["question"],
+        "options": event["options"],
+        "correct_option": event["options"][0],
+        "result_description": f"Итог события {event['id']}",
+        "winner_option_id": 1,
+        "tote_coefficient": total_bets / max(sum(w["bet_amount"] for w in winners), 1),
+        "total_winning_bets": sum(w["bet_amount"] for w in winners),
+        "date": date.strftime("%Y-%m-%d"),
+        "total_bets": total_bets,
+        "winners": winners,
+        "losers": losers,
+    }
+
+def generate_workload(args, rng):
+    """
+    Генерирует данные системы ставок по путям, заданным в модулях betting и betting_history.
+
+    Args:
+        args: Параметры теста (users, bets, active_events, history_years, events_per_day)
+        rng: Генератор случайных чисел
+
+    Returns:
+        dict: { 'active_event_ids', 'history_entries', 'bets' }
+    """
+    history_days = int(args.history_years * 365)
+    start = datetime.date.today() - datetime.timedelta(days=history_days)
+
+    events = []
+    history = []
+    for day in range(history_days):
+        for _ in range(args.events_per_day):
+            event = make_event(len(events) + 1, is_active=False, results_published=True)
+            events.append(event)
+            history.append(make_history_entry(event, rng, args.users, start + datetime.timedelta(days=day)))
+
+    active_event_ids = []
+    for _ in range(args.active_events):
+        event = make_event(len(events) + 1)
+        events.append(event)
+        active_event_ids.append(event["id"])
+    betting.save_betting_events({"events": events})
+
+    # Активные ставки распределяются по открытым событиям
+    active_bets = {event_id: {} for event_id in active_event_ids}
+    for _ in range(args.bets):
+        event_id = rng.choice(active_event_ids)
+        user_id = rng.randint(1, args.users)
+        user_bets = active_bets[event_id].setdefault(str(user_id), {"user_name": f"user{user_id}", "bets": []})
+        user_bets["bets"].append({
+            "option_id": rng.randint(1, 3),
+            "amount": rng.choice(BET_AMOUNTS),
+            "time": f"{datetime.date.today()} 12:00:00"
+        })
+    for event_id, event_bets in active_bets.items():
+        betting.save_event_bets(event_id, {"bets": event_bets, "pool": build_event_pool(event_bets)})
+
+    betting.save_betting_data({
+        "schema_version": betting.BETTING_SCHEMA_VERSION,
+        "win_streaks": {
+            str(user_id): {"streak": rng.randint(0, 5), "user_name": f"user{user_id}"}
+            for user_id in range(1, args.users + 1)
+        }
+    })
+    betting_history.append_history(history)
+    docstore.flush_all()
+    return {"active_event_ids": active_event_ids, "history_entries": len(history), "bets": args.bets}
+
+async def _send_message(**kwargs):
+    """Заглушка отправки сообщения: ответ /history формируется, но никуда не отправляется."""
+    return SimpleNamespace(**kwargs)
+
+async def time_operations(args, rng, workload):
+    """
+    Замеряет время операций системы ставок.
+
+    Returns:
+        dict: { операция: [время каждого вызова, с] }
+    """
+    timings = {name: [] for name in OPERATIONS}
+    active_event_ids = workload["active_event_ids"]
+
+    for _ in range(args.place_bets):
+        user_id = rng.randint(1, args.users)
+        started = time.perf_counter()
+        await place_bet(user_id, f"user{user_id}", rng.choice(active_event_ids), rng.randint(1, 3), rng.choice(BET_AMOUNTS))
+        timings["place_bet"].append(time.perf_counter() - started)
+
+    pages = max((workload["history_entries"] + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE, 1)
+    for _ in range(args.history_reads):
+        offset = (rng.randint(1, pages) - 1) * HISTORY_PAGE_SIZE
+        started = time.perf_counter()
+        get_betting_history(limit=HISTORY_PAGE_SIZE, offset=offset)
+        timings["get_betting_history"].append(time.perf_counter() - started)
+
+    for _ in range(args.history_reads):
+        update = SimpleNamespace(callback_query=None, effective_chat=SimpleNamespace(id=1))
+        context = SimpleNamespace(args=[str(rng.randint(1, pages))], bot=SimpleNamespace(send_message=_send_message))
+        started = time.perf_counter()
+        await history_command(update, context)
+        timings["history_command"].append(time.perf_counter() - started)
+
+    # Подведение итогов в конце: оно закрывает открытые события
+    for event_id in active_event_ids:
+        started = time.perf_counter()
+        process_event_results(event_id, rng.randint(1, 3))
+        timings["process_event_results"].append(time.perf_counter() - started)
+    return timings
+
+def run_benchmark(args):
+    """
+    Генерирует данные и выполняет замеры во временном каталоге.
+
+    Returns:
+        dict: { 'timings', 'workload', 'generate_time' }
+    """
+    rng = random.Random(args.seed)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        initial = {
+            str(user_id): {"balance": 10 ** 9, "name": f"user{user_id}"}
+            for user_id in range(1, args.users + 1)
+        }
+        ledger = BalanceLedger(
+            flush_delay=3600,
+            path=os.path.join(tmp_dir, "balance.json"),
+            journal_path=os.path.join(tmp_dir, "balance_journal.jsonl"),
+            archive_path=os.path.join(tmp_dir, "balance_journal.archive.jsonl"),
+        )
+        ledger.replace(initial)
+        ledger.flush()
+
+        with patch("balance._ledger", ledger), \
+             patch("docstore._store", docstore.JsonDocumentStore(flush_delay=3600)), \
+             patch("betting.get_storage", return_value=None), \
+             patch("betting.BETTING_EVENTS_FILE", os.path.join(tmp_dir, "betting_events.json")), \
+             patch("betting.BETTING_DATA_FILE", os.path.join(tmp_dir, "betting_data.json")), \
+             patch("betting.BETTING_BETS_DIR", os.path.join(tmp_dir, "betting_bets")), \
+             patch("betting._event_index", betting.BettingEventIndex()), \
+             patch("betting_history._log", betting_history.BettingHistoryLog(os.path.join(tmp_dir, "betting_history"))):
+            started = time.perf_counter()
+            workload = generate_workload(args, rng)
+            generate_time = time.perf_counter() - started
+            timings = asyncio.run(time_operations(args, rng, workload))
+            docstore.flush_all()
+        ledger.flush()
+
+    return {"timings": timings, "workload": workload, "generate_time": generate_time}
+
+def summarize(timings):
+    """
+    Считает медиану и перцентиль p99 по каждой операции (в миллисекундах).
+
+    Returns:
+        dict: { операция: { 'count', 'p50_ms', 'p99_ms', 'mean_ms' } }
+    """
+    summary = {}
+    for name, values in timings.items():
+        summary[name] = {
+            "count": len(values),
+            "p50_ms": percentile(values, 50) * 1000,
+            "p99_ms": percentile(values, 99) * 1000,
+            "mean_ms": statistics.mean(values) * 1000 if values else 0.0,
+        }
+    return summary
+
+def load_baseline(path):
+    """
+    Загружает базовый замер.
+
+    Returns:
+        dict: Базовый замер или None, если файла нет
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def save_baseline(path, args, summary):
+    """Сохраняет текущий замер как базовый."""
+    baseline = {
+        "params": {name: getattr(args, name) for name in WORKLOAD_PARAMS},
+        "p50_ms": {name: round(stats["p50_ms"], 3) for name, stats in summary.items()},
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(baseline, f, ensure_ascii=False, indent=4)
+        f.write("\n")
+
+def compare_with_baseline(summary, baseline, tolerance):
+    """
+    Сравнивает медианное время операций с базовым замером.
+
+    Args:
+        summary (dict): Результат summarize()
+        baseline (dict): Базовый замер
+        tolerance (float): Допустимый рост времени (0.5 - на 50%)
+
+    Returns:
+        list: Операции, время которых выросло больше допустимого
+    """
+    regressions = []
+    for name, baseline_ms in baseline.get("p50_ms", {}).items():
+        stats = summary.get(name)
+        if stats and stats["count"] and stats["p50_ms"] > baseline_ms * (1 + tolerance):
+            regressions.append(name)
+    return regressions
+
+def format_report(args, report, summary, baseline=None, regressions=()):
+    """
+    Формирует текстовый отчёт по результатам замеров.
+
+    Returns:
+        str: Таблица с результатами
+    """
+    workload = report["workload"]
+    lines = [
+        f"Пользователей: {args.users}, активных ставок: {workload['bets']} на {len(workload['active_event_ids'])} событий, "
+        f"записей истории: {workload['history_entries']}",
+        f"Генерация данных: {report['generate_time']:.2f} с",
+        "",
+        f"{'операция':<22} {'вызовов':>8} {'p50, мс':>9} {'p99, мс':>9} {'среднее, мс':>12} {'база p50':>9}  статус",
+    ]
+    for name in OPERATIONS:
+        stats = summary[name]
+        baseline_ms = (baseline or {}).get("p50_ms", {}).get(name)
+        if baseline_ms is None:
+            base_text, status = "-", ""
+        else:
+            base_text = f"{baseline_ms:.2f}"
+            status = "РЕГРЕССИЯ" if name in regressions else "OK"
+        lines.append(
+            f"{name:<22} {stats['count']:>8} {stats['p50_ms']:>9.2f} {stats['p99_ms']:>9.2f} "
+            f"{stats['mean_ms']:>12.2f} {base_text:>9}  {status}"
+        )
+    return "\n".join(lines)
+
+def main():
+    """
+    Основная функция теста производительности ставок.
+    """
+    parser = argparse.ArgumentParser(description="Тест производительности системы ставок")
+    parser.add_argument("--users", type=int, default=10000, help="Количество пользователей")
+    parser.add_argument("--bets", type=int, default=100000, help="Количество активных ставок")
+    parser.add_argument("--active-events", type=int, default=10, help="Количество открытых событий")
+    parser.add_argument("--history-years", type=float, default=3, help="Длительность истории ставок, лет")
+    parser.add_argument("--events-per-day", type=int, default=1, help="Событий в день в истории")
+    parser.add_argument("--place-bets", type=int, default=200, help="Количество замеряемых ставок")
+    parser.add_argument("--history-reads", type=int, default=200, help="Количество чтений страниц истории")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора случайных чисел")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Файл базового замера")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="Допустимый рост медианного времени относительно базового замера (0.5 = 50%%)")
+    parser.add_argument("--save-baseline", action="store_true", help="Сохранить результаты как базовый замер")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    report = run_benchmark(args)
+    summary = summarize(report["timings"])
+
+    if args.save_baseline:
+        save_baseline(args.baseline, args, summary)
+        print(format_report(args, report, summary))
+        print(f"\nБазовый замер сохранён в {args.baseline}")
+        return
+
+    baseline = load_baseline(args.baseline)
+    regressions = []
+    if baseline is None:
+        print(f"Базовый замер {args.baseline} не найден, сравнение пропущено.")
+    elif baseline.get("params") != {name: getattr(args, name) for name in WORKLOAD_PARAMS}:
+        print("Параметры данных отличаются от базового замера, сравнение пропущено.")
+        baseline = None
+    else:
+        regressions = compare_with_baseline(summary, baseline, args.tolerance)
+
+    print(format_report(args, report, summary, baseline, regressions))
+    # Ненулевой код выхода, если какая-то операция заметно замедлилась
+    sys.exit(1 if regressions else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+Нагрузочный тест баланса и казино при параллельной обработке обновлений.
+Запускать из корня проекта: python bench/bench_concurrency.py [--users 300] [--storage sqlite]
+
+Сотни виртуальных пользователей одновременно вызывают handle_slots_bet_callback,
+handle_roulette_bet_callback и place_bet через поддельный объект бота.
+Параллелизм ограничен так же, как в main.py (concurrent_updates(10)).
+
+Отчёт содержит пропускную способность, задержки p50/p99 и число потерянных
+обновлений: итоговый баланс каждого пользователя сверяется с суммой ставок
+и выигрышей, которые обработчики сообщили пользователю, а после сброса на диск
+реестр перечитывается из файлов (или базы) и сверяется ещё раз.
+"""
+
+import os
+import re
+import sys
+import time
+import json
+import random
+import asyncio
+import logging
+import argparse
+import tempfile
+import statistics
+from types import SimpleNamespace
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import balance
+import betting
+import casino.roulette
+from balance import BalanceLedger
+from storage import SqliteStorage
+from casino.slots import handle_slots_bet_callback
+from casino.roulette import handle_roulette_bet_callback
+from betting import place_bet
+
+WIN_PATTERN = re.compile(r"Вы выиграли (\d+)")
+
+# Событие для ставок, на которое делают ставки виртуальные пользователи
+BENCH_EVENT = {
+    "id": 1,
+    "description": "Нагрузочный тест",
+    "question": "Кто победит?",
+    "options": [{"id": 1, "text": "Первый"}, {"id": 2, "text": "Второй"}],
+    "is_active": True
+}
+
+class FakeMessage:
+    """Поддельное сообщение Telegram: запоминает текст и имитирует задержку сети."""
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.text = None
+        self.chat = SimpleNamespace(send_animation=self.send_animation)
+
+    async def send_animation(self, animation):
+        await asyncio.sleep(self.latency)
+        return self
+
+    async def delete(self):
+        await asyncio.sleep(self.latency)
+
+    async def edit_text(self, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.text = text
+
+class FakeQuery:
+    """Поддельный callback-запрос: хранит ответы бота для последующей сверки."""
+
+    def __init__(self, user_id, data, latency):
+        self.from_user = SimpleNamespace(id=user_id, username=f"user{user_id}")
+        self.data = data
+        self.latency = latency
+        self.message = FakeMessage(latency)
+        self.alerts = []
+        self.text = None
+
+    async def answer(self, text=None, show_alert=False):
+        await asyncio.sleep(self.latency)
+        if text:
+            self.alerts.append(text)
+
+    async def edit_message_text(self, text, **kwargs):
+        await asyncio.sleep(self.latency)
+        self.text = text
+
+async def play_slots(user_id, rng, latency):
+    """
+    Одна игра в слоты.
+
+    Returns:
+        int: Изменение баланса, о котором бот сообщил пользователю
+    """
+    bet = rng.choice([10, 50, 100])
+    query = FakeQuery(user_id, f"slots_bet:{bet}", latency)
+    update = SimpleNamespace(callback_query=query)
+    context = SimpleNamespace(user_data={})
+    await handle_slots_bet_callback(update, context)
+    if query.text is None or query.text.startswith("Недостаточно"):
+        return 0
+    match = WIN_PATTERN.search(query.text)
+    return -bet + (int(match.group(1)) if match else 0)
+
+async def play_roulette(user_id, rng, latency):
+    """
+    Одна игра в рулетку.
+
+    Returns:
+        int: Изменение баланса, о котором бот сообщил пользователю
+    """
+    bet_type = rng.choice(["red", "black", "zero"])
+    query = FakeQuery(user_id, f"roulette_bet:{bet_type}:50", latency)
+    await handle_roulette_bet_callback(query, SimpleNamespace(user_data={}), bet_type)
+    if query.alerts:
+        return 0  # Недостаточно средств
+    match = WIN_PATTERN.search(query.message.text or "")
+    return -50 + (int(match.group(1)) if match else 0)
+
+async def bet_on_event(user_id, rng, latency):
+    """
+    Одна ставка на событие.
+
+    Returns:
+        int: Изменение баланса (минус ставка, если она принята)
+    """
+    amount = rng.randint(10, 100)
+    accepted = await place_bet(user_id, f"user{user_id}", BENCH_EVENT["id"], rng.choice([1, 2]), amount)
+    return -amount if accepted else 0
+
+SCENARIOS = {
+    "slots": play_slots,
+    "roulette": play_roulette,
+    "place_bet": bet_on_event,
+}
+
+def percentile(values, q):
+    """Возвращает перцентиль q (0-100) из списка значений."""
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(q / 100 * (len(values) - 1))))
+    return values[index]
+
+async def run_load(args, ledger):
+    """
+    Запускает виртуальных пользователей и собирает задержки и ожидаемые балансы.
+
+    Returns:
+        tuple: (задержки по сценариям, ожидаемые изменения балансов, число принятых ставок, время)
+    """
+    semaphore = asyncio.Semaphore(args.concurrency)  # Как concurrent_updates в main.py
+    latencies = {name: [] for name in SCENARIOS}
+    expected = {}
+    accepted_bets = 0
+
+    async def user_session(user_id):
+        nonlocal accepted_bets
+        rng = random.Random(args.seed * 100003 + user_id)
+        for _ in range(args.ops_per_user):
+            name = rng.choice(args.scenarios)
+            async with semaphore:
+                started = time.perf_counter()
+                delta = await SCENARIOS[name](user_id, rng, args.latency)
+                latencies[name].append(time.perf_counter() - started)
+            expected[user_id] = expected.get(user_id, 0) + delta
+            if name == "place_bet" and delta:
+                accepted_bets += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_session(user_id) for user_id in range(1, args.users + 1)))
+    elapsed = time.perf_counter() - started
+    return latencies, expected, accepted_bets, elapsed
+
+def count_recorded_bets():
+    """Считает ставки, сохранённые в данных о ставках."""
+    return sum(
+        len(user_data.get("bets", []))
+        for users in betting.load_active_bets().values()
+        for user_data in users.values()
+    )
+
+def main():
+    """
+    Основная функция нагрузочного теста.
+    """
+    parser = argparse.ArgumentParser(description="Нагрузочный тест баланса и казино")
+    parser.add_argument("--users", type=int, default=300, help="Количество виртуальных пользователей")
+    parser.add_argument("--ops-per-user", type=int, default=20, help="Операций на пользователя")
+    parser.add_argument("--concurrency", type=int, default=10, help="Одновременно обрабатываемых обновлений")
+    parser.add_argument("--initial-balance", type=int, default=1000, help="Начальный баланс пользователя")
+    parser.add_argument("--latency", type=float, default=0.001, help="Задержка ответа Telegram API, с")
+    parser.add_argument("--roulette-delay", type=float, default=0.0,
+                        help="Длительность анимации рулетки, с (в боте 5.5)")
+    parser.add_argument("--flush-delay", type=float, default=balance.FLUSH_DELAY,
+                        help="Задержка отложенной записи балансов, с")
+    parser.add_argument("--storage", choices=["json", "sqlite"], default="json", help="Хранилище данных")
+    parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS),
+                        help="Сценарии нагрузки")
+    parser.add_argument("--seed", type=int, default=1, help="Зерно генератора случайных чисел")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    random.seed(args.seed)  # Результаты слотов и рулетки
+
+    report = run_benchmark(args)
+    print(format_report(args, report))
+    # Ненулевой код выхода, если обнаружены потерянные обновления
+    sys.exit(1 if report["lost_updates"] or report["lost_on_reload"] or report["lost_bets"] else 0)
+
+def run_benchmark(args):
+    """
+    Выполняет нагрузочный тест во временном каталоге.
+
+    Returns:
+        dict: Результаты теста
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage = SqliteStorage(os.path.join(tmp_dir, "bot.db")) if args.storage == "sqlite" else None
+        paths = {
+            "path": os.path.join(tmp_dir, "balance.json"),
+            "journal_path": os.path.join(tmp_dir, "balance_journal.jsonl"),
+            "archive_path": os.path.join(tmp_dir, "balance_journal.archive.jsonl"),
+        }
+        initial = {
+            str(user_id): {"balance": args.initial_balance, "name": f"user{user_id}"}
+            for user_id in range(1, args.users + 1)
+        }
+        ledger = BalanceLedger(flush_delay=args.flush_delay, storage=storage, **paths)
+        ledger.replace(initial)
+        ledger.flush()
+
+        async def animation_sleep(delay):
+            await asyncio.sleep(args.roulette_delay if delay == 5.5 else 0)
+
+        events_path = os.path.join(tmp_dir, "betting_events.json")
+        with open(events_path, "w", encoding="utf-8") as f:
+            json.dump({"events": [BENCH_EVENT]}, f, ensure_ascii=False)
+
+        gif_ids = {"animations": {"roulette": {"red": ["red"], "black": ["black"], "zero": ["zero"]}}}
+        with patch("balance._ledger", ledger), \
+             patch("betting.get_storage", return_value=storage), \
+             patch("betting.BETTING_DATA_FILE", os.path.join(tmp_dir, "betting_data.json")), \
+             patch("betting.BETTING_BETS_DIR", os.path.join(tmp_dir, "betting_bets")), \
+             patch("betting.BETTING_EVENTS_FILE", events_path), \
+             patch("betting._event_index", betting.BettingEventIndex()), \
+             patch("casino.roulette.load_file_ids", return_value=gif_ids), \
+             patch.object(casino.roulette, "asyncio", SimpleNamespace(sleep=animation_sleep)):
+            latencies, expected, accepted_bets, elapsed = asyncio.run(run_load(args, ledger))
+            recorded_bets = count_recorded_bets()
+
+        ledger.flush()
+        # Сверяем итоговые балансы с тем, что бот сообщил пользователям
+        final = ledger.snapshot()
+        lost_updates = sum(
+            1 for user_id in range(1, args.users + 1)
+            if final[str(user_id)]["balance"] != args.initial_balance + expected.get(user_id, 0)
+        )
+        # Перечитываем сохранённые данные, как при перезапуске бота
+        reloaded = BalanceLedger(flush_delay=args.flush_delay, storage=storage, **paths).snapshot()
+        lost_on_reload = sum(1 for user_id, entry in final.items() if reloaded.get(user_id) != entry)
+        if storage is not None:
+            storage.close()
+
+    return {
+        "latencies": latencies,
+        "elapsed": elapsed,
+        "lost_updates": lost_updates,
+        "lost_on_reload": lost_on_reload,
+        "lost_bets": abs(recorded_bets - accepted_bets),
+        "accepted_bets": accepted_bets,
+    }
+
+def format_report(args, report):
+    """
+    Формирует текстовый отчёт по результатам теста.
+
+    Returns:
+        str: Таблица с результатами
+    """
+    lines = [
+        f"Пользователей: {args.users}, операций на пользователя: {args.ops_per_user}, "
+        f"параллельность: {args.concurrency}, хранилище: {args.storage}",
+        "",
+        f"{'сценарий':<12} {'операций':>9} {'оп/с':>10} {'p50, мс':>9} {'p99, мс':>9}",
+    ]
+    all_latencies = []
+    for name, values in report["latencies"].items():
+        if not values:
+            continue
+        all_latencies.extend(values)
+        lines.append(
+            f"{name:<12} {len(values):>9} {len(values) / report['elapsed']:>10.1f} "
+            f"{percentile(values, 50) * 1000:>9.2f} {percentile(values, 99) * 1000:>9.2f}"
+        )
+    lines.append(
+        f"{'всего':<12} {len(all_latencies):>9} {len(all_latencies) / report['elapsed']:>10.1f} "
+        f"{percentile(all_latencies, 50) * 1000:>9.2f} {percentile(all_latencies, 99) * 1000:>9.2f}"
+    )
+    lines.append("")
+    lines.append(f"Время: {report['elapsed']:.2f} с, средняя задержка: "
+                 f"{statistics.mean(all_latencies) * 1000 if all_latencies else 0:.2f} мс")
+    lines.append(f"Потерянные обновления балансов: {report['lost_updates']}")
+    lines.append(f"Расхождения после перечитывания с диска: {report['lost_on_reload']}")
+    lines.append(f"Потерянные ставки: {report['lost_bets']} (принято {report['accepted_bets']})")
+    return "\n".join(lines)
+
+if __name__ == "__main__":
+    main()
@@ -5,14 +5,28 @@
 """
 
 import os
-import json
 import logging
 import datetime
-from balance import load_balances, update_balance, get_balance
+import copy
+import heapq
+import threading
+from balance import commit_balances_bulk, has_balance_ref, try_debit, credit
+from storage import get_storage
+from docstore import read_json, write_json, list_json, delete_json, file_signature, flush_json
+import betting_history
+from schedule_plan import get_betting_slots  # окна ставок нужны и обработчикам, и планировщику
 
 # Константы для хранения путей к файлам
 BETTING_EVENTS_FILE = "post_materials/betting_events.json"
 BETTING_DATA_FILE = "state_data/betting_data.json"
+# Каталог разделов активных ставок: по одному файлу на событие
+BETTING_BETS_DIR = "state_data/betting_bets"
+
+# Текущая версия схемы betting_data.json (файлы без schema_version - версия 1)
+BETTING_SCHEMA_VERSION = 4
+
+# Минимальное число событий для попадания в рейтинг по ROI
+BETTOP_MIN_EVENTS = 3
 
 def load_betting_events():
     """
@@ -21,13 +35,8 @@ def load_betting_events():
     Returns:
         dict: Словарь с событиями
     """
-    if not os.path.exists(BETTING_EVENTS_FILE):
-        return {"events": []}
-    
     try:
-        with open(BETTING_EVENTS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            return data
+        return read_json(BETTING_EVENTS_FILE, {"events": []})
     except Exception as e:
         logging.error(f"Ошибка при чтении {BETTING_EVENTS_FILE}: {e}")
         return {"events": []}
@@ -40,83 +49,529 @@ def save_betting_events(data):
         data (dict): Словарь с событиями для сохранения
     """
     try:
-        with open(BETTING_EVENTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        write_json(BETTING_EVENTS_FILE, data)
+        _event_index.replace(BETTING_EVENTS_FILE, data)
     except Exception as e:
         logging.error(f"Ошибка при записи {BETTING_EVENTS_FILE}: {e}")
 
+class BettingEventIndex:
+    """
+    Индекс событий для ставок по ID.
+
+    Файл событий разбирается заново только после изменения его mtime/размера
+    (или после save_betting_events), а поиск события и варианта ответа
+    выполняется по словарям без перебора списка. Возвращаемые словари
+    общие для всех вызывающих, изменять их нельзя.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._source = None  # (путь, сигнатура файла), из которых построен индекс
+        self._events = {}    # str(id события) -> событие
+        self._options = {}   # (str(id события), str(id варианта)) -> вариант
+
+    def _build(self, data):
+        events = {}
+        options = {}
+        for event in data.get("events", []):
+            event_id = str(event.get("id"))
+            events[event_id] = event
+            for option in event.get("options", []):
+                options[(event_id, str(option.get("id")))] = option
+        self._events = events
+        self._options = options
+
+    def _refresh(self):
+        path = os.path.abspath(BETTING_EVENTS_FILE)
+        source = (path, file_signature(path))
+        if source != self._source:
+            self._build(load_betting_events())
+            self._source = source
+
+    def replace(self, path, data):
+        """
+        Перестраивает индекс по только что сохранённым данным, не перечитывая файл.
+
+        Args:
+            path: Путь к файлу событий
+            data: Сохранённый словарь с событиями
+        """
+        path = os.path.abspath(path)
+        with self._lock:
+            # Запись на диск отложена, поэтому запоминаем текущую сигнатуру файла:
+            # после сброса она изменится и индекс один раз обновится из кэша документов
+            self._build(copy.deepcopy(data))
+            self._source = (path, file_signature(path))
+
+    def invalidate(self):
+        """Сбрасывает индекс: при следующем обращении файл будет прочитан заново."""
+        with self._lock:
+            self._source = None
+
+    def get_event(self, event_id):
+        """
+        Возвращает событие по ID.
+
+        Args:
+            event_id (int или str): ID события
+
+        Returns:
+            dict: Данные события или None, если событие не найдено
+        """
+        with self._lock:
+            self._refresh()
+            return self._events.get(str(event_id))
+
+    def get_option(self, event_id, option_id):
+        """
+        Возвращает вариант ответа события.
+
+        Args:
+            event_id (int или str): ID события
+            option_id (int или str): ID варианта
+
+        Returns:
+            dict: Данные варианта или None, если событие или вариант не найдены
+        """
+        with self._lock:
+            self._refresh()
+            return self._options.get((str(event_id), str(option_id)))
+
+_event_index = BettingEventIndex()
+
+def get_betting_event(event_id):
+    """
+    Получает событие по его ID из индекса событий (без разбора файла).
+
+    Args:
+        event_id (int или str): ID события
+
+    Returns:
+        dict: Данные события (только для чтения) или None, если событие не найдено
+    """
+    return _event_index.get_event(event_id)
+
+def get_betting_option(event_id, option_id):
+    """
+    Получает вариант ответа события из индекса событий (без разбора файла).
+
+    Args:
+        event_id (int или str): ID события
+        option_id (int или str): ID варианта
+
+    Returns:
+        dict: Данные варианта (только для чтения) или None, если он не найден
+    """
+    return _event_index.get_option(event_id, option_id)
+
+def _new_betting_data():
+    """Возвращает пустые данные о ставках в текущем формате."""
+    return {"schema_version": BETTING_SCHEMA_VERSION, "win_streaks": {}, "betting_stats": {}, "settled_events": {}}
+
+def _migrate_v1_to_v2(data):
+    """
+    Переводит данные первого формата (без schema_version) во второй:
+    приводит win_streaks к виду { 'streak', 'user_name' }, убирает @ из имён
+    и пересчитывает пулы тотализатора по активным ставкам.
+    """
+    data.setdefault("active_bets", {})
+
+    # Конвертируем старый формат win_streaks в новый, если нужно
+    updated_win_streaks = {}
+    for user_id, streak_data in data.get("win_streaks", {}).items():
+        if isinstance(streak_data, dict):
+            # Проверяем что все необходимые поля есть
+            streak_data.setdefault("streak", 0)
+            streak_data.setdefault("user_name", "Unknown")
+            # Удаляем @ из имени пользователя, если есть
+            if streak_data["user_name"].startswith('@'):
+                streak_data["user_name"] = streak_data["user_name"][1:]
+            updated_win_streaks[user_id] = streak_data
+        else:
+            # Старый формат - просто число
+            updated_win_streaks[user_id] = {
+                "streak": streak_data,
+                "user_name": "Unknown"
+            }
+    data["win_streaks"] = updated_win_streaks
+
+    # Пулы тотализатора появились позже ставок - пересчитываем их для старых файлов
+    if "pools" not in data:
+        data["pools"] = rebuild_pools(data["active_bets"])
+
+    # Также очищаем имена пользователей в истории ставок, оставшейся в файле
+    # от старых версий (при сохранении она переносится в журнал истории)
+    for entry in data.get("history", []):
+        for user in entry.get("winners", []) + entry.get("losers", []):
+            if user.get("user_name", "").startswith('@'):
+                user["user_name"] = user["user_name"][1:]
+    return data
+
+def _migrate_v2_to_v3(data):
+    """
+    Переводит данные второго формата в третий: активные ставки и пулы каждого
+    события переносятся в отдельные файлы разделов (BETTING_BETS_DIR),
+    в betting_data.json остаются только серии побед.
+    """
+    pools = data.pop("pools", {})
+    for event_id, event_bets in data.pop("active_bets", {}).items():
+        save_event_bets(event_id, {
+            "bets": event_bets,
+            "pool": pools.get(event_id) or build_event_pool(event_bets)
+        })
+    return data
+
+def _migrate_v3_to_v4(data):
+    """
+    Переводит данные третьего формата в четвёртый: добавляет статистику ставок
+    пользователей ('betting_stats'), один раз посчитанную по истории ставок.
+    """
+    # От старых записей к новым, чтобы в статистике осталось последнее имя пользователя
+    entries = get_betting_history(limit=count_betting_history(), offset=0)[::-1]
+    entries += sorted(data.get("history", []), key=lambda x: x.get("date") or "")
+    data["betting_stats"] = build_betting_stats(entries)
+    return data
+
+def build_betting_stats(entries):
+    """
+    Считает статистику ставок пользователей по записям истории.
+    Используется только при переносе данных: дальше статистика ведётся при подведении итогов.
+
+    Args:
+        entries (list): Записи истории ставок
+
+    Returns:
+        dict: { user_id: { 'user_name', 'wagered', 'won', 'events', 'wins' } }
+    """
+    stats = {}
+    for entry in entries:
+        # Записи без user_id (очень старые) пропускаем - их не к кому отнести
+        for winner in entry.get("winners", []):
+            if winner.get("user_id") is not None:
+                _add_user_stats(stats, winner["user_id"], winner.get("user_name", "Unknown"),
+                                winner.get("bet_amount", 0), winner.get("win_amount", 0), True)
+        for loser in entry.get("losers", []):
+            if loser.get("user_id") is not None:
+                _add_user_stats(stats, loser["user_id"], loser.get("user_name", "Unknown"),
+                                loser.get("loss_amount", 0), 0, False)
+    return stats
+
+# Шаги миграции: версия схемы -> функция перевода данных в следующую версию
+_SCHEMA_MIGRATIONS = {
+    1: _migrate_v1_to_v2,
+    2: _migrate_v2_to_v3,
+    3: _migrate_v3_to_v4,
+}
+
+def migrate_betting_data(data):
+    """
+    Последовательно переводит данные о ставках в текущую версию схемы.
+
+    Args:
+        data (dict): Данные из betting_data.json (изменяются на месте)
+
+    Returns:
+        dict: Данные с schema_version == BETTING_SCHEMA_VERSION
+    """
+    version = data.get("schema_version", 1)
+    while version < BETTING_SCHEMA_VERSION:
+        data = _SCHEMA_MIGRATIONS[version](data)
+        version += 1
+        data["schema_version"] = version
+    return data
+
+def upgrade_betting_data_file():
+    """
+    Однократно переводит betting_data.json в текущую версию схемы и сохраняет его.
+    Вызывается при запуске бота и скриптом migrate_betting_data.py.
+
+    Returns:
+        bool: True, если файл был обновлён, False, если он уже в текущем формате или отсутствует
+    """
+    if get_storage() is not None:
+        # В SQLite данные хранятся в таблицах уже в текущем формате
+        return False
+    try:
+        data = read_json(BETTING_DATA_FILE)
+    except Exception as e:
+        logging.error(f"Ошибка при чтении {BETTING_DATA_FILE}: {e}")
+        return False
+    if data is None or data.get("schema_version", 1) >= BETTING_SCHEMA_VERSION:
+        return False
+    old_version = data.get("schema_version", 1)
+    save_betting_data(migrate_betting_data(data))
+    logging.info(f"{BETTING_DATA_FILE}: схема обновлена с версии {old_version} до {BETTING_SCHEMA_VERSION}")
+    return True
+
 def load_betting_data():
     """
-    Загружает данные о текущих ставках и истории.
+    Загружает данные о текущих ставках.
+    Файл приводится к текущей схеме один раз при запуске (upgrade_betting_data_file),
+    поэтому здесь выполняется только чтение.
     
     Returns:
-        dict: Словарь с активными ставками, историей и сериями побед
+        dict: Словарь с сериями побед (в SQLite - также со всеми активными ставками и пулами)
     """
-    if not os.path.exists(BETTING_DATA_FILE):
-        return {"active_bets": {}, "history": [], "win_streaks": {}}
-    
+    storage = get_storage()
+    if storage is not None:
+        return storage.load_betting_data()
+
     try:
-        with open(BETTING_DATA_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            # Обеспечиваем совместимость со старым форматом данных
-            if "win_streaks" not in data:
-                data["win_streaks"] = {}
-                
-            # Конвертируем старый формат win_streaks в новый, если нужно
-            updated_win_streaks = {}
-            for user_id, streak_data in data["win_streaks"].items():
-                if isinstance(streak_data, dict):
-                    # Проверяем что все необходимые поля есть
-                    if "streak" not in streak_data:
-                        streak_data["streak"] = 0
-                    if "user_name" not in streak_data:
-                        streak_data["user_name"] = "Unknown"
-                        
-                    # Удаляем @ из имени пользователя, если есть
-                    if streak_data["user_name"].startswith('@'):
-                        streak_data["user_name"] = streak_data["user_name"][1:]
-                        
-                    updated_win_streaks[user_id] = streak_data
-                else:
-                    # Старый формат - просто число
-                    updated_win_streaks[user_id] = {
-                        "streak": streak_data,
-                        "user_name": "Unknown"
-                    }
-            
-            data["win_streaks"] = updated_win_streaks
-            
-            # Также очищаем имена пользователей в истории ставок
-            for entry in data.get("history", []):
-                for winner in entry.get("winners", []):
-                    if "user_name" in winner and winner["user_name"].startswith('@'):
-                        winner["user_name"] = winner["user_name"][1:]
-                        
-                for loser in entry.get("losers", []):
-                    if "user_name" in loser and loser["user_name"].startswith('@'):
-                        loser["user_name"] = loser["user_name"][1:]
-            
-            return data
+        data = read_json(BETTING_DATA_FILE)
+        if data is None:
+            return _new_betting_data()
+        if data.get("schema_version", 1) < BETTING_SCHEMA_VERSION:
+            # Файл заменили после запуска - переводим его в текущую схему
+            logging.warning(f"{BETTING_DATA_FILE} в формате версии {data.get('schema_version', 1)}, выполняю миграцию")
+            upgrade_betting_data_file()
+            data = read_json(BETTING_DATA_FILE) or _new_betting_data()
+        return data
     except Exception as e:
         logging.error(f"Ошибка при чтении {BETTING_DATA_FILE}: {e}")
-        return {"active_bets": {}, "history": [], "win_streaks": {}}
+        return _new_betting_data()
+
+def load_users_betting_data(user_ids):
+    """
+    Загружает серии побед и статистику ставок указанных пользователей.
+    В SQLite читаются только строки этих пользователей; JSON-файл хранит всех
+    пользователей одним документом, поэтому возвращается он целиком.
+
+    Args:
+        user_ids: ID пользователей
+
+    Returns:
+        dict: { 'win_streaks': {...}, 'betting_stats': {...} } (как минимум для указанных пользователей)
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.load_users_betting_data(user_ids)
+    betting_data = load_betting_data()
+    betting_data.setdefault("win_streaks", {})
+    betting_data.setdefault("betting_stats", {})
+    return betting_data
+
+def _load_all_betting_stats():
+    """
+    Загружает серии побед и статистику ставок всех пользователей (без активных ставок).
+
+    Returns:
+        dict: { 'win_streaks': {...}, 'betting_stats': {...} }
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.load_betting_stats()
+    return load_betting_data()
+
+def is_event_settled(event_id):
+    """
+    Проверяет, подведены ли итоги события.
+
+    Args:
+        event_id (int или str): ID события
+
+    Returns:
+        bool: True, если итоги события уже зафиксированы
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.is_event_settled(event_id)
+    return str(event_id) in load_betting_data().get("settled_events", {})
 
 def save_betting_data(data):
     """
-    Сохраняет данные о ставках в файл.
+    Сохраняет данные о ставках в файл (ставки событий сохраняются в своих разделах через save_event_bets).
     
     Args:
         data (dict): Словарь с данными для сохранения
+
+    Returns:
+        bool: True, если данные сохранены, False при ошибке записи
     """
     try:
-        # Оставляем только последние 7 записей в истории
-        if "history" in data and len(data["history"]) > 7:
-            data["history"] = sorted(data["history"], key=lambda x: x.get("date"), reverse=True)[:7]
-        
-        with open(BETTING_DATA_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
+        # История из файлов старых версий переносится в журнал истории
+        legacy_history = data.pop("history", None)
+        if legacy_history:
+            append_betting_history(sorted(legacy_history, key=lambda x: x.get("date") or ""))
+
+        storage = get_storage()
+        if storage is not None:
+            storage.save_betting_data(data)
+            return True
+
+        write_json(BETTING_DATA_FILE, data)
+        return True
     except Exception as e:
         logging.error(f"Ошибка при записи {BETTING_DATA_FILE}: {e}")
+        return False
+
+def build_event_pool(event_bets):
+    """
+    Считает пул тотализатора события по ставкам пользователей.
+
+    Args:
+        event_bets (dict): Ставки события { user_id: { 'user_name', 'bets': [...] } }
+
+    Returns:
+        dict: { 'total': сумма ставок, 'options': { option_id: { 'total', 'bettors' } } }
+    """
+    pool = {"total": 0, "options": {}}
+    for user_data in event_bets.values():
+        user_options = set()
+        for bet in user_data.get("bets", []):
+            option_pool = pool["options"].setdefault(str(bet.get("option_id")), {"total": 0, "bettors": 0})
+            option_pool["total"] += bet.get("amount", 0)
+            pool["total"] += bet.get("amount", 0)
+            user_options.add(str(bet.get("option_id")))
+        for option_id in user_options:
+            pool["options"][option_id]["bettors"] += 1
+    return pool
+
+def rebuild_pools(active_bets):
+    """
+    Пересчитывает пулы тотализатора всех событий по активным ставкам.
+
+    Args:
+        active_bets (dict): Активные ставки { event_id: { user_id: {...} } }
+
+    Returns:
+        dict: Пулы { event_id: пул события }
+    """
+    return {event_id: build_event_pool(event_bets) for event_id, event_bets in active_bets.items()}
+
+def _add_bet_to_pool(pool, option_id, amount, new_bettor):
+    """
+    Учитывает новую ставку в пуле события (без пересчёта остальных ставок).
+
+    Args:
+        pool (dict): Пул события { 'total', 'options' }
+        option_id: ID варианта
+        amount (int): Размер ставки
+        new_bettor (bool): True, если пользователь ещё не ставил на этот вариант
+    """
+    option_pool = pool.setdefault("options", {}).setdefault(str(option_id), {"total": 0, "bettors": 0})
+    option_pool["total"] += amount
+    pool["total"] = pool.get("total", 0) + amount
+    if new_bettor:
+        option_pool["bettors"] += 1
+
+def _event_bets_path(event_id):
+    """
+    Возвращает путь к файлу раздела ставок события.
+
+    Args:
+        event_id (int или str): ID события
+    """
+    safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in str(event_id))
+    return os.path.join(BETTING_BETS_DIR, f"event_{safe_id}.json")
+
+def load_event_bets(event_id):
+    """
+    Загружает раздел активных ставок одного события.
+    Ставки других событий при этом не читаются.
+
+    Args:
+        event_id (int или str): ID события
+
+    Returns:
+        dict: { 'bets': { user_id: { 'user_name', 'bets': [...] } }, 'pool': пул события }
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.load_event_bets(event_id)
+
+    try:
+        partition = read_json(_event_bets_path(event_id))
+    except Exception as e:
+        logging.error(f"Ошибка при чтении ставок события {event_id}: {e}")
+        partition = None
+    if partition is None:
+        return {"bets": {}, "pool": {"total": 0, "options": {}}}
+    partition.setdefault("bets", {})
+    if "pool" not in partition:
+        partition["pool"] = build_event_pool(partition["bets"])
+    return partition
+
+def save_event_bets(event_id, partition):
+    """
+    Сохраняет раздел активных ставок события, не перезаписывая ставки других событий.
+    Раздел без ставок удаляется.
+
+    Args:
+        event_id (int или str): ID события
+        partition (dict): { 'bets': {...}, 'pool': {...} }
+    """
+    storage = get_storage()
+    if storage is not None:
+        storage.replace_event_bets(event_id, partition.get("bets", {}))
+        return
+
+    path = _event_bets_path(event_id)
+    if not partition.get("bets"):
+        delete_json(path)
+        return
+    write_json(path, {
+        "event_id": event_id,
+        "bets": partition["bets"],
+        "pool": partition.get("pool") or build_event_pool(partition["bets"])
+    })
+
+def load_active_bets():
+    """
+    Собирает активные ставки всех событий (для переноса данных и отчётов).
+
+    Returns:
+        dict: Активные ставки { event_id (str): { user_id: {...} } }
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.load_betting_data()["active_bets"]
+
+    active_bets = {}
+    for path in list_json(BETTING_BETS_DIR, prefix="event_"):
+        try:
+            partition = read_json(path)
+        except Exception as e:
+            logging.error(f"Ошибка при чтении {path}: {e}")
+            continue
+        if partition and partition.get("bets"):
+            active_bets[str(partition.get("event_id"))] = partition["bets"]
+    return active_bets
+
+def get_event_pool(event_id):
+    """
+    Получает текущий пул тотализатора события.
+
+    Args:
+        event_id (int или str): ID события
+
+    Returns:
+        dict: { 'total', 'options': { option_id: { 'total', 'bettors' } } } или None, если ставок нет
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.get_event_pool(event_id)
+    pool = load_event_bets(event_id)["pool"]
+    return pool if pool.get("total") else None
+
+def get_live_odds(event_id):
+    """
+    Рассчитывает текущие коэффициенты тотализатора по вариантам события.
+    Коэффициент варианта = сумма всех ставок / сумма ставок на вариант.
+
+    Args:
+        event_id (int или str): ID события
+
+    Returns:
+        dict: { option_id (str): коэффициент } для вариантов, на которые уже есть ставки
+    """
+    pool = get_event_pool(event_id)
+    if not pool or not pool.get("total"):
+        return {}
+    return {
+        option_id: pool["total"] / option_pool["total"]
+        for option_id, option_pool in pool["options"].items()
+        if option_pool.get("total")
+    }
 
 def get_next_active_event():
     """
@@ -137,12 +592,31 @@ def get_next_active_event():
     
     return None
 
-def publish_event(event_id):
+def is_betting_open(event):
+    """
+    Проверяет, принимаются ли ставки на событие.
+
+    После публикации событие снимается из очереди (is_active = False) и открывается
+    для ставок (betting_open = True) до закрытия. Для событий без флага betting_open
+    (ещё не опубликованных) используется прежний признак is_active.
+
+    Args:
+        event (dict): Данные события
+
+    Returns:
+        bool: True, если ставки на событие принимаются
     """
-    Помечает событие как неактивное после публикации.
+    if not event:
+        return False
+    return bool(event.get("betting_open", event.get("is_active", True)))
+
+def publish_event(event_id, slot=None):
+    """
+    Снимает событие из очереди публикации и открывает приём ставок на него.
     
     Args:
         event_id (int): ID события
+        slot (int): Номер окна ставок, в котором опубликовано событие (если известен)
         
     Returns:
         bool: True, если событие успешно помечено, False в противном случае
@@ -153,15 +627,39 @@ def publish_event(event_id):
     for event in events:
         if event.get("id") == event_id:
             event["is_active"] = False
+            event["betting_open"] = True
             event["publication_date"] = datetime.datetime.now().strftime("%Y-%m-%d")
+            if slot is not None:
+                event["betting_slot"] = slot
             save_betting_events(events_data)
             return True
     
     return False
 
-def place_bet(user_id, user_name, event_id, option_id, amount):
+def close_event(event_id):
+    """
+    Закрывает приём ставок на событие.
+
+    Args:
+        event_id (int или str): ID события
+
+    Returns:
+        bool: True, если событие найдено и закрыто, False в противном случае
+    """
+    events_data = load_betting_events()
+    for event in events_data.get("events", []):
+        if str(event.get("id")) == str(event_id):
+            event["is_active"] = False
+            event["betting_open"] = False
+            save_betting_events(events_data)
+            return True
+    return False
+
+async def place_bet(user_id, user_name, event_id, option_id, amount):
     """
     Размещает ставку пользователя на конкретное событие.
+    Списание выполняется атомарно (try_debit), поэтому параллельные ставки
+    одного пользователя не могут увести баланс в минус.
     
     Args:
         user_id (int): ID пользователя
@@ -173,67 +671,149 @@ def place_bet(user_id, user_name, event_id, option_id, amount):
     Returns:
         bool: True, если ставка успешно размещена, False в противном случае
     """
-    # Проверяем баланс пользователя
-    user_balance = get_balance(user_id)
-    if user_balance < amount:
+    # Проверяем существование события и выбранного варианта
+    if get_betting_option(event_id, option_id) is None:
         return False
 
-    # Проверяем существование события
-    events_data = load_betting_events()
-    event = None
+    # Списываем ставку, только если хватает средств
+    if await try_debit(user_id, amount, reason="betting") is None:
+        return False
 
-    for e in events_data.get("events", []):
-        if str(e.get("id")) == str(event_id):
-            event = e
-            break
+    bet = {
+        "option_id": option_id,
+        "amount": amount,
+        "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
 
-    if not event:
-        return False
+    try:
+        storage = get_storage()
+        if storage is not None:
+            # В базе ставка добавляется одной строкой, без перезаписи остальных данных
+            storage.add_bet(event_id, user_id, user_name, bet)
+            return True
 
-    # Проверяем существование выбранного варианта
-    option_exists = False
-    for option in event.get("options", []):
-        if str(option.get("id")) == str(option_id):
-            option_exists = True
-            break
+        # Читаем и перезаписываем только раздел ставок этого события
+        partition = load_event_bets(event_id)
+        user_id_str = str(user_id)
+
+        if user_id_str not in partition["bets"]:
+            partition["bets"][user_id_str] = {
+                "user_name": user_name,
+                "bets": []
+            }
 
-    if not option_exists:
+        # Добавляем ставку в список ставок пользователя и в пул варианта
+        user_bets = partition["bets"][user_id_str]["bets"]
+        new_bettor = all(str(b.get("option_id")) != str(option_id) for b in user_bets)
+        user_bets.append(bet)
+        _add_bet_to_pool(partition["pool"], option_id, amount, new_bettor)
+        save_event_bets(event_id, partition)
+        return True
+    except Exception as e:
+        logging.error(f"Ошибка при сохранении ставки: {e}")
+        # Ставка не сохранилась - возвращаем списанные монеты
+        await credit(user_id, amount, reason="betting")
         return False
 
-    # Загружаем данные о ставках
-    betting_data = load_betting_data()
+def distribute_pot(stakes, pot):
+    """
+    Делит банк между победителями пропорционально их ставкам в целых числах
+    методом наибольшего остатка: каждый получает целую часть своей доли,
+    а оставшиеся от округления монеты - по одной тем, у кого дробная часть больше.
+    Сумма выплат всегда равна банку.
 
-    user_id_str = str(user_id)
-    event_id_str = str(event_id)
+    Args:
+        stakes (dict): Ставки победителей { user_id: сумма ставок на победивший вариант }
+        pot (int): Банк события (общая сумма ставок)
 
-    if event_id_str not in betting_data["active_bets"]:
-        betting_data["active_bets"][event_id_str] = {}
+    Returns:
+        dict: Выплаты { user_id: сумма }
+    """
+    total_stake = sum(stakes.values())
+    if total_stake <= 0:
+        return {}
+    payouts = {}
+    remainders = []
+    distributed = 0
+    for user_id, stake in stakes.items():
+        share, remainder = divmod(stake * pot, total_stake)
+        payouts[user_id] = share
+        distributed += share
+        remainders.append((remainder, stake, user_id))
+    # Остаток меньше числа победителей; при равных дробных частях преимущество у большей ставки
+    leftover = pot - distributed
+    if leftover:
+        for _, _, user_id in heapq.nlargest(leftover, remainders, key=lambda item: (item[0], item[1])):
+            payouts[user_id] += 1
+    return payouts
 
-    if user_id_str not in betting_data["active_bets"][event_id_str]:
-        betting_data["active_bets"][event_id_str][user_id_str] = {
-            "user_name": user_name,
-            "bets": []
-        }
+def _add_user_stats(stats, user_id, user_name, wagered, won, hit):
+    """
+    Учитывает итог одного события в статистике ставок пользователя.
 
-    # Добавляем ставку в список ставок пользователя
-    betting_data["active_bets"][event_id_str][user_id_str]["bets"].append({
-        "option_id": option_id,
-        "amount": amount,
-        "time": datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    })
+    Args:
+        stats (dict): Статистика { user_id: { 'user_name', 'wagered', 'won', 'events', 'wins' } }
+        user_id: ID пользователя
+        user_name (str): Имя пользователя
+        wagered (int): Сумма ставок пользователя на событие
+        won (int): Выплата пользователю
+        hit (bool): True, если пользователь угадал
+    """
+    user_stats = stats.setdefault(str(user_id), {"user_name": user_name, "wagered": 0, "won": 0, "events": 0, "wins": 0})
+    user_stats["user_name"] = user_name
+    user_stats["wagered"] += wagered
+    user_stats["won"] += won
+    user_stats["events"] += 1
+    if hit:
+        user_stats["wins"] += 1
 
-    try:
-        # Сначала сохраняем ставку
-        save_betting_data(betting_data)
-        
-        # Если сохранение прошло успешно, снимаем деньги с баланса
-        update_balance(user_id, -amount)
-        
-        return True
-    except Exception as e:
-        logging.error(f"Ошибка при сохранении ставки: {e}")
+def _commit_settlement(event_id, payouts, betting_data, history_entry):
+    """
+    Фиксирует итоги события.
+
+    В SQLite выплаты, серии побед, статистика и отметка о подведении итогов ('settled_events')
+    записываются одной транзакцией. В JSON-файлах выплаты сразу дописываются в журнал балансов
+    со ссылкой на событие, и только затем сохраняется отметка вместе с сериями побед: если
+    отметку сохранить не удалось, повторный расчёт найдёт выплаты по ссылке и не начислит их ещё раз.
+    После фиксации удаляется раздел ставок события и дописывается запись истории.
+    Разделы остальных событий не затрагиваются.
+
+    Args:
+        event_id (int или str): ID события
+        payouts (dict): Выплаты { user_id: сумма }
+        betting_data (dict): Серии побед и статистика с обновлёнными записями участников события
+            (в SQLite сохраняются только строки переданных пользователей)
+        history_entry (dict): Запись истории события
+
+    Returns:
+        bool: True, если итоги зафиксированы, False, если сохранить их не удалось
+    """
+    ref = f"betting:{event_id}"
+    settled_events = betting_data.setdefault("settled_events", {})
+    settled_events[str(event_id)] = history_entry["date"]
+    settlement = {
+        "schema_version": BETTING_SCHEMA_VERSION,
+        "win_streaks": betting_data["win_streaks"],
+        "betting_stats": betting_data["betting_stats"],
+        "settled_events": settled_events
+    }
+
+    storage = get_storage()
+    if storage is not None:
+        saved = commit_balances_bulk(
+            payouts, reason="betting", ref=ref,
+            save=lambda balances, user_ids, journal: storage.save_settlement(settlement, balances, user_ids, journal)
+        ) is not None
+    else:
+        saved = not payouts or has_balance_ref(ref) or commit_balances_bulk(payouts, reason="betting", ref=ref) is not None
+        saved = saved and save_betting_data(settlement) and flush_json(BETTING_DATA_FILE)
+    if not saved:
         return False
 
+    save_event_bets(event_id, {"bets": {}})
+    append_betting_history([history_entry])
+    return True
+
 def process_event_results(event_id, winner_option_id):
     """
     Обрабатывает результаты события, определяет победителей и проигравших,
@@ -246,59 +826,53 @@ def process_event_results(event_id, winner_option_id):
     Returns:
         dict: Словарь с результатами обработки ставок
     """
-    events_data = load_betting_events()
-    betting_data = load_betting_data()
-    
-    event = None
-    for e in events_data.get("events", []):
-        if str(e.get("id")) == str(event_id):
-            event = e
-            break
-    
+    event = get_betting_event(event_id)
     if not event:
         return {"status": "error", "message": "Событие не найдено"}
     
     # Получаем правильный вариант ответа и его описание
-    correct_option = None
-    for option in event.get("options", []):
-        if str(option.get("id")) == str(winner_option_id):
-            correct_option = option
-            break
-    
+    correct_option = get_betting_option(event_id, winner_option_id)
     if not correct_option:
         return {"status": "error", "message": "Вариант ответа не найден"}
     
-    # Обновляем данные события
-    event["results_published"] = True
-    event["winner_option_id"] = winner_option_id
-    event["is_active"] = False
+    # Обновляем данные события (индекс только для чтения, поэтому меняем загруженный документ)
+    events_data = load_betting_events()
+    for e in events_data.get("events", []):
+        if str(e.get("id")) == str(event_id):
+            e["results_published"] = True
+            e["winner_option_id"] = winner_option_id
+            e["is_active"] = False
+            e["betting_open"] = False
+            event = e
+            break
     save_betting_events(events_data)
     
-    # Обрабатываем ставки
-    event_id_str = str(event_id)
-    if event_id_str not in betting_data["active_bets"]:
+    # Обрабатываем ставки только этого события (из его раздела)
+    partition = load_event_bets(event_id)
+    event_bets = partition["bets"]
+    if not event_bets:
         return {"status": "success", "message": "Нет активных ставок на данное событие"}
     
-    # Подсчитываем общие суммы ставок
-    total_bets = 0  # общая сумма всех ставок
-    total_winning_bets = 0  # общая сумма выигрышных ставок
+    if is_event_settled(event_id):
+        # Итоги уже зафиксированы: повторно выплаты не начисляются
+        logging.warning(f"Итоги события {event_id} уже подведены, повторный расчёт пропущен")
+        return {"status": "error", "message": "Итоги события уже подведены"}
     
-    # Проходим все ставки для подсчета сумм
-    for user_id_str, user_data in betting_data["active_bets"][event_id_str].items():
-        for bet in user_data.get("bets", []):
-            bet_amount = bet.get("amount", 0)
-            bet_option = bet.get("option_id")
-            
-            total_bets += bet_amount
-            
-            # Если ставка на победивший вариант
-            if str(bet_option) == str(winner_option_id):
-                total_winning_bets += bet_amount
+    # Серии побед и статистика нужны только участникам события
+    betting_data = load_users_betting_data(event_bets)
+    win_streaks = betting_data["win_streaks"]
+    stats = betting_data["betting_stats"]
+    
+    # Общие суммы ставок берём из пула события, который ведётся при приёме ставок
+    pool = partition["pool"] if partition["pool"].get("total") else build_event_pool(event_bets)
+    total_bets = pool["total"]  # общая сумма всех ставок
+    # общая сумма выигрышных ставок
+    total_winning_bets = pool["options"].get(str(winner_option_id), {}).get("total", 0)
     
     # Если нет выигрышных ставок, все ставки возвращаются
     if total_winning_bets == 0:
         losers = []  # Создаем список проигравших
-        for user_id_str, user_data in betting_data["active_bets"][event_id_str].items():
+        for user_id_str, user_data in event_bets.items():
             user_id = int(user_id_str)
             user_name = user_data.get("user_name", "Unknown")
             total_bet = sum(bet.get("amount", 0) for bet in user_data.get("bets", []))
@@ -310,15 +884,16 @@ def process_event_results(event_id, winner_option_id):
                     "user_name": user_name,
                     "loss_amount": total_bet
                 })
+                _add_user_stats(stats, user_id_str, user_name, total_bet, 0, False)
                 
                 # Сбрасываем серию побед
-                if user_id_str not in betting_data["win_streaks"]:
-                    betting_data["win_streaks"][user_id_str] = {
+                if user_id_str not in win_streaks:
+                    win_streaks[user_id_str] = {
                         "streak": 0,
                         "user_name": user_name
                     }
                 else:
-                    betting_data["win_streaks"][user_id_str]["streak"] = 0
+                    win_streaks[user_id_str]["streak"] = 0
         
         # Создаем запись в истории без победителей, но с проигравшими
         history_entry = {
@@ -335,9 +910,8 @@ def process_event_results(event_id, winner_option_id):
             "losers": losers
         }
         
-        betting_data["history"].append(history_entry)
-        del betting_data["active_bets"][event_id_str]
-        save_betting_data(betting_data)
+        if not _commit_settlement(event_id, {}, betting_data, history_entry):
+            return {"status": "error", "message": "Не удалось сохранить итоги события"}
         
         return {
             "status": "success", 
@@ -349,67 +923,64 @@ def process_event_results(event_id, winner_option_id):
             "total_bets": total_bets
         }
     
-    # Коэффициент тотализатора: общая сумма ставок / сумма выигрышных ставок
+    # Коэффициент тотализатора (для отображения): общая сумма ставок / сумма выигрышных ставок.
+    # Сами выплаты считаются в целых числах через distribute_pot
     tote_coefficient = total_bets / total_winning_bets
     
-    winners = []
     losers = []
+    winning_stakes = {}  # Ставки победителей на победивший вариант: { user_id_str: сумма }
+    wagered = {}  # Все ставки пользователя на событие: { user_id_str: сумма }
     
-    for user_id_str, user_data in betting_data["active_bets"][event_id_str].items():
-        user_id = int(user_id_str)
+    # Один проход по ставкам: суммы пользователей и серии побед
+    for user_id_str, user_data in event_bets.items():
         user_name = user_data.get("user_name", "Unknown")
-        
-        # Обрабатываем все ставки пользователя
-        total_win = 0
-        total_loss = 0
         user_winning_bets = 0
+        total_loss = 0
         won = False
         
         for bet in user_data.get("bets", []):
             bet_amount = bet.get("amount", 0)
-            bet_option = bet.get("option_id")
-            
             # Если пользователь угадал
-            if str(bet_option) == str(winner_option_id):
+            if str(bet.get("option_id")) == str(winner_option_id):
                 user_winning_bets += bet_amount
                 won = True
             else:
                 total_loss += bet_amount
         
-        # Рассчитываем выигрыш по тотализатору
-        if won:
-            # Выигрыш = ставка на победивший вариант * коэффициент тотализатора
-            win_amount = int(user_winning_bets * tote_coefficient)
-            total_win = win_amount
-            # В тотализаторе ставка НЕ возвращается, начисляется только чистый выигрыш
-            update_balance(user_id, win_amount)
-        
-        # Обновляем серию побед
-        if user_id_str not in betting_data["win_streaks"]:
-            betting_data["win_streaks"][user_id_str] = {
-                "streak": 0,
-                "user_name": user_name
-            }
-        else:
-            # Обновляем имя пользователя, если оно изменилось
-            betting_data["win_streaks"][user_id_str]["user_name"] = user_name
+        # Обновляем серию побед (и имя пользователя, если оно изменилось)
+        streak = win_streaks.setdefault(user_id_str, {"streak": 0, "user_name": user_name})
+        streak["user_name"] = user_name
         
         if won:
-            betting_data["win_streaks"][user_id_str]["streak"] += 1
-            winners.append({
-                "user_id": user_id,
-                "user_name": user_name,
-                "win_amount": total_win,
-                "bet_amount": user_winning_bets,
-                "streak": betting_data["win_streaks"][user_id_str]["streak"]
-            })
+            streak["streak"] += 1
+            winning_stakes[user_id_str] = user_winning_bets
         else:
-            betting_data["win_streaks"][user_id_str]["streak"] = 0
+            streak["streak"] = 0
             losers.append({
-                "user_id": user_id,
+                "user_id": int(user_id_str),
                 "user_name": user_name,
                 "loss_amount": total_loss
             })
+        wagered[user_id_str] = user_winning_bets + total_loss
+    
+    # Весь банк делится между победителями пропорционально ставкам, без потерь на округлении.
+    # В тотализаторе ставка НЕ возвращается отдельно, она входит в выплату
+    shares = distribute_pot(winning_stakes, total_bets)
+    for user_id_str, user_data in event_bets.items():
+        _add_user_stats(stats, user_id_str, user_data.get("user_name", "Unknown"), wagered[user_id_str],
+                        shares.get(user_id_str, 0), user_id_str in shares)
+    payouts = {}  # Выплаты победителям: { user_id: win_amount }
+    winners = []
+    for user_id_str, stake in winning_stakes.items():
+        user_id = int(user_id_str)
+        payouts[user_id] = shares[user_id_str]
+        winners.append({
+            "user_id": user_id,
+            "user_name": event_bets[user_id_str].get("user_name", "Unknown"),
+            "win_amount": shares[user_id_str],
+            "bet_amount": stake,
+            "streak": win_streaks[user_id_str]["streak"]
+        })
     
     # Создаем запись в истории
     history_entry = {
@@ -428,12 +999,10 @@ def process_event_results(event_id, winner_option_id):
         "losers": losers
     }
     
-    betting_data["history"].append(history_entry)
-    
-    # Очищаем активные ставки для данного события
-    del betting_data["active_bets"][event_id_str]
-    
-    save_betting_data(betting_data)
+    # Отмечаем событие подведённым вместе с сериями побед, затем начисляем выигрыши
+    # одним пакетом, очищаем ставки события и дописываем историю
+    if not _commit_settlement(event_id, payouts, betting_data, history_entry):
+        return {"status": "error", "message": "Не удалось сохранить итоги события"}
     
     return {
         "status": "success",
@@ -455,32 +1024,49 @@ def get_event_bets(event_id):
     Returns:
         dict: Словарь со ставками пользователей
     """
-    betting_data = load_betting_data()
-    event_id_str = str(event_id)
-    
-    if event_id_str in betting_data["active_bets"]:
-        return betting_data["active_bets"][event_id_str]
-    
-    return {}
+    return load_event_bets(event_id)["bets"]
 
-def get_betting_history(limit=7):
+def append_betting_history(entries):
     """
-    Получает историю ставок.
+    Дописывает записи в историю ставок (журнал истории или таблицу SQLite).
+
+    Args:
+        entries (list): Записи истории от старых к новым
+    """
+    storage = get_storage()
+    if storage is not None:
+        storage.append_history(entries)
+    else:
+        betting_history.append_history(entries)
+
+def get_betting_history(limit=7, offset=0):
+    """
+    Получает страницу истории ставок (от новых к старым).
+    Читаются только нужные записи, а не вся история.
     
     Args:
         limit (int): Максимальное количество записей
+        offset (int): Сколько самых новых записей пропустить
         
     Returns:
         list: Список с записями истории ставок
     """
-    betting_data = load_betting_data()
-    history = betting_data.get("history", [])
-    
-    # Сортируем по дате (от новых к старым)
-    sorted_history = sorted(history, key=lambda x: x.get("date"), reverse=True)
+    storage = get_storage()
+    if storage is not None:
+        return storage.read_history(offset, limit)
+    return betting_history.read_history(offset, limit)
+
+def count_betting_history():
+    """
+    Возвращает количество записей в истории ставок.
     
-    # Возвращаем указанное количество записей
-    return sorted_history[:limit]
+    Returns:
+        int: Количество записей
+    """
+    storage = get_storage()
+    if storage is not None:
+        return storage.count_history()
+    return betting_history.count_history()
 
 def get_user_streak(user_id):
     """
@@ -492,10 +1078,75 @@ def get_user_streak(user_id):
     Returns:
         int: Количество побед подряд
     """
-    betting_data = load_betting_data()
     user_id_str = str(user_id)
+    betting_data = load_users_betting_data([user_id_str])
     
     if user_id_str in betting_data["win_streaks"]:
         return betting_data["win_streaks"][user_id_str].get("streak", 0)
     
-    return 0 
\ No newline at end of file
+    return 0 
+
+def _stats_row(user_id, user_stats, streak):
+    """Собирает строку рейтинга из статистики и серии побед пользователя."""
+    wagered = user_stats.get("wagered", 0)
+    won = user_stats.get("won", 0)
+    events = user_stats.get("events", 0)
+    return {
+        "user_id": user_id,
+        "user_name": user_stats.get("user_name", "Unknown"),
+        "streak": streak,
+        "wagered": wagered,
+        "won": won,
+        "profit": won - wagered,
+        "roi": (won - wagered) / wagered if wagered else 0.0,
+        "events": events,
+        "wins": user_stats.get("wins", 0),
+        "hit_rate": user_stats.get("wins", 0) / events if events else 0.0,
+    }
+
+# Ключи сортировки рейтинга /bettop
+BETTOP_SORT_KEYS = {
+    "streak": lambda row: (row["streak"], row["profit"]),
+    "profit": lambda row: (row["profit"], row["roi"]),
+    "roi": lambda row: (row["roi"], row["profit"]),
+}
+
+def get_user_betting_stats(user_id):
+    """
+    Получает статистику ставок пользователя (без чтения истории).
+
+    Args:
+        user_id (int): ID пользователя
+
+    Returns:
+        dict: Строка статистики (см. get_betting_leaderboard) или None, если пользователь не делал ставок
+    """
+    user_id_str = str(user_id)
+    betting_data = load_users_betting_data([user_id_str])
+    user_stats = betting_data.get("betting_stats", {}).get(user_id_str)
+    if user_stats is None:
+        return None
+    streak = betting_data["win_streaks"].get(user_id_str, {}).get("streak", 0)
+    return _stats_row(user_id_str, user_stats, streak)
+
+def get_betting_leaderboard(sort_by="streak", limit=10):
+    """
+    Возвращает рейтинг игроков по статистике ставок, которая ведётся при подведении итогов.
+
+    Args:
+        sort_by (str): 'streak' - текущая серия побед, 'profit' - прибыль, 'roi' - прибыль к сумме ставок
+            (в рейтинг по ROI попадают игроки не менее чем с BETTOP_MIN_EVENTS событиями)
+        limit (int): Количество мест в рейтинге
+
+    Returns:
+        list: [{ 'user_id', 'user_name', 'streak', 'wagered', 'won', 'profit', 'roi', 'events', 'wins', 'hit_rate' }]
+    """
+    betting_data = _load_all_betting_stats()
+    win_streaks = betting_data["win_streaks"]
+    rows = (
+        _stats_row(user_id, user_stats, win_streaks.get(user_id, {}).get("streak", 0))
+        for user_id, user_stats in betting_data.get("betting_stats", {}).items()
+    )
+    if sort_by == "roi":
+        rows = (row for row in rows if row["events"] >= BETTOP_MIN_EVENTS)
+    return heapq.nlargest(limit, rows, key=BETTOP_SORT_KEYS[sort_by])
@@ -0,0 +1,254 @@
+# betting_history.py
+"""
+Журнал истории ставок.
+
+Результаты событий дописываются в конец JSONL-сегментов
+(state_data/betting_history/segment_00001.jsonl, ...), по SEGMENT_SIZE записей в каждом.
+Рядом хранится небольшой индекс index.json с числом записей и размером каждого сегмента,
+поэтому страница истории читается только из нужных сегментов, без чтения
+и сортировки всего журнала, а файл активных ставок не растёт со временем.
+"""
+
+import os
+import json
+import logging
+import threading
+
+BETTING_HISTORY_DIR = "state_data/betting_history"
+
+# Количество записей в одном сегменте журнала
+SEGMENT_SIZE = 500
+
+INDEX_FILE_NAME = "index.json"
+
+def _segment_name(number: int) -> str:
+    """
+    Возвращает имя файла сегмента по его номеру.
+
+    Args:
+        number: Номер сегмента (начиная с 1)
+    """
+    return f"segment_{number:05d}.jsonl"
+
+class BettingHistoryLog:
+    """
+    Журнал истории ставок из JSONL-сегментов с индексом сегментов.
+
+    Индекс проверяется по размерам сегментов при первом обращении:
+    если индекса нет или он отстал от файлов (например, после сбоя),
+    число записей пересчитывается по самим сегментам.
+    """
+
+    def __init__(self, directory: str = BETTING_HISTORY_DIR, segment_size: int = SEGMENT_SIZE):
+        self.directory = directory
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self._segments = None  # [{ 'file', 'count', 'size' }] в порядке записи
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _scan_segment(self, name: str) -> dict:
+        """
+        Строит запись индекса по содержимому сегмента.
+
+        Args:
+            name: Имя файла сегмента
+
+        Returns:
+            dict: { 'file', 'count', 'size' }
+        """
+        count = 0
+        position = 0
+        complete_end = 0  # конец последней полной строки
+        with open(self._path(name), "rb") as f:
+            for line in f:
+                if line.endswith(b"\n"):
+                    if line.strip():
+                        count += 1
+                    complete_end = position + len(line)
+                position += len(line)
+        if complete_end < position:
+            # Недописанную при сбое последнюю строку отрезаем, чтобы к ней не приклеилась новая запись
+            logging.warning(f"Отброшена недописанная запись в конце {name}")
+            with open(self._path(name), "r+b") as f:
+                f.truncate(complete_end)
+        return {"file": name, "count": count, "size": complete_end}
+
+    def _load_index(self) -> list:
+        """Загружает индекс и сверяет его с сегментами на диске."""
+        if self._segments is not None:
+            return self._segments
+
+        try:
+            with open(self._path(INDEX_FILE_NAME), "r", encoding="utf-8") as f:
+                indexed = {segment["file"]: segment for segment in json.load(f).get("segments", [])}
+        except FileNotFoundError:
+            indexed = {}
+        except Exception as e:
+            logging.error(f"Ошибка при чтении индекса истории ставок: {e}")
+            indexed = {}
+
+        names = []
+        if os.path.isdir(self.directory):
+            names = sorted(
+                name for name in os.listdir(self.directory)
+                if name.startswith("segment_") and name.endswith(".jsonl")
+            )
+
+        segments = []
+        rebuilt = False
+        for name in names:
+            segment = indexed.get(name)
+            # Индекс старого формата (со смещениями строк) тоже пересчитывается
+            if segment is None or "count" not in segment or segment.get("size") != os.path.getsize(self._path(name)):
+                segment = self._scan_segment(name)
+                rebuilt = True
+            segments.append(segment)
+
+        self._segments = segments
+        if rebuilt or len(indexed) != len(segments):
+            self._save_index()
+        return segments
+
+    def _save_index(self):
+        """Атомарно записывает индекс сегментов."""
+        path = self._path(INDEX_FILE_NAME)
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"segments": self._segments}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logging.error(f"Ошибка при записи индекса истории ставок: {e}")
+
+    def append(self, entries: list) -> bool:
+        """
+        Дописывает записи в конец журнала.
+
+        Args:
+            entries: Записи истории (от старых к новым)
+
+        Returns:
+            bool: True, если запись прошла успешно
+        """
+        if not entries:
+            return True
+        with self._lock:
+            segments = self._load_index()
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                for entry in entries:
+                    if not segments or segments[-1]["count"] >= self.segment_size:
+                        segments.append({"file": _segment_name(len(segments) + 1), "count": 0, "size": 0})
+                    segment = segments[-1]
+                    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+                    with open(self._path(segment["file"]), "ab") as f:
+                        f.seek(0, os.SEEK_END)
+                        offset = f.tell()
+                        f.write(line)
+                    segment["count"] += 1
+                    segment["size"] = offset + len(line)
+                return True
+            except Exception as e:
+                logging.error(f"Ошибка при записи истории ставок: {e}")
+                # Индекс будет пересчитан по сегментам при следующем обращении
+                self._segments = None
+                return False
+            finally:
+                if self._segments is not None:
+                    self._save_index()
+
+    def count(self) -> int:
+        """Возвращает количество записей в журнале."""
+        with self._lock:
+            return sum(segment["count"] for segment in self._load_index())
+
+    def read(self, offset: int = 0, limit: int = 5) -> list:
+        """
+        Читает страницу истории, начиная с самых новых записей.
+
+        Args:
+            offset: Сколько самых новых записей пропустить
+            limit: Максимальное количество записей
+
+        Returns:
+            list: Записи истории от новых к старым
+        """
+        with self._lock:
+            segments = self._load_index()
+            # Глобальные номера нужных записей (от старых к новым)
+            total = sum(segment["count"] for segment in segments)
+            end = max(total - max(offset, 0), 0)
+            start = max(end - max(limit, 0), 0)
+
+            entries = []
+            first = 0  # глобальный номер первой записи текущего сегмента
+            for segment in segments:
+                count = segment["count"]
+                lo, hi = max(start, first), min(end, first + count)
+                if lo < hi:
+                    entries.extend(self._read_lines(segment, lo - first, hi - first))
+                first += count
+                if first >= end:
+                    break
+        entries.reverse()
+        return entries
+
+    def _read_lines(self, segment: dict, lo: int, hi: int) -> list:
+        """
+        Читает записи сегмента с номерами [lo, hi).
+        Строки находятся проходом по сегменту (не больше segment_size записей)
+        в пределах размера из индекса.
+        """
+        entries = []
+        try:
+            with open(self._path(segment["file"]), "rb") as f:
+                data = f.read(segment["size"])
+            lines = [line for line in data.split(b"\n") if line.strip()]
+            for number in range(lo, min(hi, len(lines))):
+                try:
+                    entries.append(json.loads(lines[number]))
+                except json.JSONDecodeError:
+                    logging.warning(f"Пропущена повреждённая запись {number + 1} в {segment['file']}")
+        except Exception as e:
+            logging.error(f"Ошибка при чтении {segment['file']}: {e}")
+        return entries
+
+# Журнал процесса
+_log = BettingHistoryLog()
+
+def append_history(entries: list) -> bool:
+    """
+    Дописывает записи в журнал истории ставок.
+
+    Args:
+        entries: Записи истории (от старых к новым)
+
+    Returns:
+        bool: True, если запись прошла успешно
+    """
+    return _log.append(entries)
+
+def read_history(offset: int = 0, limit: int = 5) -> list:
+    """
+    Читает страницу журнала истории ставок (от новых к старым).
+
+    Args:
+        offset: Сколько самых новых записей пропустить
+        limit: Максимальное количество записей
+
+    Returns:
+        list: Записи истории
+    """
+    return _log.read(offset, limit)
+
+def count_history() -> int:
+    """
+    Возвращает количество записей в журнале истории ставок.
+
+    Returns:
+        int: Количество записей
+    """
+    return _log.count()
@@ -7,8 +7,8 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes
 import asyncio
 import random
-from balance import get_balance, update_balance
-from casino.roulette_utils import get_roulette_result
+from balance import get_balance, try_debit, credit
+from casino.roulette_utils import get_roulette_result, get_roulette_winnings
 from telegram.error import TimedOut
 import time
 import json
@@ -55,13 +55,13 @@ async def handle_roulette_bet_callback(query, context: ContextTypes.DEFAULT_TYPE
     """
     bet_amount = int(query.data.split(":")[-1])  
     user_id = query.from_user.id
-    bal = get_balance(user_id)
 
-    if bal < bet_amount:
+    # Списываем ставку, только если хватает монет (проверка и списание атомарны)
+    new_balance = await try_debit(user_id, bet_amount, reason="roulette")
+    if new_balance is None:
         await query.answer("💸 У вас недостаточно средств для ставки.", show_alert=True)
         return
 
-    update_balance(user_id, -bet_amount)
     result = get_roulette_result()
 
     # Загружаем ID гифок из конфига
@@ -87,17 +87,13 @@ async def handle_roulette_bet_callback(query, context: ContextTypes.DEFAULT_TYPE
     win = result == bet_type
 
     if win:
-        base_winnings = 100 if bet_type != 'zero' else 1800
-        winnings = int(base_winnings * (bet_amount / 50))
-        if bet_type == 'zero':
-            winnings = int(winnings)
-        update_balance(user_id, winnings)
+        winnings = get_roulette_winnings(bet_type, bet_amount)
+        new_balance = await credit(user_id, winnings, reason="roulette")
         message = f"🎉 *Поздравляем!* Вы выиграли {winnings} монет! 🎉"
     else:
         result_emoji = "⚫" if result == "black" else "🔴" if result == "red" else "🟢"
         message = f"😔 *Вы проиграли.* Выпало: {result_emoji}"
 
-    new_balance = get_balance(user_id)
     message += f"\n\n💰 *Ваш текущий баланс*: {new_balance} монет."
 
     keyboard = [
@@ -153,8 +149,8 @@ async def handle_roulette_bet(update: Update, context: ContextTypes.DEFAULT_TYPE
         "🎰 **Рулетка**\n\n"
         f"💰 **Ставка**: {bet_amount} монет\n"
         "🎁 **Выигрыш**:\n"
-        f"- **Чёрное / Красное**: {int(100 * (bet_amount / 50))} монет\n"
-        f"- **Зеро**: {int(1800 * (bet_amount / 50))} монет\n\n"
+        f"- **Чёрное / Красное**: {get_roulette_winnings('red', bet_amount)} монет\n"
+        f"- **Зеро**: {get_roulette_winnings('zero', bet_amount)} монет\n\n"
         "Выберите ставку или измените сумму ставки:"
     )
 
@@ -5,6 +5,15 @@
 """
 import random
 
+# Исходы спина и их вероятности:
+# 1/36 на zero, оставшееся равномерно между black и red
+ROULETTE_OUTCOMES = ['black', 'red', 'zero']
+ROULETTE_PROBABILITIES = [17.5 / 36, 17.5 / 36, 1 / 36]
+
+# Выигрыш при ставке ROULETTE_BASE_BET монет (для других ставок - пропорционально)
+ROULETTE_BASE_BET = 50
+ROULETTE_PAYOUTS = {'black': 100, 'red': 100, 'zero': 1800}
+
 def get_roulette_result():
     """
     Генерирует случайный результат спина рулетки с учетом вероятности.
@@ -17,8 +26,18 @@ def get_roulette_result():
     Returns:
         str: Результат спина - 'black', 'red' или 'zero'
     """
-    outcomes = ['black', 'red', 'zero']
-    probabilities = [17.5 / 36, 17.5 / 36, 1 / 36]  # 1/36 на zero, оставшееся равномерно между black и red
-    
-    result = random.choices(outcomes, probabilities)[0]
+    result = random.choices(ROULETTE_OUTCOMES, ROULETTE_PROBABILITIES)[0]
     return result
+
+def get_roulette_winnings(bet_type: str, bet_amount: int) -> int:
+    """
+    Вычисляет выигрыш (вместе со ставкой) при угаданном исходе.
+    
+    Args:
+        bet_type: Тип ставки ('red', 'black', 'zero')
+        bet_amount: Сумма ставки
+    
+    Returns:
+        int: Сумма выигрыша
+    """
+    return int(ROULETTE_PAYOUTS[bet_type] * (bet_amount / ROULETTE_BASE_BET))
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# casino/rtp_simulator.py
+"""
+Офлайн-симулятор возврата игроку (RTP) для слотов и рулетки.
+Запускать из корня проекта:
+    python -m casino.rtp_simulator --game slots --spins 10000000
+    python -m casino.rtp_simulator --game roulette --bet-type zero --bankroll 1000 --bet 50
+
+Использует те же определения, что и игры: SLOT_SYMBOLS и множители из
+casino/slots_utils.py, вероятности и выплаты рулетки из casino/roulette_utils.py.
+
+Спины разыгрываются пакетами с помощью NumPy (миллионы спинов в секунду).
+NumPy не входит в зависимости бота: если он не установлен, используется
+медленная реализация на модуле random с теми же результатами в среднем.
+
+Отчёт содержит:
+- RTP (средний выигрыш на монету ставки) и точное значение из правил игры;
+- дисперсию и стандартное отклонение выигрыша на монету ставки;
+- долю выигрышных спинов;
+- кривую разорения: долю игроков, у которых после N раундов
+  не хватает монет на следующую ставку.
+"""
+
+import time
+import random
+import logging
+import argparse
+import itertools
+
+try:
+    import numpy as np
+except ImportError:  # NumPy нужен только для быстрой симуляции
+    np = None
+
+from casino.slots_utils import SLOT_SYMBOLS, SLOT_REELS, get_slots_multiplier, SLOT_TRIPLE_MULTIPLIER, SLOT_PAIR_MULTIPLIER
+from casino.roulette_utils import ROULETTE_OUTCOMES, ROULETTE_PROBABILITIES, get_roulette_winnings
+
+GAMES = ("slots", "roulette")
+
+# Максимальное число спинов в одном пакете (ограничивает потребление памяти)
+BATCH_SIZE = 1_000_000
+
+def _payout_table(game: str, bet_type: str, bet: int) -> list[tuple[float, float]]:
+    """
+    Возвращает распределение выплаты за один спин.
+
+    Args:
+        game: 'slots' или 'roulette'
+        bet_type: Тип ставки в рулетке ('red', 'black', 'zero')
+        bet: Сумма ставки
+
+    Returns:
+        list[tuple[float, float]]: Пары (вероятность, выплата в монетах вместе со ставкой)
+    """
+    if game == "slots":
+        combinations = len(SLOT_SYMBOLS) ** SLOT_REELS
+        counts = {}
+        for reel in itertools.product(SLOT_SYMBOLS, repeat=SLOT_REELS):
+            multiplier = get_slots_multiplier(list(reel))
+            counts[multiplier] = counts.get(multiplier, 0) + 1
+        return [(count / combinations, bet * multiplier) for multiplier, count in sorted(counts.items())]
+    if game == "roulette":
+        return [
+            (probability, get_roulette_winnings(bet_type, bet) if outcome == bet_type else 0)
+            for outcome, probability in zip(ROULETTE_OUTCOMES, ROULETTE_PROBABILITIES)
+        ]
+    raise ValueError(f"Неизвестная игра: {game}")
+
+def exact_rtp(game: str, bet_type: str = "red", bet: int = 50) -> dict:
+    """
+    Вычисляет точные RTP и дисперсию по правилам игры.
+
+    Args:
+        game: 'slots' или 'roulette'
+        bet_type: Тип ставки в рулетке
+        bet: Сумма ставки
+
+    Returns:
+        dict: {'rtp': float, 'variance': float} в расчёте на монету ставки
+    """
+    table = _payout_table(game, bet_type, bet)
+    mean = sum(p * payout / bet for p, payout in table)
+    variance = sum(p * (payout / bet - mean) ** 2 for p, payout in table)
+    return {"rtp": mean, "variance": variance}
+
+def _sample_payouts(game: str, bet_type: str, bet: int, size: int, rng):
+    """
+    Разыгрывает size спинов и возвращает выплаты в монетах.
+
+    Args:
+        rng: numpy.random.Generator или random.Random (без NumPy)
+
+    Returns:
+        numpy.ndarray или list[int]: Выплаты за каждый спин
+    """
+    if np is None:
+        if game == "slots":
+            return [bet * get_slots_multiplier(rng.choices(SLOT_SYMBOLS, k=SLOT_REELS)) for _ in range(size)]
+        winnings = get_roulette_winnings(bet_type, bet)
+        outcomes = rng.choices(ROULETTE_OUTCOMES, ROULETTE_PROBABILITIES, k=size)
+        return [winnings if outcome == bet_type else 0 for outcome in outcomes]
+
+    if game == "slots":
+        # Номера символов на барабанах; правила совпадают с get_slots_multiplier
+        reels = rng.integers(0, len(SLOT_SYMBOLS), size=(size, SLOT_REELS), dtype=np.int8)
+        # После сортировки совпадающие символы стоят рядом
+        reels.sort(axis=1)
+        triple = reels[:, 0] == reels[:, -1]
+        pair = (reels[:, 1:] == reels[:, :-1]).any(axis=1)
+        multipliers = np.where(triple, SLOT_TRIPLE_MULTIPLIER, np.where(pair, SLOT_PAIR_MULTIPLIER, 0))
+        return multipliers.astype(np.int64) * bet
+    outcomes = rng.choice(len(ROULETTE_OUTCOMES), size=size, p=np.array(ROULETTE_PROBABILITIES) / sum(ROULETTE_PROBABILITIES))
+    winning_index = ROULETTE_OUTCOMES.index(bet_type)
+    return np.where(outcomes == winning_index, get_roulette_winnings(bet_type, bet), 0).astype(np.int64)
+
+def _make_rng(seed=None):
+    """Создаёт генератор случайных чисел для выбранной реализации."""
+    return np.random.default_rng(seed) if np is not None else random.Random(seed)
+
+def simulate_rtp(game: str, spins: int, bet_type: str = "red", bet: int = 50, seed=None) -> dict:
+    """
+    Оценивает RTP методом Монте-Карло.
+
+    Args:
+        game: 'slots' или 'roulette'
+        spins: Количество спинов
+        bet_type: Тип ставки в рулетке
+        bet: Сумма ставки
+        seed: Зерно генератора случайных чисел
+
+    Returns:
+        dict: spins, rtp, variance, std, hit_rate (в расчёте на монету ставки)
+    """
+    if game not in GAMES:
+        raise ValueError(f"Неизвестная игра: {game}")
+    rng = _make_rng(seed)
+    total = total_sq = hits = 0.0
+    done = 0
+    while done < spins:
+        size = min(BATCH_SIZE, spins - done)
+        payouts = _sample_payouts(game, bet_type, bet, size, rng)
+        if np is not None:
+            returns = payouts / bet
+            total += float(returns.sum())
+            total_sq += float(np.square(returns).sum())
+            hits += int(np.count_nonzero(payouts))
+        else:
+            returns = [payout / bet for payout in payouts]
+            total += sum(returns)
+            total_sq += sum(r * r for r in returns)
+            hits += sum(1 for payout in payouts if payout)
+        done += size
+
+    rtp = total / spins if spins else 0.0
+    variance = max(total_sq / spins - rtp * rtp, 0.0) if spins else 0.0
+    return {
+        "spins": spins,
+        "rtp": rtp,
+        "variance": variance,
+        "std": variance ** 0.5,
+        "hit_rate": hits / spins if spins else 0.0,
+    }
+
+def simulate_ruin(game: str, bankroll: int, bet: int, rounds: int, players: int,
+                  bet_type: str = "red", checkpoints: int = 10, seed=None) -> list[tuple[int, float]]:
+    """
+    Строит кривую разорения: игроки с начальным балансом bankroll делают
+    одинаковые ставки bet, пока им хватает монет.
+
+    Args:
+        game: 'slots' или 'roulette'
+        bankroll: Начальный баланс игрока
+        bet: Ставка в каждом раунде
+        rounds: Максимальное число раундов
+        players: Количество моделируемых игроков
+        bet_type: Тип ставки в рулетке
+        checkpoints: Количество точек кривой
+        seed: Зерно генератора случайных чисел
+
+    Returns:
+        list[tuple[int, float]]: Пары (раунд, доля разорившихся игроков)
+    """
+    if game not in GAMES:
+        raise ValueError(f"Неизвестная игра: {game}")
+    points = sorted({max(1, rounds * i // checkpoints) for i in range(1, checkpoints + 1)})
+    if not players or not rounds:
+        return [(point, 0.0) for point in points]
+    if bankroll < bet:
+        return [(point, 1.0) for point in points]
+
+    rng = _make_rng(seed)
+    ruined = [0] * len(points)
+    if np is not None:
+        indexes = np.array(points) - 1
+        chunk = max(1, BATCH_SIZE // rounds)
+        for start in range(0, players, chunk):
+            count = min(chunk, players - start)
+            payouts = _sample_payouts(game, bet_type, bet, count * rounds, rng).reshape(count, rounds)
+            # Баланс после каждого раунда; игрок разорён, как только баланс стал меньше ставки
+            # (дальнейшие раунды он не играет, поэтому достаточно минимума по префиксу)
+            balances = bankroll + np.cumsum(payouts - bet, axis=1)
+            lowest = np.minimum.accumulate(balances, axis=1)[:, indexes]
+            for i, value in enumerate(np.count_nonzero(lowest < bet, axis=0)):
+                ruined[i] += int(value)
+    else:
+        for _ in range(players):
+            balance = bankroll
+            payouts = _sample_payouts(game, bet_type, bet, rounds, rng)
+            ruined_at = None
+            for round_number, payout in enumerate(payouts, 1):
+                balance += payout - bet
+                if balance < bet:
+                    ruined_at = round_number
+                    break
+            if ruined_at is not None:
+                for i, point in enumerate(points):
+                    if point >= ruined_at:
+                        ruined[i] += 1
+    return [(point, value / players) for point, value in zip(points, ruined)]
+
+def format_report(game: str, bet_type: str, bet: int, stats: dict, elapsed: float,
+                  ruin_curve: list[tuple[int, float]] = None, bankroll: int = None) -> str:
+    """
+    Формирует текстовый отчёт симуляции.
+
+    Returns:
+        str: Отчёт
+    """
+    exact = exact_rtp(game, bet_type, bet)
+    title = "Слоты" if game == "slots" else f"Рулетка, ставка на {bet_type}"
+    lines = [
+        f"{title}, ставка {bet} монет ({'NumPy' if np is not None else 'без NumPy'})",
+        f"Спинов: {stats['spins']:,} за {elapsed:.2f} с ({stats['spins'] / elapsed if elapsed else 0:,.0f} спинов/с)".replace(",", " "),
+        f"RTP: {stats['rtp'] * 100:.3f}% (точное значение {exact['rtp'] * 100:.3f}%)",
+        f"Дисперсия на монету ставки: {stats['variance']:.4f} (точное значение {exact['variance']:.4f}), "
+        f"стандартное отклонение: {stats['std']:.4f}",
+        f"Доля выигрышных спинов: {stats['hit_rate'] * 100:.2f}%",
+    ]
+    if ruin_curve:
+        lines.append("")
+        lines.append(f"Кривая разорения (начальный баланс {bankroll}, ставка {bet}):")
+        lines.append(f"{'раунд':>8} {'разорились':>11}")
+        for round_number, share in ruin_curve:
+            lines.append(f"{round_number:>8} {share * 100:>10.2f}%")
+    return "\n".join(lines)
+
+def main():
+    """
+    Основная функция симулятора.
+    """
+    parser = argparse.ArgumentParser(description="Симулятор RTP для слотов и рулетки")
+    parser.add_argument("--game", choices=GAMES, default="slots", help="Игра")
+    parser.add_argument("--bet-type", choices=ROULETTE_OUTCOMES, default="red", help="Ставка в рулетке")
+    parser.add_argument("--bet", type=int, default=50, help="Сумма ставки")
+    parser.add_argument("--spins", type=int, default=10_000_000, help="Количество спинов для оценки RTP")
+    parser.add_argument("--bankroll", type=int, default=1000, help="Начальный баланс для кривой разорения")
+    parser.add_argument("--players", type=int, default=10_000, help="Количество игроков для кривой разорения")
+    parser.add_argument("--rounds", type=int, default=1000, help="Количество раундов для кривой разорения")
+    parser.add_argument("--seed", type=int, default=None, help="Зерно генератора случайных чисел")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if np is None:
+        logging.warning("NumPy не установлен, симуляция будет медленной (pip install numpy).")
+
+    started = time.perf_counter()
+    stats = simulate_rtp(args.game, args.spins, args.bet_type, args.bet, seed=args.seed)
+    elapsed = time.perf_counter() - started
+    ruin_curve = None
+    if args.players and args.rounds:
+        ruin_curve = simulate_ruin(args.game, args.bankroll, args.bet, args.rounds, args.players,
+                                   bet_type=args.bet_type, seed=args.seed)
+    print(format_report(args.game, args.bet_type, args.bet, stats, elapsed, ruin_curve, args.bankroll))
+
+if __name__ == "__main__":
+    main()
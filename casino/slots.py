@@ -6,13 +6,10 @@
 - Расчет выигрыша в зависимости от комбинации символов
 - Управление балансом пользователя
 """
-import random
 import logging
 from telegram import InlineKeyboardMarkup, InlineKeyboardButton
-from balance import get_balance, update_balance
-
-# Список символов для слотов
-SLOT_SYMBOLS = ["🍒", "🍋", "🔔", "🍀", "💎", "7️⃣"]
+from balance import get_balance, try_debit, credit
+from casino.slots_utils import spin_reels, get_slots_multiplier, SLOT_TRIPLE_MULTIPLIER
 
 async def handle_slots_callback(query, context):
     """
@@ -72,40 +69,37 @@ async def handle_slots_bet_callback(update, context):
         return
 
     user_id = query.from_user.id
-    balance_now = get_balance(user_id)
-    
-    # Проверяем, достаточно ли монет для ставки
-    if balance_now < bet:
+
+    # Списываем ставку, только если хватает монет (проверка и списание атомарны)
+    new_balance = await try_debit(user_id, bet, reason="slots")
+    if new_balance is None:
         await query.edit_message_text("Недостаточно монет для этой ставки!")
         return
 
     # Сохраняем текущую ставку
     context.user_data['slots_bet'] = bet
 
-    # Списываем ставку
-    update_balance(user_id, -bet)
-
     # Генерируем результат игры (3 случайных символа)
-    reel = [random.choice(SLOT_SYMBOLS) for _ in range(3)]
+    reel = spin_reels()
     result_text = " | ".join(reel)
 
     # Определяем выигрыш:
-    if reel[0] == reel[1] == reel[2]:
+    multiplier = get_slots_multiplier(reel)
+    if multiplier == SLOT_TRIPLE_MULTIPLIER:
         # Джекпот - три одинаковых символа
-        win = bet * 5
-        update_balance(user_id, win)
+        win = bet * multiplier
+        new_balance = await credit(user_id, win, reason="slots")
         result_message = f"🎰 {result_text} 🎰\n\nДжекпот! Вы выиграли {win} монет!"
-    elif reel[0] == reel[1] or reel[1] == reel[2] or reel[0] == reel[2]:
+    elif multiplier:
         # Две одинаковые - любая пара символов
-        win = bet * 2
-        update_balance(user_id, win)
+        win = bet * multiplier
+        new_balance = await credit(user_id, win, reason="slots")
         result_message = f"🎰 {result_text} 🎰\n\nДве одинаковые! Вы выиграли {win} монет!"
     else:
         # Нет совпадений - проигрыш
         result_message = f"🎰 {result_text} 🎰\n\nНичего не совпало. Вы проиграли {bet} монет."
 
     # Добавляем информацию о текущем балансе
-    new_balance = get_balance(user_id)
     result_message += f"\n\n💳 Ваш баланс: {new_balance} монет."
 
     # Клавиатура с кнопками: повторить игру и вернуться в меню казино
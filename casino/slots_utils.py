@@ -0,0 +1,43 @@
+# casino/slots_utils.py
+"""
+Вспомогательные функции для игры в слоты.
+Содержит символы барабанов и правила выигрыша (используются игрой и симулятором RTP).
+"""
+import random
+
+# Список символов для слотов
+SLOT_SYMBOLS = ["🍒", "🍋", "🔔", "🍀", "💎", "7️⃣"]
+
+# Количество барабанов
+SLOT_REELS = 3
+
+# Множители выигрыша относительно ставки
+SLOT_TRIPLE_MULTIPLIER = 5  # три одинаковых символа
+SLOT_PAIR_MULTIPLIER = 2    # два одинаковых символа
+
+def spin_reels() -> list[str]:
+    """
+    Генерирует результат игры: по случайному символу на каждом барабане.
+
+    Returns:
+        list[str]: Символы на барабанах
+    """
+    return [random.choice(SLOT_SYMBOLS) for _ in range(SLOT_REELS)]
+
+def get_slots_multiplier(reel: list[str]) -> int:
+    """
+    Определяет множитель выигрыша для комбинации символов.
+
+    Args:
+        reel: Символы на барабанах (SLOT_REELS штук)
+
+    Returns:
+        int: SLOT_TRIPLE_MULTIPLIER (все символы совпали), SLOT_PAIR_MULTIPLIER
+             (совпали хотя бы два) или 0, если совпадений нет
+    """
+    distinct = len(set(reel))
+    if distinct == 1:
+        return SLOT_TRIPLE_MULTIPLIER
+    if distinct < len(reel):
+        return SLOT_PAIR_MULTIPLIER
+    return 0
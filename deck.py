@@ -0,0 +1,275 @@
+# deck.py
+"""
+Перемешанные колоды элементов банка (вопросов викторины, мудростей дня).
+Элементы выдаются по курсору из сохранённой перестановки, без перезаписи файла банка.
+"""
+
+import os
+import json
+import random
+import logging
+import threading
+
+from docstore import read_json, write_json, flush_json
+
+class ShuffledDeck:
+    """
+    Колода для раздачи элементов банка без повторений.
+
+    Перестановка индексов: сначала отсортированные уже выданные индексы (consumed),
+    затем остальные, перемешанные генератором с зерном seed. Курсор указывает
+    на следующий элемент, поэтому выдача и подсчёт остатка не зависят от размера банка.
+    """
+
+    def __init__(self, state_path: str, load_items, bank_signature):
+        """
+        Args:
+            state_path: Путь к JSON-файлу состояния колоды (рядом хранится *_consumed.json)
+            load_items: Функция без аргументов, возвращающая список элементов банка
+            bank_signature: Функция без аргументов, возвращающая признак версии файла банка
+        """
+        self.state_path = state_path
+        self.consumed_path = os.path.splitext(state_path)[0] + "_consumed.json"
+        self._load_items = load_items
+        self._bank_signature = bank_signature
+        self._lock = threading.RLock()
+        self._state = None      # { seed, size, cursor, bank }
+        self._items = None      # элементы банка, по которым построена перестановка
+        self._order = None      # перестановка индексов банка
+        self._signature = None  # признак версии банка для _items
+
+    def _read_state(self):
+        if self._state is None:
+            state = read_json(self.state_path, None)
+            if isinstance(state, dict) and {"seed", "size", "cursor"} <= state.keys():
+                self._state = state
+        return self._state
+
+    def _save_state(self):
+        write_json(self.state_path, self._state)
+
+    def _build_order(self, consumed):
+        size = self._state["size"]
+        consumed_set = set(consumed)
+        rest = [index for index in range(size) if index not in consumed_set]
+        random.Random(self._state["seed"]).shuffle(rest)
+        self._order = sorted(consumed_set) + rest
+
+    def _new_deck(self, size, consumed):
+        """Начинает новую колоду: выданные индексы в начале, курсор после них."""
+        consumed = sorted(index for index in consumed if index < size)
+        self._state = {
+            "seed": random.randrange(2 ** 32),
+            "size": size,
+            "cursor": len(consumed),
+            "bank": None,
+        }
+        write_json(self.consumed_path, consumed)
+        self._build_order(consumed)
+
+    def _refresh(self):
+        """Загружает банк и перестановку, если они ещё не загружены или банк изменился."""
+        signature = self._bank_signature()
+        if self._items is not None and signature == self._signature:
+            return
+        items = self._load_items()
+        state = self._read_state()
+        if state is None or len(items) < state["size"]:
+            if state is not None:
+                logging.info(f"Банк колоды {self.state_path} стал короче, колода начинается заново.")
+            self._new_deck(len(items), [])
+        else:
+            self._build_order(read_json(self.consumed_path, []))
+            if len(items) > state["size"]:
+                # В банк дописали элементы: выданные остаются выданными, остальные перемешиваем
+                dealt = self._order[:state["cursor"]]
+                self._new_deck(len(items), dealt)
+        self._state["bank"] = list(signature) if signature else None
+        self._save_state()
+        self._items = items
+        self._signature = signature
+
+    def deal(self, advance: bool = True):
+        """
+        Выдаёт следующий элемент колоды.
+
+        Args:
+            advance: Сдвигать ли курсор (False - только посмотреть следующий элемент)
+
+        Returns:
+            Элемент банка или None, если колода закончилась
+        """
+        with self._lock:
+            self._refresh()
+            cursor = self._state["cursor"]
+            if cursor >= self._state["size"]:
+                return None
+            item = self._items[self._order[cursor]]
+            if advance:
+                self._state["cursor"] = cursor + 1
+                self._save_state()
+                # Выданный элемент не должен повториться после аварийной остановки:
+                # состояние колоды (и пересобранный список выданных) пишется сразу
+                flush_json(self.consumed_path)
+                flush_json(self.state_path)
+            return item
+
+    def remaining(self) -> int:
+        """
+        Возвращает количество ещё не выданных элементов.
+        Если банк не менялся с последнего сохранения колоды, файл банка не читается.
+        """
+        with self._lock:
+            state = self._read_state()
+            signature = self._bank_signature()
+            unchanged = state is not None and state.get("bank") == (list(signature) if signature else None)
+            if self._items is None and not unchanged:
+                self._refresh()
+            elif self._items is not None and signature != self._signature:
+                self._refresh()
+            return self._state["size"] - self._state["cursor"]
+
+    def invalidate(self):
+        """Сбрасывает колоду в памяти: при следующем обращении состояние будет прочитано заново."""
+        with self._lock:
+            self._state = None
+            self._items = None
+            self._order = None
+            self._signature = None
+
+class RecyclableDeck:
+    """
+    Колода с журналом выданных элементов и повторной раздачей по кругам.
+
+    Элементы банка - строки, по ним же ведётся журнал: каждая строка журнала -
+    { "round": номер круга, "text": элемент }. Файл банка не изменяется.
+    В памяти хранится перемешанный список ещё не выданных в текущем круге
+    элементов, поэтому выдача и подсчёт остатка выполняются за O(1).
+    """
+
+    def __init__(self, used_path: str, load_items, bank_signature):
+        """
+        Args:
+            used_path: Путь к JSONL-журналу выданных элементов
+            load_items: Функция без аргументов, возвращающая список элементов банка
+            bank_signature: Функция без аргументов, возвращающая признак версии файла банка
+        """
+        self.used_path = used_path
+        self._load_items = load_items
+        self._bank_signature = bank_signature
+        self._lock = threading.RLock()
+        self._items = None      # уникальные элементы банка
+        self._signature = None  # признак версии банка для _items
+        self._round = 0         # номер текущего круга
+        self._recent = []       # последние записи журнала (для промежутка при новом круге)
+        self._deck = []         # невыданные в текущем круге элементы; выдаются с конца
+
+    def _read_log(self) -> list:
+        """Читает журнал выданных элементов, пропуская повреждённые строки."""
+        entries = []
+        try:
+            with open(self.used_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(entry, dict) and "text" in entry:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logging.error(f"Ошибка при чтении журнала колоды {self.used_path}: {e}")
+        return entries
+
+    def _append_log(self, text: str):
+        """Дописывает выданный элемент в конец журнала."""
+        try:
+            directory = os.path.dirname(self.used_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.used_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"round": self._round, "text": text}, ensure_ascii=False) + "\n")
+        except Exception as e:
+            logging.error(f"Ошибка при записи журнала колоды {self.used_path}: {e}")
+
+    def _refresh(self):
+        """Загружает банк и журнал, если они ещё не загружены или банк изменился."""
+        signature = self._bank_signature()
+        if self._items is not None and signature == self._signature:
+            return
+        items = list(dict.fromkeys(item for item in self._load_items() if isinstance(item, str)))
+        entries = self._read_log()
+        self._round = max((entry.get("round", 0) for entry in entries), default=0)
+        used = {entry["text"] for entry in entries if entry.get("round", 0) == self._round}
+        self._recent = [entry["text"] for entry in entries[-len(items):]] if items else []
+        self._deck = [item for item in items if item not in used]
+        random.shuffle(self._deck)
+        self._items = items
+        self._signature = signature
+
+    def _start_round(self, min_gap: int):
+        """
+        Начинает новый круг из всех элементов банка.
+
+        Элемент, после прошлой выдачи которого выдано after других элементов,
+        ставится в новом круге не раньше позиции min_gap - after,
+        чтобы между его выдачами прошло не меньше min_gap других элементов.
+        """
+        self._round += 1
+        min_gap = max(0, min(min_gap, len(self._items) - 1))
+        recent = self._recent[len(self._recent) - min_gap:] if min_gap else []
+        # Минимальная позиция в новом круге для недавно выданных элементов
+        min_position = {}
+        for after, text in enumerate(reversed(recent)):
+            if text not in min_position:
+                min_position[text] = min_gap - after
+        items = set(self._items)
+        order = [item for item in self._items if item not in min_position]
+        random.shuffle(order)
+        for text, position in sorted(min_position.items(), key=lambda pair: pair[1]):
+            if text in items:
+                low = min(position, len(order))
+                order.insert(random.randint(low, len(order)), text)
+        # Колода выдаётся с конца
+        order.reverse()
+        self._deck = order
+        logging.info(f"Колода {self.used_path}: начат круг {self._round} из {len(order)} элементов")
+
+    def deal(self, recycle: bool = False, min_gap: int = 0):
+        """
+        Выдаёт случайный ещё не выданный в текущем круге элемент и записывает его в журнал.
+
+        Args:
+            recycle: Начинать ли новый круг, когда элементы закончились
+            min_gap: Минимальное количество других элементов между повторными выдачами
+
+        Returns:
+            str|None: Элемент банка или None, если элементы закончились
+        """
+        with self._lock:
+            self._refresh()
+            if not self._deck:
+                if not recycle or not self._items:
+                    return None
+                self._start_round(min_gap)
+            text = self._deck.pop()
+            self._append_log(text)
+            self._recent.append(text)
+            if len(self._recent) > 2 * len(self._items):
+                del self._recent[:len(self._recent) - len(self._items)]
+            return text
+
+    def remaining(self) -> int:
+        """Возвращает количество ещё не выданных в текущем круге элементов."""
+        with self._lock:
+            self._refresh()
+            return len(self._deck)
+
+    def invalidate(self):
+        """Сбрасывает колоду в памяти: при следующем обращении банк и журнал будут прочитаны заново."""
+        with self._lock:
+            self._items = None
+            self._signature = None
+            self._recent = []
+            self._deck = []
@@ -0,0 +1,359 @@
+# docstore.py
+"""
+Общее хранилище JSON-документов (файлов в state_data/ и post_materials/).
+
+Вместо того чтобы каждый модуль сам открывал, читал и перезаписывал свой файл,
+все чтения и записи идут через JsonDocumentStore:
+- прочитанный документ кэшируется и перечитывается с диска, только если у файла
+  изменились время модификации или размер (например, его отредактировали вручную);
+- запись только обновляет документ в памяти и помечает его "грязным";
+- грязные документы сбрасываются на диск отложенно (через FLUSH_DELAY секунд),
+  несколько записей подряд превращаются в одну запись файла;
+- файл пишется во временный файл и атомарно подменяет старый (os.replace),
+  поэтому сбой во время записи не оставит половину файла;
+- flush_all() немедленно сохраняет все изменения (вызывается при остановке бота).
+
+Текстовые файлы с фразами (по строке на фразу) читаются через read_lines()
+с тем же кэшированием по времени модификации.
+"""
+
+import os
+import json
+import copy
+import atexit
+import logging
+import threading
+
+# Задержка отложенной записи документов на диск (в секундах)
+FLUSH_DELAY = 2.0
+
+def file_signature(path: str):
+    """
+    Возвращает признак версии файла: (время модификации, размер) или None, если файла нет.
+
+    Args:
+        path: Путь к файлу
+    """
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+class JsonDocumentStore:
+    """
+    Кэш JSON-документов с отложенной атомарной записью.
+
+    Документы, возвращаемые read(), являются копиями: их можно изменять,
+    а чтобы изменения сохранились, нужно передать документ в write().
+    """
+
+    def __init__(self, flush_delay: float = FLUSH_DELAY):
+        self.flush_delay = flush_delay
+        self._cache = {}    # путь -> документ
+        self._signatures = {}  # путь -> (mtime_ns, размер) файла, из которого прочитан документ
+        self._dirty = set()
+        self._lines = {}    # путь -> (признак версии файла, список строк)
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+
+    @staticmethod
+    def _key(path) -> str:
+        return os.path.abspath(os.fspath(path))
+
+    def read(self, path, default=None):
+        """
+        Возвращает документ из кэша или читает его с диска.
+
+        Args:
+            path: Путь к JSON-файлу
+            default: Значение, если файла нет
+
+        Returns:
+            Копия документа или копия default
+
+        Raises:
+            OSError, json.JSONDecodeError: Если файл не удалось прочитать
+        """
+        key = self._key(path)
+        with self._lock:
+            if key in self._dirty:
+                return copy.deepcopy(self._cache[key])
+            signature = file_signature(key)
+            if signature is None:
+                self._cache.pop(key, None)
+                self._signatures.pop(key, None)
+                return copy.deepcopy(default)
+            if self._signatures.get(key) != signature:
+                with open(key, "r", encoding="utf-8") as f:
+                    self._cache[key] = json.load(f)
+                self._signatures[key] = signature
+            return copy.deepcopy(self._cache[key])
+
+    def read_lines(self, path) -> list[str]:
+        """
+        Возвращает непустые строки текстового файла (без пробелов по краям).
+
+        Args:
+            path: Путь к текстовому файлу
+
+        Returns:
+            list[str]: Список строк или пустой список, если файла нет
+        """
+        key = self._key(path)
+        with self._lock:
+            signature = file_signature(key)
+            if signature is None:
+                self._lines.pop(key, None)
+                return []
+            cached = self._lines.get(key)
+            if cached is None or cached[0] != signature:
+                with open(key, "r", encoding="utf-8") as f:
+                    cached = (signature, [line.strip() for line in f if line.strip()])
+                self._lines[key] = cached
+            return list(cached[1])
+
+    def write(self, path, data):
+        """
+        Обновляет документ в памяти и планирует его запись на диск.
+
+        Args:
+            path: Путь к JSON-файлу
+            data: Новое содержимое документа (сохраняется копия)
+        """
+        key = self._key(path)
+        data = copy.deepcopy(data)
+        with self._lock:
+            self._cache[key] = data
+            self._dirty.add(key)
+            self._schedule_flush()
+
+    def invalidate(self, path=None):
+        """
+        Сбрасывает кэш документа (или всех документов), не сохраняя несохранённые изменения.
+
+        Args:
+            path: Путь к файлу или None для всех документов
+        """
+        with self._lock:
+            if path is None:
+                self._cache.clear()
+                self._signatures.clear()
+                self._dirty.clear()
+                self._lines.clear()
+                return
+            key = self._key(path)
+            self._lines.pop(key, None)
+            self._cache.pop(key, None)
+            self._signatures.pop(key, None)
+            self._dirty.discard(key)
+
+    def list_documents(self, directory, prefix: str = "", suffix: str = ".json") -> list[str]:
+        """
+        Возвращает пути документов каталога, включая ещё не сброшенные на диск.
+
+        Args:
+            directory: Путь к каталогу
+            prefix: Начало имени файла
+            suffix: Окончание имени файла
+
+        Returns:
+            list[str]: Отсортированные абсолютные пути документов
+        """
+        directory = self._key(directory)
+        with self._lock:
+            names = set(os.listdir(directory)) if os.path.isdir(directory) else set()
+            names.update(os.path.basename(key) for key in self._dirty if os.path.dirname(key) == directory)
+        return sorted(
+            os.path.join(directory, name) for name in names
+            if name.startswith(prefix) and name.endswith(suffix)
+        )
+
+    def delete(self, path):
+        """
+        Удаляет документ: сбрасывает его из кэша вместе с несохранёнными изменениями и удаляет файл.
+
+        Args:
+            path: Путь к JSON-файлу
+        """
+        key = self._key(path)
+        # Та же очередность блокировок, что и в flush(): идущая запись не вернёт файл после удаления
+        with self._write_lock:
+            with self._lock:
+                self._cache.pop(key, None)
+                self._signatures.pop(key, None)
+                self._dirty.discard(key)
+                self._lines.pop(key, None)
+            try:
+                os.remove(key)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"Ошибка при удалении {key}: {e}")
+
+    def _schedule_flush(self):
+        """Запускает таймер записи, если он ещё не запущен."""
+        if self._timer is not None:
+            return
+        self._timer = threading.Timer(self.flush_delay, self.flush_all)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def flush(self, path) -> bool:
+        """
+        Немедленно сохраняет документ, если он изменён.
+
+        Args:
+            path: Путь к файлу
+
+        Returns:
+            bool: True, если изменений не было или запись прошла успешно
+        """
+        key = self._key(path)
+        with self._write_lock:
+            with self._lock:
+                if key not in self._dirty:
+                    return True
+                self._dirty.discard(key)
+                data = self._cache[key]
+                # Сериализуем под блокировкой: документ может быть заменён в write()
+                try:
+                    text = json.dumps(data, ensure_ascii=False, indent=4)
+                except (TypeError, ValueError) as e:
+                    # Такой документ не удастся записать и при следующих попытках
+                    logging.error(f"Ошибка сериализации {key}: {e}")
+                    self._cache.pop(key, None)
+                    self._signatures.pop(key, None)
+                    return False
+
+            signature = self._write_file(key, text)
+            with self._lock:
+                if signature is None:
+                    if key not in self._dirty:
+                        self._dirty.add(key)
+                        self._schedule_flush()
+                    return False
+                if key not in self._dirty:
+                    self._signatures[key] = signature
+            return True
+
+    def flush_all(self) -> bool:
+        """
+        Немедленно сохраняет все изменённые документы.
+
+        Returns:
+            bool: True, если все документы записаны успешно
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            dirty = list(self._dirty)
+        results = [self.flush(key) for key in dirty]
+        return all(results)
+
+    @staticmethod
+    def _write_file(path: str, text: str):
+        """
+        Атомарно записывает текст в файл через временный файл.
+
+        Returns:
+            Признак версии записанного файла или None при ошибке
+        """
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_path, path)
+            return file_signature(path)
+        except OSError as e:
+            logging.error(f"Ошибка при записи {path}: {e}")
+            return None
+
+# Общее хранилище документов процесса
+_store = JsonDocumentStore()
+
+def read_json(path, default=None):
+    """
+    Читает JSON-документ через общее хранилище (с кэшированием).
+
+    Args:
+        path: Путь к JSON-файлу
+        default: Значение, если файла нет
+
+    Returns:
+        Копия документа или копия default
+    """
+    return _store.read(path, default)
+
+def read_lines(path) -> list[str]:
+    """
+    Читает непустые строки текстового файла через общее хранилище (с кэшированием).
+
+    Args:
+        path: Путь к текстовому файлу
+
+    Returns:
+        list[str]: Список строк или пустой список, если файла нет
+    """
+    return _store.read_lines(path)
+
+def write_json(path, data):
+    """
+    Сохраняет JSON-документ через общее хранилище (запись на диск отложенная).
+
+    Args:
+        path: Путь к JSON-файлу
+        data: Содержимое документа
+    """
+    _store.write(path, data)
+
+def list_json(directory, prefix: str = "", suffix: str = ".json") -> list[str]:
+    """
+    Возвращает пути JSON-документов каталога, включая ещё не сброшенные на диск.
+
+    Args:
+        directory: Путь к каталогу
+        prefix: Начало имени файла
+        suffix: Окончание имени файла
+
+    Returns:
+        list[str]: Отсортированные пути документов
+    """
+    return _store.list_documents(directory, prefix, suffix)
+
+def delete_json(path):
+    """
+    Удаляет JSON-документ из общего хранилища и с диска.
+
+    Args:
+        path: Путь к JSON-файлу
+    """
+    _store.delete(path)
+
+def flush_json(path) -> bool:
+    """
+    Немедленно записывает на диск один документ, если он изменён
+    (для состояния, которое нельзя потерять при аварийной остановке).
+
+    Args:
+        path: Путь к JSON-файлу
+
+    Returns:
+        bool: True, если изменений не было или запись прошла успешно
+    """
+    return _store.flush(path)
+
+def flush_all() -> bool:
+    """
+    Немедленно записывает на диск все изменённые документы.
+    Вызывается при остановке бота.
+
+    Returns:
+        bool: True, если все документы записаны успешно
+    """
+    return _store.flush_all()
+
+atexit.register(flush_all)
@@ -1,39 +1,77 @@
 # handlers/balance_command.py
 """
 Модуль обработчика команды /balance.
-Отображает текущий баланс всех пользователей, зарегистрированных в системе.
+Отображает рейтинг пользователей по балансу постранично и место вызвавшего пользователя.
 """
 from telegram import Update
 from telegram.ext import ContextTypes
-from balance import load_balances
+from balance import get_top_balances, get_balance_rank, count_balances, get_balance
+
+# Количество участников на одной странице рейтинга
+BALANCE_PAGE_SIZE = 10
+
+def parse_page_number(args) -> int:
+    """
+    Извлекает номер страницы из аргументов команды: "/balance page 2" или "/balance 2".
+
+    Args:
+        args: Список аргументов команды
+
+    Returns:
+        int: Номер страницы (начиная с 1)
+    """
+    if args and args[0].lower() in ("page", "стр", "страница"):
+        args = args[1:]
+    if args:
+        try:
+            return max(int(args[0]), 1)
+        except ValueError:
+            pass
+    return 1
 
 async def balance_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обработчик команды /balance.
-    Отображает список всех пользователей и их текущий баланс монет,
-    отсортированных по убыванию суммы баланса.
-    
+    Отображает страницу рейтинга пользователей по убыванию баланса
+    (по BALANCE_PAGE_SIZE участников) и место вызвавшего пользователя.
+    Рейтинг поддерживается при каждом изменении баланса, поэтому
+    для ответа не нужно загружать и сортировать все балансы.
+
     Args:
         update: Объект обновления от Telegram
         context: Контекст обработчика
     """
-    balances = load_balances()
-    if not balances:
+    total = count_balances()
+    if not total:
         await context.bot.send_message(
             chat_id=update.effective_chat.id,
             text="Баланс пока пуст."
         )
         return
 
+    pages = (total + BALANCE_PAGE_SIZE - 1) // BALANCE_PAGE_SIZE
+    page = min(parse_page_number(context.args), pages)
+    offset = (page - 1) * BALANCE_PAGE_SIZE
+
     text = "💰 Баланс участников:\n\n"
-    # Сортировка пользователей по балансу в порядке убывания
-    sorted_users = sorted(balances.items(), key=lambda x: x[1]["balance"], reverse=True)
-    
+    if pages > 1:
+        text = f"💰 Баланс участников (страница {page}/{pages}):\n\n"
+
     # Здесь ключи – строки с user_id, значение – словарь с name и balance
-    for user_id, data in sorted_users:
+    for place, (user_id, data) in enumerate(get_top_balances(offset, BALANCE_PAGE_SIZE), offset + 1):
         name = data["name"]
         balance = data["balance"]
-        text += f"{name}: {balance} 💵\n"
+        text += f"{place}. {name}: {balance} 💵\n"
+
+    # Место вызвавшего пользователя
+    user = update.effective_user
+    if user is not None:
+        rank = get_balance_rank(user.id)
+        if rank is not None:
+            text += f"\nВаше место: {rank} из {total} ({get_balance(user.id)} 💵)\n"
+
+    if page < pages:
+        text += f"\nСледующая страница: /balance page {page + 1}"
 
     await context.bot.send_message(
         chat_id=update.effective_chat.id,
@@ -14,16 +14,25 @@ from unittest.mock import MagicMock
 
 from betting import (
     load_betting_events, 
+    get_betting_event,
+    get_betting_option,
+    get_live_odds,
     load_betting_data, 
     place_bet, 
     get_betting_history,
+    count_betting_history,
     get_user_streak,
+    get_user_betting_stats,
+    get_betting_leaderboard,
     save_betting_events,
     get_next_active_event,
     publish_event,
+    close_event,
+    is_betting_open,
     process_event_results
 )
 from balance import get_balance
+from handlers.balance_command import parse_page_number
 from config import schedule_config, TIMEZONE_OFFSET
 
 # Состояния для conversation handler
@@ -34,6 +43,32 @@ BET_OPTION = 1
 BET_CALLBACK_PREFIX = "bet_"
 BET_OPTION_PREFIX = "bet_option_"
 BET_AMOUNT_PREFIX = "bet_amount_"
+HISTORY_PAGE_PREFIX = "history_betting_"
+
+# Количество записей истории на одной странице /history
+HISTORY_PAGE_SIZE = 5
+
+# Временные сообщения ставок удаляются пачками: через TEMP_MESSAGES_DELETE_DELAY секунд
+# после первого сообщения в чате, не более TEMP_MESSAGES_BATCH_SIZE за запрос (лимит Bot API)
+TEMP_MESSAGES_DELETE_DELAY = 3
+TEMP_MESSAGES_BATCH_SIZE = 100
+TEMP_MESSAGES_JOB_PREFIX = "delete_temp_messages_"
+
+# Ожидающие удаления временные сообщения: { chat_id: set(message_id) }
+_pending_temp_messages = {}
+
+# Количество мест в рейтинге /bettop и допустимые аргументы команды
+BETTOP_LIMIT = 10
+BETTOP_SORT_ALIASES = {
+    "streak": "streak", "серия": "streak",
+    "profit": "profit", "прибыль": "profit",
+    "roi": "roi",
+}
+BETTOP_TITLES = {
+    "streak": "🔥 ТОП ПО СЕРИИ ПОБЕД",
+    "profit": "💰 ТОП ПО ПРИБЫЛИ",
+    "roi": "📈 ТОП ПО ROI",
+}
 
 async def bet_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -88,7 +123,7 @@ async def bet_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if not active_event:
         logging.info("Ищем первое активное событие")
         for event in betting_events.get("events", []):
-            if event.get("is_active", True):
+            if is_betting_open(event):
                 active_event = event
                 logging.info(f"Найдено активное событие: {event}")
                 break
@@ -104,7 +139,7 @@ async def bet_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     # Проверяем, активно ли событие
-    if not active_event.get("is_active", True) and not event_id_from_callback:
+    if not is_betting_open(active_event) and not event_id_from_callback:
         message = "🎲 Выбранное событие больше не активно для ставок."
         logging.warning(f"Событие с ID {active_event.get('id')} не активно")
         if query:
@@ -192,27 +227,18 @@ async def bet_option_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     logging.info(f"Обработка ставки: event_id={event_id}, option_id={option_id}")
     
-    # Загружаем информацию о событии и выбранном варианте
-    betting_events = load_betting_events()
-    event = None
-    option_text = "неизвестный вариант"
-    
-    for e in betting_events.get("events", []):
-        if str(e.get("id")) == str(event_id):
-            event = e
-            for opt in e.get("options", []):
-                if str(opt.get("id")) == str(option_id):
-                    option_text = opt.get("text")
-                    break
-            break
+    # Получаем информацию о событии и выбранном варианте из индекса событий
+    event = get_betting_event(event_id)
+    option = get_betting_option(event_id, option_id)
+    option_text = option.get("text") if option else "неизвестный вариант"
     
     if not event:
         logging.error(f"Событие с ID {event_id} не найдено")
         await query.answer(text="Произошла ошибка. Событие не найдено.", show_alert=True)
         return
     
-    # Проверяем, активно ли событие
-    if not event.get("is_active", True):
+    # Проверяем, принимаются ли ещё ставки на событие
+    if not is_betting_open(event):
         logging.warning(f"Событие с ID {event_id} не активно")
         await query.answer(text="Это событие больше не активно для ставок.", show_alert=True)
         return
@@ -229,7 +255,14 @@ async def bet_option_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     user_id = update.effective_user.id
     user_balance = get_balance(user_id)
     
+    # Текущий коэффициент тотализатора по выбранному варианту (из пула события)
+    coefficient = get_live_odds(event_id).get(str(option_id))
+    
     text = f"🎯 Выбрано: *{option_text}*\n\n"
+    if coefficient:
+        text += f"📊 Текущий коэффициент: *x{coefficient:.2f}*\n\n"
+    else:
+        text += "📊 На этот вариант ещё никто не ставил\n\n"
     text += f"💰 Баланс: *{user_balance}* 💵\n\n"
     text += "💸 Сколько ставим?"
     
@@ -322,14 +355,8 @@ async def bet_amount_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
         return
     
     # Проверяем, что событие все еще активно
-    betting_events = load_betting_events()
-    event_is_active = False
-    
-    for e in betting_events.get("events", []):
-        if str(e.get("id")) == str(event_id) and e.get("is_active", True):
-            event_is_active = True
-            logging.info(f"Событие с ID {event_id} активно")
-            break
+    event = get_betting_event(event_id)
+    event_is_active = is_betting_open(event)
     
     if not event_is_active:
         logging.warning(f"Событие с ID {event_id} не активно")
@@ -340,13 +367,7 @@ async def bet_amount_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
             parse_mode="Markdown"
         )
         # Удаляем сообщение с выбором суммы ставки
-        try:
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=query.message.message_id
-            )
-        except Exception as e:
-            logging.error(f"Ошибка при удалении сообщения: {e}")
+        schedule_temp_messages_deletion(context, update.effective_chat.id, [query.message.message_id])
         return
     
     # Размещаем ставку
@@ -357,7 +378,7 @@ async def bet_amount_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     logging.info(f"Размещаем ставку: user_id={user_id}, user_name={user_name}, event_id={event_id}, option_id={option_id}, amount={amount}")
     
-    success = place_bet(user_id, user_name, event_id, option_id, amount)
+    success = await place_bet(user_id, user_name, event_id, option_id, amount)
     
     if not success:
         logging.error("Не удалось разместить ставку")
@@ -369,21 +390,9 @@ async def bet_amount_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     
     logging.info("Ставка успешно размещена")
     
-    # Загружаем информацию о событии и выбранном варианте
-    event = None
-    option_text = "неизвестный вариант"
-    
-    for e in betting_events.get("events", []):
-        if str(e.get("id")) == str(event_id):
-            event = e
-            for opt in e.get("options", []):
-                if str(opt.get("id")) == str(option_id):
-                    option_text = opt.get("text")
-                    break
-            break
-    
-    # Получаем обновленный баланс
-    new_balance = get_balance(user_id)
+    # Получаем текст выбранного варианта из индекса событий
+    option = get_betting_option(event_id, option_id)
+    option_text = option.get("text") if option else "неизвестный вариант"
     
     # Экранируем символы Markdown в имени пользователя, если оно используется
     safe_user_name = user_name
@@ -410,37 +419,82 @@ async def bet_amount_callback(update: Update, context: ContextTypes.DEFAULT_TYPE
     if event_message_id:
         messages_to_delete.append(event_message_id)
     
-    # Удаляем временные сообщения сразу
-    for msg_id in messages_to_delete:
-        try:
-            await context.bot.delete_message(
-                chat_id=update.effective_chat.id,
-                message_id=msg_id
-            )
-            logging.info(f"Удалено сообщение: message_id={msg_id}")
-        except Exception as e:
-            logging.error(f"Ошибка при удалении сообщения: {e}")
+    # Удаляем временные сообщения пачкой вместе с другими сообщениями чата
+    schedule_temp_messages_deletion(context, update.effective_chat.id, messages_to_delete)
 
 async def delete_temp_messages(context: CallbackContext, message_ids: list, chat_id: int):
     """
-    Удаляет временные сообщения.
-    Функция может использоваться в других местах кода для удаления временных сообщений.
+    Удаляет временные сообщения пачками по TEMP_MESSAGES_BATCH_SIZE через deleteMessages.
+    Если запрос не удался, сообщения пачки удаляются по одному.
     
     Args:
         context: Контекст от JobQueue
         message_ids: Список ID сообщений для удаления
         chat_id: ID чата
     """
-    for message_id in message_ids:
+    for start in range(0, len(message_ids), TEMP_MESSAGES_BATCH_SIZE):
+        batch = message_ids[start:start + TEMP_MESSAGES_BATCH_SIZE]
         try:
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            # В python-telegram-bot 20.7 нет обёртки для deleteMessages, метод Bot API вызывается напрямую
+            await context.bot._post("deleteMessages", {"chat_id": chat_id, "message_ids": batch})
+            continue
         except Exception as e:
-            logging.error(f"Ошибка при удалении временного сообщения: {e}")
+            logging.error(f"Ошибка при пакетном удалении временных сообщений: {e}")
+        for message_id in batch:
+            try:
+                await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
+            except Exception as e:
+                logging.error(f"Ошибка при удалении временного сообщения: {e}")
+
+def schedule_temp_messages_deletion(context: CallbackContext, chat_id: int, message_ids: list):
+    """
+    Добавляет временные сообщения чата в очередь на удаление.
+    Первое сообщение в чате запускает задачу, которая через TEMP_MESSAGES_DELETE_DELAY
+    секунд удалит все накопившиеся сообщения чата пачкой. Сообщения попадают в очередь
+    только после того, как задача запланирована: иначе их некому было бы удалить.
+    
+    Args:
+        context: Контекст обработчика
+        chat_id: ID чата
+        message_ids: Список ID сообщений для удаления
+    """
+    pending = _pending_temp_messages.get(chat_id)
+    if pending is not None:
+        pending.update(message_ids)
+        return
+    if context.job_queue is None:
+        logging.warning(f"JobQueue недоступна, временные сообщения в чате {chat_id} не будут удалены")
+        return
+    try:
+        context.job_queue.run_once(
+            flush_temp_messages_job,
+            when=TEMP_MESSAGES_DELETE_DELAY,
+            name=f"{TEMP_MESSAGES_JOB_PREFIX}{chat_id}",
+            data={"chat_id": chat_id}
+        )
+    except Exception as e:
+        logging.error(f"Ошибка при планировании удаления временных сообщений в чате {chat_id}: {e}")
+        return
+    _pending_temp_messages[chat_id] = set(message_ids)
+
+async def flush_temp_messages_job(context: CallbackContext):
+    """
+    Задача JobQueue: удаляет все накопившиеся временные сообщения чата.
+    
+    Args:
+        context: Контекст от JobQueue (job.data содержит chat_id)
+    """
+    chat_id = context.job.data["chat_id"]
+    message_ids = sorted(_pending_temp_messages.pop(chat_id, ()))
+    if message_ids:
+        await delete_temp_messages(context, message_ids, chat_id)
+        logging.info(f"Удалено временных сообщений в чате {chat_id}: {len(message_ids)}")
 
 async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     Обработчик команды /history.
-    Показывает историю последних результатов ставок.
+    Показывает страницу истории результатов ставок: "/history 2" или кнопки
+    "Новее"/"Старее". Из журнала истории читается только нужная страница.
     
     Args:
         update: Объект обновления от Telegram
@@ -448,16 +502,23 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
     # Определяем, был ли вызов через callback или через команду
     query = update.callback_query
+    page = 1
     
     if query:
         # Это callback от кнопки
         await query.answer()
         chat_id = update.effective_chat.id
+        if query.data and query.data.startswith(HISTORY_PAGE_PREFIX):
+            page = parse_page_number([query.data[len(HISTORY_PAGE_PREFIX):]])
     else:
         # Это обычная команда
         chat_id = update.effective_chat.id
+        page = parse_page_number(context.args)
     
-    history = get_betting_history(limit=5)
+    total = count_betting_history()
+    pages = max((total + HISTORY_PAGE_SIZE - 1) // HISTORY_PAGE_SIZE, 1)
+    page = min(page, pages)
+    history = get_betting_history(limit=HISTORY_PAGE_SIZE, offset=(page - 1) * HISTORY_PAGE_SIZE)
     
     if not history:
         message = "📜 История ставок пуста. Делайте ставки! 🎲"
@@ -468,6 +529,16 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
     
     text = "📜 *ИСТОРИЯ СТАВОК* 📊\n\n"
+    if pages > 1:
+        text = f"📜 *ИСТОРИЯ СТАВОК* 📊 (страница {page}/{pages})\n\n"
+    
+    # Кнопки перехода между страницами
+    buttons = []
+    if page > 1:
+        buttons.append(InlineKeyboardButton("⬅️ Новее", callback_data=f"{HISTORY_PAGE_PREFIX}{page - 1}"))
+    if page < pages:
+        buttons.append(InlineKeyboardButton("Старее ➡️", callback_data=f"{HISTORY_PAGE_PREFIX}{page + 1}"))
+    reply_markup = InlineKeyboardMarkup([buttons]) if buttons else None
     
     for i, entry in enumerate(history):
         event_date = entry.get("date", "Неизвестно")
@@ -537,6 +608,7 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         try:
             await query.edit_message_text(
                 text=text, 
+                reply_markup=reply_markup,
                 parse_mode="Markdown"
             )
         except Exception as e:
@@ -546,15 +618,94 @@ async def history_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
             await context.bot.send_message(
                 chat_id=chat_id,
                 text=text,
+                reply_markup=reply_markup,
                 parse_mode="Markdown"
             )
     else:
         await context.bot.send_message(
             chat_id=chat_id,
             text=text,
+            reply_markup=reply_markup,
             parse_mode="Markdown"
         )
 
+def _format_bettop_row(row: dict, sort_by: str) -> str:
+    """Форматирует показатели игрока для рейтинга /bettop."""
+    if sort_by == "roi":
+        value = f"ROI {row['roi'] * 100:+.0f}%"
+    elif sort_by == "profit":
+        value = f"{row['profit']:+d} 💵"
+    else:
+        value = f"серия {row['streak']} 🔥"
+    return f"{value} | угадано {row['wins']}/{row['events']} ({row['hit_rate'] * 100:.0f}%)"
+
+async def bettop_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """
+    Обработчик команды /bettop.
+    Показывает рейтинг игроков: "/bettop" - по серии побед, "/bettop profit" - по прибыли,
+    "/bettop roi" - по отношению прибыли к сумме ставок. Рейтинг строится по статистике,
+    которая ведётся при подведении итогов, без чтения истории ставок.
+    
+    Args:
+        update: Объект обновления от Telegram
+        context: Контекст обработчика
+    """
+    chat_id = update.effective_chat.id
+    arg = context.args[0].lower() if context.args else "streak"
+    sort_by = BETTOP_SORT_ALIASES.get(arg)
+    if sort_by is None:
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text="Использование: /bettop [streak|profit|roi]"
+        )
+        return
+    
+    leaderboard = get_betting_leaderboard(sort_by=sort_by, limit=BETTOP_LIMIT)
+    if not leaderboard:
+        await context.bot.send_message(
+            chat_id=chat_id,
+            text="🏆 Рейтинг пока пуст. Делайте ставки! 🎲"
+        )
+        return
+    
+    medals = {1: "🥇", 2: "🥈", 3: "🥉"}
+    lines = [f"{BETTOP_TITLES[sort_by]}\n"]
+    for place, row in enumerate(leaderboard, start=1):
+        lines.append(f"{medals.get(place, f'{place}.')} {row['user_name']}: {_format_bettop_row(row, sort_by)}")
+    
+    # Показываем строку вызвавшего, если его нет в рейтинге
+    user = update.effective_user
+    if user and all(row["user_id"] != str(user.id) for row in leaderboard):
+        own = get_user_betting_stats(user.id)
+        if own:
+            lines.append(f"\nВы: {_format_bettop_row(own, sort_by)}")
+    
+    await context.bot.send_message(chat_id=chat_id, text="\n".join(lines))
+
+def _betting_job_data(context: CallbackContext) -> dict:
+    """
+    Возвращает данные задачи ставок: номер окна ('slot') и/или ID события ('event_id').
+    Для задач без данных (запуск вручную или старое расписание) возвращает пустой словарь.
+    """
+    job = getattr(context, "job", None)
+    data = getattr(job, "data", None)
+    return data if isinstance(data, dict) else {}
+
+def _event_in_job(event: dict, job_data: dict) -> bool:
+    """
+    Проверяет, относится ли событие к задаче ставок.
+    События без betting_slot (опубликованные до появления окон ставок) относятся к первому окну.
+
+    Args:
+        event: Данные события
+        job_data: Данные задачи (см. _betting_job_data)
+    """
+    if "event_id" in job_data:
+        return str(event.get("id")) == str(job_data["event_id"])
+    if "slot" in job_data:
+        return event.get("betting_slot", 0) == job_data["slot"]
+    return True
+
 async def publish_betting_event(context: CallbackContext):
     """
     Публикует событие для ставок.
@@ -564,7 +715,7 @@ async def publish_betting_event(context: CallbackContext):
         context: Контекст от JobQueue
     """
     app = context.application # Получаем app из контекста
-    from betting import get_next_active_event
+    from betting import get_next_active_event, get_betting_slots
     from config import POST_CHAT_ID
     from config import schedule_config, TIMEZONE_OFFSET
     import state
@@ -574,10 +725,12 @@ async def publish_betting_event(context: CallbackContext):
         logging.info("Система ставок отключена. Пропускаем публикацию события.")
         return
     
-    # Получаем времена из конфига
-    betting_config = schedule_config.get("betting", {})
-    results_time = betting_config.get("results_time", "21:00")
-    close_time = betting_config.get("close_time", "20:00")
+    # Получаем времена окна ставок, для которого запущена задача
+    slots = get_betting_slots(schedule_config.get("betting", {}))
+    slot_index = _betting_job_data(context).get("slot", 0)
+    slot = slots[slot_index] if 0 <= slot_index < len(slots) else slots[0]
+    results_time = slot["results_time"]
+    close_time = slot["close_time"]
     
     # Получаем следующее активное событие
     next_event = get_next_active_event()
@@ -627,12 +780,12 @@ async def publish_betting_event(context: CallbackContext):
         reply_markup=reply_markup
     )
 
-    # Помечаем событие как неактивное при публикации
-    success = publish_event(event_id)
+    # Снимаем событие из очереди и открываем приём ставок в окне этой задачи
+    success = publish_event(event_id, slot=slot_index)
     if success:
-        logging.info(f"Событие с ID {event_id} помечено как неактивное после публикации")
+        logging.info(f"Событие с ID {event_id} открыто для ставок после публикации")
     else:
-        logging.error(f"Не удалось пометить событие с ID {event_id} как неактивное")
+        logging.error(f"Не удалось открыть для ставок событие с ID {event_id}")
 
     logging.info(f"Опубликовано событие для ставок (ID: {event_id}) в чат {POST_CHAT_ID}")
 
@@ -661,10 +814,13 @@ async def process_betting_results(context: CallbackContext):
     events_data = load_betting_events()
     events_for_results = []
     
+    # Берём только события окна ставок этой задачи: итоги остальных подводятся по их расписанию
+    job_data = _betting_job_data(context)
     for event in events_data.get("events", []):
         if (not event.get("is_active", True) and 
             event.get("winner_option_id") is not None and 
-            not event.get("results_published", False)):
+            not event.get("results_published", False) and
+            _event_in_job(event, job_data)):
             events_for_results.append(event)
     
     if not events_for_results:
@@ -759,7 +915,7 @@ async def process_betting_results(context: CallbackContext):
 
 async def close_betting_event(context: CallbackContext):
     """
-    Закрывает текущее активное событие для ставок.
+    Закрывает приём ставок на открытое событие окна ставок этой задачи.
     Вызывается по расписанию перед публикацией результатов.
     """
     app = context.application # Получаем app из контекста
@@ -776,9 +932,10 @@ async def close_betting_event(context: CallbackContext):
     events_data = load_betting_events()
     active_event = None
     
-    # Найдем активное событие, которое нужно закрыть
+    # Найдем открытое для ставок событие окна ставок этой задачи
+    job_data = _betting_job_data(context)
     for event in events_data.get("events", []):
-        if event.get("is_active", True):
+        if event.get("betting_open") and _event_in_job(event, job_data):
             active_event = event
             break
     
@@ -786,9 +943,9 @@ async def close_betting_event(context: CallbackContext):
         logging.info("Нет активных событий для закрытия.")
         return
     
-    # Закрываем событие
+    # Закрываем приём ставок
     event_id = active_event.get("id")
-    success = publish_event(event_id)
+    success = close_event(event_id)
     
     if success:
         # Записываем в лог об успешном закрытии события
@@ -821,14 +978,17 @@ async def close_betting_command(update: Update, context: ContextTypes.DEFAULT_TY
     Обработчик команды для ручного закрытия текущего активного события для ставок.
     Используется администраторами, когда нужно вручную закрыть прием ставок.
     """
-    from betting import load_betting_events, publish_event, get_next_active_event
+    from betting import load_betting_events, close_event
     
     # Создаем контекст для функции close_betting_event
     context_for_close = MagicMock()
     context_for_close.application = context.application
     
-    # Проверяем, есть ли активное событие
-    active_event = get_next_active_event()
+    # Проверяем, есть ли событие, открытое для ставок
+    active_event = next(
+        (event for event in load_betting_events().get("events", []) if event.get("betting_open")),
+        None
+    )
     
     if not active_event:
         await context.bot.send_message(
@@ -845,7 +1005,7 @@ async def close_betting_command(update: Update, context: ContextTypes.DEFAULT_TY
     event_status_changed = True
     
     for event in events_data.get("events", []):
-        if event.get("id") == active_event.get("id") and event.get("is_active", True):
+        if event.get("id") == active_event.get("id") and event.get("betting_open"):
             event_status_changed = False
             break
     
@@ -856,7 +1016,7 @@ async def close_betting_command(update: Update, context: ContextTypes.DEFAULT_TY
         )
     else:
         # Попробуем закрыть напрямую
-        success = publish_event(active_event.get("id"))
+        success = close_event(active_event.get("id"))
         if success:
             await context.bot.send_message(
                 chat_id=update.effective_chat.id,
@@ -988,13 +1148,7 @@ def get_betting_event_by_id(event_id):
     Returns:
         dict: Данные события или None, если событие не найдено
     """
-    events_data = load_betting_events()
-    
-    for event in events_data.get("events", []):
-        if str(event.get("id")) == str(event_id):
-            return event
-    
-    return None
+    return get_betting_event(event_id)
 
 async def betting_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -1026,7 +1180,7 @@ async def betting_callback_handler(update: Update, context: ContextTypes.DEFAULT
         
         # Размещаем ставку стандартного размера (например, 50)
         bet_amount = 50
-        success = place_bet(user_id, username, event_id, option_id, bet_amount)
+        success = await place_bet(user_id, username, event_id, option_id, bet_amount)
         
         if success:
             await query.answer("Ставка принята!")
@@ -1076,7 +1230,7 @@ async def update_betting_schedule_command(update: Update, context: ContextTypes.
     betting_jobs_removed = 0
     
     for job in jobs:
-        if job.name in ["publish_betting_event", "close_betting_event", "process_betting_results"]:
+        if job.name and job.name.startswith(("publish_betting_event", "close_betting_event", "process_betting_results")):
             job.schedule_removal()
             betting_jobs_removed += 1
     
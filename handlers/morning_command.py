@@ -4,47 +4,30 @@
 Система запоминает последнее отправленное пожелание и при следующем запросе 
 показывает следующее в списке, обеспечивая ротацию пожеланий.
 """
-import os
-import json
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
+from docstore import read_lines
+from kvstate import kv_get, kv_set
 
 logger = logging.getLogger(__name__)
 
 # Путь к файлу с пожеланиями доброго утра (каждое пожелание с новой строки)
 MORNING_WISHES_FILE = "phrases/morning_wishes.txt"
-# Файл для хранения текущего индекса пожелания
-MORNING_INDEX_FILE = "state_data/morning_index.json"
+# Ключ текущего индекса пожелания в хранилище состояния (kvstate)
+MORNING_INDEX_KEY = "morning_index"
 
 def load_morning_wishes() -> list[str]:
     """Считываем пожелания из файла. Пустые строки отбрасываются."""
-    if not os.path.exists(MORNING_WISHES_FILE):
-        return []
-    with open(MORNING_WISHES_FILE, "r", encoding="utf-8") as f:
-        wishes = [line.strip() for line in f if line.strip()]
-    return wishes
+    return read_lines(MORNING_WISHES_FILE)
 
 def load_morning_index() -> int:
-    """Загружаем текущий индекс из файла. Если файла нет — возвращаем 0."""
-    if not os.path.exists(MORNING_INDEX_FILE):
-        return 0
-    try:
-        with open(MORNING_INDEX_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict) and "morning_index" in data:
-                return data["morning_index"]
-    except Exception as e:
-        logger.error("Ошибка чтения файла индекса утра: %s", e)
-    return 0
+    """Загружаем текущий индекс из хранилища состояния. Если его нет — возвращаем 0."""
+    return kv_get(MORNING_INDEX_KEY, 0)
 
 def save_morning_index(index: int):
-    """Сохраняем новый индекс в файл."""
-    try:
-        with open(MORNING_INDEX_FILE, "w", encoding="utf-8") as f:
-            json.dump({"morning_index": index}, f, ensure_ascii=False, indent=4)
-    except Exception as e:
-        logger.error("Ошибка записи файла индекса утра: %s", e)
+    """Сохраняем новый индекс в хранилище состояния."""
+    kv_set(MORNING_INDEX_KEY, index)
 
 async def morning_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
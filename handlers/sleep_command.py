@@ -4,47 +4,30 @@
 Система запоминает последнее отправленное пожелание и при следующем запросе 
 показывает следующее в списке, обеспечивая ротацию пожеланий.
 """
-import os
-import json
 import logging
 from telegram import Update
 from telegram.ext import ContextTypes
+from docstore import read_lines
+from kvstate import kv_get, kv_set
 
 logger = logging.getLogger(__name__)
 
 # Путь к файлу с пожеланиями для сна (каждое пожелание с новой строки)
 SLEEP_WISHES_FILE = "phrases/sleep_wishes.txt"
-# Файл для хранения текущего индекса пожелания
-SLEEP_INDEX_FILE = "state_data/sleep_index.json"
+# Ключ текущего индекса пожелания в хранилище состояния (kvstate)
+SLEEP_INDEX_KEY = "sleep_index"
 
 def load_sleep_wishes() -> list[str]:
     """Считываем пожелания из файла. Пустые строки отбрасываются."""
-    if not os.path.exists(SLEEP_WISHES_FILE):
-        return []
-    with open(SLEEP_WISHES_FILE, "r", encoding="utf-8") as f:
-        wishes = [line.strip() for line in f if line.strip()]
-    return wishes
+    return read_lines(SLEEP_WISHES_FILE)
 
 def load_sleep_index() -> int:
-    """Загружаем текущий индекс из файла. Если файла нет — возвращаем 0."""
-    if not os.path.exists(SLEEP_INDEX_FILE):
-        return 0
-    try:
-        with open(SLEEP_INDEX_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict) and "sleep_index" in data:
-                return data["sleep_index"]
-    except Exception as e:
-        logger.error("Ошибка чтения файла индекса сна: %s", e)
-    return 0
+    """Загружаем текущий индекс из хранилища состояния. Если его нет — возвращаем 0."""
+    return kv_get(SLEEP_INDEX_KEY, 0)
 
 def save_sleep_index(index: int):
-    """Сохраняем новый индекс в файл."""
-    try:
-        with open(SLEEP_INDEX_FILE, "w", encoding="utf-8") as f:
-            json.dump({"sleep_index": index}, f, ensure_ascii=False, indent=4)
-    except Exception as e:
-        logger.error("Ошибка записи файла индекса сна: %s", e)
+    """Сохраняем новый индекс в хранилище состояния."""
+    kv_set(SLEEP_INDEX_KEY, index)
 
 async def sleep_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
@@ -60,7 +60,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> No
             "• <b>/post [HH:MM]</b> – Запланировать публикацию. Текст поста надо писать со следующей строчки, можно прикладывать фото, видео и звуки 📧\n"
             "• <b>/talk [текст]</b> – Мгновенно отправить сообщение в групповой чат. Поддерживает все типы медиа 📣\n"
             "• <b>/posts</b> – Просмотр и управление отложенными публикациями 📋\n"
-            "• <b>/history</b> – Показать историю последних результатов ставок 📜\n\n"
+            "• <b>/history [страница]</b> – Показать историю последних результатов ставок 📜\n"
+            "• <b>/bettop [streak|profit|roi]</b> – Рейтинг игроков по серии побед, прибыли или ROI 🏆\n\n"
             "🔸 <b>Технические команды</b>:\n"
             "• <b>/chatid</b> – Узнать ID чата\n"
             "• <b>/getfileid</b> – Получить file_id отправленного GIF\n"
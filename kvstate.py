@@ -0,0 +1,181 @@
+# kvstate.py
+"""
+Хранилище "ключ-значение" для мелких значений состояния бота (флаги, индексы, счётчики)
+в одном файле KV_STATE_FILE.
+"""
+
+import os
+import json
+import logging
+import threading
+
+from docstore import read_json, write_json
+
+KV_STATE_FILE = "state_data/bot_state.json"
+
+# Ключ -> (старый файл, поле в нём)
+LEGACY_FILES = {
+    "morning_index": ("state_data/morning_index.json", "morning_index"),
+    "sleep_index": ("state_data/sleep_index.json", "sleep_index"),
+    "praise_index": ("state_data/praise_state.json", "praise_index"),
+    "weekly_quiz_count": ("state_data/weekly_quiz_count.json", "count"),
+}
+
+def _read_legacy_values(legacy_files: dict) -> dict:
+    """
+    Читает значения из старых файлов состояния.
+
+    Args:
+        legacy_files: Словарь { ключ: (путь к файлу, поле) }
+
+    Returns:
+        dict: Найденные значения { ключ: значение }
+    """
+    values = {}
+    for key, (path, field) in legacy_files.items():
+        if not os.path.exists(path):
+            continue
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and field in data:
+                values[key] = data[field]
+        except Exception as e:
+            logging.error(f"Ошибка при чтении {path}: {e}")
+    return values
+
+class KeyValueState:
+    """
+    Значения состояния в памяти процесса с сохранением в один JSON-файл.
+    """
+
+    def __init__(self, path: str = KV_STATE_FILE, legacy_files: dict = None):
+        self.path = path
+        self.legacy_files = LEGACY_FILES if legacy_files is None else legacy_files
+        self._data = None
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        """Загружает значения при первом обращении и переносит значения из старых файлов."""
+        if self._data is not None:
+            return
+        try:
+            data = read_json(self.path, {})
+        except Exception as e:
+            logging.error(f"Ошибка при чтении {self.path}: {e}")
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        missing = {key: value for key, value in self.legacy_files.items() if key not in data}
+        migrated = _read_legacy_values(missing)
+        data.update(migrated)
+        self._data = data
+        if migrated:
+            logging.info(f"Перенесены значения состояния в {self.path}: {', '.join(sorted(migrated))}")
+            self._save()
+
+    def _save(self):
+        """Планирует запись значений на диск."""
+        write_json(self.path, self._data)
+
+    def get(self, key: str, default=None):
+        """
+        Возвращает значение по ключу.
+
+        Args:
+            key: Ключ
+            default: Значение, если ключа нет
+
+        Returns:
+            Значение или default
+        """
+        with self._lock:
+            self._ensure_loaded()
+            return self._data.get(key, default)
+
+    def set(self, key: str, value):
+        """
+        Устанавливает значение по ключу.
+
+        Args:
+            key: Ключ
+            value: Значение (должно сериализоваться в JSON)
+        """
+        self.update({key: value})
+
+    def update(self, values: dict):
+        """
+        Устанавливает несколько значений одной записью.
+
+        Args:
+            values: Словарь { ключ: значение }
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._data.update(values)
+            self._save()
+
+    def incr(self, key: str, delta: int = 1, default: int = 0) -> int:
+        """
+        Атомарно увеличивает числовое значение.
+
+        Args:
+            key: Ключ
+            delta: Величина увеличения
+            default: Начальное значение, если ключа нет
+
+        Returns:
+            int: Новое значение
+        """
+        with self._lock:
+            self._ensure_loaded()
+            value = self._data.get(key, default) + delta
+            self._data[key] = value
+            self._save()
+            return value
+
+# Общее хранилище значений состояния процесса
+_state = KeyValueState()
+
+def kv_get(key: str, default=None):
+    """
+    Возвращает значение состояния по ключу.
+
+    Args:
+        key: Ключ
+        default: Значение, если ключа нет
+    """
+    return _state.get(key, default)
+
+def kv_set(key: str, value):
+    """
+    Устанавливает значение состояния по ключу.
+
+    Args:
+        key: Ключ
+        value: Значение
+    """
+    _state.set(key, value)
+
+def kv_update(values: dict):
+    """
+    Устанавливает несколько значений состояния одной записью.
+
+    Args:
+        values: Словарь { ключ: значение }
+    """
+    _state.update(values)
+
+def kv_incr(key: str, delta: int = 1, default: int = 0) -> int:
+    """
+    Увеличивает числовое значение состояния.
+
+    Args:
+        key: Ключ
+        delta: Величина увеличения
+        default: Начальное значение, если ключа нет
+
+    Returns:
+        int: Новое значение
+    """
+    return _state.incr(key, delta, default)
@@ -117,14 +117,14 @@ from scheduler import (
     change_date_callback, 
     custom_date_handler, 
     reschedule_all_posts, 
-    parse_time_from_string, 
     list_scheduled_posts_command, 
     delete_post_callback,
     talk_command,
     talk_media_group_command,
     schedule_media_group_post_command
 )
-from quiz import poll_answer_handler, rating_command, weekly_quiz_reset
+from utils import parse_time_from_string
+from quiz import poll_answer_handler, rating_command, weekly_quiz_reset, evict_expired_quizzes_job, ACTIVE_QUIZZES_EVICT_INTERVAL, flush_quiz_rewards
 from state import load_state
 
 from quiz import start_quiz_command, stop_quiz_command
@@ -134,6 +134,10 @@ from wisdom import start_wisdom_command, stop_wisdom_command
 from handlers.logout_command import logout_command
 
 from handlers.balance_command import balance_command
+from balance import compact_balances, compact_balances_job, COMPACT_INTERVAL
+from utils_autopost import compact_anecdotes_job, ANECDOTES_COMPACT_INTERVAL
+from docstore import flush_all
+from betting import upgrade_betting_data_file
 from casino.casino_main import casino_command, casino_callback_handler
 from casino.slots import handle_slots_bet_callback
 from casino.roulette import handle_roulette_bet_callback, handle_change_bet
@@ -144,6 +148,7 @@ from handlers.betting_commands import (
     bet_option_callback, 
     bet_amount_callback, 
     history_command,
+    bettop_command,
     update_betting_schedule_command,
     process_betting_results, 
     start_betting_command, 
@@ -300,6 +305,15 @@ async def reload_config_command(update, context):
     reload_all_configs()
     await update.message.reply_text("Конфигурации перезагружены!")
 
+async def on_shutdown(app):
+    """Сохраняет накопленные в памяти данные перед остановкой бота."""
+    # Начисляет накопленные награды за ответы на викторину
+    flush_quiz_rewards()
+    # Дописывает журнал балансов и пересобирает снимок, чтобы следующий запуск не проигрывал журнал
+    compact_balances()
+    # Записывает отложенные изменения файлов состояния (ставки, викторина, расписание и т.д.)
+    flush_all()
+
 def main() -> None:
     """
     Основная функция, которая инициализирует бота, добавляет обработчики команд
@@ -310,12 +324,15 @@ def main() -> None:
         ApplicationBuilder()
         .token(TOKEN)
         .concurrent_updates(num_concurrent_updates)
+        .post_shutdown(on_shutdown)
         .build()
     )
 
     # --- ВАЖНО ---:
     # Считываем состояние флагов до того, как отдадим бота в run_polling
     load_state()
+    # Однократно приводим данные о ставках к текущей схеме, чтобы загрузка была простым чтением
+    upgrade_betting_data_file()
 
     # Добавляем отладочный обработчик для всех callback запросов
     app.add_handler(CallbackQueryHandler(log_all_callbacks), group=-1)
@@ -378,6 +395,7 @@ def main() -> None:
 
     # Казино и баланс
     app.add_handler(CommandHandler("balance", balance_command))
+    app.add_handler(CommandHandler("top", balance_command))
     app.add_handler(CommandHandler("casino", casino_command))
     app.add_handler(CallbackQueryHandler(casino_callback_handler, pattern=r"^casino:"))
     app.add_handler(CallbackQueryHandler(handle_slots_bet_callback, pattern=r"^slots_bet:"))
@@ -394,6 +412,7 @@ def main() -> None:
     # Обработчики для системы ставок
     app.add_handler(CommandHandler("bet", bet_command))
     app.add_handler(CommandHandler("history", history_command))
+    app.add_handler(CommandHandler("bettop", bettop_command))
     app.add_handler(CommandHandler("startbetting", start_betting_command))
     app.add_handler(CommandHandler("stopbetting", stop_betting_command))
     app.add_handler(CommandHandler("close_betting", close_betting_command))
@@ -402,7 +421,7 @@ def main() -> None:
     app.add_handler(CallbackQueryHandler(bet_option_callback, pattern="^bet_option_"))
     app.add_handler(CallbackQueryHandler(bet_amount_callback, pattern="^bet_amount_|^bet_back$"))
     app.add_handler(CallbackQueryHandler(bet_command, pattern="^bet_event_"))
-    app.add_handler(CallbackQueryHandler(history_command, pattern="^history_betting$"))
+    app.add_handler(CallbackQueryHandler(history_command, pattern=r"^history_betting(_\d+)?$"))
     
     app.add_handler(CommandHandler("meme", search_meme_command))
 
@@ -429,6 +448,30 @@ def main() -> None:
         job_kwargs={'misfire_grace_time': 3600}
     )
 
+    # Периодическая пересборка снимка балансов из журнала
+    app.job_queue.run_repeating(
+        compact_balances_job,
+        interval=COMPACT_INTERVAL,
+        first=COMPACT_INTERVAL,
+        name="compact_balance_journal"
+    )
+
+    # Периодическое уплотнение файла анекдотов (вырезание выданных)
+    app.job_queue.run_repeating(
+        compact_anecdotes_job,
+        interval=ANECDOTES_COMPACT_INTERVAL,
+        first=ANECDOTES_COMPACT_INTERVAL,
+        name="compact_anecdotes"
+    )
+
+    # Загрузка реестра опросов викторины и периодическое удаление устаревших опросов
+    app.job_queue.run_repeating(
+        evict_expired_quizzes_job,
+        interval=ACTIVE_QUIZZES_EVICT_INTERVAL,
+        first=0,
+        name="evict_expired_quizzes"
+    )
+
     # При первом запуске бота — сразу же сделаем сброс расписания
     # Планировщик автоматически передаст контекст в callback
     app.job_queue.run_once(midnight_reset_callback, 0)
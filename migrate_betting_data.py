@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Скрипт для перевода state_data/betting_data.json в текущую версию схемы.
+Запускать из командной строки: python migrate_betting_data.py
+
+Бот выполняет ту же миграцию при запуске; скрипт позволяет обновить файл заранее,
+например после восстановления из резервной копии.
+"""
+
+import logging
+
+# Настраиваем логирование для вывода в консоль
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+
+def main():
+    """
+    Основная функция миграции данных о ставках.
+    """
+    from betting import upgrade_betting_data_file, BETTING_DATA_FILE, BETTING_SCHEMA_VERSION
+    from docstore import flush_all
+
+    logging.info(f"Проверяю схему {BETTING_DATA_FILE} (текущая версия: {BETTING_SCHEMA_VERSION})...")
+    if not upgrade_betting_data_file():
+        logging.info("Миграция не требуется.")
+        return
+
+    # Запись файлов отложенная - сохраняем изменения до выхода
+    if flush_all():
+        logging.info("Миграция завершена.")
+    else:
+        logging.error("Не удалось сохранить данные после миграции.")
+
+if __name__ == "__main__":
+    main()
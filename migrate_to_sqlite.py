@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Скрипт для переноса балансов, ставок и рейтинга викторины из JSON-файлов в SQLite.
+Запускать из командной строки: python migrate_to_sqlite.py [--db state_data/bot.db] [--force]
+
+После переноса включите хранилище в config/bot_config.json:
+    "storage": "sqlite",
+    "sqlite_path": "state_data/bot.db"
+"""
+
+import os
+import sys
+import json
+import logging
+import argparse
+
+# Настраиваем логирование для вывода в консоль
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler()]
+)
+
+BALANCE_FILE = "state_data/balance.json"
+BETTING_DATA_FILE = "state_data/betting_data.json"
+BETTING_BETS_DIR = "state_data/betting_bets"
+RATING_FILE = "state_data/rating.json"
+
+def read_json(path, default):
+    """
+    Читает JSON-файл, возвращая значение по умолчанию, если файла нет.
+
+    Args:
+        path (str): Путь к файлу
+        default: Значение, если файл отсутствует
+
+    Returns:
+        Содержимое файла или default
+    """
+    if not os.path.exists(path):
+        logging.warning(f"Файл {path} не найден, пропускаю.")
+        return default
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def normalize_betting_data(data):
+    """
+    Приводит данные о ставках к текущему формату (как betting.load_betting_data).
+
+    Args:
+        data (dict): Данные из betting_data.json
+
+    Returns:
+        dict: Данные с полями active_bets, history и win_streaks
+    """
+    data.setdefault("active_bets", {})
+    data.setdefault("history", [])
+    win_streaks = {}
+    for user_id, streak_data in data.get("win_streaks", {}).items():
+        if isinstance(streak_data, dict):
+            win_streaks[user_id] = {
+                "streak": streak_data.get("streak", 0),
+                "user_name": streak_data.get("user_name", "Unknown").lstrip('@')
+            }
+        else:
+            # Старый формат - просто число
+            win_streaks[user_id] = {"streak": streak_data, "user_name": "Unknown"}
+    data["win_streaks"] = win_streaks
+    return data
+
+def read_event_bets(active_bets):
+    """
+    Добавляет к активным ставкам разделы событий из BETTING_BETS_DIR (формат версии 3).
+
+    Args:
+        active_bets (dict): Активные ставки { event_id: { user_id: {...} } } (изменяются на месте)
+
+    Returns:
+        dict: Активные ставки всех событий
+    """
+    if not os.path.isdir(BETTING_BETS_DIR):
+        return active_bets
+    for name in sorted(os.listdir(BETTING_BETS_DIR)):
+        if name.startswith("event_") and name.endswith(".json"):
+            partition = read_json(os.path.join(BETTING_BETS_DIR, name), {})
+            if partition.get("bets"):
+                active_bets[str(partition.get("event_id"))] = partition["bets"]
+    return active_bets
+
+def main():
+    """
+    Основная функция переноса данных.
+    """
+    from storage import SqliteStorage, DEFAULT_SQLITE_PATH
+    from balance import BalanceLedger
+    from betting_history import read_history, count_history
+    from betting import build_betting_stats
+
+    parser = argparse.ArgumentParser(description="Перенос данных бота из JSON в SQLite")
+    parser.add_argument("--db", default=DEFAULT_SQLITE_PATH, help="Путь к файлу базы данных")
+    parser.add_argument("--force", action="store_true", help="Перезаписать данные, если база не пуста")
+    args = parser.parse_args()
+
+    storage = SqliteStorage(args.db)
+    try:
+        if (storage.load_balances() or storage.load_rating()) and not args.force:
+            logging.error(f"База {args.db} уже содержит данные. Используйте --force для перезаписи.")
+            sys.exit(1)
+
+        # Снимок балансов вместе с непроигранными записями журнала
+        balances = BalanceLedger(BALANCE_FILE).snapshot()
+        storage.save_balances(balances, set(balances) | set(storage.load_balances()))
+        logging.info(f"Перенесено балансов: {len(balances)}")
+
+        betting_data = normalize_betting_data(read_json(BETTING_DATA_FILE, {}))
+        read_event_bets(betting_data["active_bets"])
+        # История: записи старого формата из betting_data.json, затем журнал истории (от старых к новым)
+        history = sorted(betting_data.pop("history"), key=lambda x: x.get("date") or "")
+        history += list(reversed(read_history(0, count_history())))
+        if "betting_stats" not in betting_data:
+            # Файл старого формата - статистику ставок считаем по истории
+            betting_data["betting_stats"] = build_betting_stats(history)
+        storage.save_betting_data(betting_data, replace=True)
+        storage.replace_history(history)
+        bets_count = sum(
+            len(user_data.get("bets", []))
+            for users in betting_data["active_bets"].values()
+            for user_data in users.values()
+        )
+        logging.info(f"Перенесено активных ставок: {bets_count}, записей истории: {len(history)}")
+
+        rating = read_json(RATING_FILE, {})
+        storage.save_rating(rating)
+        logging.info(f"Перенесено записей рейтинга: {len(rating)}")
+    finally:
+        storage.close()
+
+    logging.info("Перенос завершён. Включите \"storage\": \"sqlite\" в config/bot_config.json и перезапустите бота.")
+
+if __name__ == "__main__":
+    main()
@@ -11,58 +11,63 @@
 import os
 import json
 import random
+import logging
 import datetime
+import threading
 
 from telegram import Poll
 from telegram.ext import ContextTypes
 
 from config import POST_CHAT_ID, MATERIALS_DIR
 
-from balance import update_balance
+from balance import update_balances_bulk
+from storage import get_storage
+from docstore import read_json, read_lines, write_json, file_signature
+from deck import ShuffledDeck
+from quiz_polls import ActivePollRegistry, ACTIVE_QUIZZES_FILE
+from kvstate import kv_get, kv_set
 
 import state
 
 
 # Пути к файлам
 QUIZ_FILE = os.path.join(MATERIALS_DIR, "quiz.json")  # исходные вопросы
+QUIZ_DECK_FILE = "state_data/quiz_deck.json"  # курсор колоды вопросов (quiz.json не изменяется)
 RATING_FILE = "state_data/rating.json"                           # для хранения звёзд
 PRAISES_FILE = "phrases/praises_rating.txt"  # тексты похвал
-PRAISE_INDEX_FILE = "state_data/praise_state.json"
+PRAISE_INDEX_KEY = "praise_index"  # ключ индекса похвалы в хранилище состояния (kvstate)
 
-# Глобальная структура, чтобы запоминать правильный ответ
-# key = poll_id (str), value = correct_option_id (int)
-ACTIVE_QUIZZES = {}
+# Реестр опубликованных опросов: правильный ответ, время публикации и счётчики ответов.
+# Сохраняется в ACTIVE_QUIZZES_FILE, поэтому ответы принимаются и после перезапуска бота
+ACTIVE_QUIZZES = ActivePollRegistry(ACTIVE_QUIZZES_FILE)
+# Интервал удаления устаревших опросов из реестра (в секундах)
+ACTIVE_QUIZZES_EVICT_INTERVAL = 3600
 
-WEEKLY_COUNT_FILE = "state_data/weekly_quiz_count.json"
+# Монеты за правильный ответ на вопрос викторины
+QUIZ_REWARD = 5
+# Задержка пакетного начисления звёзд и монет за ответы (в секундах)
+QUIZ_REWARDS_FLUSH_DELAY = 3.0
+
+WEEKLY_COUNT_KEY = "weekly_quiz_count"  # ключ в хранилище состояния (kvstate)
 
 def load_weekly_quiz_count() -> int:
     """
-    Загружает количество вопросов викторины за неделю из WEEKLY_COUNT_FILE.
-    Если файла нет или он некорректный, возвращает 0.
+    Загружает количество вопросов викторины за неделю из хранилища состояния.
+    Если значения нет, возвращает 0.
     
     Returns:
         int: Количество вопросов за текущую неделю
     """
-    if not os.path.exists(WEEKLY_COUNT_FILE):
-        return 0
-    try:
-        with open(WEEKLY_COUNT_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict) and "count" in data:
-                return data["count"]
-    except Exception as e:
-        pass
-    return 0
+    return kv_get(WEEKLY_COUNT_KEY, 0)
 
 def save_weekly_quiz_count(count: int):
     """
-    Сохраняет количество вопросов викторины за неделю в WEEKLY_COUNT_FILE.
+    Сохраняет количество вопросов викторины за неделю в хранилище состояния.
     
     Args:
         count: Количество вопросов для сохранения
     """
-    with open(WEEKLY_COUNT_FILE, "w", encoding="utf-8") as f:
-        json.dump({"count": count}, f, ensure_ascii=False, indent=4)
+    kv_set(WEEKLY_COUNT_KEY, count)
 
 
 def load_quiz_questions() -> list[dict]:
@@ -80,15 +85,12 @@ def load_quiz_questions() -> list[dict]:
     Returns:
         list[dict]: Список словарей с вопросами, вариантами ответов и правильным ответом
     """
-    if not os.path.exists(QUIZ_FILE):
+    try:
+        data = read_json(QUIZ_FILE)
+        if isinstance(data, list):
+            return data
+    except json.JSONDecodeError:
         return []
-    with open(QUIZ_FILE, "r", encoding="utf-8") as f:
-        try:
-            data = json.load(f)
-            if isinstance(data, list):
-                return data
-        except json.JSONDecodeError:
-            return []
     return []
 
 
@@ -99,14 +101,21 @@ def save_quiz_questions(questions: list[dict]):
     Args:
         questions: Список словарей с вопросами для сохранения
     """
-    with open(QUIZ_FILE, "w", encoding="utf-8") as f:
-        json.dump(questions, f, ensure_ascii=False, indent=4)
+    write_json(QUIZ_FILE, questions)
 
 
+# Колода вопросов: перемешанная один раз перестановка quiz.json и курсор в ней
+_quiz_deck = ShuffledDeck(
+    QUIZ_DECK_FILE,
+    load_items=lambda: load_quiz_questions(),
+    bank_signature=lambda: file_signature(QUIZ_FILE)
+)
+
 def get_random_question() -> dict | None:
     """
-    Возвращает случайный вопрос из quiz.json и удаляет его из файла,
-    чтобы не повторялся.
+    Возвращает следующий вопрос из перемешанной колоды вопросов quiz.json.
+    Вопрос не удаляется из файла: сдвигается только курсор колоды,
+    поэтому вопросы не повторяются, а файл с вопросами не перезаписывается.
     
     Returns:
         dict|None: Словарь с вопросом или None, если вопросов нет
@@ -114,20 +123,8 @@ def get_random_question() -> dict | None:
     # Проверяем, запущен ли тест
     is_test = hasattr(state, 'is_test_mode') and state.is_test_mode
 
-    # Загружаем вопросы
-    questions = load_quiz_questions()
-    if not questions:
-        return None
-        
-    # Выбираем случайный вопрос
-    question = random.choice(questions)
-    
-    # Удаляем вопрос из списка только в реальном режиме, не в тестах
-    if not is_test:
-        questions.remove(question)
-        save_quiz_questions(questions)
-        
-    return question
+    # В тестовом режиме курсор не сдвигается
+    return _quiz_deck.deal(advance=not is_test)
 
 
 def load_rating() -> dict:
@@ -142,15 +139,17 @@ def load_rating() -> dict:
           }
         Если файл пуст или отсутствует — вернёт пустой словарь.
     """
-    if not os.path.exists(RATING_FILE):
-        return {}
+    storage = get_storage()
+    if storage is not None:
+        return storage.load_rating()
+
     try:
-        with open(RATING_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                return data
+        data = read_json(RATING_FILE)
+        if isinstance(data, dict):
+            return data
     except Exception as e:
-        return {}
+        pass
+    return {}
 
 def save_rating(rating: dict):
     """
@@ -160,12 +159,141 @@ def save_rating(rating: dict):
         rating: Словарь вида:
             dict[user_id_str] = { "stars": int, "name": str }
     """
+    storage = get_storage()
+    if storage is not None:
+        storage.save_rating(rating)
+        return
+
     try:
-        with open(RATING_FILE, "w", encoding="utf-8") as f:
-            json.dump(rating, f, ensure_ascii=False, indent=4)
+        write_json(RATING_FILE, rating)
     except Exception as e:
         pass
 
+def add_stars_bulk(awards: dict):
+    """
+    Начисляет звёзды нескольким пользователям одной записью рейтинга.
+
+    Args:
+        awards: Словарь { user_id_str: { "stars": количество звёзд, "name": имя } }
+    """
+    if not awards:
+        return
+    storage = get_storage()
+    if storage is not None:
+        storage.add_stars_bulk(awards)
+        return
+
+    rating = load_rating()
+    for user_id_str, award in awards.items():
+        user_data = rating.get(user_id_str, {"stars": 0, "name": None})
+        user_data["stars"] = user_data.get("stars", 0) + award["stars"]
+        user_data["name"] = award["name"]
+        rating[user_id_str] = user_data
+    save_rating(rating)
+
+class QuizRewardAggregator:
+    """
+    Накопитель наград за правильные ответы на викторину.
+
+    Ответы на опрос приходят пачкой за несколько секунд. Вместо чтения и записи
+    рейтинга и балансов на каждый ответ награды копятся в памяти и начисляются
+    по таймеру: все ответы за flush_delay секунд - одной записью рейтинга
+    и одним пакетным изменением балансов. Вместе с наградами сохраняется
+    реестр опросов (ID ответивших пользователей).
+
+    Если начисление не удалось, пакет возвращается в очередь и повторяется
+    при следующем сбросе. Звёзды и монеты ведутся раздельно: если звёзды уже
+    записаны, повторно начисляются только монеты.
+    """
+
+    def __init__(self, flush_delay: float = QUIZ_REWARDS_FLUSH_DELAY):
+        self.flush_delay = flush_delay
+        self._pending = {}  # { user_id_str: { "stars": int, "name": str } }
+        self._pending_coins = {}  # { user_id_str: монеты } - звёзды за них уже записаны
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._timer = None
+
+    def _schedule_flush(self):
+        """Запускает таймер сброса, если он ещё не запущен (вызывается под self._lock)."""
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def add(self, user_id, name: str):
+        """
+        Добавляет награду за правильный ответ пользователя.
+
+        Args:
+            user_id: ID пользователя Telegram
+            name: Имя пользователя для отображения в рейтинге
+        """
+        with self._lock:
+            award = self._pending.setdefault(str(user_id), {"stars": 0, "name": name})
+            award["stars"] += 1
+            award["name"] = name
+            self._schedule_flush()
+
+    def _requeue(self, awards: dict, coins: dict):
+        """Возвращает неначисленные звёзды и монеты в очередь и планирует повторный сброс."""
+        with self._lock:
+            for user_id_str, award in awards.items():
+                pending = self._pending.setdefault(user_id_str, {"stars": 0, "name": award["name"]})
+                pending["stars"] += award["stars"]
+            for user_id_str, amount in coins.items():
+                self._pending_coins[user_id_str] = self._pending_coins.get(user_id_str, 0) + amount
+            self._schedule_flush()
+
+    def flush(self) -> int:
+        """
+        Немедленно начисляет накопленные звёзды и монеты.
+
+        Returns:
+            int: Количество пользователей, получивших награду (0, если начислить не удалось)
+        """
+        with self._write_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                pending, self._pending = self._pending, {}
+                coins, self._pending_coins = self._pending_coins, {}
+            if not pending and not coins:
+                return 0
+            try:
+                if pending:
+                    add_stars_bulk(pending)
+            except Exception as e:
+                logging.error(f"Ошибка при начислении звёзд викторины, повторим позже: {e}")
+                self._requeue(pending, coins)
+                return 0
+            for user_id_str, award in pending.items():
+                coins[user_id_str] = coins.get(user_id_str, 0) + QUIZ_REWARD * award["stars"]
+            try:
+                update_balances_bulk(coins, reason="quiz")
+            except Exception as e:
+                logging.error(f"Ошибка при начислении монет викторины, повторим позже: {e}")
+                self._requeue({}, coins)
+                return 0
+            ACTIVE_QUIZZES.save()
+            return len(coins)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._pending.keys() | self._pending_coins.keys())
+
+_quiz_rewards = QuizRewardAggregator()
+
+def flush_quiz_rewards() -> int:
+    """
+    Начисляет накопленные награды за ответы (перед чтением рейтинга и при остановке бота).
+
+    Returns:
+        int: Количество пользователей, получивших награду
+    """
+    return _quiz_rewards.flush()
+
 
 
 def load_praises() -> list[str]:
@@ -177,9 +305,8 @@ def load_praises() -> list[str]:
     """
     if not os.path.exists(PRAISES_FILE):
         return ["Поздравляем! Ты великолепен!", "Блестящая победа!"]
-    with open(PRAISES_FILE, "r", encoding="utf-8") as f:
-        lines = [line.strip() for line in f.readlines() if line.strip()]
-        return lines if lines else ["Молодец!", "Отличный результат!"]
+    lines = read_lines(PRAISES_FILE)
+    return lines if lines else ["Молодец!", "Отличный результат!"]
     
 
 def load_praise_index() -> int:
@@ -187,18 +314,9 @@ def load_praise_index() -> int:
     Загружает текущий индекс для циклического выбора фраз похвалы.
     
     Returns:
-        int: Текущий индекс или 0, если файла нет
+        int: Текущий индекс или 0, если его ещё нет
     """
-    if not os.path.exists(PRAISE_INDEX_FILE):
-        return 0
-    try:
-        with open(PRAISE_INDEX_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict) and "praise_index" in data:
-                return data["praise_index"]
-    except:
-        pass
-    return 0
+    return kv_get(PRAISE_INDEX_KEY, 0)
 
 def save_praise_index(index: int):
     """
@@ -207,13 +325,12 @@ def save_praise_index(index: int):
     Args:
         index: Индекс последней использованной фразы
     """
-    with open(PRAISE_INDEX_FILE, "w", encoding="utf-8") as f:
-        json.dump({"praise_index": index}, f, ensure_ascii=False, indent=4)
+    kv_set(PRAISE_INDEX_KEY, index)
 
 def get_next_praise(praises: list[str]) -> str:
     """
     Возвращает очередную фразу из списка `praises` по циклу.
-    Состояние (индекс) хранится в praise_state.json.
+    Состояние (индекс) хранится в хранилище состояния (kvstate).
     
     Args:
         praises: Список фраз похвалы
@@ -275,7 +392,7 @@ async def quiz_post_callback(context: ContextTypes.DEFAULT_TYPE):
     )
 
     # Сохраняем правильный ответ для данного опроса:
-    ACTIVE_QUIZZES[message.poll.id] = correct_index
+    ACTIVE_QUIZZES.register(message.poll.id, correct_index)
 
     # Увеличиваем количество вопросов викторины за неделю:
     current_count = load_weekly_quiz_count()
@@ -293,42 +410,40 @@ async def poll_answer_handler(update, context):
     poll_id = poll_answer.poll_id
     user_id = poll_answer.user.id
     chosen_ids = poll_answer.option_ids  # выбранные индексы
-    if poll_id not in ACTIVE_QUIZZES:
-        return
 
-    correct_index = ACTIVE_QUIZZES[poll_id]
+    # Учитываем ответ в счётчиках опроса; None - опроса нет в реестре, он устарел
+    # или этот ответ уже учтён (повторная доставка не даёт второй награды)
+    is_correct = ACTIVE_QUIZZES.record_answer(poll_id, user_id, chosen_ids)
 
     # Если пользователь выбрал правильный вариант (совпал индекс)
-    if correct_index in chosen_ids:
-        rating = load_rating()
+    if is_correct:
         user_id_str = str(user_id)
 
-        # Получаем текущие данные пользователя из рейтинга
-        old_data = rating.get(user_id_str, {"stars": 0, "name": None})
-        old_data["stars"] = old_data.get("stars", 0) + 1  # увеличиваем звезды
-
         # Запоминаем имя пользователя
         tg_user = poll_answer.user
         name_candidate = tg_user.username if tg_user.username else tg_user.first_name
         if not name_candidate:
             name_candidate = f"User_{user_id_str}"  # на случай, если ничего нет
 
-        old_data["name"] = name_candidate
+        # Звезда и монеты начисляются пакетом вместе с ответами других пользователей
+        _quiz_rewards.add(user_id, name_candidate)
 
-        rating[user_id_str] = old_data
-        save_rating(rating)
-
-        # Начисляем 5 монет за правильный ответ
-        update_balance(user_id, 5)  # Награда за правильный ответ
 
 
 
+async def evict_expired_quizzes_job(context: ContextTypes.DEFAULT_TYPE):
+    """
+    Фоновая задача планировщика: удаление устаревших опросов из реестра викторин.
+    При первом запуске загружает сохранённый реестр.
+    """
+    ACTIVE_QUIZZES.evict_expired()
 
 async def rating_command(update, context):
     """
     /rating — показать текущий рейтинг (сортируем по убыванию звёзд),
     а также в первой строке указывается, из скольки максимальных звезд (количество вопросов за неделю).
     """
+    flush_quiz_rewards()
     rating = load_rating()
     weekly_count = load_weekly_quiz_count()  # максимальное число звезд, если бы все ответы были верными
 
@@ -357,6 +472,7 @@ async def weekly_quiz_reset(context: ContextTypes.DEFAULT_TYPE):
     if not state.quiz_enabled:
         return
 
+    flush_quiz_rewards()
     rating = load_rating()
     if not rating:
         await context.bot.send_message(
@@ -424,9 +540,8 @@ async def weekly_quiz_reset(context: ContextTypes.DEFAULT_TYPE):
 #
 
 def count_quiz_questions() -> int:
-    """Просто возвращаем, сколько осталось вопросов в quiz.json."""
-    questions = load_quiz_questions()
-    return len(questions)
+    """Возвращает, сколько вопросов ещё не выдано (по курсору колоды, без чтения quiz.json)."""
+    return _quiz_deck.remaining()
 
 #
 # Новые команды для включения/выключения викторины
@@ -0,0 +1,221 @@
+# quiz_polls.py
+"""
+Реестр активных опросов викторины: правильные ответы, время публикации и ответившие пользователи.
+Переживает перезапуск бота; устаревшие опросы удаляются.
+"""
+
+import os
+import time
+import logging
+import threading
+
+from docstore import read_json, write_json
+
+ACTIVE_QUIZZES_FILE = "state_data/active_quizzes.json"
+
+# Сколько секунд после публикации принимаются ответы на опрос
+POLL_TTL = 48 * 3600
+
+# Максимальное количество опросов в реестре
+MAX_ACTIVE_POLLS = 500
+
+# Позиции полей в записи опроса
+_CORRECT, _POSTED, _ANSWERS, _CORRECT_ANSWERS = range(4)
+
+class ActivePollRegistry:
+    """
+    Активные опросы викторины в памяти процесса с сохранением в JSON-файл.
+
+    Записи хранятся в порядке публикации, поэтому устаревшие опросы
+    удаляются с начала словаря, без перебора всего реестра.
+    Файл: { "polls": { poll_id: [правильный вариант, время публикации, ответов, верных ответов] } },
+    ID ответивших - в отдельном файле *_answered.json (записываются методом save()).
+    """
+
+    def __init__(self, path: str = ACTIVE_QUIZZES_FILE, ttl: float = POLL_TTL,
+                 max_polls: int = MAX_ACTIVE_POLLS):
+        self.path = path
+        self.answered_path = os.path.splitext(path)[0] + "_answered.json"
+        self.ttl = ttl
+        self.max_polls = max_polls
+        self._polls = None
+        self._answered = {}  # { poll_id: set(ID ответивших) }
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self):
+        """Загружает реестр с диска при первом обращении."""
+        if self._polls is not None:
+            return
+        try:
+            data = read_json(self.path, {})
+            answered = read_json(self.answered_path, {})
+        except Exception as e:
+            logging.error(f"Ошибка при чтении {self.path}: {e}")
+            data, answered = {}, {}
+        polls = data.get("polls") if isinstance(data, dict) else None
+        if not isinstance(polls, dict):
+            polls = {}
+        entries = [
+            (poll_id, (list(entry[:4]) + [0, 0])[:4])
+            for poll_id, entry in polls.items()
+            if isinstance(entry, list) and len(entry) >= 2
+        ]
+        entries.sort(key=lambda item: item[1][_POSTED])
+        self._polls = dict(entries)
+        # Записи прежнего формата хранили ID ответивших пятым полем
+        self._answered = {
+            poll_id: set(map(str, entry[4]))
+            for poll_id, entry in polls.items()
+            if poll_id in self._polls and len(entry) > 4 and isinstance(entry[4], list)
+        }
+        if isinstance(answered, dict):
+            for poll_id, user_ids in answered.items():
+                if poll_id in self._polls and isinstance(user_ids, list):
+                    self._answered.setdefault(poll_id, set()).update(map(str, user_ids))
+        if self._evict(time.time()):
+            self._save()
+
+    def _save(self):
+        write_json(self.path, {"polls": self._polls})
+        write_json(self.answered_path, {
+            poll_id: sorted(user_ids) for poll_id, user_ids in self._answered.items() if user_ids
+        })
+
+    def _evict(self, now: float) -> int:
+        """
+        Удаляет устаревшие опросы и самые старые опросы сверх MAX_ACTIVE_POLLS.
+
+        Returns:
+            int: Количество удалённых опросов
+        """
+        removed = 0
+        while self._polls:
+            poll_id = next(iter(self._polls))
+            if self._polls[poll_id][_POSTED] > now - self.ttl and len(self._polls) <= self.max_polls:
+                break
+            del self._polls[poll_id]
+            self._answered.pop(poll_id, None)
+            removed += 1
+        return removed
+
+    def _get(self, poll_id: str):
+        """Возвращает запись опроса, если он есть в реестре и ещё не устарел."""
+        entry = self._polls.get(poll_id)
+        if entry is None or entry[_POSTED] <= time.time() - self.ttl:
+            return None
+        return entry
+
+    def register(self, poll_id: str, correct_index: int, posted: float = None):
+        """
+        Добавляет опубликованный опрос в реестр.
+
+        Args:
+            poll_id: ID опроса Telegram
+            correct_index: Индекс правильного варианта ответа
+            posted: Время публикации (unix), по умолчанию текущее
+        """
+        now = time.time() if posted is None else posted
+        with self._lock:
+            self._ensure_loaded()
+            self._polls.pop(poll_id, None)
+            self._polls[poll_id] = [correct_index, int(now), 0, 0]
+            self._answered[poll_id] = set()
+            self._evict(time.time())
+            self._save()
+
+    def get_correct_index(self, poll_id: str) -> int | None:
+        """
+        Возвращает индекс правильного ответа активного опроса.
+
+        Args:
+            poll_id: ID опроса Telegram
+
+        Returns:
+            int|None: Индекс правильного варианта или None, если опроса нет или он устарел
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._get(poll_id)
+            return None if entry is None else entry[_CORRECT]
+
+    def record_answer(self, poll_id: str, user_id, option_ids) -> bool | None:
+        """
+        Учитывает ответ пользователя на опрос в счётчиках (только в памяти, см. save).
+        Каждый пользователь учитывается в опросе один раз.
+
+        Args:
+            poll_id: ID опроса Telegram
+            user_id: ID ответившего пользователя
+            option_ids: Выбранные пользователем варианты
+
+        Returns:
+            bool|None: Верен ли ответ или None, если опроса нет, он устарел
+                       или ответ этого пользователя уже учтён
+        """
+        user_id_str = str(user_id)
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._get(poll_id)
+            if entry is None:
+                return None
+            answered = self._answered.setdefault(poll_id, set())
+            if user_id_str in answered:
+                return None
+            correct = entry[_CORRECT] in option_ids
+            answered.add(user_id_str)
+            entry[_ANSWERS] += 1
+            if correct:
+                entry[_CORRECT_ANSWERS] += 1
+            return correct
+
+    def save(self):
+        """Сохраняет счётчики ответов и ID ответивших (после начисления наград за ответы)."""
+        with self._lock:
+            if self._polls is not None:
+                self._save()
+
+    def get_stats(self, poll_id: str) -> dict | None:
+        """
+        Возвращает данные опроса для статистики.
+
+        Args:
+            poll_id: ID опроса Telegram
+
+        Returns:
+            dict|None: { 'correct_index', 'posted', 'answers', 'correct_answers' }
+                       или None, если опроса нет в реестре
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._polls.get(poll_id)
+            if entry is None:
+                return None
+            return {
+                "correct_index": entry[_CORRECT],
+                "posted": entry[_POSTED],
+                "answers": entry[_ANSWERS],
+                "correct_answers": entry[_CORRECT_ANSWERS],
+            }
+
+    def evict_expired(self) -> int:
+        """
+        Удаляет устаревшие опросы из реестра.
+
+        Returns:
+            int: Количество удалённых опросов
+        """
+        with self._lock:
+            self._ensure_loaded()
+            removed = self._evict(time.time())
+            if removed:
+                self._save()
+                logging.info(f"Из реестра викторин удалено устаревших опросов: {removed}")
+            return removed
+
+    def __contains__(self, poll_id) -> bool:
+        return self.get_correct_index(poll_id) is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._polls)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# schedule_plan.py
+"""
+Расчёт расписания задач бота без ввода-вывода.
+По разделам schedule_config.json вычисляет задачи автопостинга, викторин,
+мудрости и ставок: scheduler.py только ставит готовый план в очередь задач,
+а update_betting_schedule.py и команда ниже показывают его без запуска бота.
+
+Все времена в настройках указываются в локальном времени, задачи в очереди - в UTC.
+Дни недели в настройках: 0 - воскресенье, 6 - суббота.
+
+Показать план на ближайшие дни: python schedule_plan.py [--days 7] [--seed 1]
+"""
+
+import sys
+import json
+import random
+import argparse
+import datetime
+
+# Задачи автопостинга: (имя задачи, вид задачи)
+AUTOPOST_JOBS = [
+    ("morning_pics", "autopost_10_pics"),
+    ("day_videos", "autopost_4_videos"),
+    ("day_pics", "autopost_10_pics"),
+    ("evening_pics", "autopost_10_pics"),
+]
+
+# Задачи окна ставок: (базовое имя задачи, ключ времени в настройках окна)
+BETTING_JOB_KEYS = [
+    ("publish_betting_event", "publish_time"),
+    ("close_betting_event", "close_time"),
+    ("process_betting_results", "results_time"),
+]
+
+DEFAULT_BETTING_DAYS = [0, 1, 2, 3, 4, 5, 6]
+
+def config_weekday(date):
+    """
+    Возвращает день недели в нумерации настроек (0 - воскресенье, 6 - суббота).
+
+    Args:
+        date (datetime.date): Дата
+    """
+    return (date.weekday() + 1) % 7
+
+def parse_local_time(time_str):
+    """
+    Преобразует строку "HH:MM" в datetime.time без перевода в UTC.
+
+    Args:
+        time_str (str): Время в формате "часы:минуты"
+    """
+    hours, minutes = map(int, time_str.split(':'))
+    return datetime.time(hour=hours, minute=minutes)
+
+def local_to_utc(local_time, tz_offset):
+    """
+    Переводит локальное время в UTC (смещение часового пояса в часах).
+
+    Args:
+        local_time (datetime.time): Локальное время
+        tz_offset (int): Смещение часового пояса (timezone_offset из bot_config.json)
+
+    Returns:
+        datetime.time: Время в UTC
+    """
+    return local_time.replace(hour=(local_time.hour - tz_offset) % 24)
+
+def random_time_in_range(start, end, rng=random):
+    """
+    Возвращает случайное время между start и end включительно (с точностью до секунды).
+
+    Args:
+        start (datetime.time): Начало диапазона
+        end (datetime.time): Конец диапазона
+        rng: Генератор случайных чисел (для воспроизводимого плана)
+    """
+    start_s = start.hour * 3600 + start.minute * 60 + start.second
+    end_s = end.hour * 3600 + end.minute * 60 + end.second
+    r = rng.randint(start_s, end_s)
+    return datetime.time(hour=r // 3600, minute=(r % 3600) // 60, second=r % 60)
+
+def get_betting_slots(betting_config):
+    """
+    Возвращает окна ставок на день: у каждого одновременного события свои
+    время публикации, закрытия приема ставок и подведения итогов.
+    Окна задаются списком 'slots' в настройках ставок; без него используется
+    одно окно из publish_time/close_time/results_time.
+
+    Args:
+        betting_config (dict): Раздел 'betting' из schedule_config.json
+
+    Returns:
+        list: [{ 'publish_time', 'close_time', 'results_time' }, ...]
+    """
+    defaults = {
+        "publish_time": betting_config.get("publish_time", "11:00"),
+        "close_time": betting_config.get("close_time", "20:00"),
+        "results_time": betting_config.get("results_time", "21:00"),
+    }
+    slots = betting_config.get("slots")
+    if not slots:
+        return [defaults]
+    return [{**defaults, **slot} for slot in slots]
+
+def betting_job_name(base_name, slot_index):
+    """
+    Возвращает имя задачи ставок для окна. Первое окно сохраняет прежние имена задач.
+
+    Args:
+        base_name (str): Базовое имя задачи
+        slot_index (int): Номер окна ставок (с нуля)
+    """
+    return base_name if slot_index == 0 else f"{base_name}_{slot_index + 1}"
+
+def _daily_job(name, kind, job_config, tz_offset, rng):
+    """Собирает ежедневную задачу со случайным временем из time_range."""
+    local_time = random_time_in_range(
+        parse_local_time(job_config['time_range']['start']),
+        parse_local_time(job_config['time_range']['end']),
+        rng
+    )
+    return {
+        "name": name,
+        "kind": kind,
+        "time": local_to_utc(local_time, tz_offset),
+        "local_time": local_time,
+        "days": tuple(job_config['days']),
+    }
+
+def plan_autopost_jobs(schedule_config, tz_offset, rng=random):
+    """
+    Планирует задачи автопостинга на день.
+
+    Args:
+        schedule_config (dict): Содержимое schedule_config.json
+        tz_offset (int): Смещение часового пояса в часах
+        rng: Генератор случайных чисел
+
+    Returns:
+        list: [{ 'name', 'kind', 'time' (UTC), 'local_time', 'days' }]
+    """
+    return [
+        _daily_job(name, kind, schedule_config['autopost'][name], tz_offset, rng)
+        for name, kind in AUTOPOST_JOBS
+    ]
+
+def plan_quiz_jobs(schedule_config, tz_offset, rng=random):
+    """
+    Планирует викторины на день (задачи quiz_1, quiz_2, ...).
+    Если викторины отключены в настройках, возвращает пустой список.
+
+    Args:
+        schedule_config (dict): Содержимое schedule_config.json
+        tz_offset (int): Смещение часового пояса в часах
+        rng: Генератор случайных чисел
+
+    Returns:
+        list: Задачи в формате plan_autopost_jobs
+    """
+    if not schedule_config['quiz']['enabled']:
+        return []
+    return [
+        _daily_job(f"quiz_{i}", "quiz", quiz_time_config, tz_offset, rng)
+        for i, quiz_time_config in enumerate(schedule_config['quiz']['quiz_times'], start=1)
+    ]
+
+def plan_wisdom_jobs(schedule_config, tz_offset, rng=random):
+    """
+    Планирует публикацию мудрой мысли на день.
+    Если мудрые мысли отключены в настройках, возвращает пустой список.
+
+    Args:
+        schedule_config (dict): Содержимое schedule_config.json
+        tz_offset (int): Смещение часового пояса в часах
+        rng: Генератор случайных чисел
+
+    Returns:
+        list: Задачи в формате plan_autopost_jobs
+    """
+    if not schedule_config['wisdom']['enabled']:
+        return []
+    return [_daily_job("wisdom", "wisdom", schedule_config['wisdom'], tz_offset, rng)]
+
+def plan_betting_jobs(betting_config, tz_offset, now_utc):
+    """
+    Планирует задачи ставок, которые ещё не прошли: для каждого окна ставок -
+    публикация события, закрытие приема ставок и подведение итогов.
+    Если все задачи окна на сегодня уже прошли, окно планируется на завтра
+    (если завтрашний день есть в расписании ставок). "Сегодня" - локальная дата.
+
+    Args:
+        betting_config (dict): Раздел 'betting' из schedule_config.json
+        tz_offset (int): Смещение часового пояса в часах
+        now_utc (datetime.datetime): Текущее время UTC
+
+    Returns:
+        list: [{ 'name', 'kind' (базовое имя задачи), 'slot', 'run_at' (UTC), 'local_time' }]
+    """
+    days = betting_config.get("days", DEFAULT_BETTING_DAYS)
+    offset = datetime.timedelta(hours=tz_offset)
+    # День и день недели определяются по локальному времени, а не по дате UTC
+    today = (now_utc + offset).date()
+    if config_weekday(today) not in days:
+        return []
+    tomorrow = today + datetime.timedelta(days=1)
+
+    jobs = []
+    for slot_index, slot in enumerate(get_betting_slots(betting_config)):
+        times = {key: parse_local_time(slot[key]) for _, key in BETTING_JOB_KEYS}
+        run_at = {key: datetime.datetime.combine(today, time) - offset for key, time in times.items()}
+
+        # План на следующий день нужен, только если все задачи окна на сегодня уже прошли
+        if all(now_utc > when for when in run_at.values()):
+            if config_weekday(tomorrow) not in days:
+                continue
+            run_at = {key: datetime.datetime.combine(tomorrow, time) - offset for key, time in times.items()}
+
+        for base_name, key in BETTING_JOB_KEYS:
+            if now_utc > run_at[key]:
+                continue
+            jobs.append({
+                "name": betting_job_name(base_name, slot_index),
+                "kind": base_name,
+                "slot": slot_index,
+                "run_at": run_at[key],
+                "local_time": slot[key],
+            })
+    return jobs
+
+def plan_betting_catch_up(betting_config, now):
+    """
+    Планирует закрытие ставок и публикацию результатов окон, итоги которых
+    сегодня ещё не подведены. Если время закрытия уже прошло, закрытие
+    назначается через 1 минуту, а результаты - через 5 минут.
+
+    Args:
+        betting_config (dict): Раздел 'betting' из schedule_config.json
+        now (datetime.datetime): Текущее локальное время
+
+    Returns:
+        list: [{ 'slot', 'close_betting', 'publish_results' }] (время - datetime)
+    """
+    plan = []
+    for slot_index, slot in enumerate(get_betting_slots(betting_config)):
+        close_at = datetime.datetime.combine(now.date(), parse_local_time(slot["close_time"]))
+        results_at = datetime.datetime.combine(now.date(), parse_local_time(slot["results_time"]))
+        if now >= results_at:
+            continue
+        if now >= close_at:
+            close_at = now + datetime.timedelta(minutes=1)
+            results_at = now + datetime.timedelta(minutes=5)
+        plan.append({"slot": slot_index, "close_betting": close_at, "publish_results": results_at})
+    return plan
+
+def plan_days(schedule_config, tz_offset, start_date, days=7, rng=random,
+              quiz_enabled=True, wisdom_enabled=True, betting_enabled=True):
+    """
+    Составляет полный план задач на несколько дней (по локальному времени).
+    Случайное время ежедневных задач выбирается заново для каждого дня,
+    как при полуночном перепланировании.
+
+    Args:
+        schedule_config (dict): Содержимое schedule_config.json
+        tz_offset (int): Смещение часового пояса в часах
+        start_date (datetime.date): Первый день плана
+        days (int): Количество дней
+        rng: Генератор случайных чисел
+        quiz_enabled, wisdom_enabled, betting_enabled (bool): Флаги из состояния бота
+
+    Returns:
+        list: [{ 'date', 'local_time' (datetime.time), 'name', 'kind' }] в порядке выполнения
+    """
+    betting_config = schedule_config.get("betting", {})
+    betting_days = betting_config.get("days", DEFAULT_BETTING_DAYS)
+    plan = []
+    for offset in range(days):
+        date = start_date + datetime.timedelta(days=offset)
+        weekday = config_weekday(date)
+
+        daily_jobs = plan_autopost_jobs(schedule_config, tz_offset, rng)
+        if quiz_enabled:
+            daily_jobs += plan_quiz_jobs(schedule_config, tz_offset, rng)
+        if wisdom_enabled:
+            daily_jobs += plan_wisdom_jobs(schedule_config, tz_offset, rng)
+        for job in daily_jobs:
+            if weekday in job["days"]:
+                plan.append({"date": date, "local_time": job["local_time"], "name": job["name"], "kind": job["kind"]})
+
+        if betting_enabled and betting_config.get("enabled", True) and weekday in betting_days:
+            for slot_index, slot in enumerate(get_betting_slots(betting_config)):
+                for base_name, key in BETTING_JOB_KEYS:
+                    plan.append({
+                        "date": date,
+                        "local_time": parse_local_time(slot[key]),
+                        "name": betting_job_name(base_name, slot_index),
+                        "kind": base_name,
+                    })
+    plan.sort(key=lambda job: (job["date"], job["local_time"]))
+    return plan
+
+def format_plan(plan):
+    """
+    Форматирует план задач для вывода в консоль: по строке на задачу, с заголовком для каждого дня.
+
+    Args:
+        plan (list): Результат plan_days
+    """
+    lines = []
+    current_date = None
+    for job in plan:
+        if job["date"] != current_date:
+            current_date = job["date"]
+            if lines:
+                lines.append("")
+            lines.append(current_date.strftime("%Y-%m-%d (%a)"))
+        lines.append(f"  {job['local_time'].strftime('%H:%M:%S')}  {job['name']}")
+    return "\n".join(lines)
+
+def main(argv=None):
+    """
+    Печатает план задач на ближайшие дни по файлам конфигурации, не запуская бота.
+    """
+    parser = argparse.ArgumentParser(description="План задач бота на ближайшие дни")
+    parser.add_argument("--days", type=int, default=7, help="Количество дней")
+    parser.add_argument("--start", help="Первый день плана (YYYY-MM-DD), по умолчанию сегодня")
+    parser.add_argument("--config", default="config/schedule_config.json", help="Файл расписания")
+    parser.add_argument("--bot-config", default="config/bot_config.json", help="Файл с timezone_offset")
+    parser.add_argument("--seed", type=int, help="Зерно генератора случайного времени")
+    args = parser.parse_args(argv)
+
+    with open(args.config, "r", encoding="utf-8") as f:
+        schedule_config = json.load(f)
+    try:
+        with open(args.bot_config, "r", encoding="utf-8") as f:
+            tz_offset = json.load(f).get("timezone_offset", 0)
+    except FileNotFoundError:
+        tz_offset = 0
+
+    start_date = datetime.date.fromisoformat(args.start) if args.start else datetime.date.today()
+    plan = plan_days(schedule_config, tz_offset, start_date, args.days, rng=random.Random(args.seed))
+    print(format_plan(plan))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,6 @@
 import datetime
 import random
 import logging
-import json
 import os
 from pathlib import Path
 from telegram.ext import ContextTypes, CommandHandler, CallbackQueryHandler, MessageHandler, filters
@@ -18,14 +17,17 @@ from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton, InputMe
 from autopost import autopost_10_pics_callback, autopost_4_videos_callback
 from quiz import quiz_post_callback, weekly_quiz_reset
 from wisdom import wisdom_post_callback
-from utils import random_time_in_range, parse_time_from_string, convert_local_to_utc
 
 import state  # Флаги автопубликации, викторины, мудрости и т.д.
+from docstore import read_json, write_json
 
 from config import POST_CHAT_ID, schedule_config, TIMEZONE_OFFSET
 
 # Добавляем импорт функций для системы ставок
 from handlers.betting_commands import publish_betting_event, process_betting_results, close_betting_event
+from schedule_plan import (
+    plan_autopost_jobs, plan_quiz_jobs, plan_wisdom_jobs, plan_betting_jobs
+)
 
 import functools
 
@@ -154,18 +156,17 @@ def load_scheduled_posts() -> dict:
     Returns:
         dict: Словарь с данными отложенных публикаций или пустой словарь, если файл не существует
     """
-    if not SCHEDULED_POSTS_FILE.exists():
-        logger.info(f"[DEBUG] load_scheduled_posts: Файл {SCHEDULED_POSTS_FILE} не существует, возвращаем пустой словарь")
-        return {}
     try:
-        with open(SCHEDULED_POSTS_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, dict):
-                # Логируем, что мы загрузили
-                for post_id, post_data in data.items():
-                    text = post_data.get("text", "")
-                    logger.info(f"[DEBUG] load_scheduled_posts: Загружена публикация {post_id} с текстом: '{text}', тип: {type(text).__name__}")
-                return data
+        data = read_json(SCHEDULED_POSTS_FILE)
+        if data is None:
+            logger.info(f"[DEBUG] load_scheduled_posts: Файл {SCHEDULED_POSTS_FILE} не существует, возвращаем пустой словарь")
+            return {}
+        if isinstance(data, dict):
+            # Логируем, что мы загрузили
+            for post_id, post_data in data.items():
+                text = post_data.get("text", "")
+                logger.info(f"[DEBUG] load_scheduled_posts: Загружена публикация {post_id} с текстом: '{text}', тип: {type(text).__name__}")
+            return data
     except Exception as e:
         logger.error(f"Ошибка чтения {SCHEDULED_POSTS_FILE}: {e}")
     return {}
@@ -179,18 +180,15 @@ def save_scheduled_posts(data: dict):
         data: Словарь с данными отложенных публикаций
     """
     try:
-        # Создаем родительский каталог, если он не существует
-        SCHEDULED_POSTS_FILE.parent.mkdir(exist_ok=True, parents=True)
-        
         # Логируем, что мы сохраняем
         for post_id, post_data in data.items():
             text = post_data.get("text", "")
             logger.info(f"[DEBUG] save_scheduled_posts: Сохраняем публикацию {post_id} с текстом: '{text}', тип: {type(text).__name__}")
         
-        with open(SCHEDULED_POSTS_FILE, "w", encoding="utf-8") as f:
-            json.dump(data, f, ensure_ascii=False, indent=4)
-            
-        logger.info(f"[DEBUG] save_scheduled_posts: Файл {SCHEDULED_POSTS_FILE} успешно сохранен")
+        # Каталог создаётся при записи файла хранилищем документов
+        write_json(SCHEDULED_POSTS_FILE, data)
+
+        logger.info(f"[DEBUG] save_scheduled_posts: Публикации {SCHEDULED_POSTS_FILE} сохранены")
     except Exception as e:
         logger.error(f"Ошибка записи {SCHEDULED_POSTS_FILE}: {e}")
 
@@ -199,6 +197,31 @@ def save_scheduled_posts(data: dict):
 # ==== ЕЖЕДНЕВНОЕ РАСПИСАНИЕ (автопост, викторины, мудрость) ====
 #
 
+# Обработчики ежедневных задач по видам задач из schedule_plan
+DAILY_JOB_CALLBACKS = {
+    "autopost_10_pics": autopost_10_pics_callback,
+    "autopost_4_videos": autopost_4_videos_callback,
+    "quiz": quiz_post_callback,
+    "wisdom": wisdom_post_callback,
+}
+
+def _run_daily_jobs(job_queue, jobs):
+    """
+    Ставит в очередь ежедневные задачи из плана schedule_plan.
+    
+    Args:
+        job_queue: Очередь задач планировщика Telegram
+        jobs: Список задач { 'name', 'kind', 'time', 'days' }
+    """
+    for job in jobs:
+        job_queue.run_daily(
+            DAILY_JOB_CALLBACKS[job["kind"]],
+            time=job["time"],
+            days=job["days"],
+            name=job["name"]
+        )
+
+
 def schedule_autopost_for_today(job_queue):
     """
     Планирует автоматические публикации на сегодня согласно расписанию из конфигурации.
@@ -207,53 +230,7 @@ def schedule_autopost_for_today(job_queue):
     Args:
         job_queue: Очередь задач планировщика Telegram
     """
-    # Расписание утренних картинок
-    morning_config = schedule_config['autopost']['morning_pics']
-    start_time = parse_time_from_string(morning_config['time_range']['start'])
-    end_time = parse_time_from_string(morning_config['time_range']['end'])
-    time1 = random_time_in_range(start_time, end_time)
-    job_queue.run_daily(
-        autopost_10_pics_callback,
-        time=time1,
-        days=tuple(morning_config['days']),
-        name="morning_pics"
-    )
-
-    # Расписание дневных видео
-    day_videos_config = schedule_config['autopost']['day_videos']
-    start_time = parse_time_from_string(day_videos_config['time_range']['start'])
-    end_time = parse_time_from_string(day_videos_config['time_range']['end'])
-    time2 = random_time_in_range(start_time, end_time)
-    job_queue.run_daily(
-        autopost_4_videos_callback,
-        time=time2,
-        days=tuple(day_videos_config['days']),
-        name="day_videos"
-    )
-
-    # Расписание дневных картинок
-    day_pics_config = schedule_config['autopost']['day_pics']
-    start_time = parse_time_from_string(day_pics_config['time_range']['start'])
-    end_time = parse_time_from_string(day_pics_config['time_range']['end'])
-    time3 = random_time_in_range(start_time, end_time)
-    job_queue.run_daily(
-        autopost_10_pics_callback,
-        time=time3,
-        days=tuple(day_pics_config['days']),
-        name="day_pics"
-    )
-
-    # Расписание вечерних картинок
-    evening_pics_config = schedule_config['autopost']['evening_pics']
-    start_time = parse_time_from_string(evening_pics_config['time_range']['start'])
-    end_time = parse_time_from_string(evening_pics_config['time_range']['end'])
-    time4 = random_time_in_range(start_time, end_time)
-    job_queue.run_daily(
-        autopost_10_pics_callback,
-        time=time4,
-        days=tuple(evening_pics_config['days']),
-        name="evening_pics"
-    )
+    _run_daily_jobs(job_queue, plan_autopost_jobs(schedule_config, TIMEZONE_OFFSET))
 
 
 def schedule_quizzes_for_today(job_queue):
@@ -264,19 +241,9 @@ def schedule_quizzes_for_today(job_queue):
     Args:
         job_queue: Очередь задач планировщика Telegram
     """
-    if not state.quiz_enabled or not schedule_config['quiz']['enabled']:
+    if not state.quiz_enabled:
         return
-
-    for i, quiz_time_config in enumerate(schedule_config['quiz']['quiz_times'], start=1):
-        start_time = parse_time_from_string(quiz_time_config['time_range']['start'])
-        end_time = parse_time_from_string(quiz_time_config['time_range']['end'])
-        time = random_time_in_range(start_time, end_time)
-        job_queue.run_daily(
-            quiz_post_callback,
-            time=time,
-            days=tuple(quiz_time_config['days']),
-            name=f"quiz_{i}"
-        )
+    _run_daily_jobs(job_queue, plan_quiz_jobs(schedule_config, TIMEZONE_OFFSET))
 
 
 def schedule_wisdom_for_today(job_queue):
@@ -287,19 +254,9 @@ def schedule_wisdom_for_today(job_queue):
     Args:
         job_queue: Очередь задач планировщика Telegram
     """
-    if not state.wisdom_enabled or not schedule_config['wisdom']['enabled']:
+    if not state.wisdom_enabled:
         return
-        
-    wisdom_config = schedule_config['wisdom']
-    start_time = parse_time_from_string(wisdom_config['time_range']['start'])
-    end_time = parse_time_from_string(wisdom_config['time_range']['end'])
-    time = random_time_in_range(start_time, end_time)
-    job_queue.run_daily(
-        wisdom_post_callback,
-        time=time,
-        days=tuple(wisdom_config['days']),
-        name="wisdom"
-    )
+    _run_daily_jobs(job_queue, plan_wisdom_jobs(schedule_config, TIMEZONE_OFFSET))
 
 
 async def midnight_reset_callback(context: ContextTypes.DEFAULT_TYPE):
@@ -1428,9 +1385,20 @@ def adjust_time_with_timezone(time_str):
         return datetime.datetime.strptime(time_str, "%H:%M").time()
 
 
+# Обработчики задач окна ставок по базовым именам задач
+BETTING_JOB_CALLBACKS = {
+    "publish_betting_event": publish_betting_event,
+    "close_betting_event": close_betting_event,
+    "process_betting_results": process_betting_results,
+}
+
 def schedule_betting_events(job_queue, app):
     """
     Планирует задачи для системы ставок на текущий день.
+    Для каждого окна ставок (betting.slots в настройках) планируются свои
+    публикация события, закрытие приема ставок и подведение итогов,
+    поэтому в течение дня может идти несколько событий одновременно.
+    Время задач рассчитывает schedule_plan.plan_betting_jobs.
     
     Args:
         job_queue: Очередь задач Telegram
@@ -1445,118 +1413,16 @@ def schedule_betting_events(job_queue, app):
         logging.info("Система ставок отключена. Пропускаем планирование.")
         return
     
-    # Получаем настройки из конфига
-    betting_config = schedule_config.get("betting", {})
-    
-    # Проверяем, нужно ли запускать сегодня
-    now = datetime.datetime.now()
-    today_weekday = now.weekday()
-    # Преобразуем день недели, т.к. в Python понедельник=0, воскресенье=6,
-    # а в конфиге используется воскресенье=0, суббота=6
-    today_weekday = (today_weekday + 1) % 7
-    
-    if today_weekday not in betting_config.get("days", [0, 1, 2, 3, 4, 5, 6]):
-        logging.info(f"День недели {today_weekday} не включен в расписание ставок. Пропускаем.")
+    jobs = plan_betting_jobs(schedule_config.get("betting", {}), TIMEZONE_OFFSET, datetime.datetime.utcnow())
+    if not jobs:
+        logging.info("Задач ставок на сегодня нет (день не включен в расписание или все окна уже прошли).")
         return
     
-    today = now.date()
-    
-    # Время для публикации события - используем новую функцию convert_local_to_utc
-    publish_time_str = betting_config.get("publish_time", "11:00")
-    publish_time = convert_local_to_utc(publish_time_str)
-    publish_datetime = datetime.datetime.combine(today, publish_time)
-    
-    # Время для закрытия ставок
-    close_time_str = betting_config.get("close_time", "20:00")
-    close_time = convert_local_to_utc(close_time_str)
-    close_datetime = datetime.datetime.combine(today, close_time)
-    
-    # Время для публикации результатов
-    results_time_str = betting_config.get("results_time", "21:00")
-    results_time = convert_local_to_utc(results_time_str)
-    results_datetime = datetime.datetime.combine(today, results_time)
-    
-    # Проверяем текущее время в UTC
-    now_utc = datetime.datetime.utcnow()
-    
-    # План на следующий день нужен, только если все задачи на сегодня уже прошли
-    all_times_passed = (now_utc > publish_datetime and now_utc > close_datetime and now_utc > results_datetime)
-    
-    # Если все запланированные времена на сегодня уже прошли, переносим на следующий день
-    if all_times_passed:
-        tomorrow = today + datetime.timedelta(days=1)
-        tomorrow_weekday = (today_weekday + 1) % 7
-        
-        # Проверяем, включен ли следующий день в расписание
-        if tomorrow_weekday in betting_config.get("days", [0, 1, 2, 3, 4, 5, 6]):
-            publish_datetime = datetime.datetime.combine(tomorrow, publish_time)
-            close_datetime = datetime.datetime.combine(tomorrow, close_time)
-            results_datetime = datetime.datetime.combine(tomorrow, results_time)
-            
-            logging.info(f"Все времена ставок на сегодня уже прошли. Планирую события на завтра ({tomorrow}).")
-        else:
-            logging.warning(f"Следующий день ({tomorrow_weekday}) не включен в расписание ставок. Пропускаем.")
-            return
-    else:
-        # Если не все времена прошли, определяем, какие задачи еще можно запланировать на сегодня
-        logging.info(f"Планирую оставшиеся задачи для ставок на сегодня ({today}).")
-        
-        # Если время публикации события уже прошло, не планируем его
-        publish_event_scheduled = now_utc <= publish_datetime
-        
-        # Если время закрытия ставок еще не наступило, планируем задачу закрытия
-        close_event_scheduled = now_utc <= close_datetime
-        
-        # Если время публикации результатов еще не наступило, планируем задачу публикации результатов
-        results_event_scheduled = now_utc <= results_datetime
-    
-    # Планируем задачи в зависимости от проверок
-    if not all_times_passed:
-        # Публикация события (только если время еще не прошло)
-        if publish_event_scheduled:
-            job_queue.run_once(
-                publish_betting_event,
-                when=publish_datetime,
-                name="publish_betting_event"
-            )
-            logging.info(f"Запланирована публикация события для ставок на {publish_datetime} UTC (локальное время: {publish_time_str})")
-        
-        # Закрытие приема ставок (только если время еще не прошло)
-        if close_event_scheduled:
-            job_queue.run_once(
-                close_betting_event,
-                when=close_datetime,
-                name="close_betting_event"
-            )
-            logging.info(f"Запланировано закрытие приема ставок на {close_datetime} UTC (локальное время: {close_time_str})")
-        
-        # Публикация результатов (только если время еще не прошло)
-        if results_event_scheduled:
-            job_queue.run_once(
-                process_betting_results,
-                when=results_datetime,
-                name="process_betting_results"
-            )
-            logging.info(f"Запланирована публикация результатов ставок на {results_datetime} UTC (локальное время: {results_time_str})")
-    else:
-        # Если все времена прошли, планируем все задачи на завтра
-        job_queue.run_once(
-            publish_betting_event,
-            when=publish_datetime,
-            name="publish_betting_event"
-        )
-        logging.info(f"Запланирована публикация события для ставок на {publish_datetime} UTC (локальное время: {publish_time_str})")
-        
-        job_queue.run_once(
-            close_betting_event,
-            when=close_datetime,
-            name="close_betting_event"
-        )
-        logging.info(f"Запланировано закрытие приема ставок на {close_datetime} UTC (локальное время: {close_time_str})")
-        
+    for job in jobs:
         job_queue.run_once(
-            process_betting_results,
-            when=results_datetime,
-            name="process_betting_results"
+            BETTING_JOB_CALLBACKS[job["kind"]],
+            when=job["run_at"],
+            name=job["name"],
+            data={"slot": job["slot"]}
         )
-        logging.info(f"Запланирована публикация результатов ставок на {results_datetime} UTC (локальное время: {results_time_str})")
+        logging.info(f"Запланирована задача {job['name']} на {job['run_at']} UTC (локальное время: {job['local_time']})")
@@ -0,0 +1,635 @@
+# storage.py
+"""
+Модуль хранилища данных бота.
+Позволяет хранить балансы, ставки и рейтинг викторины не в JSON-файлах,
+а в базе SQLite (режим WAL): каждое изменение затрагивает одну строку таблицы,
+а чтение выполняется по индексу ID пользователя.
+
+Хранилище выбирается параметром "storage" в config/bot_config.json:
+- "json" (по умолчанию) - прежние JSON-файлы в state_data/
+- "sqlite" - база данных по пути "sqlite_path" (по умолчанию state_data/bot.db)
+
+Перенос существующих JSON-файлов в базу выполняется скриптом migrate_to_sqlite.py.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+
+import config
+
+DEFAULT_SQLITE_PATH = "state_data/bot.db"
+
+# Сколько ID передаётся в одном запросе "... IN (...)" (число параметров запроса SQLite ограничено)
+QUERY_CHUNK_SIZE = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS balances (
+    user_id TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL DEFAULT 0,
+    name TEXT
+);
+CREATE TABLE IF NOT EXISTS balance_journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    delta INTEGER NOT NULL,
+    reason TEXT,
+    time TEXT
+);
+CREATE TABLE IF NOT EXISTS bets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    event_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    user_name TEXT,
+    option_id TEXT,
+    amount INTEGER NOT NULL,
+    time TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_bets_event_user ON bets (event_id, user_id);
+CREATE TABLE IF NOT EXISTS bet_pools (
+    event_id TEXT NOT NULL,
+    option_id TEXT NOT NULL,
+    total INTEGER NOT NULL DEFAULT 0,
+    bettors INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_id, option_id)
+);
+CREATE TABLE IF NOT EXISTS betting_history (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    date TEXT,
+    entry TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS win_streaks (
+    user_id TEXT PRIMARY KEY,
+    streak INTEGER NOT NULL DEFAULT 0,
+    user_name TEXT
+);
+CREATE TABLE IF NOT EXISTS bet_stats (
+    user_id TEXT PRIMARY KEY,
+    user_name TEXT,
+    wagered INTEGER NOT NULL DEFAULT 0,
+    won INTEGER NOT NULL DEFAULT 0,
+    events INTEGER NOT NULL DEFAULT 0,
+    wins INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS settled_events (
+    event_id TEXT PRIMARY KEY,
+    date TEXT
+);
+CREATE TABLE IF NOT EXISTS rating (
+    user_id TEXT PRIMARY KEY,
+    stars INTEGER NOT NULL DEFAULT 0,
+    name TEXT
+);
+"""
+
+def _aggregate_pools(bet_rows) -> list[tuple]:
+    """
+    Считает пулы тотализатора по строкам ставок.
+
+    Args:
+        bet_rows: Кортежи (event_id, user_id, option_id, amount), option_id - значение из JSON
+
+    Returns:
+        list[tuple]: Строки таблицы bet_pools (event_id, option_id, total, bettors)
+    """
+    totals = {}
+    bettors = {}
+    for event_id, user_id, option_id, amount in bet_rows:
+        key = (str(event_id), str(option_id))
+        totals[key] = totals.get(key, 0) + amount
+        bettors.setdefault(key, set()).add(str(user_id))
+    return [(event_id, option_id, total, len(bettors[(event_id, option_id)]))
+            for (event_id, option_id), total in totals.items()]
+
+class SqliteStorage:
+    """
+    Хранилище балансов, ставок и рейтинга в базе SQLite.
+
+    Соединение общее для всех потоков (запись балансов выполняется из таймера),
+    поэтому все обращения к нему сериализуются блокировкой.
+    """
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            self._conn.commit()
+            self._fill_missing_pools()
+
+    def _fill_missing_pools(self):
+        """Заполняет таблицу пулов для базы, созданной до её появления."""
+        if self._conn.execute("SELECT 1 FROM bet_pools LIMIT 1").fetchone() is not None:
+            return
+        rows = self._conn.execute("SELECT event_id, user_id, option_id, amount FROM bets").fetchall()
+        if not rows:
+            return
+        pool_rows = _aggregate_pools(
+            (row["event_id"], row["user_id"], json.loads(row["option_id"]), row["amount"]) for row in rows
+        )
+        with self._conn:
+            self._conn.executemany(
+                "INSERT INTO bet_pools (event_id, option_id, total, bettors) VALUES (?, ?, ?, ?)",
+                pool_rows
+            )
+
+    def close(self):
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._conn.close()
+
+    # --- Балансы ---
+
+    def load_balances(self) -> dict:
+        """
+        Загружает все балансы.
+
+        Returns:
+            dict: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, balance, name FROM balances").fetchall()
+        return {row["user_id"]: {"balance": row["balance"], "name": row["name"]} for row in rows}
+
+    def save_balances(self, balances: dict, user_ids, journal=()) -> bool:
+        """
+        Сохраняет только указанные записи балансов.
+        Пользователи из user_ids, которых нет в balances, удаляются.
+        Записи журнала сохраняются в той же транзакции.
+
+        Args:
+            balances: Словарь вида { str(user_id): { 'balance': int, 'name': str } }
+            user_ids: ID пользователей, записи которых изменились
+            journal: Записи журнала вида { 'user_id', 'delta', 'reason', 'time' }
+
+        Returns:
+            bool: True, если запись прошла успешно
+        """
+        try:
+            with self._lock, self._conn:
+                self._write_balances(balances, user_ids, journal)
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Ошибка при записи балансов в {self.path}: {e}")
+            return False
+
+    def _write_balances(self, balances: dict, user_ids, journal):
+        """Записывает строки балансов и журнала (вызывается в открытой транзакции)."""
+        upserts = []
+        deletes = []
+        for user_id in user_ids:
+            entry = balances.get(user_id)
+            if entry is None:
+                deletes.append((user_id,))
+            else:
+                upserts.append((user_id, entry.get("balance", 0), entry.get("name")))
+        journal_rows = [
+            (str(entry["user_id"]), entry.get("delta", 0), entry.get("reason"), entry.get("time"))
+            for entry in journal
+        ]
+        self._conn.executemany(
+            "INSERT INTO balances (user_id, balance, name) VALUES (?, ?, ?) "
+            "ON CONFLICT(user_id) DO UPDATE SET balance = excluded.balance, name = excluded.name",
+            upserts
+        )
+        self._conn.executemany("DELETE FROM balances WHERE user_id = ?", deletes)
+        self._conn.executemany(
+            "INSERT INTO balance_journal (user_id, delta, reason, time) VALUES (?, ?, ?, ?)",
+            journal_rows
+        )
+
+    # --- Ставки ---
+
+    def load_betting_data(self) -> dict:
+        """
+        Загружает данные о ставках в формате betting_data.json.
+        История хранится отдельно и читается постранично (read_history).
+
+        Returns:
+            dict: Словарь с активными ставками, пулами, сериями побед, статистикой ставок
+                  и подведёнными событиями
+        """
+        data = {"active_bets": {}, "win_streaks": {}, "pools": {}, "betting_stats": {}, "settled_events": {}}
+        with self._lock:
+            bet_rows = self._conn.execute(
+                "SELECT event_id, user_id, user_name, option_id, amount, time FROM bets ORDER BY id"
+            ).fetchall()
+            streak_rows = self._conn.execute(
+                "SELECT user_id, streak, user_name FROM win_streaks"
+            ).fetchall()
+            pool_rows = self._conn.execute(
+                "SELECT event_id, option_id, total, bettors FROM bet_pools"
+            ).fetchall()
+            stats_rows = self._conn.execute(
+                "SELECT user_id, user_name, wagered, won, events, wins FROM bet_stats"
+            ).fetchall()
+            settled_rows = self._conn.execute("SELECT event_id, date FROM settled_events").fetchall()
+
+        for row in pool_rows:
+            event_pool = data["pools"].setdefault(row["event_id"], {"total": 0, "options": {}})
+            event_pool["total"] += row["total"]
+            event_pool["options"][row["option_id"]] = {"total": row["total"], "bettors": row["bettors"]}
+        for row in bet_rows:
+            event_bets = data["active_bets"].setdefault(row["event_id"], {})
+            user_bets = event_bets.setdefault(row["user_id"], {"user_name": row["user_name"], "bets": []})
+            user_bets["bets"].append({
+                "option_id": json.loads(row["option_id"]),
+                "amount": row["amount"],
+                "time": row["time"]
+            })
+        for row in streak_rows:
+            data["win_streaks"][row["user_id"]] = self._streak_entry(row)
+        for row in stats_rows:
+            data["betting_stats"][row["user_id"]] = self._stats_entry(row)
+        for row in settled_rows:
+            data["settled_events"][row["event_id"]] = row["date"]
+        return data
+
+    @staticmethod
+    def _bet_rows(active_bets: dict) -> list[tuple]:
+        """Преобразует активные ставки { event_id: { user_id: {...} } } в строки таблицы bets."""
+        bet_rows = []
+        for event_id, users in active_bets.items():
+            for user_id, user_data in users.items():
+                for bet in user_data.get("bets", []):
+                    bet_rows.append((
+                        str(event_id), str(user_id), user_data.get("user_name"),
+                        json.dumps(bet.get("option_id")), bet.get("amount", 0), bet.get("time")
+                    ))
+        return bet_rows
+
+    @staticmethod
+    def _pool_rows(bet_rows: list[tuple]) -> list[tuple]:
+        """Считает строки таблицы bet_pools по строкам ставок."""
+        return _aggregate_pools(
+            (event_id, user_id, json.loads(option_id), amount)
+            for event_id, user_id, _, option_id, amount, _ in bet_rows
+        )
+
+    def save_betting_data(self, data: dict, replace: bool = False):
+        """
+        Сохраняет данные о ставках (используется при подведении итогов и переносе данных).
+        Записываются только разделы, присутствующие в data: все активные ставки ('active_bets',
+        заменяются целиком, пулы пересчитываются по ним), серии побед ('win_streaks')
+        и статистика ставок ('betting_stats') переданных пользователей - строки остальных
+        пользователей не затрагиваются. Подведённые события ('settled_events') только добавляются.
+        Все разделы записываются одной транзакцией. История не затрагивается.
+
+        Args:
+            data (dict): Словарь в формате betting_data.json
+            replace (bool): Заменить серии побед и статистику всех пользователей (при переносе данных)
+        """
+        with self._lock, self._conn:
+            self._write_betting_data(data, replace)
+
+    def _write_betting_data(self, data: dict, replace: bool = False):
+        """Записывает разделы данных о ставках (вызывается в открытой транзакции, см. save_betting_data)."""
+        if "active_bets" in data:
+            bet_rows = self._bet_rows(data["active_bets"])
+            self._conn.execute("DELETE FROM bets")
+            self._conn.executemany(
+                "INSERT INTO bets (event_id, user_id, user_name, option_id, amount, time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                bet_rows
+            )
+            self._conn.execute("DELETE FROM bet_pools")
+            self._conn.executemany(
+                "INSERT INTO bet_pools (event_id, option_id, total, bettors) VALUES (?, ?, ?, ?)",
+                self._pool_rows(bet_rows)
+            )
+        if "win_streaks" in data:
+            if replace:
+                self._conn.execute("DELETE FROM win_streaks")
+            self._conn.executemany(
+                "INSERT INTO win_streaks (user_id, streak, user_name) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET streak = excluded.streak, user_name = excluded.user_name",
+                [(str(user_id), streak.get("streak", 0), streak.get("user_name"))
+                 for user_id, streak in data["win_streaks"].items()]
+            )
+        if "betting_stats" in data:
+            if replace:
+                self._conn.execute("DELETE FROM bet_stats")
+            self._conn.executemany(
+                "INSERT INTO bet_stats (user_id, user_name, wagered, won, events, wins) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET user_name = excluded.user_name, wagered = excluded.wagered, "
+                "won = excluded.won, events = excluded.events, wins = excluded.wins",
+                [(str(user_id), stats.get("user_name"), stats.get("wagered", 0), stats.get("won", 0),
+                  stats.get("events", 0), stats.get("wins", 0))
+                 for user_id, stats in data["betting_stats"].items()]
+            )
+        if "settled_events" in data:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO settled_events (event_id, date) VALUES (?, ?)",
+                [(str(event_id), date) for event_id, date in data["settled_events"].items()]
+            )
+
+    def save_settlement(self, data: dict, balances: dict, user_ids, journal) -> bool:
+        """
+        Сохраняет итоги события ставок одной транзакцией: выплаты (строки балансов
+        и записи журнала), серии побед, статистику и отметку о подведении итогов.
+
+        Args:
+            data (dict): Разделы данных о ставках (см. save_betting_data)
+            balances, user_ids, journal: Изменения балансов (см. save_balances)
+
+        Returns:
+            bool: True, если запись прошла успешно
+        """
+        try:
+            with self._lock, self._conn:
+                self._write_balances(balances, user_ids, journal)
+                self._write_betting_data(data)
+            return True
+        except sqlite3.Error as e:
+            logging.error(f"Ошибка при записи итогов события в {self.path}: {e}")
+            return False
+
+    @staticmethod
+    def _streak_entry(row) -> dict:
+        """Преобразует строку таблицы win_streaks в запись серии побед."""
+        return {"streak": row["streak"], "user_name": row["user_name"]}
+
+    @staticmethod
+    def _stats_entry(row) -> dict:
+        """Преобразует строку таблицы bet_stats в запись статистики ставок."""
+        return {
+            "user_name": row["user_name"],
+            "wagered": row["wagered"],
+            "won": row["won"],
+            "events": row["events"],
+            "wins": row["wins"]
+        }
+
+    def load_users_betting_data(self, user_ids) -> dict:
+        """
+        Загружает серии побед и статистику ставок только указанных пользователей
+        (по первичному ключу), без чтения ставок и данных остальных пользователей.
+
+        Args:
+            user_ids: ID пользователей
+
+        Returns:
+            dict: { 'win_streaks': {...}, 'betting_stats': {...} } найденных пользователей
+        """
+        data = {"win_streaks": {}, "betting_stats": {}}
+        keys = [str(user_id) for user_id in user_ids]
+        with self._lock:
+            for start in range(0, len(keys), QUERY_CHUNK_SIZE):
+                chunk = keys[start:start + QUERY_CHUNK_SIZE]
+                placeholders = ", ".join("?" * len(chunk))
+                for row in self._conn.execute(
+                    f"SELECT user_id, streak, user_name FROM win_streaks WHERE user_id IN ({placeholders})", chunk
+                ):
+                    data["win_streaks"][row["user_id"]] = self._streak_entry(row)
+                for row in self._conn.execute(
+                    f"SELECT user_id, user_name, wagered, won, events, wins FROM bet_stats "
+                    f"WHERE user_id IN ({placeholders})", chunk
+                ):
+                    data["betting_stats"][row["user_id"]] = self._stats_entry(row)
+        return data
+
+    def load_betting_stats(self) -> dict:
+        """
+        Загружает серии побед и статистику ставок всех пользователей (для рейтинга)
+        без чтения активных ставок и пулов.
+
+        Returns:
+            dict: { 'win_streaks': {...}, 'betting_stats': {...} }
+        """
+        with self._lock:
+            streak_rows = self._conn.execute("SELECT user_id, streak, user_name FROM win_streaks").fetchall()
+            stats_rows = self._conn.execute(
+                "SELECT user_id, user_name, wagered, won, events, wins FROM bet_stats"
+            ).fetchall()
+        return {
+            "win_streaks": {row["user_id"]: self._streak_entry(row) for row in streak_rows},
+            "betting_stats": {row["user_id"]: self._stats_entry(row) for row in stats_rows}
+        }
+
+    def is_event_settled(self, event_id) -> bool:
+        """
+        Проверяет, подведены ли итоги события.
+
+        Args:
+            event_id: ID события
+
+        Returns:
+            bool: True, если событие отмечено в таблице settled_events
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM settled_events WHERE event_id = ?", (str(event_id),)
+            ).fetchone()
+        return row is not None
+
+    def load_event_bets(self, event_id) -> dict:
+        """
+        Загружает ставки и пул одного события (по индексу event_id).
+
+        Args:
+            event_id: ID события
+
+        Returns:
+            dict: { 'bets': { user_id: { 'user_name', 'bets': [...] } }, 'pool': пул события }
+        """
+        bets = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, user_name, option_id, amount, time FROM bets WHERE event_id = ? ORDER BY id",
+                (str(event_id),)
+            ).fetchall()
+        for row in rows:
+            user_bets = bets.setdefault(row["user_id"], {"user_name": row["user_name"], "bets": []})
+            user_bets["bets"].append({
+                "option_id": json.loads(row["option_id"]),
+                "amount": row["amount"],
+                "time": row["time"]
+            })
+        return {"bets": bets, "pool": self.get_event_pool(event_id) or {"total": 0, "options": {}}}
+
+    def replace_event_bets(self, event_id, bets: dict):
+        """
+        Заменяет ставки одного события, не затрагивая остальные события.
+
+        Args:
+            event_id: ID события
+            bets (dict): Ставки события { user_id: { 'user_name', 'bets': [...] } }
+        """
+        bet_rows = self._bet_rows({str(event_id): bets})
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM bets WHERE event_id = ?", (str(event_id),))
+            self._conn.execute("DELETE FROM bet_pools WHERE event_id = ?", (str(event_id),))
+            self._conn.executemany(
+                "INSERT INTO bets (event_id, user_id, user_name, option_id, amount, time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                bet_rows
+            )
+            self._conn.executemany(
+                "INSERT INTO bet_pools (event_id, option_id, total, bettors) VALUES (?, ?, ?, ?)",
+                self._pool_rows(bet_rows)
+            )
+
+    def add_bet(self, event_id, user_id, user_name, bet: dict):
+        """
+        Добавляет одну ставку (одна строка в таблице bets)
+        и в той же транзакции обновляет пул варианта.
+
+        Args:
+            event_id: ID события
+            user_id: ID пользователя
+            user_name (str): Имя пользователя
+            bet (dict): { 'option_id', 'amount', 'time' }
+        """
+        option_json = json.dumps(bet.get("option_id"))
+        amount = bet.get("amount", 0)
+        with self._lock, self._conn:
+            new_bettor = self._conn.execute(
+                "SELECT 1 FROM bets WHERE event_id = ? AND user_id = ? AND option_id = ? LIMIT 1",
+                (str(event_id), str(user_id), option_json)
+            ).fetchone() is None
+            self._conn.execute(
+                "INSERT INTO bets (event_id, user_id, user_name, option_id, amount, time) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (str(event_id), str(user_id), user_name, option_json, amount, bet.get("time"))
+            )
+            self._conn.execute(
+                "INSERT INTO bet_pools (event_id, option_id, total, bettors) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (event_id, option_id) DO UPDATE SET "
+                "total = total + excluded.total, bettors = bettors + excluded.bettors",
+                (str(event_id), str(bet.get("option_id")), amount, int(new_bettor))
+            )
+
+    def get_event_pool(self, event_id) -> dict | None:
+        """
+        Возвращает пул тотализатора события, не загружая сами ставки.
+
+        Args:
+            event_id: ID события
+
+        Returns:
+            dict|None: { 'total', 'options': { option_id: { 'total', 'bettors' } } } или None
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT option_id, total, bettors FROM bet_pools WHERE event_id = ?", (str(event_id),)
+            ).fetchall()
+        if not rows:
+            return None
+        return {
+            "total": sum(row["total"] for row in rows),
+            "options": {row["option_id"]: {"total": row["total"], "bettors": row["bettors"]} for row in rows}
+        }
+
+    def append_history(self, entries: list):
+        """
+        Дописывает записи в историю ставок.
+
+        Args:
+            entries (list): Записи истории от старых к новым
+        """
+        rows = [(entry.get("date"), json.dumps(entry, ensure_ascii=False)) for entry in entries]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO betting_history (date, entry) VALUES (?, ?)", rows)
+
+    def replace_history(self, entries: list):
+        """
+        Полностью заменяет историю ставок (используется при переносе данных).
+
+        Args:
+            entries (list): Записи истории от старых к новым
+        """
+        rows = [(entry.get("date"), json.dumps(entry, ensure_ascii=False)) for entry in entries]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM betting_history")
+            self._conn.executemany("INSERT INTO betting_history (date, entry) VALUES (?, ?)", rows)
+
+    def read_history(self, offset: int = 0, limit: int = 5) -> list:
+        """
+        Читает страницу истории ставок (от новых к старым).
+
+        Args:
+            offset (int): Сколько самых новых записей пропустить
+            limit (int): Максимальное количество записей
+
+        Returns:
+            list: Записи истории
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT entry FROM betting_history ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [json.loads(row["entry"]) for row in rows]
+
+    def count_history(self) -> int:
+        """
+        Возвращает количество записей в истории ставок.
+
+        Returns:
+            int: Количество записей
+        """
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM betting_history").fetchone()[0]
+
+    # --- Рейтинг викторины ---
+
+    def load_rating(self) -> dict:
+        """
+        Загружает рейтинг участников викторины.
+
+        Returns:
+            dict: Словарь вида { str(user_id): { 'stars': int, 'name': str } }
+        """
+        with self._lock:
+            rows = self._conn.execute("SELECT user_id, stars, name FROM rating").fetchall()
+        return {row["user_id"]: {"stars": row["stars"], "name": row["name"]} for row in rows}
+
+    def save_rating(self, rating: dict):
+        """
+        Полностью заменяет рейтинг (используется при еженедельном сбросе).
+
+        Args:
+            rating: Словарь вида { str(user_id): { 'stars': int, 'name': str } }
+        """
+        rows = [
+            (str(user_id), data.get("stars", 0), data.get("name"))
+            for user_id, data in rating.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM rating")
+            self._conn.executemany("INSERT INTO rating (user_id, stars, name) VALUES (?, ?, ?)", rows)
+
+    def add_stars_bulk(self, awards: dict):
+        """
+        Начисляет звёзды нескольким пользователям одной транзакцией.
+
+        Args:
+            awards: Словарь { user_id: { "stars": количество звёзд, "name": имя } }
+        """
+        rows = [(str(user_id), data["stars"], data.get("name")) for user_id, data in awards.items()]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO rating (user_id, stars, name) VALUES (?, ?, ?) "
+                "ON CONFLICT(user_id) DO UPDATE SET stars = stars + excluded.stars, name = excluded.name",
+                rows
+            )
+
+# Хранилище процесса (создаётся при первом обращении)
+_storage = None
+
+def get_storage() -> SqliteStorage | None:
+    """
+    Возвращает SQLite-хранилище, если оно включено в bot_config.json.
+
+    Returns:
+        SqliteStorage|None: Хранилище или None, если данные хранятся в JSON-файлах
+    """
+    global _storage
+    if _storage is None and config.bot_config.get("storage", "json") == "sqlite":
+        _storage = SqliteStorage(config.bot_config.get("sqlite_path", DEFAULT_SQLITE_PATH))
+    return _storage
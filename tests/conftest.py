@@ -0,0 +1,159 @@
+import sys
+import pytest
+from unittest.mock import patch
+
+try:
+    import docstore
+except ImportError:
+    docstore = None
+
+try:
+    import kvstate
+except ImportError:
+    kvstate = None
+
+try:
+    import betting_history
+except ImportError:
+    betting_history = None
+
+@pytest.fixture(autouse=True)
+def doc_store():
+    """
+    Подменяет общее хранилище JSON-документов пустым для каждого теста,
+    чтобы кэш и несохранённые изменения не переходили между тестами.
+    Отложенная запись отключена: на диск документы попадают только через flush_all().
+    """
+    if docstore is None:
+        yield None
+        return
+    store = docstore.JsonDocumentStore(flush_delay=3600)
+    with patch('docstore._store', store):
+        yield store
+    if store._timer is not None:
+        store._timer.cancel()
+
+@pytest.fixture(autouse=True)
+def kv_state(doc_store, tmp_path):
+    """
+    Подменяет хранилище значений состояния (kvstate) пустым, с файлом во временном каталоге
+    и без переноса значений из старых файлов.
+    """
+    if kvstate is None:
+        yield None
+        return
+    kv = kvstate.KeyValueState(str(tmp_path / "bot_state.json"), legacy_files={})
+    with patch('kvstate._state', kv):
+        yield kv
+
+@pytest.fixture(autouse=True)
+def history_log(tmp_path):
+    """Подменяет журнал истории ставок пустым журналом во временном каталоге."""
+    if betting_history is None:
+        yield None
+        return
+    log = betting_history.BettingHistoryLog(str(tmp_path / "betting_history"))
+    with patch('betting_history._log', log):
+        yield log
+
+@pytest.fixture(autouse=True)
+def betting_event_index():
+    """
+    Сбрасывает индекс событий для ставок, чтобы события из одного теста
+    (в том числе подменённые через load_betting_events) не попадали в другой.
+    Модуль betting не импортируется здесь, чтобы не мешать подмене модулей в тестах.
+    """
+    betting = sys.modules.get("betting")
+    if betting is not None and hasattr(betting, "_event_index"):
+        betting._event_index.invalidate()
+    yield
+
+@pytest.fixture(autouse=True)
+def bets_dir(tmp_path):
+    """Подменяет каталог разделов активных ставок временным каталогом."""
+    betting = sys.modules.get("betting")
+    if betting is None or not hasattr(betting, "BETTING_BETS_DIR"):
+        yield None
+        return
+    path = tmp_path / "betting_bets"
+    with patch.object(betting, "BETTING_BETS_DIR", str(path)):
+        yield path
+
+@pytest.fixture(autouse=True)
+def temp_messages():
+    """Очищает очередь временных сообщений ставок на удаление между тестами."""
+    commands = sys.modules.get("handlers.betting_commands")
+    if commands is None or not hasattr(commands, "_pending_temp_messages"):
+        yield None
+        return
+    with patch.dict(commands._pending_temp_messages, clear=True):
+        yield commands._pending_temp_messages
+
+@pytest.fixture(autouse=True)
+def quiz_deck(tmp_path):
+    """Переносит состояние колоды вопросов во временный каталог и сбрасывает колоду между тестами."""
+    quiz = sys.modules.get("quiz")
+    if quiz is None or not hasattr(quiz, "_quiz_deck"):
+        yield None
+        return
+    deck = quiz._quiz_deck
+    deck.invalidate()
+    with patch.object(deck, "state_path", str(tmp_path / "quiz_deck.json")), \
+         patch.object(deck, "consumed_path", str(tmp_path / "quiz_deck_consumed.json")):
+        yield deck
+    deck.invalidate()
+
+@pytest.fixture(autouse=True)
+def wisdom_deck(tmp_path):
+    """Переносит журнал выданных мудростей во временный каталог и сбрасывает колоду мудростей."""
+    wisdom = sys.modules.get("wisdom")
+    if wisdom is None or not hasattr(wisdom, "_wisdom_deck"):
+        yield None
+        return
+    deck = wisdom._wisdom_deck
+    deck.invalidate()
+    with patch.object(deck, "used_path", str(tmp_path / "wisdom_used.jsonl")):
+        yield deck
+    deck.invalidate()
+
+@pytest.fixture(autouse=True)
+def active_quizzes(tmp_path):
+    """Подменяет реестр опросов викторины пустым реестром с файлом во временном каталоге."""
+    quiz = sys.modules.get("quiz")
+    if quiz is None or not hasattr(quiz, "ActivePollRegistry"):
+        yield None
+        return
+    registry = quiz.ActivePollRegistry(str(tmp_path / "active_quizzes.json"))
+    with patch.object(quiz, "ACTIVE_QUIZZES", registry):
+        yield registry
+
+@pytest.fixture(autouse=True)
+def quiz_rewards():
+    """Подменяет накопитель наград викторины пустым, без начисления по таймеру во время теста."""
+    quiz = sys.modules.get("quiz")
+    if quiz is None or not hasattr(quiz, "QuizRewardAggregator"):
+        yield None
+        return
+    aggregator = quiz.QuizRewardAggregator(flush_delay=3600)
+    with patch.object(quiz, "_quiz_rewards", aggregator):
+        yield aggregator
+    if aggregator._timer is not None:
+        aggregator._timer.cancel()
+
+@pytest.fixture(autouse=True)
+def balance_ledger(tmp_path):
+    """
+    Подменяет реестр балансов пустым реестром с файлами во временном каталоге,
+    без записи по таймеру во время теста.
+    """
+    balance = sys.modules.get("balance")
+    if balance is None or not hasattr(balance, "BalanceLedger"):
+        yield None
+        return
+    ledger = balance.BalanceLedger(str(tmp_path / "balance.json"), flush_delay=3600,
+                                   journal_path=str(tmp_path / "balance_journal.jsonl"),
+                                   archive_path=str(tmp_path / "balance_journal.archive.jsonl"))
+    with patch.object(balance, "_ledger", ledger):
+        yield ledger
+    if ledger._timer is not None:
+        ledger._timer.cancel()
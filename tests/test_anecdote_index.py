@@ -0,0 +1,62 @@
+import pytest
+from unittest.mock import patch
+
+try:
+    from anecdote_index import AnecdoteIndex, scan_offsets
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов anecdote_index: не удалось импортировать модуль ({e}).", allow_module_level=True)
+
+SEPARATOR = "=" * 50
+
+@pytest.fixture
+def anecdotes_file(tmp_path):
+    path = tmp_path / "anecdotes.txt"
+    path.write_text(f"Первый\n{SEPARATOR}\n  Второй  \n{SEPARATOR}\nТретий\n", encoding="utf-8")
+    return path
+
+def test_scan_offsets(anecdotes_file):
+    """Границы анекдотов находятся без пробелов по краям"""
+    data = anecdotes_file.read_bytes()
+    starts, ends = scan_offsets(str(anecdotes_file), SEPARATOR.encode())
+    assert [data[a:b].decode("utf-8") for a, b in zip(starts, ends)] == ["Первый", "Второй", "Третий"]
+
+def test_index_persisted_between_instances(anecdotes_file):
+    """Отметки о выданных анекдотах сохраняются в битовой карте, файл не сканируется повторно"""
+    index = AnecdoteIndex(SEPARATOR)
+    first = index.pop_random(anecdotes_file)
+    assert (anecdotes_file.parent / "anecdotes.txt.idx").exists()
+
+    restored = AnecdoteIndex(SEPARATOR)
+    with patch('anecdote_index.scan_offsets') as mock_scan:
+        assert restored.count(anecdotes_file) == 2
+        mock_scan.assert_not_called()
+    rest = {restored.pop_random(anecdotes_file), restored.pop_random(anecdotes_file)}
+    assert {first} | rest == {"Первый", "Второй", "Третий"}
+    assert restored.pop_random(anecdotes_file) is None
+
+def test_appended_file_keeps_used(anecdotes_file):
+    """Дописанные анекдоты добавляются в индекс, выданные не повторяются"""
+    index = AnecdoteIndex(SEPARATOR)
+    dealt = [index.pop_random(anecdotes_file) for _ in range(3)]
+    with open(anecdotes_file, "a", encoding="utf-8") as f:
+        f.write(f"{SEPARATOR}\nЧетвёртый")
+    assert index.count(anecdotes_file) == 1
+    assert index.pop_random(anecdotes_file) == "Четвёртый"
+    assert len(set(dealt)) == 3
+
+def test_replaced_file_resets_used(anecdotes_file):
+    """Если файл заменили, отметки о выданных сбрасываются"""
+    index = AnecdoteIndex(SEPARATOR)
+    index.pop_random(anecdotes_file)
+    anecdotes_file.write_text(f"Новый 1\n{SEPARATOR}\nНовый 2", encoding="utf-8")
+    assert index.count(anecdotes_file) == 2
+
+def test_missing_used_bitmap(anecdotes_file):
+    """Если битовой карты нет рядом с индексом, все анекдоты считаются невыданными"""
+    AnecdoteIndex(SEPARATOR).count(anecdotes_file)
+    (anecdotes_file.parent / "anecdotes.txt.used").unlink()
+
+    restored = AnecdoteIndex(SEPARATOR)
+    assert restored.count(anecdotes_file) == 3
+    assert restored.pop_random(anecdotes_file) in {"Первый", "Второй", "Третий"}
+    assert AnecdoteIndex(SEPARATOR).count(anecdotes_file) == 2
@@ -1,12 +1,17 @@
 import pytest
 import json
 import os
+import asyncio
 from unittest.mock import patch, mock_open, MagicMock
 
 # Импортируем тестируемые функции из balance.py
 # Предполагаем, что тесты запускаются из корня проекта
 try:
+    import balance
     from balance import (
+        _read_balance_file,
+        _write_balance_file,
+        BalanceLedger,
         load_balances,
         save_balances,
         get_balance,
@@ -16,30 +21,30 @@ try:
 except ImportError:
     pytest.skip("Пропуск тестов balance: не удалось импортировать модуль balance.", allow_module_level=True)
 
-# --- Тесты для load_balances ---
+# --- Тесты для чтения файла балансов ---
 
 @patch('os.path.exists', return_value=True)
 @patch('builtins.open', new_callable=mock_open, read_data='{"123": {"balance": 100, "name": "User1"}, "456": {"balance": 50, "name": "User2"}}')
-def test_load_balances_success(mock_file_open, mock_exists):
+def test_read_balance_file_success(mock_file_open, mock_exists):
     """Тестирует успешную загрузку балансов из существующего файла."""
-    balances = load_balances()
+    balances = _read_balance_file()
     mock_exists.assert_called_once_with(BALANCE_FILE)
     mock_file_open.assert_called_once_with(BALANCE_FILE, "r", encoding="utf-8")
     assert balances == {"123": {"balance": 100, "name": "User1"}, "456": {"balance": 50, "name": "User2"}}
 
 @patch('os.path.exists', return_value=False)
-def test_load_balances_file_not_exists(mock_exists):
+def test_read_balance_file_file_not_exists(mock_exists):
     """Тестирует случай, когда файл балансов не существует."""
-    balances = load_balances()
+    balances = _read_balance_file()
     mock_exists.assert_called_once_with(BALANCE_FILE)
     assert balances == {}
 
 @patch('os.path.exists', return_value=True)
 @patch('builtins.open', new_callable=mock_open, read_data='invalid json')
 @patch('logging.error') # Мокаем логгер ошибок
-def test_load_balances_invalid_json(mock_log_error, mock_file_open, mock_exists):
+def test_read_balance_file_invalid_json(mock_log_error, mock_file_open, mock_exists):
     """Тестирует случай с невалидным JSON в файле."""
-    balances = load_balances()
+    balances = _read_balance_file()
     mock_exists.assert_called_once_with(BALANCE_FILE)
     mock_file_open.assert_called_once_with(BALANCE_FILE, "r", encoding="utf-8")
     assert balances == {}
@@ -48,22 +53,22 @@ def test_load_balances_invalid_json(mock_log_error, mock_file_open, mock_exists)
 @patch('os.path.exists', return_value=True)
 @patch('builtins.open', side_effect=IOError("Test IO Error"))
 @patch('logging.error')
-def test_load_balances_read_error(mock_log_error, mock_file_open, mock_exists):
+def test_read_balance_file_read_error(mock_log_error, mock_file_open, mock_exists):
     """Тестирует случай ошибки чтения файла."""
-    balances = load_balances()
+    balances = _read_balance_file()
     mock_exists.assert_called_once_with(BALANCE_FILE)
     mock_file_open.assert_called_once_with(BALANCE_FILE, "r", encoding="utf-8")
     assert balances == {}
     mock_log_error.assert_called_once() # Проверяем логирование ошибки
 
-# --- Тесты для save_balances ---
+# --- Тесты для записи файла балансов ---
 
 @patch('builtins.open', new_callable=mock_open)
 @patch('json.dump')
-def test_save_balances_success(mock_json_dump, mock_file_open):
+def test_write_balance_file_success(mock_json_dump, mock_file_open):
     """Тестирует успешное сохранение балансов."""
     balances_to_save = {"789": {"balance": 200, "name": "User3"}}
-    save_balances(balances_to_save)
+    _write_balance_file(balances_to_save)
     mock_file_open.assert_called_once_with(BALANCE_FILE, "w", encoding="utf-8")
     # Получаем file handle, который был передан в json.dump
     handle = mock_file_open()
@@ -71,108 +76,344 @@ def test_save_balances_success(mock_json_dump, mock_file_open):
 
 @patch('builtins.open', side_effect=IOError("Test IO Error"))
 @patch('logging.error')
-def test_save_balances_write_error(mock_log_error, mock_file_open):
+def test_write_balance_file_write_error(mock_log_error, mock_file_open):
     """Тестирует ошибку записи файла."""
     balances_to_save = {"111": {"balance": 10, "name": "User4"}}
-    save_balances(balances_to_save)
+    _write_balance_file(balances_to_save)
     mock_file_open.assert_called_once_with(BALANCE_FILE, "w", encoding="utf-8")
     mock_log_error.assert_called_once() # Проверяем логирование ошибки
 
 @patch('builtins.open', new_callable=mock_open) # Мок open успешен
 @patch('json.dump', side_effect=TypeError("Test Type Error")) # Ошибка при сериализации
 @patch('logging.error')
-def test_save_balances_json_error(mock_log_error, mock_json_dump, mock_file_open):
+def test_write_balance_file_json_error(mock_log_error, mock_json_dump, mock_file_open):
     """Тестирует ошибку при сериализации в JSON."""
     balances_to_save = {"222": {"balance": 20, "name": "User5"}}
-    save_balances(balances_to_save)
+    _write_balance_file(balances_to_save)
     mock_file_open.assert_called_once_with(BALANCE_FILE, "w", encoding="utf-8")
     handle = mock_file_open()
     mock_json_dump.assert_called_once_with(balances_to_save, handle, ensure_ascii=False, indent=4)
     mock_log_error.assert_called_once() # Проверяем логирование ошибки
 
-# --- Тесты для get_balance ---
+# --- Тесты для BalanceLedger ---
 
-@patch('balance.load_balances', return_value={"123": {"balance": 150, "name": "Test"}, "456": {}})
-def test_get_balance_user_exists(mock_load):
+@pytest.fixture
+def ledger(tmp_path):
+    path = tmp_path / "balance.json"
+    path.write_text(json.dumps({"123": {"balance": 100, "name": "User1"}}), encoding="utf-8")
+    # Большая задержка, чтобы таймер не срабатывал во время теста
+    ledger = BalanceLedger(str(path), flush_delay=3600,
+                           journal_path=str(tmp_path / "journal.jsonl"),
+                           archive_path=str(tmp_path / "journal.archive.jsonl"))
+    yield ledger
+    if ledger._timer is not None:
+        ledger._timer.cancel()
+
+def test_ledger_reads_file_once(ledger):
+    """Тестирует, что файл читается только при первом обращении."""
+    with patch('balance._read_balance_file', wraps=balance._read_balance_file) as mock_read:
+        assert ledger.get(123) == 100
+        assert ledger.get(123) == 100
+        assert ledger.get(456) == 0
+    mock_read.assert_called_once_with(ledger.path)
+
+def reopen(ledger):
+    """Создаёт новый реестр поверх тех же файлов (как при перезапуске бота)."""
+    return BalanceLedger(ledger.path, flush_delay=3600,
+                         journal_path=ledger.journal_path, archive_path=ledger.archive_path)
+
+def read_journal_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def test_ledger_apply_is_write_behind(ledger):
+    """Тестирует, что изменения не пишутся на диск до сброса, а затем дописываются в журнал."""
+    assert ledger.apply(123, 50) == 150
+    assert ledger.apply(123, -30) == 120
+    assert not os.path.exists(ledger.journal_path)
+    assert ledger._timer is not None # Запись запланирована
+
+    assert ledger.flush() is True
+    assert ledger._timer is None
+    # Снимок не перезаписывается, изменения только дописываются в журнал
+    with open(ledger.path, encoding="utf-8") as f:
+        assert json.load(f)["123"]["balance"] == 100
+    assert [e["delta"] for e in read_journal_lines(ledger.journal_path)] == [50, -30]
+    # При перезапуске журнал проигрывается поверх снимка
+    assert reopen(ledger).get(123) == 120
+
+def test_ledger_apply_below_zero_and_new_user(ledger):
+    """Тестирует ограничение нулём и создание нового пользователя."""
+    assert ledger.apply(123, -500) == 0
+    assert ledger.apply(789, -5) == 0
+    assert ledger.apply(790, 75) == 75
+    assert ledger.snapshot()["790"] == {"balance": 75, "name": "Unknown"}
+
+def test_ledger_journal_records_applied_delta_and_reason(ledger):
+    """Тестирует, что в журнал пишется фактическое изменение и его причина."""
+    ledger.apply(123, -500, reason="slots")
+    ledger.apply(123, 5, reason="quiz")
+    ledger.flush()
+    entries = read_journal_lines(ledger.journal_path)
+    assert [(e["user_id"], e["delta"], e["reason"]) for e in entries] == [
+        ("123", -100, "slots"), # Баланс не уходит ниже нуля
+        ("123", 5, "quiz")
+    ]
+    assert [e["seq"] for e in entries] == [1, 2]
+    assert all(e["time"] for e in entries)
+    assert reopen(ledger).get(123) == 5
+
+def test_ledger_flush_coalesces_writes(ledger):
+    """Тестирует, что пачка изменений сохраняется одной записью."""
+    with patch('balance._append_journal', return_value=True) as mock_append:
+        for _ in range(10):
+            ledger.apply(123, 1)
+        ledger.flush()
+        ledger.flush() # Повторный сброс без изменений не пишет файл
+    mock_append.assert_called_once()
+    assert len(mock_append.call_args[0][0]) == 10
+
+def test_ledger_flush_failure_keeps_dirty(ledger):
+    """Тестирует, что при ошибке записи изменения не теряются."""
+    ledger.apply(123, 5)
+    with patch('balance._append_journal', return_value=False):
+        assert ledger.flush() is False
+    assert ledger._dirty == {"123"}
+    assert len(ledger._pending) == 1
+    assert ledger.flush() is True
+    assert reopen(ledger).get(123) == 105
+
+def test_ledger_compact_writes_snapshot_and_archives_journal(ledger):
+    """Тестирует пересборку снимка из журнала."""
+    ledger.apply(123, 10, reason="roulette")
+    ledger.flush()
+    ledger.apply(456, 20, reason="betting")
+    assert ledger.compact() is True
+
+    with open(ledger.path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert snapshot["123"]["balance"] == 110
+    assert snapshot["456"]["balance"] == 20
+    assert snapshot[balance.JOURNAL_SEQ_KEY] == 2
+    assert not os.path.exists(ledger.journal_path)
+    # Все записи, вошедшие в снимок, сохранены в архиве
+    assert [e["reason"] for e in read_journal_lines(ledger.archive_path)] == ["roulette", "betting"]
+
+    reopened = reopen(ledger)
+    assert reopened.snapshot() == {
+        "123": {"balance": 110, "name": "User1"},
+        "456": {"balance": 20, "name": "Unknown"}
+    }
+    # Нумерация журнала продолжается после перезапуска
+    reopened.apply(123, 1)
+    reopened.flush()
+    assert read_journal_lines(ledger.journal_path)[0]["seq"] == 3
+
+def test_ledger_replay_skips_entries_in_snapshot(ledger):
+    """Тестирует, что записи, уже вошедшие в снимок, не применяются повторно."""
+    ledger.apply(123, 10)
+    ledger.flush()
+    # Сбой после записи снимка, но до архивации журнала
+    with patch('balance._archive_journal'):
+        ledger.compact()
+    assert os.path.exists(ledger.journal_path)
+    assert reopen(ledger).get(123) == 110
+
+def test_ledger_compact_snapshot_failure_keeps_journal(ledger):
+    """Тестирует, что при сбое записи снимка уже дописанные записи журнала не ставятся в очередь повторно."""
+    ledger.apply(123, 10)
+    with patch('balance._write_balance_file', return_value=False):
+        assert ledger.compact() is False
+    assert [e["delta"] for e in read_journal_lines(ledger.journal_path)] == [10]
+    assert ledger._pending == []
+    # Снимок пересобирается при следующем сбросе
+    assert ledger.flush() is True
+    assert reopen(ledger).get(123) == 110
+    assert [e["delta"] for e in read_journal_lines(ledger.archive_path)] == [10]
+
+def test_ledger_compact_journal_failure_requeues(ledger):
+    """Тестирует, что при сбое дописывания журнала записи остаются в очереди."""
+    ledger.apply(123, 10)
+    with patch('balance._append_journal', return_value=False):
+        assert ledger.compact() is False
+    assert [e["delta"] for e in ledger._pending] == [10]
+    assert ledger.flush() is True
+    assert reopen(ledger).get(123) == 110
+
+def test_ledger_replay_skips_corrupted_line(ledger):
+    """Тестирует, что недописанная строка журнала пропускается."""
+    ledger.apply(123, 10)
+    ledger.flush()
+    with open(ledger.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"seq": 2, "user_id": "123", "del')
+    assert reopen(ledger).get(123) == 110
+
+def test_ledger_commit_bulk_writes_journal_immediately(ledger):
+    """Тестирует, что пакет сохраняется сразу вместе с накопленными записями и помечается ссылкой."""
+    ledger.apply(123, 5, reason="roulette")
+    assert ledger.commit_bulk({123: 10, 456: 20}, reason="betting", ref="betting:1") == {123: 115, 456: 20}
+    entries = read_journal_lines(ledger.journal_path)
+    assert [e["seq"] for e in entries] == [1, 2, 3]
+    assert [e.get("ref") for e in entries] == [None, "betting:1", "betting:1"]
+    assert ledger.has_ref("betting:1")
+
+    reopened = reopen(ledger)
+    assert reopened.has_ref("betting:1")
+    assert not reopened.has_ref("betting:2")
+    # Ссылки сохраняются и после переноса журнала в архив
+    assert reopened.compact() is True
+    assert reopen(ledger).has_ref("betting:1")
+
+def test_ledger_commit_bulk_rolls_back_on_failure(ledger):
+    """Тестирует, что при сбое записи пакет отменяется, а ранее накопленные изменения остаются."""
+    ledger.apply(123, 5)
+    with patch('balance._append_journal', return_value=False):
+        assert ledger.commit_bulk({123: 10, 456: 20}, ref="betting:1") is None
+    assert ledger.get(123) == 105
+    assert ledger.get(456) == 0
+    assert ledger.rank(456) is None
+    assert not ledger.has_ref("betting:1")
+    assert ledger.flush() is True
+    assert [e["delta"] for e in read_journal_lines(ledger.journal_path)] == [5]
+
+def test_ledger_snapshot_is_copy(ledger):
+    """Тестирует, что снимок не связан с данными реестра."""
+    snapshot = ledger.snapshot()
+    snapshot["123"]["balance"] = 999
+    assert ledger.get(123) == 100
+
+# --- Тесты для функций модуля ---
+
+@pytest.fixture
+def module_ledger(ledger):
+    with patch('balance._ledger', ledger):
+        yield ledger
+
+def test_load_balances_returns_ledger_snapshot(module_ledger):
+    """Тестирует, что load_balances берёт данные из реестра."""
+    module_ledger.apply(123, 1)
+    assert load_balances() == {"123": {"balance": 101, "name": "User1"}}
+
+def test_save_balances_replaces_and_flushes(module_ledger):
+    """Тестирует, что save_balances заменяет данные и сразу пишет файл."""
+    save_balances({"789": {"balance": 200, "name": "User3"}})
+    assert get_balance(123) == 0
+    assert get_balance(789) == 200
+    with open(module_ledger.path, encoding="utf-8") as f:
+        saved = json.load(f)
+    saved.pop(balance.JOURNAL_SEQ_KEY)
+    assert saved == {"789": {"balance": 200, "name": "User3"}}
+
+def test_get_balance_user_exists(module_ledger):
     """Тестирует получение баланса существующего пользователя."""
-    assert get_balance(123) == 150
+    assert get_balance(123) == 100
 
-@patch('balance.load_balances', return_value={"123": {"balance": 150, "name": "Test"}, "456": {}})
-def test_get_balance_user_exists_no_balance_key(mock_load):
+def test_get_balance_user_exists_no_balance_key(module_ledger):
     """Тестирует получение баланса пользователя без ключа 'balance'."""
+    module_ledger.replace({"456": {}})
     assert get_balance(456) == 0 # Должен вернуть 0 по умолчанию
 
-@patch('balance.load_balances', return_value={"123": {"balance": 150, "name": "Test"}})
-def test_get_balance_user_not_exists(mock_load):
+def test_get_balance_user_not_exists(module_ledger):
     """Тестирует получение баланса несуществующего пользователя."""
     assert get_balance(789) == 0
 
-@patch('balance.load_balances', return_value={})
-def test_get_balance_empty_data(mock_load):
-    """Тестирует получение баланса, когда файл пуст."""
-    assert get_balance(123) == 0
-
-# --- Тесты для update_balance ---
-
-@patch('balance.load_balances')
-@patch('balance.save_balances')
-def test_update_balance_existing_user_add(mock_save, mock_load):
+def test_update_balance_existing_user_add(module_ledger):
     """Тестирует добавление средств существующему пользователю."""
-    mock_load.return_value = {"123": {"balance": 100, "name": "User1"}}
-    update_balance(123, 50)
-    mock_load.assert_called_once()
-    expected_data = {"123": {"balance": 150, "name": "User1"}}
-    mock_save.assert_called_once_with(expected_data)
-
-@patch('balance.load_balances')
-@patch('balance.save_balances')
-def test_update_balance_existing_user_subtract(mock_save, mock_load):
-    """Тестирует снятие средств у существующего пользователя."""
-    mock_load.return_value = {"123": {"balance": 100, "name": "User1"}}
-    update_balance(123, -30)
-    mock_load.assert_called_once()
-    expected_data = {"123": {"balance": 70, "name": "User1"}}
-    mock_save.assert_called_once_with(expected_data)
-
-@patch('balance.load_balances')
-@patch('balance.save_balances')
-def test_update_balance_existing_user_subtract_below_zero(mock_save, mock_load):
+    assert update_balance(123, 50) == 150
+    assert get_balance(123) == 150
+
+def test_update_balance_existing_user_subtract_below_zero(module_ledger):
     """Тестирует снятие средств, приводящее к балансу ниже нуля."""
-    mock_load.return_value = {"123": {"balance": 20, "name": "User1"}}
-    update_balance(123, -50)
-    mock_load.assert_called_once()
-    expected_data = {"123": {"balance": 0, "name": "User1"}} # Баланс не должен быть отрицательным
-    mock_save.assert_called_once_with(expected_data)
-
-@patch('balance.load_balances')
-@patch('balance.save_balances')
-def test_update_balance_new_user_add(mock_save, mock_load):
+    assert update_balance(123, -150) == 0 # Баланс не должен быть отрицательным
+
+def test_update_balance_new_user_add(module_ledger):
     """Тестирует добавление нового пользователя с положительным балансом."""
-    mock_load.return_value = {"123": {"balance": 100, "name": "User1"}} # Начальные данные
-    update_balance(789, 75) # Добавляем нового пользователя
-    mock_load.assert_called_once()
-    expected_data = {
+    update_balance(789, 75)
+    assert module_ledger.snapshot() == {
         "123": {"balance": 100, "name": "User1"},
         "789": {"balance": 75, "name": "Unknown"} # Новый пользователь
     }
-    mock_save.assert_called_once_with(expected_data)
-
-@patch('balance.load_balances')
-@patch('balance.save_balances')
-def test_update_balance_new_user_add_zero(mock_save, mock_load):
-    """Тестирует добавление нового пользователя с нулевым балансом."""
-    mock_load.return_value = {} # Пустые начальные данные
-    update_balance(789, 0)
-    mock_load.assert_called_once()
-    expected_data = {"789": {"balance": 0, "name": "Unknown"}}
-    mock_save.assert_called_once_with(expected_data)
-
-@patch('balance.load_balances')
-@patch('balance.save_balances')
-def test_update_balance_new_user_add_negative(mock_save, mock_load):
-    """Тестирует добавление нового пользователя с отрицательным начальным значением (должен стать 0)."""
-    mock_load.return_value = {}
-    update_balance(789, -50)
-    mock_load.assert_called_once()
-    expected_data = {"789": {"balance": 0, "name": "Unknown"}} # Баланс не должен быть отрицательным
-    mock_save.assert_called_once_with(expected_data) 
\ No newline at end of file
+
+# --- Тесты для транзакций ---
+
+def test_ledger_try_debit(ledger):
+    """Тестирует списание только при достаточном балансе."""
+    assert ledger.try_debit(123, 40) == 60
+    assert ledger.try_debit(123, 61) is None
+    assert ledger.try_debit(123, 0) is None
+    assert ledger.get(123) == 60
+
+def test_ledger_transfer(ledger):
+    """Тестирует перевод между пользователями."""
+    assert ledger.transfer(123, 456, 30) == (70, 30)
+    assert ledger.transfer(456, 123, 31) is None
+    assert ledger.get(456) == 30
+
+@pytest.mark.asyncio
+async def test_try_debit_concurrent_never_overdraws(module_ledger):
+    """Тестирует, что параллельные списания не уводят баланс в минус."""
+    results = await asyncio.gather(*(balance.try_debit(123, 30) for _ in range(5)))
+    assert sorted(r for r in results if r is not None) == [10, 40, 70]
+    assert results.count(None) == 2
+    assert get_balance(123) == 10
+
+@pytest.mark.asyncio
+async def test_credit_and_transfer(module_ledger):
+    """Тестирует асинхронные начисление и перевод."""
+    assert await balance.credit(123, 25) == 125
+    assert await balance.transfer(123, 456, 100) == (25, 100)
+    assert await balance.transfer(123, 456, 26) is None
+    assert get_balance(456) == 100
+
+# --- Тесты для пакетного обновления ---
+
+def test_update_balances_bulk_single_write(module_ledger):
+    """Тестирует, что пакет выплат применяется и сохраняется одной записью."""
+    with patch('balance._append_journal', return_value=True) as mock_append:
+        result = balance.update_balances_bulk({123: 50, 456: 30, 789: -10}, reason="betting")
+        module_ledger.flush()
+    assert result == {123: 150, 456: 30, 789: 0}
+    mock_append.assert_called_once()
+    entries = mock_append.call_args[0][0]
+    assert [e["reason"] for e in entries] == ["betting"] * 3
+
+def test_update_balances_bulk_empty(module_ledger):
+    """Тестирует, что пустой пакет ничего не меняет."""
+    assert balance.update_balances_bulk({}) == {}
+    assert module_ledger._timer is None
+
+# --- Тесты для рейтинга по балансу ---
+
+def test_leaderboard_tracks_updates(ledger):
+    """Тестирует, что рейтинг поддерживается при каждом изменении баланса."""
+    ledger.apply(456, 50)
+    ledger.apply(789, 150)
+    assert [uid for uid, _ in ledger.top()] == ["789", "123", "456"]
+    assert ledger.rank(456) == 3
+
+    ledger.apply(456, 200) # 250 - первое место
+    assert ledger.top(0, 1) == [("456", {"balance": 250, "name": "Unknown"})]
+    assert ledger.rank(456) == 1
+    assert ledger.rank(123) == 3
+    assert ledger.rank(999) is None
+    assert ledger.count() == 3
+
+def test_leaderboard_matches_full_sort(ledger):
+    """Тестирует, что рейтинг совпадает с полной сортировкой после серии изменений."""
+    import random
+    rng = random.Random(42)
+    for _ in range(500):
+        ledger.apply(rng.randint(1, 40), rng.randint(-60, 60))
+    expected = sorted(ledger.snapshot().items(), key=lambda x: (-x[1]["balance"], x[0]))
+    assert ledger.top(0, 100) == expected
+    for place, (uid, _) in enumerate(expected, 1):
+        assert ledger.rank(uid) == place
+
+def test_leaderboard_after_replace_and_replay(ledger):
+    """Тестирует перестроение рейтинга при замене данных и проигрывании журнала."""
+    ledger.replace({"1": {"balance": 5, "name": "A"}, "2": {"balance": 7, "name": "B"}})
+    assert [uid for uid, _ in ledger.top()] == ["2", "1"]
+    ledger.flush()
+    ledger.apply(1, 10)
+    ledger.flush()
+    assert [uid for uid, _ in reopen(ledger).top()] == ["1", "2"]
@@ -1,29 +1,54 @@
 import pytest
+import json
 from unittest.mock import patch, MagicMock, AsyncMock
 
 # Импортируем тестируемые функции
 try:
-    from handlers.balance_command import balance_command
+    from handlers.balance_command import balance_command, parse_page_number, BALANCE_PAGE_SIZE
     import balance  # для мокирования
+    from balance import BalanceLedger
 except ImportError as e:
     pytest.skip(f"Пропуск тестов balance_command: не удалось импортировать модуль handlers.balance_command или его зависимости ({e}).", allow_module_level=True)
 
-@pytest.mark.asyncio
-@patch('handlers.balance_command.load_balances')
-async def test_balance_command_empty(mock_load_balances):
-    """Тест команды /balance когда баланс пуст"""
-    # Настраиваем мок
-    mock_load_balances.return_value = {}
-    
-    # Создаем моки для update и context
+@pytest.fixture
+def make_ledger(tmp_path):
+    """Подменяет реестр балансов реестром с заданными данными."""
+    patchers = []
+
+    def _make(balances):
+        path = tmp_path / "balance.json"
+        path.write_text(json.dumps(balances), encoding="utf-8")
+        ledger = BalanceLedger(str(path), flush_delay=3600,
+                               journal_path=str(tmp_path / "journal.jsonl"),
+                               archive_path=str(tmp_path / "journal.archive.jsonl"))
+        patcher = patch('balance._ledger', ledger)
+        patcher.start()
+        patchers.append((patcher, ledger))
+        return ledger
+
+    yield _make
+    for patcher, ledger in patchers:
+        patcher.stop()
+        if ledger._timer is not None:
+            ledger._timer.cancel()
+
+def make_update(user_id=None, args=None):
     update = MagicMock()
     context = MagicMock()
     context.bot = AsyncMock()  # Используем AsyncMock для асинхронных методов
+    context.args = args or []
     update.effective_chat.id = 123
-    
-    # Вызываем тестируемую функцию
+    update.effective_user.id = user_id
+    return update, context
+
+@pytest.mark.asyncio
+async def test_balance_command_empty(make_ledger):
+    """Тест команды /balance когда баланс пуст"""
+    make_ledger({})
+    update, context = make_update(user_id=1)
+
     await balance_command(update, context)
-    
+
     # Проверяем, что бот отправил сообщение об отсутствии баланса
     context.bot.send_message.assert_awaited_once_with(
         chat_id=123,
@@ -31,89 +56,90 @@ async def test_balance_command_empty(mock_load_balances):
     )
 
 @pytest.mark.asyncio
-@patch('handlers.balance_command.load_balances')
-async def test_balance_command_with_users(mock_load_balances):
+async def test_balance_command_with_users(make_ledger):
     """Тест команды /balance с несколькими пользователями"""
-    # Настраиваем мок с данными о пользователях
-    mock_balances = {
+    make_ledger({
         "123456": {"name": "Пользователь1", "balance": 100},
         "789012": {"name": "Пользователь2", "balance": 200},
         "345678": {"name": "Пользователь3", "balance": 50}
-    }
-    mock_load_balances.return_value = mock_balances
-    
-    # Создаем моки для update и context
-    update = MagicMock()
-    context = MagicMock()
-    context.bot = AsyncMock()  # Используем AsyncMock для асинхронных методов
-    update.effective_chat.id = 123
-    
-    # Вызываем тестируемую функцию
+    })
+    update, context = make_update(user_id=123456)
+
     await balance_command(update, context)
-    
+
     # Проверяем, что бот отправил сообщение с правильным форматированием
     expected_text = "💰 Баланс участников:\n\n"
-    expected_text += "Пользователь2: 200 💵\n"
-    expected_text += "Пользователь1: 100 💵\n"
-    expected_text += "Пользователь3: 50 💵\n"
-    
+    expected_text += "1. Пользователь2: 200 💵\n"
+    expected_text += "2. Пользователь1: 100 💵\n"
+    expected_text += "3. Пользователь3: 50 💵\n"
+    expected_text += "\nВаше место: 2 из 3 (100 💵)\n"
+
     context.bot.send_message.assert_awaited_once_with(
         chat_id=123,
         text=expected_text
     )
 
 @pytest.mark.asyncio
-@patch('handlers.balance_command.load_balances')
-async def test_balance_command_with_one_user(mock_load_balances):
-    """Тест команды /balance с одним пользователем"""
-    # Настраиваем мок с данными об одном пользователе
-    mock_balances = {
-        "123456": {"name": "Пользователь1", "balance": 100}
-    }
-    mock_load_balances.return_value = mock_balances
-    
-    # Создаем моки для update и context
-    update = MagicMock()
-    context = MagicMock()
-    context.bot = AsyncMock()  # Используем AsyncMock для асинхронных методов
-    update.effective_chat.id = 123
-    
-    # Вызываем тестируемую функцию
+async def test_balance_command_with_zero_balance(make_ledger):
+    """Тест команды /balance с нулевым балансом у пользователя"""
+    make_ledger({"123456": {"name": "Пользователь1", "balance": 0}})
+    update, context = make_update(user_id=999)  # У вызвавшего нет баланса
+
     await balance_command(update, context)
-    
-    # Проверяем, что бот отправил сообщение с правильным форматированием
+
     expected_text = "💰 Баланс участников:\n\n"
-    expected_text += "Пользователь1: 100 💵\n"
-    
+    expected_text += "1. Пользователь1: 0 💵\n"
+
     context.bot.send_message.assert_awaited_once_with(
         chat_id=123,
         text=expected_text
     )
 
 @pytest.mark.asyncio
-@patch('handlers.balance_command.load_balances')
-async def test_balance_command_with_zero_balance(mock_load_balances):
-    """Тест команды /balance с нулевым балансом у пользователя"""
-    # Настраиваем мок с данными о пользователе с нулевым балансом
-    mock_balances = {
-        "123456": {"name": "Пользователь1", "balance": 0}
-    }
-    mock_load_balances.return_value = mock_balances
-    
-    # Создаем моки для update и context
-    update = MagicMock()
-    context = MagicMock()
-    context.bot = AsyncMock()  # Используем AsyncMock для асинхронных методов
-    update.effective_chat.id = 123
-    
-    # Вызываем тестируемую функцию
+async def test_balance_command_pages(make_ledger):
+    """Тест постраничного вывода: /balance page 2"""
+    total = BALANCE_PAGE_SIZE + 3
+    make_ledger({str(i): {"name": f"U{i}", "balance": i * 10} for i in range(1, total + 1)})
+
+    update, context = make_update(user_id=1)
     await balance_command(update, context)
-    
-    # Проверяем, что бот отправил сообщение с правильным форматированием
-    expected_text = "💰 Баланс участников:\n\n"
-    expected_text += "Пользователь1: 0 💵\n"
-    
-    context.bot.send_message.assert_awaited_once_with(
-        chat_id=123,
-        text=expected_text
-    ) 
\ No newline at end of file
+    text = context.bot.send_message.call_args.kwargs["text"]
+    assert text.startswith("💰 Баланс участников (страница 1/2):")
+    assert f"1. U{total}: {total * 10} 💵" in text
+    assert text.count(" 💵\n") == BALANCE_PAGE_SIZE  # Только одна страница
+    assert f"Ваше место: {total} из {total}" in text
+    assert "/balance page 2" in text
+
+    update, context = make_update(user_id=1, args=["page", "2"])
+    await balance_command(update, context)
+    text = context.bot.send_message.call_args.kwargs["text"]
+    assert text.startswith("💰 Баланс участников (страница 2/2):")
+    assert f"{BALANCE_PAGE_SIZE + 1}. U3: 30 💵" in text
+    assert f"{total}. U1: 10 💵" in text
+    assert "Следующая страница" not in text
+
+@pytest.mark.asyncio
+async def test_balance_command_reflects_updates(make_ledger):
+    """Тест, что рейтинг обновляется при изменении баланса без перезагрузки"""
+    make_ledger({
+        "1": {"name": "A", "balance": 100},
+        "2": {"name": "B", "balance": 50}
+    })
+    balance.update_balance(2, 100)
+    update, context = make_update(user_id=1)
+
+    with patch('balance._read_balance_file') as mock_read:
+        await balance_command(update, context)
+    mock_read.assert_not_called()
+
+    text = context.bot.send_message.call_args.kwargs["text"]
+    assert "1. B: 150 💵\n2. A: 100 💵\n" in text
+    assert "Ваше место: 2 из 2" in text
+
+def test_parse_page_number():
+    """Тест разбора номера страницы из аргументов команды"""
+    assert parse_page_number([]) == 1
+    assert parse_page_number(["page", "2"]) == 2
+    assert parse_page_number(["3"]) == 3
+    assert parse_page_number(["page", "abc"]) == 1
+    assert parse_page_number(["0"]) == 1
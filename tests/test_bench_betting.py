@@ -0,0 +1,45 @@
+import pytest
+import argparse
+
+try:
+    from bench.bench_betting import (
+        run_benchmark, summarize, compare_with_baseline, format_report, save_baseline, load_baseline, OPERATIONS
+    )
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов теста производительности ставок: не удалось импортировать bench.bench_betting ({e}).", allow_module_level=True)
+
+def make_args(**overrides):
+    args = dict(users=30, bets=300, active_events=3, history_years=0.1, events_per_day=2,
+                place_bets=5, history_reads=5, seed=1)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+def test_run_benchmark_small_workload():
+    """Небольшой прогон: все операции замеряются, открытые события закрываются"""
+    args = make_args()
+    report = run_benchmark(args)
+
+    assert report["workload"]["history_entries"] == int(0.1 * 365) * 2
+    assert len(report["workload"]["active_event_ids"]) == 3
+    summary = summarize(report["timings"])
+    assert summary["place_bet"]["count"] == 5
+    assert summary["process_event_results"]["count"] == 3
+    assert summary["get_betting_history"]["count"] == 5
+    assert summary["history_command"]["count"] == 5
+    assert all(name in format_report(args, report, summary) for name in OPERATIONS)
+
+def test_compare_with_baseline(tmp_path):
+    """Тест сравнения с базовым замером и его сохранения"""
+    summary = {
+        "place_bet": {"count": 10, "p50_ms": 3.0},
+        "history_command": {"count": 10, "p50_ms": 1.0},
+    }
+    path = str(tmp_path / "baseline.json")
+    save_baseline(path, make_args(), {name: {**stats} for name, stats in summary.items()})
+    baseline = load_baseline(path)
+    assert baseline["params"]["users"] == 30
+    assert compare_with_baseline(summary, baseline, 0.5) == []
+
+    summary["place_bet"]["p50_ms"] = 4.6
+    assert compare_with_baseline(summary, baseline, 0.5) == ["place_bet"]
+    assert load_baseline(str(tmp_path / "missing.json")) is None
@@ -0,0 +1,32 @@
+import pytest
+import argparse
+
+try:
+    from bench.bench_concurrency import run_benchmark, format_report, percentile, SCENARIOS
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов нагрузочного теста: не удалось импортировать bench.bench_concurrency ({e}).", allow_module_level=True)
+
+def make_args(**overrides):
+    args = dict(users=8, ops_per_user=5, concurrency=10, initial_balance=200, latency=0.0,
+                roulette_delay=0.0, flush_delay=3600, storage="json", scenarios=list(SCENARIOS), seed=1)
+    args.update(overrides)
+    return argparse.Namespace(**args)
+
+@pytest.mark.parametrize("storage", ["json", "sqlite"])
+def test_run_benchmark_no_lost_updates(storage):
+    """Небольшой прогон нагрузочного теста не должен терять обновления"""
+    args = make_args(storage=storage)
+    report = run_benchmark(args)
+
+    assert sum(len(values) for values in report["latencies"].values()) == args.users * args.ops_per_user
+    assert report["lost_updates"] == 0
+    assert report["lost_on_reload"] == 0
+    assert report["lost_bets"] == 0
+    assert "Потерянные обновления балансов: 0" in format_report(args, report)
+
+def test_percentile():
+    """Тест вычисления перцентилей"""
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 51
+    assert percentile(values, 99) == 99
+    assert percentile([], 99) == 0.0
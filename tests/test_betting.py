@@ -2,7 +2,7 @@ import pytest
 import json
 import os
 import datetime
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, mock_open, MagicMock, AsyncMock
 
 # Импортируем тестируемые функции из betting.py
 try:
@@ -13,137 +13,312 @@ try:
         save_betting_data,
         get_next_active_event,
         publish_event,
+        close_event,
+        is_betting_open,
         place_bet,
         process_event_results,
         get_event_bets,
+        load_event_bets,
+        save_event_bets,
+        load_active_bets,
+        get_betting_slots,
         get_betting_history,
+        append_betting_history,
+        count_betting_history,
         get_user_streak,
+        get_user_betting_stats,
+        get_betting_leaderboard,
+        build_betting_stats,
+        get_betting_event,
+        get_betting_option,
+        get_event_pool,
+        get_live_odds,
+        build_event_pool,
+        distribute_pot,
+        migrate_betting_data,
+        upgrade_betting_data_file,
+        BETTING_SCHEMA_VERSION,
         BETTING_EVENTS_FILE,
         BETTING_DATA_FILE
     )
 except ImportError:
     pytest.skip("Пропуск тестов betting: не удалось импортировать модуль betting.", allow_module_level=True)
 
+@pytest.fixture
+def events_file(tmp_path):
+    """Подменяет файл событий временным файлом."""
+    path = tmp_path / "betting_events.json"
+    with patch('betting.BETTING_EVENTS_FILE', str(path)):
+        yield path
+
+@pytest.fixture
+def data_file(tmp_path):
+    """Подменяет файл данных о ставках временным файлом."""
+    path = tmp_path / "betting_data.json"
+    with patch('betting.BETTING_DATA_FILE', str(path)):
+        yield path
+
 # --- Тесты для load_betting_events ---
 
-@patch('os.path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data='{"events": [{"id": 1, "description": "Test Event", "is_active": true}]}')
-def test_load_betting_events_success(mock_file_open, mock_exists):
+def test_load_betting_events_success(events_file):
     """Тестирует успешную загрузку событий из существующего файла."""
+    events_file.write_text('{"events": [{"id": 1, "description": "Test Event", "is_active": true}]}', encoding="utf-8")
     events = load_betting_events()
-    mock_exists.assert_called_once_with(BETTING_EVENTS_FILE)
-    mock_file_open.assert_called_once_with(BETTING_EVENTS_FILE, "r", encoding="utf-8")
     assert events == {"events": [{"id": 1, "description": "Test Event", "is_active": True}]}
 
-@patch('os.path.exists', return_value=False)
-def test_load_betting_events_file_not_exists(mock_exists):
+def test_load_betting_events_file_not_exists(events_file):
     """Тестирует случай, когда файл событий не существует."""
     events = load_betting_events()
-    mock_exists.assert_called_once_with(BETTING_EVENTS_FILE)
     assert events == {"events": []}
 
-@patch('os.path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data='invalid json')
 @patch('logging.error')
-def test_load_betting_events_invalid_json(mock_log_error, mock_file_open, mock_exists):
+def test_load_betting_events_invalid_json(mock_log_error, events_file):
     """Тестирует случай с невалидным JSON в файле событий."""
+    events_file.write_text('invalid json', encoding="utf-8")
     events = load_betting_events()
-    mock_exists.assert_called_once_with(BETTING_EVENTS_FILE)
-    mock_file_open.assert_called_once_with(BETTING_EVENTS_FILE, "r", encoding="utf-8")
     assert events == {"events": []}
     mock_log_error.assert_called_once()
 
-@patch('os.path.exists', return_value=True)
 @patch('builtins.open', side_effect=IOError("Test IO Error"))
 @patch('logging.error')
-def test_load_betting_events_read_error(mock_log_error, mock_file_open, mock_exists):
+def test_load_betting_events_read_error(mock_log_error, mock_file_open, events_file):
     """Тестирует случай ошибки чтения файла событий."""
+    events_file.write_bytes(b'{}')
     events = load_betting_events()
-    mock_exists.assert_called_once_with(BETTING_EVENTS_FILE)
-    mock_file_open.assert_called_once_with(BETTING_EVENTS_FILE, "r", encoding="utf-8")
+    mock_file_open.assert_called_once_with(str(events_file), "r", encoding="utf-8")
     assert events == {"events": []}
     mock_log_error.assert_called_once()
 
+def test_load_betting_events_cached(events_file):
+    """Тестирует, что неизменённый файл событий не перечитывается с диска."""
+    events_file.write_text('{"events": [{"id": 1}]}', encoding="utf-8")
+    assert load_betting_events() == {"events": [{"id": 1}]}
+    with patch('builtins.open') as mock_file_open:
+        assert load_betting_events() == {"events": [{"id": 1}]}
+    mock_file_open.assert_not_called()
+
 # --- Тесты для save_betting_events ---
 
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-def test_save_betting_events_success(mock_json_dump, mock_file_open):
+def test_save_betting_events_success(events_file, doc_store):
     """Тестирует успешное сохранение событий."""
     events_to_save = {"events": [{"id": 2, "description": "New Event", "is_active": True}]}
     save_betting_events(events_to_save)
-    mock_file_open.assert_called_once_with(BETTING_EVENTS_FILE, "w", encoding="utf-8")
-    handle = mock_file_open()
-    mock_json_dump.assert_called_once_with(events_to_save, handle, ensure_ascii=False, indent=4)
+    # Запись отложенная: до сброса файл не создаётся, но данные уже доступны
+    assert not events_file.exists()
+    assert load_betting_events() == events_to_save
+    assert doc_store.flush_all() is True
+    assert json.loads(events_file.read_text(encoding="utf-8")) == events_to_save
 
-@patch('builtins.open', side_effect=IOError("Test IO Error"))
 @patch('logging.error')
-def test_save_betting_events_write_error(mock_log_error, mock_file_open):
-    """Тестирует ошибку записи файла событий."""
+def test_save_betting_events_write_error(mock_log_error, events_file, doc_store):
+    """Тестирует ошибку записи файла событий: данные остаются в памяти для повторной записи."""
     events_to_save = {"events": [{"id": 3, "description": "Error Event", "is_active": True}]}
     save_betting_events(events_to_save)
-    mock_file_open.assert_called_once_with(BETTING_EVENTS_FILE, "w", encoding="utf-8")
+    with patch('builtins.open', side_effect=IOError("Test IO Error")):
+        assert doc_store.flush_all() is False
     mock_log_error.assert_called_once()
+    assert not events_file.exists()
+    assert doc_store.flush_all() is True
+    assert json.loads(events_file.read_text(encoding="utf-8")) == events_to_save
 
 # --- Тесты для load_betting_data ---
 
-@patch('os.path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data='{"active_bets": {"1": {"123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 50}]}}}, "history": [], "win_streaks": {"123": {"streak": 3, "user_name": "User1"}}}')
-def test_load_betting_data_success(mock_file_open, mock_exists):
+def test_load_betting_data_success(data_file):
     """Тестирует успешную загрузку данных о ставках из существующего файла."""
+    data_file.write_text('{"active_bets": {"1": {"123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 50}]}}}, "history": [], "win_streaks": {"123": {"streak": 3, "user_name": "User1"}}}', encoding="utf-8")
     data = load_betting_data()
-    mock_exists.assert_called_once_with(BETTING_DATA_FILE)
-    mock_file_open.assert_called_once_with(BETTING_DATA_FILE, "r", encoding="utf-8")
+    # Файл без schema_version приводится к текущей схеме: ставки переносятся в раздел события
     assert data == {
-        "active_bets": {"1": {"123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 50}]}}},
-        "history": [],
-        "win_streaks": {"123": {"streak": 3, "user_name": "User1"}}
+        "win_streaks": {"123": {"streak": 3, "user_name": "User1"}},
+        "betting_stats": {},
+        "schema_version": BETTING_SCHEMA_VERSION
     }
+    assert get_event_bets(1) == {"123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 50}]}}
+    assert get_event_pool(1) == {"total": 50, "options": {"1": {"total": 50, "bettors": 1}}}
 
-@patch('os.path.exists', return_value=False)
-def test_load_betting_data_file_not_exists(mock_exists):
+def test_load_betting_data_file_not_exists(data_file):
     """Тестирует случай, когда файл данных о ставках не существует."""
     data = load_betting_data()
-    mock_exists.assert_called_once_with(BETTING_DATA_FILE)
-    assert data == {"active_bets": {}, "history": [], "win_streaks": {}}
+    assert data == {"schema_version": BETTING_SCHEMA_VERSION, "win_streaks": {}, "betting_stats": {}, "settled_events": {}}
 
-@patch('os.path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data='{"active_bets": {}, "history": [], "win_streaks": {"123": 3}}')
-def test_load_betting_data_old_format(mock_file_open, mock_exists):
+def test_load_betting_data_old_format(data_file):
     """Тестирует загрузку данных в старом формате."""
+    data_file.write_text('{"active_bets": {}, "history": [], "win_streaks": {"123": 3}}', encoding="utf-8")
     data = load_betting_data()
-    mock_exists.assert_called_once_with(BETTING_DATA_FILE)
-    mock_file_open.assert_called_once_with(BETTING_DATA_FILE, "r", encoding="utf-8")
     assert data["win_streaks"]["123"]["streak"] == 3
     assert data["win_streaks"]["123"]["user_name"] == "Unknown"
 
+def test_load_betting_data_returns_copy(data_file):
+    """Тестирует, что изменение загруженных данных без сохранения не портит кэш."""
+    data_file.write_text('{"active_bets": {}, "history": [], "win_streaks": {}}', encoding="utf-8")
+    data = load_betting_data()
+    data["win_streaks"]["1"] = {"streak": 1}
+    assert load_betting_data()["win_streaks"] == {}
+
+def test_load_betting_data_current_schema_not_normalized(data_file):
+    """Тестирует, что данные текущей схемы возвращаются как есть, без поправок записей."""
+    stored = {"schema_version": BETTING_SCHEMA_VERSION,
+              "win_streaks": {"123": {"streak": 1, "user_name": "@kept"}}}
+    data_file.write_text(json.dumps(stored), encoding="utf-8")
+    with patch('betting.migrate_betting_data') as mock_migrate:
+        assert load_betting_data() == stored
+    mock_migrate.assert_not_called()
+
+# --- Тесты для миграции схемы ---
+
+def test_migrate_betting_data_v1():
+    """Тестирует перевод данных первой версии в текущую."""
+    data = migrate_betting_data({
+        "active_bets": {"1": {"5": {"user_name": "A", "bets": [{"option_id": 2, "amount": 10}]}}},
+        "history": [{"winners": [{"user_name": "@win"}], "losers": [{"user_name": "@lose"}]}],
+        "win_streaks": {"5": 2, "6": {"user_name": "@B"}}
+    })
+    assert data["schema_version"] == BETTING_SCHEMA_VERSION
+    assert data["win_streaks"] == {"5": {"streak": 2, "user_name": "Unknown"}, "6": {"streak": 0, "user_name": "B"}}
+    assert data["history"][0]["winners"][0]["user_name"] == "win"
+    assert data["history"][0]["losers"][0]["user_name"] == "lose"
+    # Активные ставки и пулы переносятся в разделы событий
+    assert "active_bets" not in data and "pools" not in data
+    assert get_event_pool(1) == {"total": 10, "options": {"2": {"total": 10, "bettors": 1}}}
+
+def test_migrate_betting_data_v2_partitions(data_file, bets_dir, doc_store):
+    """Тестирует перенос ставок второй версии в отдельные разделы событий."""
+    data_file.write_text(json.dumps({
+        "schema_version": 2,
+        "active_bets": {
+            "1": {"5": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]}},
+            "2": {"6": {"user_name": "B", "bets": [{"option_id": 2, "amount": 20}]}}
+        },
+        "pools": {"1": {"total": 10, "options": {"1": {"total": 10, "bettors": 1}}}},
+        "win_streaks": {}
+    }), encoding="utf-8")
+    assert upgrade_betting_data_file() is True
+    doc_store.flush_all()
+    assert json.loads(data_file.read_text(encoding="utf-8")) == {"schema_version": BETTING_SCHEMA_VERSION, "win_streaks": {}, "betting_stats": {}}
+    assert sorted(os.listdir(bets_dir)) == ["event_1.json", "event_2.json"]
+    assert load_event_bets(2)["pool"] == {"total": 20, "options": {"2": {"total": 20, "bettors": 1}}}
+    assert load_active_bets() == {
+        "1": {"5": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]}},
+        "2": {"6": {"user_name": "B", "bets": [{"option_id": 2, "amount": 20}]}}
+    }
+
+def test_migrate_betting_data_current_unchanged():
+    """Тестирует, что данные текущей версии не изменяются."""
+    data = {"schema_version": BETTING_SCHEMA_VERSION, "active_bets": {}, "win_streaks": {"1": 3}}
+    assert migrate_betting_data(dict(data)) == data
+
+def test_upgrade_betting_data_file(data_file, doc_store):
+    """Тестирует однократное обновление файла ставок: миграция, перенос истории и сохранение."""
+    data_file.write_text(json.dumps({
+        "active_bets": {},
+        "history": [{"event_id": 1, "date": "2023-04-01"}],
+        "win_streaks": {"5": 2}
+    }), encoding="utf-8")
+    assert upgrade_betting_data_file() is True
+    doc_store.flush_all()
+    saved = json.loads(data_file.read_text(encoding="utf-8"))
+    assert saved == {"schema_version": BETTING_SCHEMA_VERSION,
+                     "win_streaks": {"5": {"streak": 2, "user_name": "Unknown"}},
+                     "betting_stats": {}}
+    assert get_betting_history() == [{"event_id": 1, "date": "2023-04-01"}]
+    # Повторный запуск ничего не меняет
+    assert upgrade_betting_data_file() is False
+
+def test_migrate_betting_data_v3_builds_stats(data_file, doc_store):
+    """Тестирует однократный подсчёт статистики ставок по журналу истории при переходе на v4."""
+    append_betting_history([
+        {"event_id": 1, "winners": [{"user_id": 5, "user_name": "A", "bet_amount": 10, "win_amount": 30}],
+         "losers": [{"user_id": 6, "user_name": "B", "loss_amount": 20}]},
+        {"event_id": 2, "winners": [{"user_id": 6, "user_name": "B2", "bet_amount": 5, "win_amount": 15}],
+         "losers": [{"user_id": 5, "user_name": "A", "loss_amount": 10}, {"user_name": "NoId", "loss_amount": 1}]}
+    ])
+    data_file.write_text(json.dumps({"schema_version": 3, "win_streaks": {}}), encoding="utf-8")
+    assert upgrade_betting_data_file() is True
+    assert load_betting_data()["betting_stats"] == {
+        "5": {"user_name": "A", "wagered": 20, "won": 30, "events": 2, "wins": 1},
+        "6": {"user_name": "B2", "wagered": 25, "won": 15, "events": 2, "wins": 1}
+    }
+
+def test_upgrade_betting_data_file_missing(data_file):
+    """Тестирует запуск миграции без файла ставок."""
+    assert upgrade_betting_data_file() is False
+    assert not data_file.exists()
+
 # --- Тесты для save_betting_data ---
 
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-def test_save_betting_data_success(mock_json_dump, mock_file_open):
+def test_save_betting_data_success(data_file, doc_store):
     """Тестирует успешное сохранение данных о ставках."""
     data_to_save = {"active_bets": {}, "history": [], "win_streaks": {}}
     save_betting_data(data_to_save)
-    mock_file_open.assert_called_once_with(BETTING_DATA_FILE, "w", encoding="utf-8")
-    handle = mock_file_open()
-    mock_json_dump.assert_called_once_with(data_to_save, handle, ensure_ascii=False, indent=4)
-
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-def test_save_betting_data_history_truncate(mock_json_dump, mock_file_open):
-    """Тестирует ограничение истории до 7 записей."""
+    doc_store.flush_all()
+    assert json.loads(data_file.read_text(encoding="utf-8")) == data_to_save
+
+def test_save_betting_data_moves_history_to_log(data_file, doc_store):
+    """Тестирует перенос истории старого формата из файла ставок в журнал истории."""
     history = []
     for i in range(10):
-        history.append({"id": i, "date": f"2023-04-{i+1}"})
+        history.append({"id": i, "date": f"2023-04-{i+1:02d}"})
     data_to_save = {"active_bets": {}, "history": history, "win_streaks": {}}
     save_betting_data(data_to_save)
-    mock_file_open.assert_called_once_with(BETTING_DATA_FILE, "w", encoding="utf-8")
-    handle = mock_file_open()
-    
-    # Проверяем, что json.dump был вызван с данными, где история ограничена 7 записями
-    args, kwargs = mock_json_dump.call_args
-    assert len(args[0]["history"]) == 7
+    doc_store.flush_all()
+
+    # В файле ставок история больше не хранится, а в журнале сохранены все записи
+    saved = json.loads(data_file.read_text(encoding="utf-8"))
+    assert "history" not in saved
+    assert count_betting_history() == 10
+    assert [entry["id"] for entry in get_betting_history(limit=3)] == [9, 8, 7]
+
+# --- Тесты для индекса событий ---
+
+def test_get_betting_event_and_option(events_file):
+    """Тестирует поиск события и варианта по ID (числом или строкой)."""
+    events_file.write_text(json.dumps({"events": [
+        {"id": 1, "options": [{"id": 1, "text": "Да"}, {"id": 2, "text": "Нет"}]}
+    ]}), encoding="utf-8")
+    assert get_betting_event("1")["id"] == 1
+    assert get_betting_option(1, "2") == {"id": 2, "text": "Нет"}
+    assert get_betting_event(2) is None
+    assert get_betting_option(1, 3) is None
+
+def test_betting_event_index_parses_file_once(events_file):
+    """Тестирует, что неизменённый файл событий не разбирается при каждом поиске."""
+    events_file.write_text('{"events": [{"id": 1, "options": [{"id": 1}]}]}', encoding="utf-8")
+    with patch('betting.load_betting_events', wraps=load_betting_events) as mock_load:
+        for _ in range(5):
+            assert get_betting_option(1, 1) == {"id": 1}
+    mock_load.assert_called_once()
+
+def test_betting_event_index_reloads_changed_file(events_file):
+    """Тестирует обновление индекса после изменения файла событий."""
+    events_file.write_text('{"events": [{"id": 1}]}', encoding="utf-8")
+    assert get_betting_event(2) is None
+    events_file.write_text('{"events": [{"id": 1}, {"id": 2, "is_active": true}]}', encoding="utf-8")
+    assert get_betting_event(2) == {"id": 2, "is_active": True}
+
+def test_betting_event_index_follows_save(events_file):
+    """Тестирует, что сохранённые события сразу видны в индексе, до записи файла на диск."""
+    save_betting_events({"events": [{"id": 5, "options": [{"id": 1, "text": "Да"}]}]})
+    assert not events_file.exists()
+    assert get_betting_option(5, 1)["text"] == "Да"
+
+# --- Тесты для окон ставок ---
+
+def test_get_betting_slots_default():
+    """Тестирует одно окно ставок из общих настроек."""
+    assert get_betting_slots({"publish_time": "10:00"}) == [
+        {"publish_time": "10:00", "close_time": "20:00", "results_time": "21:00"}
+    ]
+
+def test_get_betting_slots_multiple():
+    """Тестирует несколько окон: недостающие времена берутся из общих настроек."""
+    slots = get_betting_slots({"results_time": "22:00", "slots": [
+        {"publish_time": "09:00", "close_time": "12:00", "results_time": "13:00"},
+        {"publish_time": "14:00", "close_time": "18:00"}
+    ]})
+    assert slots == [
+        {"publish_time": "09:00", "close_time": "12:00", "results_time": "13:00"},
+        {"publish_time": "14:00", "close_time": "18:00", "results_time": "22:00"}
+    ]
 
 # --- Тесты для get_next_active_event ---
 
@@ -200,9 +375,9 @@ def test_publish_event_success(mock_datetime, mock_save, mock_load):
     mock_load.assert_called_once()
     assert result is True
     
-    # Проверяем, что событие помечено как неактивное и установлена дата публикации
+    # Проверяем, что событие снято из очереди, открыто для ставок и установлена дата публикации
     expected_events_data = {"events": [
-        {"id": 1, "is_active": False, "description": "Test Event", "publication_date": test_date}
+        {"id": 1, "is_active": False, "betting_open": True, "description": "Test Event", "publication_date": test_date}
     ]}
     mock_save.assert_called_once_with(expected_events_data)
 
@@ -214,15 +389,29 @@ def test_publish_event_not_found(mock_load):
     mock_load.assert_called_once()
     assert result is False
 
+@patch('betting.load_betting_events')
+@patch('betting.save_betting_events')
+def test_close_event(mock_save, mock_load):
+    """Тестирует закрытие приёма ставок на опубликованное событие."""
+    event = {"id": 1, "is_active": False, "betting_open": True, "betting_slot": 0}
+    mock_load.return_value = {"events": [event]}
+    assert is_betting_open(event)
+
+    assert close_event("1") is True
+    mock_save.assert_called_once()
+    assert event["betting_open"] is False and event["betting_slot"] == 0
+    assert not is_betting_open(event)
+    assert close_event(2) is False
+    # События без флага (ещё не опубликованные) оцениваются по is_active
+    assert is_betting_open({"id": 3}) and not is_betting_open({"id": 3, "is_active": False})
+
 # --- Тесты для place_bet ---
 
-@patch('betting.get_balance', return_value=100)
-@patch('betting.update_balance')
+@pytest.mark.asyncio
+@patch('betting.try_debit', new_callable=AsyncMock, return_value=50)
 @patch('betting.load_betting_events')
-@patch('betting.load_betting_data')
-@patch('betting.save_betting_data')
 @patch('datetime.datetime')
-def test_place_bet_success(mock_datetime, mock_save_data, mock_load_data, mock_load_events, mock_update_balance, mock_get_balance):
+async def test_place_bet_success(mock_datetime, mock_load_events, mock_try_debit, bets_dir, doc_store):
     """Тестирует успешное размещение ставки."""
     test_date = "2023-04-10 12:00:00"
     mock_now = MagicMock()
@@ -233,76 +422,174 @@ def test_place_bet_success(mock_datetime, mock_save_data, mock_load_data, mock_l
     mock_load_events.return_value = {"events": [
         {"id": 1, "is_active": True, "options": [{"id": 1}, {"id": 2}]}
     ]}
-    mock_load_data.return_value = {"active_bets": {}, "history": [], "win_streaks": {}}
     
-    result = place_bet(123, "User1", 1, 1, 50)
+    result = await place_bet(123, "User1", 1, 1, 50)
     
     # Проверяем результат
     assert result is True
     
-    # Проверяем, что баланс был обновлен
-    mock_get_balance.assert_called_once_with(123)
-    mock_update_balance.assert_called_once_with(123, -50)
+    # Проверяем, что ставка была списана атомарно
+    mock_try_debit.assert_awaited_once_with(123, 50, reason="betting")
     
-    # Проверяем, что ставка сохранена в правильном формате
+    # Проверяем, что ставка сохранена в разделе события в правильном формате
+    doc_store.flush_all()
     expected_data = {
-        "active_bets": {
-            "1": {
-                "123": {
-                    "user_name": "User1",
-                    "bets": [
-                        {
-                            "option_id": 1,
-                            "amount": 50,
-                            "time": test_date
-                        }
-                    ]
-                }
+        "event_id": 1,
+        "bets": {
+            "123": {
+                "user_name": "User1",
+                "bets": [
+                    {
+                        "option_id": 1,
+                        "amount": 50,
+                        "time": test_date
+                    }
+                ]
             }
         },
-        "history": [],
-        "win_streaks": {}
+        "pool": {"total": 50, "options": {"1": {"total": 50, "bettors": 1}}}
     }
-    mock_save_data.assert_called_once_with(expected_data)
+    assert json.loads((bets_dir / "event_1.json").read_text(encoding="utf-8")) == expected_data
 
-@patch('betting.get_balance', return_value=30)
-def test_place_bet_insufficient_balance(mock_get_balance):
+@pytest.mark.asyncio
+@patch('betting.try_debit', new_callable=AsyncMock, return_value=None)
+@patch('betting.load_betting_events')
+@patch('betting.save_event_bets')
+async def test_place_bet_insufficient_balance(mock_save_data, mock_load_events, mock_try_debit):
     """Тестирует случай недостаточного баланса для ставки."""
-    result = place_bet(123, "User1", 1, 1, 50)
-    mock_get_balance.assert_called_once_with(123)
+    mock_load_events.return_value = {"events": [
+        {"id": 1, "is_active": True, "options": [{"id": 1}]}
+    ]}
+    result = await place_bet(123, "User1", 1, 1, 50)
+    mock_try_debit.assert_awaited_once_with(123, 50, reason="betting")
+    mock_save_data.assert_not_called()
     assert result is False
 
-@patch('betting.get_balance', return_value=100)
+@pytest.mark.asyncio
+@patch('betting.try_debit', new_callable=AsyncMock)
 @patch('betting.load_betting_events')
-def test_place_bet_event_not_found(mock_load_events, mock_get_balance):
+async def test_place_bet_event_not_found(mock_load_events, mock_try_debit):
     """Тестирует ставку на несуществующее событие."""
     mock_load_events.return_value = {"events": []}
-    result = place_bet(123, "User1", 1, 1, 50)
-    mock_get_balance.assert_called_once_with(123)
+    result = await place_bet(123, "User1", 1, 1, 50)
     mock_load_events.assert_called_once()
+    mock_try_debit.assert_not_called() # Монеты не списываются
     assert result is False
 
-@patch('betting.get_balance', return_value=100)
+@pytest.mark.asyncio
+@patch('betting.try_debit', new_callable=AsyncMock)
 @patch('betting.load_betting_events')
-def test_place_bet_option_not_found(mock_load_events, mock_get_balance):
+async def test_place_bet_option_not_found(mock_load_events, mock_try_debit):
     """Тестирует ставку на несуществующий вариант."""
     mock_load_events.return_value = {"events": [
         {"id": 1, "is_active": True, "options": [{"id": 2}]}
     ]}
-    result = place_bet(123, "User1", 1, 1, 50)
-    mock_get_balance.assert_called_once_with(123)
+    result = await place_bet(123, "User1", 1, 1, 50)
     mock_load_events.assert_called_once()
+    mock_try_debit.assert_not_called()
+    assert result is False
+
+@pytest.mark.asyncio
+@patch('betting.try_debit', new_callable=AsyncMock, return_value=50)
+@patch('betting.credit', new_callable=AsyncMock)
+@patch('betting.load_betting_events')
+@patch('betting.save_event_bets', side_effect=IOError("disk full"))
+async def test_place_bet_save_error_refunds(mock_save_data, mock_load_events, mock_credit, mock_try_debit):
+    """Тестирует возврат списанной ставки, если её не удалось сохранить."""
+    mock_load_events.return_value = {"events": [
+        {"id": 1, "is_active": True, "options": [{"id": 1}]}
+    ]}
+    result = await place_bet(123, "User1", 1, 1, 50)
+    mock_credit.assert_awaited_once_with(123, 50, reason="betting")
     assert result is False
 
+# --- Тесты для пулов тотализатора ---
+
+@pytest.mark.asyncio
+@patch('betting.try_debit', new_callable=AsyncMock, return_value=0)
+async def test_place_bet_updates_pool(mock_try_debit, events_file, data_file):
+    """Тестирует, что каждая ставка сразу учитывается в пуле события."""
+    events_file.write_text(json.dumps({"events": [
+        {"id": 1, "is_active": True, "options": [{"id": 1}, {"id": 2}]}
+    ]}), encoding="utf-8")
+    assert await place_bet(1, "A", 1, 1, 100)
+    assert await place_bet(1, "A", 1, "1", 50)  # тот же вариант - участник не добавляется
+    assert await place_bet(2, "B", 1, 2, 50)
+    assert await place_bet(3, "C", 1, 1, 50)
+
+    pool = get_event_pool(1)
+    assert pool == {"total": 250, "options": {
+        "1": {"total": 200, "bettors": 2},
+        "2": {"total": 50, "bettors": 1}
+    }}
+    assert pool == build_event_pool(get_event_bets(1))
+    assert get_live_odds(1) == {"1": 1.25, "2": 5.0}
+
+@pytest.mark.asyncio
+@patch('betting.try_debit', new_callable=AsyncMock, return_value=0)
+@patch('betting.commit_balances_bulk')
+async def test_events_have_separate_partitions(mock_update_bulk, mock_try_debit, events_file, data_file, bets_dir, doc_store):
+    """Тестирует, что ставка и подведение итогов одного события не затрагивают другие события."""
+    events_file.write_text(json.dumps({"events": [
+        {"id": 1, "is_active": True, "options": [{"id": 1}, {"id": 2}]},
+        {"id": 2, "is_active": True, "options": [{"id": 1}, {"id": 2}]}
+    ]}), encoding="utf-8")
+    assert await place_bet(1, "A", 1, 1, 100)
+    assert await place_bet(2, "B", 2, 2, 30)
+    doc_store.flush_all()
+    event_2_file = bets_dir / "event_2.json"
+    event_2_content = event_2_file.read_text(encoding="utf-8")
+
+    with patch('betting.save_event_bets', wraps=save_event_bets) as mock_save:
+        assert await place_bet(3, "C", 1, 2, 50)
+        result = process_event_results(1, 1)
+    # Сохранялся только раздел события 1
+    assert {str(call.args[0]) for call in mock_save.call_args_list} == {"1"}
+    assert result["total_bets"] == 150
+    doc_store.flush_all()
+    assert not (bets_dir / "event_1.json").exists()
+    assert event_2_file.read_text(encoding="utf-8") == event_2_content
+    assert load_active_bets() == {"2": get_event_bets(2)}
+
+def test_get_live_odds_no_bets(data_file):
+    """Тестирует коэффициенты события без ставок."""
+    assert get_event_pool(1) is None
+    assert get_live_odds(1) == {}
+
+@patch('betting.commit_balances_bulk')
+@patch('betting.save_betting_events')
+@patch('betting.save_betting_data')
+@patch('betting.load_betting_events')
+def test_process_event_results_uses_pool(mock_load_events, mock_save_data, mock_save_events, mock_update_bulk):
+    """Тестирует, что суммы для расчёта берутся из пула, а раздел события удаляется после расчёта."""
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    save_event_bets(1, {
+        "bets": {
+            "123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 100}]},
+            "456": {"user_name": "User2", "bets": [{"option_id": 2, "amount": 300}]}
+        },
+        "pool": {"total": 400, "options": {
+            "1": {"total": 100, "bettors": 1},
+            "2": {"total": 300, "bettors": 1}
+        }}
+    })
+    with patch('betting.build_event_pool') as mock_build_pool:
+        result = process_event_results(1, 1)
+    mock_build_pool.assert_not_called()
+    assert result["tote_coefficient"] == 4.0
+    mock_update_bulk.assert_called_once_with({123: 400}, reason="betting", ref="betting:1")
+    assert get_event_pool(1) is None
+    assert get_event_bets(1) == {}
+
 # --- Тесты для process_event_results ---
 
 @patch('betting.load_betting_events')
 @patch('betting.load_betting_data')
 @patch('betting.save_betting_events')
 @patch('betting.save_betting_data')
-@patch('betting.update_balance')
+@patch('betting.commit_balances_bulk')
 @patch('datetime.datetime')
-def test_process_event_results_with_winners(mock_datetime, mock_update_balance, mock_save_data,
+def test_process_event_results_with_winners(mock_datetime, mock_update_bulk, mock_save_data,
                                            mock_save_events, mock_load_data, mock_load_events):
     """Тестирует обработку результатов события с победителями."""
     test_date = "2023-04-10"
@@ -321,24 +608,22 @@ def test_process_event_results_with_winners(mock_datetime, mock_update_balance,
         }
     ]}
     
-    mock_load_data.return_value = {
-        "active_bets": {
-            "1": {
-                "123": {
-                    "user_name": "User1",
-                    "bets": [
-                        {"option_id": 1, "amount": 100, "time": "2023-04-09 12:00:00"}
-                    ]
-                },
-                "456": {
-                    "user_name": "User2",
-                    "bets": [
-                        {"option_id": 2, "amount": 50, "time": "2023-04-09 12:30:00"}
-                    ]
-                }
-            }
+    save_event_bets(1, {"bets": {
+        "123": {
+            "user_name": "User1",
+            "bets": [
+                {"option_id": 1, "amount": 100, "time": "2023-04-09 12:00:00"}
+            ]
         },
-        "history": [],
+        "456": {
+            "user_name": "User2",
+            "bets": [
+                {"option_id": 2, "amount": 50, "time": "2023-04-09 12:30:00"}
+            ]
+        }
+    }})
+    
+    mock_load_data.return_value = {
         "win_streaks": {"123": {"streak": 0, "user_name": "User1"}, "456": {"streak": 0, "user_name": "User2"}}
     }
     
@@ -365,7 +650,17 @@ def test_process_event_results_with_winners(mock_datetime, mock_update_balance,
     
     # Проверяем, что балансы были обновлены
     # Тотализатор должен выплатить 150 (общая сумма ставок) / 100 (сумма выигрышных ставок) * 100 = 150
-    mock_update_balance.assert_called_once_with(123, 150)
+    # Все выплаты начисляются одним пакетом
+    mock_update_bulk.assert_called_once_with({123: 150}, reason="betting", ref="betting:1")
+    
+    # Результат события записан в журнал истории
+    history = get_betting_history()
+    assert len(history) == 1
+    assert history[0]["event_id"] == 1
+    assert history[0]["winners"][0]["user_id"] == 123
+    
+    # Раздел ставок события очищен
+    assert get_event_bets(1) == {}
 
 @patch('betting.load_betting_events')
 @patch('betting.load_betting_data')
@@ -391,24 +686,22 @@ def test_process_event_results_no_winners(mock_datetime, mock_save_data, mock_sa
         }
     ]}
     
-    mock_load_data.return_value = {
-        "active_bets": {
-            "1": {
-                "123": {
-                    "user_name": "User1",
-                    "bets": [
-                        {"option_id": 1, "amount": 100, "time": "2023-04-09 12:00:00"}
-                    ]
-                },
-                "456": {
-                    "user_name": "User2",
-                    "bets": [
-                        {"option_id": 2, "amount": 50, "time": "2023-04-09 12:30:00"}
-                    ]
-                }
-            }
+    save_event_bets(1, {"bets": {
+        "123": {
+            "user_name": "User1",
+            "bets": [
+                {"option_id": 1, "amount": 100, "time": "2023-04-09 12:00:00"}
+            ]
         },
-        "history": [],
+        "456": {
+            "user_name": "User2",
+            "bets": [
+                {"option_id": 2, "amount": 50, "time": "2023-04-09 12:30:00"}
+            ]
+        }
+    }})
+    
+    mock_load_data.return_value = {
         "win_streaks": {"123": {"streak": 1, "user_name": "User1"}, "456": {"streak": 2, "user_name": "User2"}}
     }
     
@@ -447,67 +740,245 @@ def test_process_event_results_option_not_found(mock_load_events):
     assert result["status"] == "error"
     assert "не найден" in result["message"]
 
-# --- Тесты для get_event_bets ---
+# --- Тесты для распределения банка ---
+
+def test_distribute_pot_largest_remainder():
+    """Тестирует целочисленное деление банка методом наибольшего остатка."""
+    assert distribute_pot({"a": 1, "b": 1, "c": 1}, 100) == {"a": 34, "b": 33, "c": 33}
+    # Остаток достаётся пользователю с большей дробной частью
+    assert distribute_pot({"a": 2, "b": 1}, 10) == {"a": 7, "b": 3}
+    assert distribute_pot({"a": 50}, 130) == {"a": 130}
+    assert distribute_pot({}, 100) == {}
+
+def test_distribute_pot_many_winners_exact():
+    """Тестирует, что сумма выплат тысячам победителей в точности равна банку."""
+    stakes = {str(i): (i * 37) % 991 + 1 for i in range(5000)}
+    pot = sum(stakes.values()) * 3 + 4999
+    payouts = distribute_pot(stakes, pot)
+    assert sum(payouts.values()) == pot
+    for user_id, stake in stakes.items():
+        exact = stake * pot / sum(stakes.values())
+        assert abs(payouts[user_id] - exact) < 1
+
+@patch('betting.commit_balances_bulk')
+@patch('betting.save_betting_events')
+@patch('betting.load_betting_events')
+def test_process_event_results_pays_whole_pot(mock_load_events, mock_save_events, mock_update_bulk, data_file):
+    """Тестирует, что весь банк события выплачивается победителям без потерь на округлении."""
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    save_event_bets(1, {"bets": {
+        "1": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]},
+        "2": {"user_name": "B", "bets": [{"option_id": 1, "amount": 10}]},
+        "3": {"user_name": "C", "bets": [{"option_id": 1, "amount": 10}]},
+        "4": {"user_name": "D", "bets": [{"option_id": 2, "amount": 70}]}
+    }})
+    result = process_event_results(1, 1)
+    mock_update_bulk.assert_called_once_with({1: 34, 2: 33, 3: 33}, reason="betting", ref="betting:1")
+    assert sum(winner["win_amount"] for winner in result["winners"]) == result["total_bets"] == 100
+
+@patch('betting.commit_balances_bulk')
+@patch('betting.save_betting_events')
+@patch('betting.load_betting_events')
+def test_process_event_results_updates_stats(mock_load_events, mock_save_events, mock_update_bulk, data_file):
+    """Тестирует обновление статистики ставок при подведении итогов."""
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    save_event_bets(1, {"bets": {
+        "1": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]},
+        "2": {"user_name": "B", "bets": [{"option_id": 2, "amount": 30}]}
+    }})
+    process_event_results(1, 1)
+    assert get_user_betting_stats(1)["profit"] == 30
+    assert get_user_betting_stats(2) == {
+        "user_id": "2", "user_name": "B", "streak": 0, "wagered": 30, "won": 0,
+        "profit": -30, "roi": -1.0, "events": 1, "wins": 0, "hit_rate": 0.0
+    }
+    assert get_user_betting_stats(3) is None
+
+@patch('betting.commit_balances_bulk')
+@patch('betting.save_betting_events')
+@patch('betting.load_betting_events')
+def test_process_event_results_settles_once(mock_load_events, mock_save_events, mock_update_bulk, data_file):
+    """Тестирует, что повторный расчёт подведённого события не начисляет выплаты ещё раз."""
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    event_bets = {"bets": {
+        "1": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]},
+        "2": {"user_name": "B", "bets": [{"option_id": 2, "amount": 30}]}
+    }}
+    save_event_bets(1, event_bets)
+    assert process_event_results(1, 1)["status"] == "success"
+    assert "1" in load_betting_data()["settled_events"]
+    # Ставки события остались (например, сбой после фиксации итогов) - расчёт не повторяется
+    save_event_bets(1, event_bets)
+    assert process_event_results(1, 1)["status"] == "error"
+    mock_update_bulk.assert_called_once_with({1: 40}, reason="betting", ref="betting:1")
+    assert count_betting_history() == 1
+    assert get_user_betting_stats(1)["events"] == 1
+
+@patch('betting.append_betting_history')
+@patch('betting.commit_balances_bulk', return_value=None)
+@patch('betting.save_betting_data')
+@patch('betting.save_betting_events')
+@patch('betting.load_betting_events')
+def test_process_event_results_payout_failed(mock_load_events, mock_save_events, mock_save_data,
+                                             mock_commit_bulk, mock_append_history):
+    """Тестирует, что без сохранения выплат итоги и история не записываются."""
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    save_event_bets(1, {"bets": {"1": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]}}})
+    assert process_event_results(1, 1)["status"] == "error"
+    mock_save_data.assert_not_called()
+    mock_append_history.assert_not_called()
+    assert get_event_bets(1) != {}
+
+@patch('betting.save_betting_events')
+@patch('betting.load_betting_events')
+def test_process_event_results_mark_failed_after_payout(mock_load_events, mock_save_events,
+                                                        data_file, balance_ledger):
+    """Тестирует, что сбой записи отметки после выплат не приводит к повторным выплатам при пересчёте."""
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    save_event_bets(1, {"bets": {
+        "1": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]},
+        "2": {"user_name": "B", "bets": [{"option_id": 2, "amount": 30}]}
+    }})
+    with patch('betting.save_betting_data', return_value=False), \
+         patch('betting.append_betting_history') as mock_append_history:
+        assert process_event_results(1, 1)["status"] == "error"
+    mock_append_history.assert_not_called()
+    # Выплата уже в журнале балансов (сохранена синхронно)
+    assert balance_ledger.has_ref("betting:1")
+    assert reopen_ledger(balance_ledger).get(1) == 40
+    assert get_event_bets(1) != {}
+
+    # Повторный расчёт сохраняет отметку, но не начисляет выплату ещё раз
+    assert process_event_results(1, 1)["status"] == "success"
+    assert balance_ledger.get(1) == 40
+    assert reopen_ledger(balance_ledger).get(1) == 40
+    assert "1" in load_betting_data()["settled_events"]
+    assert count_betting_history() == 1
+
+def reopen_ledger(ledger):
+    """Создаёт новый реестр балансов поверх тех же файлов (как при перезапуске бота)."""
+    from balance import BalanceLedger
+    return BalanceLedger(ledger.path, flush_delay=3600, storage=ledger.storage,
+                         journal_path=ledger.journal_path, archive_path=ledger.archive_path)
+
+@pytest.fixture
+def sqlite_betting(tmp_path, balance_ledger):
+    """SQLite-хранилище для ставок и балансов (реестр балансов работает поверх него)."""
+    from storage import SqliteStorage
+    db = SqliteStorage(str(tmp_path / "bot.db"))
+    balance_ledger.storage = db
+    with patch('betting.get_storage', return_value=db):
+        yield db
+    db.close()
+
+@patch('betting.save_betting_events')
+@patch('betting.load_betting_events')
+def test_process_event_results_sqlite_reads_event_users(mock_load_events, mock_save_events, sqlite_betting):
+    """Тестирует, что в SQLite расчёт читает и сохраняет данные только участников события."""
+    db = sqlite_betting
+    db.save_betting_data({"win_streaks": {"9": {"streak": 7, "user_name": "Other"}}})
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    with patch('betting.load_betting_data', side_effect=AssertionError("полная загрузка")):
+        event_bets = {"bets": {
+            "1": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]},
+            "2": {"user_name": "B", "bets": [{"option_id": 2, "amount": 30}]}
+        }}
+        save_event_bets(1, event_bets)
+        assert process_event_results(1, 1)["status"] == "success"
+        assert get_user_streak(1) == 1
+        assert get_user_betting_stats(2)["wagered"] == 30
+        assert [row["user_id"] for row in get_betting_leaderboard("streak")] == ["1", "2"]
+        save_event_bets(1, event_bets)
+        assert process_event_results(1, 1)["status"] == "error"
+    assert db.load_balances()["1"]["balance"] == 40
+    # Данные других пользователей не перезаписывались
+    assert db.load_users_betting_data(["9"])["win_streaks"] == {"9": {"streak": 7, "user_name": "Other"}}
+
+@patch('betting.save_betting_events')
+@patch('betting.load_betting_events')
+def test_process_event_results_sqlite_single_transaction(mock_load_events, mock_save_events,
+                                                         sqlite_betting, balance_ledger):
+    """Тестирует, что в SQLite сбой записи итогов откатывает и выплаты."""
+    import sqlite3
+    db = sqlite_betting
+    mock_load_events.return_value = {"events": [{"id": 1, "options": [{"id": 1}, {"id": 2}]}]}
+    save_event_bets(1, {"bets": {
+        "1": {"user_name": "A", "bets": [{"option_id": 1, "amount": 10}]},
+        "2": {"user_name": "B", "bets": [{"option_id": 2, "amount": 30}]}
+    }})
+    # Сбой между записью выплат и записью отметки в той же транзакции
+    with patch.object(db, '_write_betting_data', side_effect=sqlite3.OperationalError("disk I/O error")):
+        assert process_event_results(1, 1)["status"] == "error"
+    assert db.load_balances() == {}
+    assert not db.is_event_settled(1)
+    assert balance_ledger.get(1) == 0
+    assert get_event_bets(1) != {}
+
+    assert process_event_results(1, 1)["status"] == "success"
+    assert db.load_balances()["1"]["balance"] == 40
+    assert balance_ledger.get(1) == 40
+    assert db.is_event_settled(1)
+
+# --- Тесты для рейтинга /bettop ---
 
 @patch('betting.load_betting_data')
-def test_get_event_bets_success(mock_load):
-    """Тестирует успешное получение ставок для события."""
+def test_get_betting_leaderboard_sorting(mock_load):
+    """Тестирует сортировку рейтинга и отбор игроков для ROI."""
     mock_load.return_value = {
-        "active_bets": {
-            "1": {
-                "123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 100}]},
-                "456": {"user_name": "User2", "bets": [{"option_id": 2, "amount": 50}]}
-            }
+        "win_streaks": {"1": {"streak": 4, "user_name": "A"}, "2": {"streak": 1, "user_name": "B"}},
+        "betting_stats": {
+            "1": {"user_name": "A", "wagered": 100, "won": 120, "events": 5, "wins": 4},
+            "2": {"user_name": "B", "wagered": 100, "won": 300, "events": 3, "wins": 2},
+            "3": {"user_name": "C", "wagered": 10, "won": 50, "events": 1, "wins": 1}
         }
     }
+    assert [row["user_id"] for row in get_betting_leaderboard("streak")] == ["1", "2", "3"]
+    assert [row["user_id"] for row in get_betting_leaderboard("profit", limit=2)] == ["2", "3"]
+    # У C ROI выше, но событий меньше BETTOP_MIN_EVENTS
+    roi = get_betting_leaderboard("roi")
+    assert [row["user_id"] for row in roi] == ["2", "1"]
+    assert roi[0]["roi"] == 2.0 and roi[1]["hit_rate"] == 0.8
+
+# --- Тесты для get_event_bets ---
+
+def test_get_event_bets_success():
+    """Тестирует успешное получение ставок для события."""
+    save_event_bets(1, {"bets": {
+        "123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 100}]},
+        "456": {"user_name": "User2", "bets": [{"option_id": 2, "amount": 50}]}
+    }})
+    save_event_bets(2, {"bets": {"789": {"user_name": "User3", "bets": [{"option_id": 1, "amount": 10}]}}})
     bets = get_event_bets(1)
-    mock_load.assert_called_once()
     assert len(bets) == 2
     assert "123" in bets
     assert "456" in bets
 
-@patch('betting.load_betting_data')
-def test_get_event_bets_event_not_found(mock_load):
+def test_get_event_bets_event_not_found():
     """Тестирует получение ставок для несуществующего события."""
-    mock_load.return_value = {"active_bets": {}}
     bets = get_event_bets(999)
-    mock_load.assert_called_once()
     assert bets == {}
 
 # --- Тесты для get_betting_history ---
 
-@patch('betting.load_betting_data')
-def test_get_betting_history_success(mock_load):
+def test_get_betting_history_success():
     """Тестирует успешное получение истории ставок."""
-    mock_load.return_value = {
-        "history": [
-            {"event_id": 1, "date": "2023-04-10"},
-            {"event_id": 2, "date": "2023-04-09"},
-            {"event_id": 3, "date": "2023-04-08"}
-        ]
-    }
+    append_betting_history([
+        {"event_id": 3, "date": "2023-04-08"},
+        {"event_id": 2, "date": "2023-04-09"},
+        {"event_id": 1, "date": "2023-04-10"}
+    ])
     history = get_betting_history()
-    mock_load.assert_called_once()
     assert len(history) == 3
     assert history[0]["event_id"] == 1  # Самое новое событие должно быть первым
 
-@patch('betting.load_betting_data')
-def test_get_betting_history_with_limit(mock_load):
-    """Тестирует получение истории ставок с ограничением количества."""
-    mock_load.return_value = {
-        "history": [
-            {"event_id": 1, "date": "2023-04-10"},
-            {"event_id": 2, "date": "2023-04-09"},
-            {"event_id": 3, "date": "2023-04-08"},
-            {"event_id": 4, "date": "2023-04-07"},
-            {"event_id": 5, "date": "2023-04-06"}
-        ]
-    }
+def test_get_betting_history_with_limit():
+    """Тестирует получение истории ставок с ограничением количества и смещением."""
+    append_betting_history([{"event_id": i, "date": f"2023-04-{11 - i:02d}"} for i in range(5, 0, -1)])
     history = get_betting_history(limit=2)
-    mock_load.assert_called_once()
-    assert len(history) == 2
-    assert history[0]["event_id"] == 1
-    assert history[1]["event_id"] == 2
+    assert [entry["event_id"] for entry in history] == [1, 2]
+    history = get_betting_history(limit=2, offset=4)
+    assert [entry["event_id"] for entry in history] == [5]
+    assert count_betting_history() == 5
 
 # --- Тесты для get_user_streak ---
 
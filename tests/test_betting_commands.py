@@ -2,6 +2,7 @@ import pytest
 import json
 import sys
 from unittest.mock import patch, MagicMock, AsyncMock
+from telegram import Bot
 
 # Предварительно добавляем патчи для state и других модулей
 sys.modules['state'] = MagicMock(betting_enabled=True)
@@ -14,6 +15,7 @@ try:
         bet_option_callback,
         bet_amount_callback,
         history_command,
+        bettop_command,
         publish_betting_event,
         process_betting_results,
         close_betting_event,
@@ -25,7 +27,10 @@ try:
         betting_callback_handler,  # Добавляем явный импорт для патчирования
         results_command,
         results_callback_handler,
-        get_betting_event_by_id
+        get_betting_event_by_id,
+        delete_temp_messages,
+        schedule_temp_messages_deletion,
+        flush_temp_messages_job
     )
     from betting import process_event_results
 except ImportError as e:
@@ -139,9 +144,10 @@ async def test_bet_command_with_callback_query(mock_load_events):
 # --- Тесты для bet_option_callback ---
 
 @pytest.mark.asyncio
-@patch('handlers.betting_commands.load_betting_events')
+@patch('betting.load_betting_events')
 @patch('handlers.betting_commands.get_balance')
-async def test_bet_option_callback(mock_get_balance, mock_load_events):
+@patch('handlers.betting_commands.get_live_odds', return_value={"1": 4.0, "2": 1.33})
+async def test_bet_option_callback(mock_get_odds, mock_get_balance, mock_load_events):
     """Тест колбэка выбора варианта ставки"""
     # Настраиваем моки
     mock_load_events.return_value = {"events": [
@@ -182,9 +188,13 @@ async def test_bet_option_callback(mock_get_balance, mock_load_events):
     
     # Проверяем, что была отправлена клавиатура с вариантами сумм ставок
     assert context.bot.send_message.called
+    
+    # Проверяем, что показан текущий коэффициент выбранного варианта
+    mock_get_odds.assert_called_once_with("1")
+    assert "x1.33" in context.bot.send_message.call_args.kwargs["text"]
 
 @pytest.mark.asyncio
-@patch('handlers.betting_commands.load_betting_events')
+@patch('betting.load_betting_events')
 async def test_bet_option_callback_inactive_event(mock_load_events):
     """Тест колбэка выбора варианта для неактивного события"""
     # Настраиваем моки
@@ -218,7 +228,7 @@ async def test_bet_option_callback_inactive_event(mock_load_events):
 
 @pytest.mark.asyncio
 @patch('handlers.betting_commands.place_bet')
-@patch('handlers.betting_commands.load_betting_events')
+@patch('betting.load_betting_events')
 async def test_bet_amount_callback(mock_load_events, mock_place_bet):
     """Тест колбэка выбора суммы ставки"""
     # Настраиваем моки для функций
@@ -261,10 +271,15 @@ async def test_bet_amount_callback(mock_load_events, mock_place_bet):
     context.bot.send_message.assert_awaited_once()
     args, kwargs = context.bot.send_message.await_args
     assert "ставка принята".lower() in kwargs["text"].lower() or "ставка" in kwargs["text"].lower()
+    
+    # Временные сообщения не удаляются сразу, а ставятся в очередь чата
+    context.bot.delete_message.assert_not_awaited()
+    context.job_queue.run_once.assert_called_once()
+    assert context.job_queue.run_once.call_args.kwargs["data"] == {"chat_id": 123}
 
 @pytest.mark.asyncio
 @patch('handlers.betting_commands.place_bet')
-@patch('handlers.betting_commands.load_betting_events')
+@patch('betting.load_betting_events')
 async def test_bet_amount_callback_failed(mock_load_events, mock_place_bet):
     """Тест колбэка выбора суммы ставки с ошибкой размещения"""
     # Настраиваем моки для функций
@@ -308,11 +323,65 @@ async def test_bet_amount_callback_failed(mock_load_events, mock_place_bet):
     assert kwargs.get("show_alert", False) is True, "show_alert не установлен в True"
     assert "не удалось" in kwargs.get("text", "").lower() or "невозможно" in kwargs.get("text", "").lower() or "ошибка" in kwargs.get("text", "").lower(), f"Сообщение об ошибке не найдено в тексте: {kwargs.get('text', '')}"
 
+# --- Тесты для удаления временных сообщений ---
+
+@pytest.mark.asyncio
+async def test_temp_messages_batched_per_chat():
+    """Тест накопления временных сообщений чата и удаления одной пачкой"""
+    context = MagicMock()
+    context.bot = AsyncMock(spec=Bot)
+    schedule_temp_messages_deletion(context, 123, [5, 3])
+    schedule_temp_messages_deletion(context, 123, [7])
+    schedule_temp_messages_deletion(context, 456, [1])
+    # Одна задача на чат
+    assert context.job_queue.run_once.call_count == 2
+    
+    context.job.data = {"chat_id": 123}
+    await flush_temp_messages_job(context)
+    context.bot._post.assert_awaited_once_with("deleteMessages", {"chat_id": 123, "message_ids": [3, 5, 7]})
+    context.bot.delete_message.assert_not_awaited()
+    
+    # После удаления новое сообщение чата запускает новую задачу
+    schedule_temp_messages_deletion(context, 123, [8])
+    assert context.job_queue.run_once.call_count == 3
+
+def test_temp_messages_not_queued_without_job(temp_messages):
+    """Тест: если задачу удаления запланировать не удалось, сообщения не остаются в очереди"""
+    context = MagicMock()
+    context.job_queue = None
+    schedule_temp_messages_deletion(context, 123, [1])
+    assert temp_messages == {}
+    
+    context.job_queue = MagicMock()
+    context.job_queue.run_once.side_effect = RuntimeError("scheduler stopped")
+    schedule_temp_messages_deletion(context, 123, [2])
+    assert temp_messages == {}
+    
+    # Следующая попытка снова планирует задачу
+    context.job_queue.run_once.side_effect = None
+    schedule_temp_messages_deletion(context, 123, [3])
+    assert context.job_queue.run_once.call_count == 2
+    assert temp_messages == {123: {3}}
+
+@pytest.mark.asyncio
+async def test_delete_temp_messages_fallback():
+    """Тест удаления по одному сообщению, если пакетное удаление не удалось"""
+    context = MagicMock()
+    context.bot = AsyncMock(spec=Bot)
+    context.bot._post.side_effect = [None, Exception("Bad Request")]
+    # Пачки по 100 сообщений: первая удалена одним запросом, вторая - по одному
+    await delete_temp_messages(context, list(range(150)), 123)
+    assert [c.args[1]["message_ids"] for c in context.bot._post.await_args_list] == [
+        list(range(100)), list(range(100, 150))
+    ]
+    assert [c.kwargs["message_id"] for c in context.bot.delete_message.await_args_list] == list(range(100, 150))
+
 # --- Тесты для history_command ---
 
 @pytest.mark.asyncio
+@patch('handlers.betting_commands.count_betting_history', return_value=1)
 @patch('handlers.betting_commands.get_betting_history')
-async def test_history_command_with_data(mock_get_history):
+async def test_history_command_with_data(mock_get_history, mock_count):
     """Тест команды /history с данными истории"""
     # Настраиваем моки
     mock_get_history.return_value = [
@@ -374,6 +443,86 @@ async def test_history_command_empty(mock_get_history):
     assert kwargs["chat_id"] == 123
     assert ("пуста".lower() in kwargs["text"].lower() or "история".lower() in kwargs["text"].lower())
 
+@pytest.mark.asyncio
+@patch('handlers.betting_commands.count_betting_history', return_value=12)
+@patch('handlers.betting_commands.get_betting_history')
+async def test_history_command_pages(mock_get_history, mock_count):
+    """Тест постраничного вывода /history: номер страницы из команды и кнопки переходов"""
+    mock_get_history.return_value = [{"event_id": 6, "description": "Событие 6", "date": "2023-04-06"}]
+    
+    update = MagicMock()
+    context = MagicMock()
+    context.bot = AsyncMock()
+    context.args = ["2"]
+    update.effective_chat.id = 123
+    update.callback_query = None
+    
+    await history_command(update, context)
+    
+    # Читается только вторая страница
+    mock_get_history.assert_called_once_with(limit=5, offset=5)
+    kwargs = context.bot.send_message.await_args.kwargs
+    assert "страница 2/3" in kwargs["text"]
+    buttons = kwargs["reply_markup"].inline_keyboard[0]
+    assert [b.callback_data for b in buttons] == ["history_betting_1", "history_betting_3"]
+    
+    # Переход по кнопке "Старее" на последнюю страницу
+    query = AsyncMock()
+    query.data = "history_betting_3"
+    update.callback_query = query
+    mock_get_history.reset_mock()
+    await history_command(update, context)
+    mock_get_history.assert_called_once_with(limit=5, offset=10)
+    buttons = query.edit_message_text.await_args.kwargs["reply_markup"].inline_keyboard[0]
+    assert [b.callback_data for b in buttons] == ["history_betting_2"]
+
+# --- Тесты для bettop_command ---
+
+@pytest.mark.asyncio
+@patch('handlers.betting_commands.get_user_betting_stats')
+@patch('handlers.betting_commands.get_betting_leaderboard')
+async def test_bettop_command(mock_leaderboard, mock_user_stats):
+    """Тест команды /bettop: рейтинг по прибыли и строка вызвавшего"""
+    row = {"user_id": "1", "user_name": "Alice", "streak": 2, "profit": 150, "roi": 0.5,
+           "events": 4, "wins": 3, "hit_rate": 0.75}
+    mock_leaderboard.return_value = [row]
+    mock_user_stats.return_value = {**row, "user_id": "7", "profit": -20, "events": 2, "wins": 0, "hit_rate": 0.0}
+    
+    update = MagicMock()
+    context = MagicMock()
+    context.bot = AsyncMock()
+    context.args = ["profit"]
+    update.effective_chat.id = 123
+    update.effective_user.id = 7
+    
+    await bettop_command(update, context)
+    
+    mock_leaderboard.assert_called_once_with(sort_by="profit", limit=10)
+    mock_user_stats.assert_called_once_with(7)
+    text = context.bot.send_message.await_args.kwargs["text"]
+    assert "🥇 Alice: +150 💵 | угадано 3/4 (75%)" in text
+    assert "Вы: -20 💵" in text
+
+@pytest.mark.asyncio
+@patch('handlers.betting_commands.get_betting_leaderboard')
+async def test_bettop_command_invalid_and_empty(mock_leaderboard):
+    """Тест команды /bettop с неизвестным аргументом и пустым рейтингом"""
+    mock_leaderboard.return_value = []
+    update = MagicMock()
+    context = MagicMock()
+    context.bot = AsyncMock()
+    update.effective_chat.id = 123
+    
+    context.args = ["abc"]
+    await bettop_command(update, context)
+    assert "/bettop [streak|profit|roi]" in context.bot.send_message.await_args.kwargs["text"]
+    mock_leaderboard.assert_not_called()
+    
+    context.args = []
+    await bettop_command(update, context)
+    mock_leaderboard.assert_called_once_with(sort_by="streak", limit=10)
+    assert "пуст" in context.bot.send_message.await_args.kwargs["text"]
+
 # --- Тесты для publish_betting_event ---
 
 @pytest.mark.asyncio
@@ -531,6 +680,32 @@ async def test_process_betting_results_event_not_found():
         # Проверяем, что было отправлено предупреждение администраторам
         assert context.application.bot.send_message.called
 
+@pytest.mark.asyncio
+async def test_process_betting_results_only_own_slot():
+    """Тест подведения итогов только для событий своего окна ставок"""
+    context = MagicMock()
+    context.bot = AsyncMock()
+    context.job = MagicMock()
+    context.job.data = {"slot": 1}
+    context.application = MagicMock()
+    context.application.bot = context.bot
+    
+    base = {"is_active": False, "winner_option_id": 1, "results_published": False,
+            "options": [{"id": 1, "text": "Вариант 1"}]}
+    events = [
+        {**base, "id": 1},                     # опубликовано до появления окон - первое окно
+        {**base, "id": 2, "betting_slot": 0},
+        {**base, "id": 3, "betting_slot": 1},
+    ]
+    with patch('betting.load_betting_events', return_value={"events": events}), \
+         patch('betting.process_event_results', return_value={"status": "success"}) as mock_process_results, \
+         patch.dict('sys.modules', {'state': MagicMock(betting_enabled=True)}), \
+         patch('config.POST_CHAT_ID', 123), \
+         patch('config.ADMIN_GROUP_ID', 456):
+        await process_betting_results(context)
+        
+        mock_process_results.assert_called_once_with(3, 1)
+
 # --- Тесты для close_betting_event ---
 
 @pytest.mark.asyncio
@@ -539,25 +714,23 @@ async def test_close_betting_event():
     # Создаем мок для контекста
     context = MagicMock()
     context.job = MagicMock()
-    context.job.data = {"event_id": 1}
+    context.job.data = {"slot": 1}
     context.application = MagicMock()
     
     # Используем патч внутри теста
     with patch('betting.load_betting_events') as mock_load_events, \
-         patch('betting.save_betting_events') as mock_save_events, \
-         patch('betting.publish_event') as mock_publish_event, \
-         patch('handlers.betting_commands.publish_event', mock_publish_event), \
+         patch('betting.close_event') as mock_close_event, \
+         patch('handlers.betting_commands.close_event', mock_close_event), \
          patch.dict('sys.modules', {'state': MagicMock(betting_enabled=True)}):
          
-        # Настраиваем моки
-        event = {
-            "id": 1,
-            "description": "Тестовое событие",
-            "is_active": True,  # Событие должно быть активным
-            "results_published": False
-        }
-        mock_load_events.return_value = {"events": [event]}
-        mock_publish_event.return_value = True
+        # Настраиваем моки: ещё не опубликованное событие, открытое событие
+        # другого окна и открытое событие окна задачи
+        mock_load_events.return_value = {"events": [
+            {"id": 1, "is_active": True},
+            {"id": 2, "is_active": False, "betting_open": True, "betting_slot": 0},
+            {"id": 3, "is_active": False, "betting_open": True, "betting_slot": 1},
+        ]}
+        mock_close_event.return_value = True
         
         # Вызываем тестируемую функцию
         await close_betting_event(context)
@@ -565,8 +738,62 @@ async def test_close_betting_event():
         # Проверяем, что load_betting_events был вызван
         assert mock_load_events.called
         
-        # Проверяем, что publish_event был вызван с правильным ID
-        mock_publish_event.assert_called_once_with(1)
+        # Закрывается только открытое событие окна задачи
+        mock_close_event.assert_called_once_with(3)
+
+@pytest.mark.asyncio
+async def test_publish_close_results_sequence(tmp_path):
+    """Тест полного цикла окна ставок: публикация, приём ставок, закрытие и итоги"""
+    events_file = tmp_path / "betting_events.json"
+    events_file.write_text(json.dumps({"events": [
+        {"id": 7, "description": "Событие", "question": "Кто победит?", "is_active": True,
+         "winner_option_id": 1, "results_published": False,
+         "options": [{"id": 1, "text": "Вариант 1"}, {"id": 2, "text": "Вариант 2"}]}
+    ]}), encoding="utf-8")
+
+    def job_context():
+        context = MagicMock()
+        context.job.data = {"slot": 0}
+        context.application.bot = AsyncMock()
+        return context
+
+    def option_update():
+        update = MagicMock()
+        update.callback_query = AsyncMock()
+        update.callback_query.data = "bet_option_7_1"
+        update.effective_user.id = 1
+        update.effective_chat.id = 123
+        return update
+
+    with patch('betting.BETTING_EVENTS_FILE', str(events_file)), \
+         patch('handlers.betting_commands.get_balance', return_value=100), \
+         patch.dict('sys.modules', {'state': MagicMock(betting_enabled=True)}), \
+         patch('config.schedule_config', {"betting": {}}):
+        import betting
+
+        await publish_betting_event(job_context())
+        event = betting.get_betting_event(7)
+        assert event["betting_open"] is True and event["betting_slot"] == 0
+
+        # Ставки на опубликованное событие принимаются
+        context = MagicMock()
+        context.bot = AsyncMock()
+        context.user_data = {}
+        await bet_option_callback(option_update(), context)
+        assert context.user_data["bet_event_id"] == "7"
+
+        # Задача закрытия окна закрывает приём ставок
+        await close_betting_event(job_context())
+        assert betting.get_betting_event(7)["betting_open"] is False
+        update = option_update()
+        await bet_option_callback(update, MagicMock())
+        assert "не активно" in update.callback_query.answer.await_args.kwargs["text"]
+
+        # Итоги подводятся по закрытому событию окна
+        results_context = job_context()
+        await process_betting_results(results_context)
+        assert betting.get_betting_event(7)["results_published"] is True
+        assert "РЕЗУЛЬТАТЫ" in results_context.application.bot.send_message.await_args.kwargs["text"]
 
 @pytest.mark.asyncio
 async def test_close_betting_event_not_found():
@@ -0,0 +1,108 @@
+import pytest
+import json
+import os
+from unittest.mock import patch
+
+try:
+    from betting_history import BettingHistoryLog, INDEX_FILE_NAME
+except ImportError:
+    pytest.skip("Пропуск тестов betting_history: не удалось импортировать модуль betting_history.", allow_module_level=True)
+
+@pytest.fixture
+def log_dir(tmp_path):
+    return str(tmp_path / "history")
+
+def entries(start, stop):
+    return [{"event_id": i} for i in range(start, stop)]
+
+def ids(records):
+    return [record["event_id"] for record in records]
+
+def test_append_and_read_pages(log_dir):
+    """Тестирует чтение страниц от новых записей к старым через границы сегментов."""
+    log = BettingHistoryLog(log_dir, segment_size=3)
+    assert log.append(entries(1, 8)) is True
+    assert log.count() == 7
+    assert sorted(name for name in os.listdir(log_dir) if name.endswith(".jsonl")) == [
+        "segment_00001.jsonl", "segment_00002.jsonl", "segment_00003.jsonl"
+    ]
+    assert ids(log.read(0, 2)) == [7, 6]
+    assert ids(log.read(2, 3)) == [5, 4, 3]
+    assert ids(log.read(5, 5)) == [2, 1]
+    assert log.read(10, 5) == []
+
+def test_read_opens_needed_segment(log_dir):
+    """Тестирует, что страница читается только из нужного сегмента."""
+    log = BettingHistoryLog(log_dir, segment_size=2)
+    log.append(entries(1, 7))
+    opened = []
+    real_open = open
+    def tracking_open(path, *args, **kwargs):
+        opened.append(os.path.basename(path))
+        return real_open(path, *args, **kwargs)
+    with patch('builtins.open', side_effect=tracking_open):
+        assert ids(log.read(0, 2)) == [6, 5]
+    assert opened == ["segment_00003.jsonl"]
+
+def test_index_persisted_between_instances(log_dir):
+    """Тестирует, что новый экземпляр использует сохранённый индекс."""
+    BettingHistoryLog(log_dir, segment_size=3).append(entries(1, 5))
+    reopened = BettingHistoryLog(log_dir, segment_size=3)
+    with patch.object(BettingHistoryLog, '_scan_segment') as mock_scan:
+        assert reopened.count() == 4
+    mock_scan.assert_not_called()
+    reopened.append(entries(5, 6))
+    assert ids(BettingHistoryLog(log_dir).read(0, 2)) == [5, 4]
+
+def test_index_keeps_segment_totals(log_dir):
+    """Тестирует, что индекс хранит только число записей и размер сегментов, а не смещения строк."""
+    BettingHistoryLog(log_dir, segment_size=3).append(entries(1, 5))
+    with open(os.path.join(log_dir, INDEX_FILE_NAME), encoding="utf-8") as f:
+        segments = json.load(f)["segments"]
+    assert segments == [
+        {"file": "segment_00001.jsonl", "count": 3,
+         "size": os.path.getsize(os.path.join(log_dir, "segment_00001.jsonl"))},
+        {"file": "segment_00002.jsonl", "count": 1,
+         "size": os.path.getsize(os.path.join(log_dir, "segment_00002.jsonl"))}
+    ]
+
+def test_legacy_offsets_index_rebuilt(log_dir):
+    """Тестирует пересчёт индекса старого формата со смещениями строк."""
+    BettingHistoryLog(log_dir).append(entries(1, 3))
+    segment_path = os.path.join(log_dir, "segment_00001.jsonl")
+    with open(os.path.join(log_dir, INDEX_FILE_NAME), "w", encoding="utf-8") as f:
+        json.dump({"segments": [{"file": "segment_00001.jsonl", "offsets": [0, 16],
+                                 "size": os.path.getsize(segment_path)}]}, f)
+    log = BettingHistoryLog(log_dir)
+    assert log.count() == 2
+    assert ids(log.read(0, 5)) == [2, 1]
+
+def test_index_rebuilt_when_stale(log_dir):
+    """Тестирует пересчёт индекса, если он отстал от сегментов или удалён."""
+    log = BettingHistoryLog(log_dir)
+    log.append(entries(1, 3))
+    # Запись попала в сегмент, но индекс не обновился (сбой между записями)
+    with open(os.path.join(log_dir, "segment_00001.jsonl"), "a", encoding="utf-8") as f:
+        f.write(json.dumps({"event_id": 3}) + "\n")
+    assert ids(BettingHistoryLog(log_dir).read(0, 5)) == [3, 2, 1]
+
+    os.remove(os.path.join(log_dir, INDEX_FILE_NAME))
+    assert BettingHistoryLog(log_dir).count() == 3
+
+def test_partial_line_discarded(log_dir):
+    """Тестирует отбрасывание недописанной последней записи."""
+    log = BettingHistoryLog(log_dir)
+    log.append(entries(1, 3))
+    with open(os.path.join(log_dir, "segment_00001.jsonl"), "a", encoding="utf-8") as f:
+        f.write('{"event_id": 9')
+    reopened = BettingHistoryLog(log_dir)
+    assert reopened.count() == 2
+    reopened.append(entries(3, 4))
+    assert ids(BettingHistoryLog(log_dir).read(0, 5)) == [3, 2, 1]
+
+def test_empty_log(log_dir):
+    """Тестирует пустой журнал: каталог не создаётся при чтении."""
+    log = BettingHistoryLog(log_dir)
+    assert log.count() == 0
+    assert log.read() == []
+    assert not os.path.exists(log_dir)
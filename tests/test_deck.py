@@ -0,0 +1,96 @@
+import pytest
+import json
+from unittest.mock import MagicMock
+
+try:
+    from deck import ShuffledDeck, RecyclableDeck
+    from docstore import file_signature
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов deck: не удалось импортировать модуль ({e}).", allow_module_level=True)
+
+@pytest.fixture
+def bank(tmp_path):
+    """Файл банка с элементами 0..9."""
+    path = tmp_path / "bank.json"
+    path.write_text(json.dumps(list(range(10))), encoding="utf-8")
+    return path
+
+def make_deck(tmp_path, bank):
+    load = MagicMock(side_effect=lambda: json.loads(bank.read_text(encoding="utf-8")))
+    deck = ShuffledDeck(str(tmp_path / "deck.json"), load, lambda: file_signature(str(bank)))
+    return deck, load
+
+def test_deal_without_repeats(tmp_path, bank):
+    """Колода выдаёт все элементы по одному разу, не изменяя файл банка"""
+    deck, load = make_deck(tmp_path, bank)
+    content = bank.read_text(encoding="utf-8")
+    dealt = [deck.deal() for _ in range(10)]
+    assert sorted(dealt) == list(range(10))
+    assert deck.deal() is None and deck.remaining() == 0
+    assert bank.read_text(encoding="utf-8") == content
+    # Банк читается один раз
+    load.assert_called_once()
+
+def test_peek_does_not_advance(tmp_path, bank):
+    """Просмотр следующего элемента не сдвигает курсор"""
+    deck, _ = make_deck(tmp_path, bank)
+    assert deck.deal(advance=False) == deck.deal(advance=False) == deck.deal()
+    assert deck.remaining() == 9
+
+def test_state_persisted_between_instances(tmp_path, bank, doc_store):
+    """Новая колода продолжает с сохранённого курсора, а остаток считается без чтения банка"""
+    deck, _ = make_deck(tmp_path, bank)
+    first = [deck.deal() for _ in range(4)]
+    doc_store.flush_all()
+    state = json.loads((tmp_path / "deck.json").read_text(encoding="utf-8"))
+    assert state["cursor"] == 4 and state["size"] == 10
+
+    restored, load = make_deck(tmp_path, bank)
+    assert restored.remaining() == 6
+    load.assert_not_called()
+    rest = [restored.deal() for _ in range(6)]
+    assert sorted(first + rest) == list(range(10))
+
+def test_deal_flushes_state(tmp_path, bank, doc_store):
+    """Курсор сохраняется на диск сразу после выдачи, без отложенной записи"""
+    deck, _ = make_deck(tmp_path, bank)
+    deck.deal()
+    deck.deal(advance=False)
+    state = json.loads((tmp_path / "deck.json").read_text(encoding="utf-8"))
+    assert state["cursor"] == 1
+    assert json.loads((tmp_path / "deck_consumed.json").read_text(encoding="utf-8")) == []
+
+def test_appended_bank_keeps_dealt(tmp_path, bank):
+    """Дописанные в банк элементы попадают в колоду, выданные не повторяются"""
+    deck, _ = make_deck(tmp_path, bank)
+    first = [deck.deal() for _ in range(3)]
+    bank.write_text(json.dumps(list(range(15))), encoding="utf-8")
+    assert deck.remaining() == 12
+    rest = [deck.deal() for _ in range(12)]
+    assert sorted(first + rest) == list(range(15))
+
+def test_shorter_bank_restarts(tmp_path, bank):
+    """Если банк заменили более коротким, колода начинается заново"""
+    deck, _ = make_deck(tmp_path, bank)
+    deck.deal()
+    bank.write_text(json.dumps(["a", "b"]), encoding="utf-8")
+    assert deck.remaining() == 2
+    assert sorted([deck.deal(), deck.deal()]) == ["a", "b"]
+
+def test_recyclable_deck_rounds(tmp_path):
+    """Повторная раздача начинается только в режиме recycle, номер круга пишется в журнал"""
+    used = tmp_path / "used.jsonl"
+    deck = RecyclableDeck(str(used), lambda: ["a", "b", "a"], lambda: None)
+    assert deck.remaining() == 2
+    first = [deck.deal(), deck.deal()]
+    assert deck.deal() is None
+    second = [deck.deal(recycle=True, min_gap=1), deck.deal(recycle=True)]
+    assert sorted(first) == sorted(second) == ["a", "b"]
+    # Промежуток 1: последний выданный элемент не открывает новый круг
+    assert second[0] != first[-1]
+    rounds = [json.loads(line)["round"] for line in used.read_text(encoding="utf-8").splitlines()]
+    assert rounds == [0, 0, 1, 1]
+
+    restored = RecyclableDeck(str(used), lambda: ["a", "b"], lambda: None)
+    assert restored.remaining() == 0
+    assert restored.deal(recycle=True) in ("a", "b")
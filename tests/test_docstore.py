@@ -0,0 +1,158 @@
+import pytest
+import json
+import os
+from unittest.mock import patch
+
+try:
+    import docstore
+    from docstore import JsonDocumentStore, read_json, write_json, flush_all
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов docstore: не удалось импортировать модуль docstore ({e}).", allow_module_level=True)
+
+@pytest.fixture
+def store():
+    store = JsonDocumentStore(flush_delay=3600)
+    yield store
+    if store._timer is not None:
+        store._timer.cancel()
+
+def test_read_missing_file_returns_default_copy(store, tmp_path):
+    """Тест чтения отсутствующего файла: возвращается копия значения по умолчанию"""
+    default = {"events": []}
+    data = store.read(tmp_path / "missing.json", default)
+    assert data == default
+    data["events"].append(1)
+    assert default == {"events": []}
+
+def test_read_is_cached_until_file_changes(store, tmp_path):
+    """Тест кэширования: файл перечитывается только после изменения"""
+    path = tmp_path / "doc.json"
+    path.write_text('{"a": 1}', encoding="utf-8")
+    assert store.read(path) == {"a": 1}
+
+    with patch('builtins.open') as mock_open_func:
+        assert store.read(path) == {"a": 1}
+    mock_open_func.assert_not_called()
+
+    # Файл изменён вручную - документ перечитывается
+    path.write_text('{"a": 22}', encoding="utf-8")
+    assert store.read(path) == {"a": 22}
+
+def test_read_returns_copy(store, tmp_path):
+    """Тест, что изменение прочитанного документа не меняет кэш"""
+    path = tmp_path / "doc.json"
+    path.write_text('{"items": [1]}', encoding="utf-8")
+    store.read(path)["items"].append(2)
+    assert store.read(path) == {"items": [1]}
+
+def test_read_invalid_json_raises(store, tmp_path):
+    """Тест чтения файла с невалидным JSON"""
+    path = tmp_path / "doc.json"
+    path.write_text('invalid json', encoding="utf-8")
+    with pytest.raises(json.JSONDecodeError):
+        store.read(path)
+
+def test_write_is_deferred_and_coalesced(store, tmp_path):
+    """Тест отложенной записи: несколько изменений записываются одной записью"""
+    path = tmp_path / "sub" / "doc.json"
+    for i in range(5):
+        store.write(path, {"count": i})
+    assert not path.exists()
+    assert store.read(path) == {"count": 4}
+
+    with patch.object(JsonDocumentStore, '_write_file', wraps=store._write_file) as mock_write:
+        assert store.flush_all() is True
+    mock_write.assert_called_once()
+    assert json.loads(path.read_text(encoding="utf-8")) == {"count": 4}
+    assert not os.path.exists(str(path) + ".tmp")
+
+def test_write_stores_copy(store, tmp_path):
+    """Тест, что изменения документа после write() не попадают в хранилище"""
+    path = tmp_path / "doc.json"
+    data = {"items": [1]}
+    store.write(path, data)
+    data["items"].append(2)
+    assert store.read(path) == {"items": [1]}
+
+def test_own_write_does_not_invalidate_cache(store, tmp_path):
+    """Тест, что после записи документ не перечитывается с диска"""
+    path = tmp_path / "doc.json"
+    store.write(path, {"a": 1})
+    store.flush_all()
+    with patch('builtins.open') as mock_open_func:
+        assert store.read(path) == {"a": 1}
+    mock_open_func.assert_not_called()
+
+def test_flush_failure_keeps_changes(store, tmp_path):
+    """Тест ошибки записи: старый файл не повреждается, изменения остаются для повторной записи"""
+    path = tmp_path / "doc.json"
+    path.write_text('{"a": 1}', encoding="utf-8")
+    store.write(path, {"a": 2})
+    with patch('docstore.os.replace', side_effect=OSError("disk full")):
+        assert store.flush_all() is False
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 1}
+    assert store.read(path) == {"a": 2}
+
+    assert store.flush_all() is True
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 2}
+
+def test_flush_unserializable_document(store, tmp_path):
+    """Тест документа, который нельзя сериализовать: он отбрасывается с ошибкой в логе"""
+    path = tmp_path / "doc.json"
+    store.write(path, {"a": object()})
+    with patch('logging.error') as mock_log_error:
+        assert store.flush_all() is False
+    mock_log_error.assert_called_once()
+    assert not path.exists()
+    assert store.flush_all() is True
+
+def test_debounced_flush_timer(tmp_path):
+    """Тест, что изменения записываются по таймеру без явного flush_all()"""
+    store = JsonDocumentStore(flush_delay=0.01)
+    path = tmp_path / "doc.json"
+    store.write(path, {"a": 1})
+    store._timer.join(1)
+    assert json.loads(path.read_text(encoding="utf-8")) == {"a": 1}
+
+def test_read_lines_cached(store, tmp_path):
+    """Тест чтения текстового файла по строкам с кэшированием"""
+    path = tmp_path / "phrases.txt"
+    assert store.read_lines(path) == []
+    path.write_text("Раз\n\n  Два  \n", encoding="utf-8")
+    assert store.read_lines(path) == ["Раз", "Два"]
+    with patch('builtins.open') as mock_open_func:
+        assert store.read_lines(path) == ["Раз", "Два"]
+    mock_open_func.assert_not_called()
+
+def test_module_functions_use_shared_store(doc_store, tmp_path):
+    """Тест функций модуля: они работают через общее хранилище"""
+    path = tmp_path / "doc.json"
+    write_json(path, [1, 2])
+    assert read_json(path) == [1, 2]
+    assert flush_all() is True
+    assert json.loads(path.read_text(encoding="utf-8")) == [1, 2]
+
+def test_delete_drops_pending_changes(store, tmp_path):
+    """Тестирует удаление документа: файл удаляется, несохранённые изменения не записываются."""
+    path = tmp_path / "doc.json"
+    path.write_text('{"a": 1}', encoding="utf-8")
+    store.write(str(path), {"a": 2})
+    store.delete(str(path))
+    assert not path.exists()
+    assert store.flush_all() is True
+    assert not path.exists()
+    assert store.read(str(path), {}) == {}
+    # Удаление отсутствующего документа не считается ошибкой
+    store.delete(str(tmp_path / "missing.json"))
+
+def test_list_documents_includes_pending(store, tmp_path):
+    """Тестирует список документов каталога: учитываются и ещё не записанные на диск."""
+    (tmp_path / "event_1.json").write_text("{}", encoding="utf-8")
+    (tmp_path / "other.txt").write_text("", encoding="utf-8")
+    store.write(str(tmp_path / "event_2.json"), {})
+    assert store.list_documents(str(tmp_path), prefix="event_") == [
+        str(tmp_path / "event_1.json"), str(tmp_path / "event_2.json")
+    ]
+    store.delete(str(tmp_path / "event_2.json"))
+    assert store.list_documents(str(tmp_path), prefix="event_") == [str(tmp_path / "event_1.json")]
+    assert store.list_documents(str(tmp_path / "missing")) == []
@@ -0,0 +1,95 @@
+import pytest
+import json
+from unittest.mock import patch
+
+try:
+    import kvstate
+    from kvstate import KeyValueState, kv_get, kv_set, kv_update, kv_incr
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов kvstate: не удалось импортировать модуль kvstate ({e}).", allow_module_level=True)
+
+def read_file(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+def test_get_set_incr(tmp_path, doc_store):
+    """Тест основных операций и записи всех значений в один файл"""
+    kv = KeyValueState(str(tmp_path / "state.json"), legacy_files={})
+    assert kv.get("morning_index") is None
+    assert kv.get("morning_index", 0) == 0
+
+    kv.set("morning_index", 2)
+    assert kv.incr("weekly_quiz_count") == 1
+    assert kv.incr("weekly_quiz_count", 5) == 6
+    kv.update({"quiz_enabled": False, "praise_index": 7})
+
+    assert kv.get("morning_index") == 2
+    doc_store.flush_all()
+    assert read_file(kv.path) == {
+        "morning_index": 2,
+        "weekly_quiz_count": 6,
+        "quiz_enabled": False,
+        "praise_index": 7
+    }
+
+def test_changes_are_coalesced(tmp_path, doc_store):
+    """Тест, что серия изменений записывается на диск одной записью"""
+    kv = KeyValueState(str(tmp_path / "state.json"), legacy_files={})
+    for _ in range(10):
+        kv.incr("sleep_index")
+    with patch.object(type(doc_store), '_write_file', wraps=doc_store._write_file) as mock_write:
+        doc_store.flush_all()
+    mock_write.assert_called_once()
+    assert read_file(kv.path) == {"sleep_index": 10}
+
+def test_loads_existing_file(tmp_path):
+    """Тест загрузки значений, сохранённых предыдущим запуском"""
+    path = tmp_path / "state.json"
+    path.write_text('{"autopost_enabled": false, "morning_index": 4}', encoding="utf-8")
+    kv = KeyValueState(str(path), legacy_files={})
+    assert kv.get("autopost_enabled") is False
+    assert kv.get("morning_index") == 4
+
+def test_invalid_file_starts_empty(tmp_path):
+    """Тест повреждённого файла состояния: используются значения по умолчанию"""
+    path = tmp_path / "state.json"
+    path.write_text('invalid json', encoding="utf-8")
+    kv = KeyValueState(str(path), legacy_files={})
+    with patch('logging.error') as mock_log_error:
+        assert kv.get("morning_index", 0) == 0
+    mock_log_error.assert_called_once()
+
+def test_migrates_legacy_files(tmp_path, doc_store):
+    """Тест переноса значений из старых отдельных файлов"""
+    (tmp_path / "morning_index.json").write_text('{"morning_index": 3}', encoding="utf-8")
+    (tmp_path / "weekly_quiz_count.json").write_text('{"count": 9}', encoding="utf-8")
+    (tmp_path / "state.json").write_text('{"betting_enabled": false, "sleep_index": 1}', encoding="utf-8")
+    legacy_files = {
+        "morning_index": (str(tmp_path / "morning_index.json"), "morning_index"),
+        "sleep_index": (str(tmp_path / "sleep_index_old.json"), "sleep_index"),
+        "weekly_quiz_count": (str(tmp_path / "weekly_quiz_count.json"), "count"),
+        "praise_index": (str(tmp_path / "missing.json"), "praise_index"),
+    }
+    (tmp_path / "sleep_index_old.json").write_text('{"sleep_index": 8}', encoding="utf-8")
+
+    kv = KeyValueState(str(tmp_path / "state.json"), legacy_files=legacy_files)
+    assert kv.get("morning_index") == 3
+    assert kv.get("weekly_quiz_count") == 9
+    assert kv.get("sleep_index") == 1  # Значение из нового файла важнее старого
+    assert kv.get("praise_index") is None
+
+    doc_store.flush_all()
+    assert read_file(kv.path) == {
+        "betting_enabled": False,
+        "sleep_index": 1,
+        "morning_index": 3,
+        "weekly_quiz_count": 9
+    }
+
+def test_module_functions(kv_state):
+    """Тест функций модуля: они работают с общим хранилищем"""
+    kv_set("a", 1)
+    kv_update({"b": 2})
+    assert kv_incr("a", 2) == 3
+    assert kv_get("b") == 2
+    assert kv_state.get("a") == 3
@@ -8,11 +8,11 @@ from unittest.mock import patch, mock_open, MagicMock, AsyncMock, call, ANY
 try:
     import quiz
     from quiz import (
-        load_weekly_quiz_count, save_weekly_quiz_count, WEEKLY_COUNT_FILE,
+        load_weekly_quiz_count, save_weekly_quiz_count,
         load_quiz_questions, save_quiz_questions, QUIZ_FILE,
         load_rating, save_rating, RATING_FILE,
         load_praises, PRAISES_FILE,
-        load_praise_index, save_praise_index, PRAISE_INDEX_FILE,
+        load_praise_index, save_praise_index,
         get_random_question,
         get_next_praise,
         quiz_post_callback,
@@ -22,7 +22,6 @@ try:
         count_quiz_questions,
         start_quiz_command,
         stop_quiz_command,
-        ACTIVE_QUIZZES, # Импортируем для очистки/проверки
     )
     # Импортируем зависимости для мокирования
     import state
@@ -32,10 +31,9 @@ try:
 except ImportError as e:
     pytest.skip(f"Пропуск тестов quiz: не удалось импортировать модуль quiz или его зависимости ({e}).", allow_module_level=True)
 
-# Фикстура для очистки ACTIVE_QUIZZES перед каждым тестом
+# Фикстура подготовки состояния перед каждым тестом (реестр опросов подменяет conftest)
 @pytest.fixture(autouse=True)
 def clear_active_quizzes():
-    ACTIVE_QUIZZES.clear()
     # Устанавливаем режим теста, чтобы не модифицировать реальные файлы данных
     state.is_test_mode = True
     # Также сбрасываем состояние, используемое в тестах
@@ -55,24 +53,19 @@ def clear_active_quizzes():
 
 # --- Тесты файловых операций --- (Упрощенные примеры, аналогично balance/state)
 
-@patch('os.path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data='{"count": 5}')
-def test_load_weekly_quiz_count_success(mock_file, mock_exists):
-    assert load_weekly_quiz_count() == 5
-    mock_exists.assert_called_once_with(WEEKLY_COUNT_FILE)
-    mock_file.assert_called_once_with(WEEKLY_COUNT_FILE, "r", encoding="utf-8")
-
-@patch('os.path.exists', return_value=False)
-def test_load_weekly_quiz_count_no_file(mock_exists):
+def test_load_weekly_quiz_count_no_value():
     assert load_weekly_quiz_count() == 0
 
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-def test_save_weekly_quiz_count(mock_dump, mock_file):
+def test_save_weekly_quiz_count(kv_state):
     save_weekly_quiz_count(10)
-    mock_file.assert_called_once_with(WEEKLY_COUNT_FILE, "w", encoding="utf-8")
-    handle = mock_file()
-    mock_dump.assert_called_once_with({"count": 10}, handle, ensure_ascii=False, indent=4)
+    assert load_weekly_quiz_count() == 10
+    assert kv_state.get("weekly_quiz_count") == 10
+
+def test_praise_index_roundtrip(kv_state):
+    assert load_praise_index() == 0
+    save_praise_index(3)
+    assert load_praise_index() == 3
+    assert kv_state.get("praise_index") == 3
 
 # ... (Аналогичные тесты для load/save_quiz_questions, load/save_rating, load_praises, load/save_praise_index) ...
 # Для краткости пропустим их детальную реализацию, но они должны быть написаны
@@ -118,6 +111,19 @@ def test_get_random_question_from_loaded():
         # так что проверять изменение списка не имеет смысла
 
 
+def test_get_random_question_deck_does_not_rewrite_bank():
+    # Вопросы выдаются по курсору колоды без повторов, quiz.json не перезаписывается
+    questions = [{"question": f"Q{i}", "options": ["a", "b"], "answer": "a"} for i in range(5)]
+    with patch('quiz.load_quiz_questions', return_value=questions) as mock_load, \
+         patch('quiz.save_quiz_questions') as mock_save, \
+         patch('state.is_test_mode', False, create=True):
+        dealt = [get_random_question()["question"] for _ in range(3)]
+        assert len(set(dealt)) == 3
+        assert count_quiz_questions() == 2
+        mock_load.assert_called_once()
+        mock_save.assert_not_called()
+
+
 # --- Тесты для quiz_post_callback ---
 
 @pytest.mark.asyncio
@@ -148,7 +154,6 @@ async def test_quiz_post_callback_success():
     with patch.object(quiz, 'get_random_question', return_value=q_data), \
          patch.object(state, 'quiz_enabled', True), \
          patch.object(quiz, 'POST_CHAT_ID', -1001234567890), \
-         patch.object(quiz, 'ACTIVE_QUIZZES', {}), \
          patch.object(quiz, 'load_weekly_quiz_count', return_value=5), \
          patch.object(quiz, 'save_weekly_quiz_count') as mock_save_weekly_quiz_count:
         
@@ -171,7 +176,7 @@ async def test_quiz_post_callback_success():
         assert kwargs['correct_option_id'] == correct_option
         
         # Проверяем, что poll_id добавлен в ACTIVE_QUIZZES
-        assert quiz.ACTIVE_QUIZZES["poll123"] == correct_option
+        assert quiz.ACTIVE_QUIZZES.get_correct_index("poll123") == correct_option
         
         # Проверяем, что счетчик викторин увеличен
         mock_save_weekly_quiz_count.assert_called_once_with(6)  # 5 + 1
@@ -213,10 +218,10 @@ async def test_poll_answer_handler_correct():
     poll_id = "poll123"
     correct_option = 1
     
-    with patch('quiz.update_balance') as mock_update_balance, \
+    with patch('quiz.update_balances_bulk') as mock_update_balance, \
          patch('quiz.load_rating', return_value={}) as mock_load_rating, \
-         patch('quiz.save_rating') as mock_save_rating, \
-         patch('quiz.ACTIVE_QUIZZES', {poll_id: correct_option}):
+         patch('quiz.save_rating') as mock_save_rating:
+        quiz.ACTIVE_QUIZZES.register(poll_id, correct_option)
 
         update = MagicMock()
         update.poll_answer = MagicMock()
@@ -230,9 +235,15 @@ async def test_poll_answer_handler_correct():
         
         # Вызываем тестируемую функцию
         await poll_answer_handler(update, context)
+        # Повторная доставка того же ответа не даёт второй награды
+        await poll_answer_handler(update, context)
+
+        # Награды начисляются пакетом при сбросе накопителя
+        mock_update_balance.assert_not_called()
+        assert quiz.flush_quiz_rewards() == 1
         
         # Проверяем обновление баланса и рейтинга
-        mock_update_balance.assert_called_once_with(user_id, 5)
+        mock_update_balance.assert_called_once_with({str(user_id): 5}, reason="quiz")
         
         # Проверяем сохранение рейтинга
         mock_save_rating.assert_called_once()
@@ -250,12 +261,12 @@ async def test_poll_answer_handler_incorrect():
     correct_option = 0  # верный ответ
     wrong_option = 2    # ответ пользователя
     
-    with patch('quiz.update_balance') as mock_update_balance, \
+    with patch('quiz.update_balances_bulk') as mock_update_balance, \
          patch('quiz.load_rating') as mock_load_rating, \
          patch('quiz.save_rating') as mock_save_rating:
 
-        # Настраиваем ACTIVE_QUIZZES напрямую
-        ACTIVE_QUIZZES[poll_id] = correct_option
+        # Регистрируем опрос в реестре
+        quiz.ACTIVE_QUIZZES.register(poll_id, correct_option)
 
         update = MagicMock()
         update.poll_answer = MagicMock()
@@ -268,8 +279,98 @@ async def test_poll_answer_handler_incorrect():
 
         await poll_answer_handler(update, context)
 
+        assert quiz.flush_quiz_rewards() == 0
         mock_update_balance.assert_not_called()
         mock_save_rating.assert_not_called()
+        assert quiz.ACTIVE_QUIZZES.get_stats(poll_id)["answers"] == 1
+
+
+@pytest.mark.asyncio
+async def test_poll_answer_handler_batches_rewards():
+    """Ответы нескольких пользователей начисляются одной записью рейтинга и балансов."""
+    quiz.ACTIVE_QUIZZES.register("p1", 0)
+    quiz.ACTIVE_QUIZZES.register("p2", 1)
+
+    with patch('quiz.update_balances_bulk') as mock_update_balance, \
+         patch('quiz.load_rating', return_value={"1": {"stars": 4, "name": "Old"}}), \
+         patch('quiz.save_rating') as mock_save_rating:
+        for poll_id, user_id, option in (("p1", 1, 0), ("p1", 2, 0), ("p2", 1, 1), ("p2", 3, 0)):
+            update = MagicMock()
+            update.poll_answer.poll_id = poll_id
+            update.poll_answer.user.id = user_id
+            update.poll_answer.user.username = f"user{user_id}"
+            update.poll_answer.option_ids = [option]
+            await poll_answer_handler(update, MagicMock())
+
+        assert quiz.flush_quiz_rewards() == 2
+
+        mock_save_rating.assert_called_once_with({
+            "1": {"stars": 6, "name": "user1"},
+            "2": {"stars": 1, "name": "user2"}
+        })
+        mock_update_balance.assert_called_once_with({"1": 10, "2": 5}, reason="quiz")
+
+
+def test_quiz_rewards_requeued_when_stars_fail(quiz_rewards):
+    """Если звёзды записать не удалось, весь пакет остаётся в очереди до следующего сброса."""
+    quiz_rewards.add(1, "user1")
+    with patch('quiz.add_stars_bulk', side_effect=[OSError("disk full"), None]) as mock_add_stars, \
+         patch('quiz.update_balances_bulk') as mock_update_balance:
+        assert quiz_rewards.flush() == 0
+        mock_update_balance.assert_not_called()
+        assert len(quiz_rewards) == 1
+        quiz_rewards.add(1, "user1")
+        assert quiz_rewards.flush() == 1
+    assert mock_add_stars.call_args_list[-1].args[0] == {"1": {"stars": 2, "name": "user1"}}
+    mock_update_balance.assert_called_once_with({"1": 10}, reason="quiz")
+    assert len(quiz_rewards) == 0
+
+def test_quiz_rewards_coins_retried_without_stars(quiz_rewards):
+    """Если звёзды записаны, а монеты нет, при повторе начисляются только монеты."""
+    quiz_rewards.add(1, "user1")
+    with patch('quiz.add_stars_bulk') as mock_add_stars, \
+         patch('quiz.update_balances_bulk', side_effect=[RuntimeError("ledger"), {}]) as mock_update_balance:
+        assert quiz_rewards.flush() == 0
+        assert quiz_rewards.flush() == 1
+    mock_add_stars.assert_called_once_with({"1": {"stars": 1, "name": "user1"}})
+    assert mock_update_balance.call_args_list[-1].args[0] == {"1": 5}
+
+@pytest.mark.asyncio
+async def test_quiz_rewards_flush_saves_answered(active_quizzes, doc_store):
+    """Ответ меняет реестр опросов только в памяти, ID ответивших сохраняются вместе с наградами."""
+    active_quizzes.register("p1", 0)
+    doc_store.flush_all()
+    update = MagicMock()
+    update.poll_answer.poll_id = "p1"
+    update.poll_answer.user.id = 7
+    update.poll_answer.user.username = "user7"
+    update.poll_answer.option_ids = [0]
+    with patch('quiz.add_stars_bulk'), patch('quiz.update_balances_bulk'):
+        with patch('quiz_polls.write_json') as mock_write:
+            await poll_answer_handler(update, MagicMock())
+        mock_write.assert_not_called()
+        quiz.flush_quiz_rewards()
+    doc_store.flush_all()
+    with open(active_quizzes.answered_path, encoding="utf-8") as f:
+        assert json.load(f) == {"p1": ["7"]}
+
+@pytest.mark.asyncio
+async def test_poll_answer_handler_expired_poll():
+    """Ответ на устаревший опрос не приносит награды."""
+    poll_id = "poll_old"
+    quiz.ACTIVE_QUIZZES.register(poll_id, 0, posted=0)
+
+    with patch('quiz.update_balances_bulk') as mock_update_balance, \
+         patch('quiz.add_stars_bulk') as mock_add_stars:
+        update = MagicMock()
+        update.poll_answer.poll_id = poll_id
+        update.poll_answer.option_ids = [0]
+
+        await poll_answer_handler(update, MagicMock())
+        quiz.flush_quiz_rewards()
+
+        mock_update_balance.assert_not_called()
+        mock_add_stars.assert_not_called()
 
 
 # --- Тесты для rating_command ---
@@ -0,0 +1,71 @@
+import pytest
+import json
+from unittest.mock import patch
+
+try:
+    from quiz_polls import ActivePollRegistry
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов quiz_polls: не удалось импортировать модуль ({e}).", allow_module_level=True)
+
+@pytest.fixture
+def registry_path(tmp_path):
+    return str(tmp_path / "active_quizzes.json")
+
+def test_register_and_answers(registry_path):
+    """Правильный ответ и счётчики ответов опроса"""
+    registry = ActivePollRegistry(registry_path)
+    registry.register("p1", 2)
+    assert "p1" in registry and "p2" not in registry
+    assert registry.record_answer("p1", 1, [2]) is True
+    assert registry.record_answer("p1", 2, [0]) is False
+    assert registry.record_answer("p2", 1, [0]) is None
+    # Повторный ответ того же пользователя не учитывается
+    assert registry.record_answer("p1", 1, [2]) is None
+    stats = registry.get_stats("p1")
+    assert stats["correct_index"] == 2
+    assert (stats["answers"], stats["correct_answers"]) == (2, 1)
+
+def test_registry_persisted(registry_path, doc_store):
+    """Реестр сохраняется компактно и загружается заново после перезапуска"""
+    with patch('quiz_polls.time.time', return_value=1_000_100):
+        registry = ActivePollRegistry(registry_path)
+        registry.register("p1", 1, posted=1_000_000)
+        registry.record_answer("p1", 7, [1])
+        registry.save()
+        doc_store.flush_all()
+        with open(registry_path, encoding="utf-8") as f:
+            assert json.load(f) == {"polls": {"p1": [1, 1_000_000, 1, 1]}}
+        with open(registry.answered_path, encoding="utf-8") as f:
+            assert json.load(f) == {"p1": ["7"]}
+
+        doc_store.invalidate()
+        restored = ActivePollRegistry(registry_path)
+        assert restored.get_correct_index("p1") == 1
+        # Ответ, учтённый до перезапуска, повторно не засчитывается
+        assert restored.record_answer("p1", 7, [1]) is None
+
+def test_legacy_entries_loaded(registry_path):
+    """Записи прежнего формата (с ID ответивших) загружаются, повторный ответ не учитывается"""
+    with open(registry_path, "w", encoding="utf-8") as f:
+        json.dump({"polls": {"p1": [1, 1_000_000, 1, 1, ["7"]], "p2": [0, 1_000_050]}}, f)
+    with patch('quiz_polls.time.time', return_value=1_000_100):
+        registry = ActivePollRegistry(registry_path)
+        assert registry.record_answer("p1", 7, [1]) is None
+        assert registry.record_answer("p2", 7, [0]) is True
+        assert registry.get_stats("p1")["answers"] == 1
+        assert registry.get_stats("p2")["correct_answers"] == 1
+
+def test_ttl_and_size_eviction(registry_path):
+    """Устаревшие опросы и самые старые опросы сверх лимита удаляются"""
+    registry = ActivePollRegistry(registry_path, ttl=100, max_polls=2)
+    with patch('quiz_polls.time.time', return_value=900):
+        registry.register("old", 0, posted=850)
+        registry.register("a", 0, posted=950)
+    with patch('quiz_polls.time.time', return_value=1000):
+        assert registry.get_correct_index("old") is None
+        assert registry.evict_expired() == 1
+        registry.register("b", 1)
+        registry.register("c", 2)
+    assert len(registry) == 2
+    assert registry.get_stats("a") is None
+    assert registry.get_stats("c")["correct_index"] == 2
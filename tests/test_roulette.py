@@ -217,8 +217,8 @@ async def test_handle_change_bet_max_limit(mock_handle_bet_display, mock_get_bal
 # --- Тесты для handle_roulette_bet_callback --- (Обработка результата)
 
 @pytest.mark.asyncio
-@patch('casino.roulette.get_balance')
-@patch('casino.roulette.update_balance')
+@patch('casino.roulette.try_debit', new_callable=AsyncMock)
+@patch('casino.roulette.credit', new_callable=AsyncMock)
 @patch('casino.roulette.get_roulette_result', return_value='red') # Результат - красное
 @patch('casino.roulette.load_file_ids', return_value={'animations': {'roulette': {'red': ['gif_red']}}})
 @patch('random.choice', return_value='gif_red')
@@ -226,7 +226,7 @@ async def test_handle_change_bet_max_limit(mock_handle_bet_display, mock_get_bal
 @patch('asyncio.sleep', return_value=None)
 async def test_handle_roulette_bet_callback_win_red(
     mock_sleep, mock_safe_delete, mock_random_choice, mock_load_ids, 
-    mock_get_result, mock_update_balance, mock_get_balance
+    mock_get_result, mock_credit, mock_try_debit
 ):
     update = MagicMock(spec=Update)
     query = MagicMock(spec=CallbackQuery)
@@ -242,11 +242,12 @@ async def test_handle_roulette_bet_callback_win_red(
     update.callback_query = query
     context = MagicMock()
     
-    mock_get_balance.side_effect = [1000, 1000 - bet + (100 * (bet / 50))] # Баланс до, баланс после
+    mock_try_debit.return_value = 1000 - bet # Баланс после списания ставки
+    mock_credit.return_value = 1000 - bet + int(100 * (bet / 50)) # Баланс после выигрыша
     
     await handle_roulette_bet_callback(query, context, 'red')
     
-    mock_get_balance.assert_called()
+    mock_try_debit.assert_awaited_once_with(333, bet, reason="roulette")
     mock_get_result.assert_called_once()
     mock_load_ids.assert_called_once()
     mock_random_choice.assert_called_once_with(['gif_red']) # Выбор гифки
@@ -256,7 +257,7 @@ async def test_handle_roulette_bet_callback_win_red(
     
     # Проверка обновления баланса (списание + выигрыш)
     expected_winnings = int(100 * (bet / 50))
-    mock_update_balance.assert_has_calls([call(333, -bet), call(333, expected_winnings)])
+    mock_credit.assert_awaited_once_with(333, expected_winnings, reason="roulette")
     
     # Проверка сообщения
     query.message.edit_text.assert_awaited_once()
@@ -271,8 +272,8 @@ async def test_handle_roulette_bet_callback_win_red(
 # ... (Аналогичные тесты для выигрыша zero, проигрыша, недостатка баланса) ...
 
 @pytest.mark.asyncio
-@patch('casino.roulette.get_balance', return_value=10) # Недостаточно средств
-async def test_handle_roulette_bet_callback_insufficient_funds(mock_get_balance):
+@patch('casino.roulette.try_debit', new_callable=AsyncMock, return_value=None) # Недостаточно средств
+async def test_handle_roulette_bet_callback_insufficient_funds(mock_try_debit):
     update = MagicMock(spec=Update)
     query = MagicMock(spec=CallbackQuery)
     query.answer = AsyncMock()
@@ -285,7 +286,7 @@ async def test_handle_roulette_bet_callback_insufficient_funds(mock_get_balance)
 
     await handle_roulette_bet_callback(query, context, 'black')
     
-    mock_get_balance.assert_called_once_with(444)
+    mock_try_debit.assert_awaited_once_with(444, bet, reason="roulette")
     query.answer.assert_awaited_once_with("💸 У вас недостаточно средств для ставки.", show_alert=True)
     # Другие действия (отправка гифки, редактирование) не должны выполняться
     query.message.chat.send_animation.assert_not_called() 
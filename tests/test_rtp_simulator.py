@@ -0,0 +1,92 @@
+import pytest
+from unittest.mock import patch
+
+try:
+    from casino.rtp_simulator import exact_rtp, simulate_rtp, simulate_ruin, format_report
+    from casino.slots_utils import get_slots_multiplier, SLOT_TRIPLE_MULTIPLIER, SLOT_PAIR_MULTIPLIER
+    from casino.roulette_utils import get_roulette_winnings
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов rtp_simulator: не удалось импортировать модуль ({e}).", allow_module_level=True)
+
+def test_slots_multiplier():
+    """Тест правил выигрыша в слотах"""
+    assert get_slots_multiplier(["🍒", "🍒", "🍒"]) == SLOT_TRIPLE_MULTIPLIER
+    assert get_slots_multiplier(["🍒", "🍋", "🍒"]) == SLOT_PAIR_MULTIPLIER
+    assert get_slots_multiplier(["🍒", "🍋", "🔔"]) == 0
+
+def test_roulette_winnings():
+    """Тест выплат рулетки: 100 и 1800 монет за ставку 50, пропорционально для других ставок"""
+    assert get_roulette_winnings("red", 50) == 100
+    assert get_roulette_winnings("zero", 50) == 1800
+    assert get_roulette_winnings("black", 25) == 50
+
+def test_exact_rtp():
+    """Тест точного RTP по правилам игр"""
+    # Слоты: 6 троек из 216 комбинаций (x5) и 90 пар (x2)
+    assert exact_rtp("slots")["rtp"] == pytest.approx(210 / 216)
+    assert exact_rtp("roulette", "red")["rtp"] == pytest.approx(35 / 36)
+    assert exact_rtp("roulette", "zero")["rtp"] == pytest.approx(1.0)
+    assert exact_rtp("roulette", "zero")["variance"] == pytest.approx(35.0)
+
+@pytest.mark.parametrize("game,bet_type", [("slots", "red"), ("roulette", "red"), ("roulette", "black")])
+def test_simulate_rtp_matches_exact(game, bet_type):
+    """Тест, что оценка Монте-Карло близка к точному значению"""
+    stats = simulate_rtp(game, 50_000, bet_type=bet_type, seed=1)
+    exact = exact_rtp(game, bet_type)
+    assert stats["spins"] == 50_000
+    assert stats["rtp"] == pytest.approx(exact["rtp"], abs=0.03)
+    assert stats["variance"] == pytest.approx(exact["variance"], rel=0.05)
+    assert 0 < stats["hit_rate"] < 1
+
+@pytest.mark.parametrize("game,bet_type", [("slots", "red"), ("roulette", "zero")])
+def test_vectorised_simulate_rtp(game, bet_type):
+    """Тест векторизованной симуляции (NumPy) с фиксированным зерном"""
+    pytest.importorskip("numpy")
+    from casino import rtp_simulator
+    assert rtp_simulator.np is not None
+    with patch('casino.rtp_simulator.BATCH_SIZE', 30_000):
+        stats = simulate_rtp(game, 200_000, bet_type=bet_type, seed=42)
+        assert simulate_rtp(game, 200_000, bet_type=bet_type, seed=42) == stats
+    exact = exact_rtp(game, bet_type)
+    assert stats["rtp"] == pytest.approx(exact["rtp"], abs=0.05)
+    assert stats["variance"] == pytest.approx(exact["variance"], rel=0.1)
+
+def test_simulate_rtp_reel_count():
+    """Тест, что симуляция учитывает настроенное количество барабанов"""
+    assert get_slots_multiplier(["🍒", "🍋", "🔔", "🍒"]) == SLOT_PAIR_MULTIPLIER
+    with patch('casino.rtp_simulator.SLOT_REELS', 4):
+        exact = exact_rtp("slots")
+        stats = simulate_rtp("slots", 50_000, seed=1)
+    assert exact["rtp"] != pytest.approx(exact_rtp("slots")["rtp"])
+    assert stats["rtp"] == pytest.approx(exact["rtp"], abs=0.03)
+
+def test_simulate_rtp_batches():
+    """Тест разбиения симуляции на пакеты"""
+    with patch('casino.rtp_simulator.BATCH_SIZE', 7):
+        stats = simulate_rtp("slots", 100, seed=3)
+    assert stats["spins"] == 100
+
+def test_simulate_rtp_unknown_game():
+    with pytest.raises(ValueError):
+        simulate_rtp("poker", 10)
+
+def test_simulate_ruin_curve():
+    """Тест кривой разорения: доля разорившихся не убывает со временем"""
+    curve = simulate_ruin("slots", bankroll=200, bet=50, rounds=100, players=200, checkpoints=5, seed=1)
+    assert [point for point, _ in curve] == [20, 40, 60, 80, 100]
+    shares = [share for _, share in curve]
+    assert shares == sorted(shares)
+    assert 0 < shares[-1] <= 1
+
+def test_simulate_ruin_bankroll_below_bet():
+    """Тест: игрок, которому не хватает на ставку, разорён сразу"""
+    curve = simulate_ruin("roulette", bankroll=10, bet=50, rounds=10, players=5, checkpoints=2)
+    assert curve == [(5, 1.0), (10, 1.0)]
+
+def test_format_report():
+    """Тест текстового отчёта"""
+    stats = simulate_rtp("slots", 1000, seed=1)
+    report = format_report("slots", "red", 50, stats, 0.5, [(10, 0.25)], 1000)
+    assert "RTP:" in report
+    assert "точное значение 97.222%" in report
+    assert "25.00%" in report
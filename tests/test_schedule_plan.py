@@ -0,0 +1,114 @@
+import pytest
+import json
+import random
+import datetime
+
+try:
+    from schedule_plan import (
+        config_weekday,
+        local_to_utc,
+        parse_local_time,
+        plan_autopost_jobs,
+        plan_quiz_jobs,
+        plan_betting_jobs,
+        plan_betting_catch_up,
+        plan_days,
+        format_plan,
+        main
+    )
+except ImportError as e:
+    pytest.skip(f"Пропуск тестов schedule_plan: не удалось импортировать модуль ({e}).", allow_module_level=True)
+
+SCHEDULE_CONFIG = {
+    "autopost": {
+        "morning_pics": {"time_range": {"start": "09:00", "end": "10:00"}, "days": [0, 1, 2, 3, 4, 5, 6]},
+        "day_videos": {"time_range": {"start": "13:00", "end": "14:00"}, "days": [1, 2, 3, 4, 5]},
+        "day_pics": {"time_range": {"start": "15:00", "end": "15:00"}, "days": [0, 1, 2, 3, 4, 5, 6]},
+        "evening_pics": {"time_range": {"start": "20:00", "end": "21:00"}, "days": [0, 1, 2, 3, 4, 5, 6]}
+    },
+    "quiz": {"enabled": True, "quiz_times": [{"time_range": {"start": "11:00", "end": "11:30"}, "days": [0]}]},
+    "wisdom": {"enabled": False, "time_range": {"start": "08:00", "end": "08:30"}, "days": [0]},
+    "betting": {
+        "days": [1, 2],
+        "slots": [
+            {"publish_time": "10:00", "close_time": "12:00", "results_time": "13:00"},
+            {"publish_time": "14:00"}
+        ]
+    }
+}
+
+def test_time_helpers():
+    """Тест перевода времени и нумерации дней недели"""
+    assert config_weekday(datetime.date(2024, 1, 7)) == 0  # воскресенье
+    assert config_weekday(datetime.date(2024, 1, 8)) == 1  # понедельник
+    assert local_to_utc(parse_local_time("02:30"), 3) == datetime.time(23, 30)
+    assert local_to_utc(parse_local_time("22:15"), -3) == datetime.time(1, 15)
+
+def test_plan_daily_jobs():
+    """Тест плана ежедневных задач: время в диапазоне, перевод в UTC и дни недели"""
+    jobs = plan_autopost_jobs(SCHEDULE_CONFIG, 3, rng=random.Random(1))
+    assert [job["name"] for job in jobs] == ["morning_pics", "day_videos", "day_pics", "evening_pics"]
+    assert jobs[1]["kind"] == "autopost_4_videos" and jobs[1]["days"] == (1, 2, 3, 4, 5)
+    assert jobs[2]["local_time"] == datetime.time(15, 0) and jobs[2]["time"] == datetime.time(12, 0)
+    assert datetime.time(9, 0) <= jobs[0]["local_time"] <= datetime.time(10, 0)
+    assert plan_quiz_jobs({"quiz": {"enabled": False, "quiz_times": []}}, 0) == []
+
+def test_plan_betting_jobs_today_and_tomorrow():
+    """Тест плана задач ставок: оставшиеся задачи сегодня и перенос прошедшего окна на завтра"""
+    # Понедельник, 12:30 UTC: у первого окна осталось подведение итогов, второе идёт целиком
+    now_utc = datetime.datetime(2024, 1, 8, 12, 30)
+    jobs = plan_betting_jobs(SCHEDULE_CONFIG["betting"], 0, now_utc)
+    assert [(job["name"], job["slot"], job["run_at"].hour) for job in jobs] == [
+        ("process_betting_results", 0, 13),
+        ("publish_betting_event_2", 1, 14),
+        ("close_betting_event_2", 1, 20),
+        ("process_betting_results_2", 1, 21)
+    ]
+    # После всех задач дня окна переносятся на вторник
+    jobs = plan_betting_jobs(SCHEDULE_CONFIG["betting"], 0, datetime.datetime(2024, 1, 8, 22, 0))
+    assert len(jobs) == 6 and all(job["run_at"].date() == datetime.date(2024, 1, 9) for job in jobs)
+    # Вечер вторника: среды в расписании нет
+    assert plan_betting_jobs(SCHEDULE_CONFIG["betting"], 0, datetime.datetime(2024, 1, 9, 22, 0)) == []
+    # Воскресенье не входит в расписание ставок
+    assert plan_betting_jobs(SCHEDULE_CONFIG["betting"], 0, datetime.datetime(2024, 1, 7, 9, 0)) == []
+
+def test_plan_betting_jobs_local_date():
+    """Тест плана задач ставок при смещении часового пояса: день определяется по локальному времени"""
+    # Воскресенье, 22:30 UTC = понедельник, 01:30 по UTC+3: окна понедельника идут целиком
+    now_utc = datetime.datetime(2024, 1, 7, 22, 30)
+    jobs = plan_betting_jobs(SCHEDULE_CONFIG["betting"], 3, now_utc)
+    assert len(jobs) == 6
+    assert jobs[0]["run_at"] == datetime.datetime(2024, 1, 8, 7, 0)  # 10:00 по местному времени
+    assert all(job["run_at"] > now_utc for job in jobs)
+    # Вторник, 23:30 UTC = среда по UTC+3: среды нет в расписании ставок
+    assert plan_betting_jobs(SCHEDULE_CONFIG["betting"], 3, datetime.datetime(2024, 1, 9, 23, 30)) == []
+    # Понедельник, 02:00 UTC = воскресенье, 21:00 по UTC-5: воскресенья нет в расписании ставок
+    assert plan_betting_jobs(SCHEDULE_CONFIG["betting"], -5, datetime.datetime(2024, 1, 8, 2, 0)) == []
+
+def test_plan_betting_catch_up():
+    """Тест досрочного закрытия ставок после времени закрытия"""
+    now = datetime.datetime(2024, 1, 8, 12, 30)
+    plan = plan_betting_catch_up(SCHEDULE_CONFIG["betting"], now)
+    assert plan[0] == {
+        "slot": 0,
+        "close_betting": now + datetime.timedelta(minutes=1),
+        "publish_results": now + datetime.timedelta(minutes=5)
+    }
+    assert plan[1]["close_betting"] == datetime.datetime(2024, 1, 8, 20, 0)
+    assert plan_betting_catch_up(SCHEDULE_CONFIG["betting"], datetime.datetime(2024, 1, 8, 21, 0)) == []
+
+def test_plan_days_and_cli(tmp_path, capsys):
+    """Тест плана на несколько дней и вывода командной строки"""
+    plan = plan_days(SCHEDULE_CONFIG, 0, datetime.date(2024, 1, 7), days=2, rng=random.Random(1))
+    sunday = [job["name"] for job in plan if job["date"] == datetime.date(2024, 1, 7)]
+    monday = [job["name"] for job in plan if job["date"] == datetime.date(2024, 1, 8)]
+    assert sunday == ["morning_pics", "quiz_1", "day_pics", "evening_pics"]
+    assert "day_videos" in monday and "publish_betting_event_2" in monday and "quiz_1" not in monday
+    assert format_plan(plan).startswith("2024-01-07 (Sun)\n  09:")
+
+    config_path = tmp_path / "schedule_config.json"
+    config_path.write_text(json.dumps(SCHEDULE_CONFIG), encoding="utf-8")
+    main(["--config", str(config_path), "--bot-config", str(tmp_path / "missing.json"),
+          "--start", "2024-01-08", "--days", "1", "--seed", "1"])
+    output = capsys.readouterr().out
+    assert output.startswith("2024-01-08 (Mon)") and "process_betting_results_2" in output
@@ -32,35 +32,35 @@ except ImportError as e:
 
 # --- Тесты для load/save_scheduled_posts ---
 
-@patch('pathlib.Path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data="""{
+@pytest.fixture
+def posts_file(tmp_path):
+    path = tmp_path / "state_data" / "scheduled_posts.json"
+    with patch('scheduler.SCHEDULED_POSTS_FILE', path):
+        yield path
+
+def test_load_scheduled_posts_success(posts_file):
+    posts_file.parent.mkdir()
+    posts_file.write_text("""{
     \"post1\": {\"datetime\": \"2024-01-01T10:00:00\", \"chat_id\": 1, \"text\": \"Hi\"},
     \"post2\": {\"datetime\": \"2024-01-02T12:00:00\", \"chat_id\": 2, \"media\": \"file_id\", \"media_type\": \"photo\"}
-}""")
-def test_load_scheduled_posts_success(mock_file, mock_exists):
+}""", encoding="utf-8")
     data = load_scheduled_posts()
     expected_data = {
         "post1": {"datetime": "2024-01-01T10:00:00", "chat_id": 1, "text": "Hi"},
         "post2": {"datetime": "2024-01-02T12:00:00", "chat_id": 2, "media": "file_id", "media_type": "photo"}
     }
     assert data == expected_data
-    mock_exists.assert_called_once()
-    mock_file.assert_called_once_with(SCHEDULED_POSTS_FILE, "r", encoding="utf-8")
 
-@patch('pathlib.Path.exists', return_value=False)
-def test_load_scheduled_posts_no_file(mock_exists):
+def test_load_scheduled_posts_no_file(posts_file):
     assert load_scheduled_posts() == {}
 
-@patch('pathlib.Path.mkdir')
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-def test_save_scheduled_posts_success(mock_dump, mock_file, mock_mkdir):
+def test_save_scheduled_posts_success(posts_file, doc_store):
     data_to_save = {"post3": {"datetime": "2024-01-03T14:00:00", "chat_id": 3, "text": "Saved"}}
     save_scheduled_posts(data_to_save)
-    mock_mkdir.assert_called_once_with(exist_ok=True, parents=True)
-    mock_file.assert_called_once_with(SCHEDULED_POSTS_FILE, "w", encoding="utf-8")
-    handle = mock_file()
-    mock_dump.assert_called_once_with(data_to_save, handle, ensure_ascii=False, indent=4)
+    assert load_scheduled_posts() == data_to_save
+    # Каталог создаётся при записи файла
+    doc_store.flush_all()
+    assert json.loads(posts_file.read_text(encoding="utf-8")) == data_to_save
 
 # --- Тесты для reschedule_all_posts ---
 
@@ -177,7 +177,6 @@ def test_schedule_autopost_for_today():
             'evening_pics': {'time_range': {'start': '20:00', 'end': '21:00'}, 'days': [0, 1, 2, 3, 4, 5, 6]}
         }
     }
-    parse_time_side_effect = lambda t: real_datetime.datetime.strptime(t, '%H:%M').time()
     random_time_side_effect = [
         real_datetime.time(9, 30),  # morning_pics
         real_datetime.time(13, 15), # day_videos
@@ -186,8 +185,8 @@ def test_schedule_autopost_for_today():
     ]
 
     # Применяем патчи через with
-    with patch('scheduler.parse_time_from_string', side_effect=parse_time_side_effect) as mock_parse_time, \
-         patch('scheduler.random_time_in_range') as mock_random_time, \
+    with patch('scheduler.TIMEZONE_OFFSET', 0), \
+         patch('schedule_plan.random_time_in_range') as mock_random_time, \
          patch('scheduler.schedule_config', config_patch_value) as mock_schedule_cfg:
 
         # Настраиваем side_effect для mock_random_time внутри with
@@ -219,12 +218,11 @@ def test_schedule_quizzes_for_today_enabled():
             ]
         }
     }
-    parse_time_side_effect = lambda t: real_datetime.datetime.strptime(t, '%H:%M').time()
     random_time_side_effect = [real_datetime.time(11, 10), real_datetime.time(17, 25)]
 
     # Применяем патчи через with
-    with patch('scheduler.parse_time_from_string', side_effect=parse_time_side_effect) as mock_parse_time, \
-         patch('scheduler.random_time_in_range') as mock_random_time, \
+    with patch('scheduler.TIMEZONE_OFFSET', 0), \
+         patch('schedule_plan.random_time_in_range') as mock_random_time, \
          patch('scheduler.schedule_config', config_patch_value) as mock_schedule_cfg, \
          patch('scheduler.state.quiz_enabled', True) as mock_quiz_state:
 
@@ -277,8 +275,10 @@ def test_schedule_quizzes_for_today_disabled_config():
 @patch('scheduler.schedule_autopost_for_today')
 @patch('scheduler.schedule_quizzes_for_today')
 @patch('scheduler.schedule_wisdom_for_today')
+@patch('scheduler.schedule_betting_events')
 @patch('quiz.weekly_quiz_reset')
-async def test_midnight_reset_callback(mock_weekly_reset, mock_sched_wisdom, mock_sched_quiz, mock_sched_autopost):
+async def test_midnight_reset_callback(mock_weekly_reset, mock_sched_betting, mock_sched_wisdom, mock_sched_quiz,
+                                       mock_sched_autopost):
     context = MagicMock()
     job_queue = MagicMock()
     # Имитируем наличие старых задач
@@ -298,6 +298,7 @@ async def test_midnight_reset_callback(mock_weekly_reset, mock_sched_wisdom, moc
     mock_sched_autopost.assert_called_once_with(job_queue)
     mock_sched_quiz.assert_called_once_with(job_queue)
     mock_sched_wisdom.assert_called_once_with(job_queue)
+    mock_sched_betting.assert_called_once()
     
     # Проверяем вызов сбросов
     # mock_weekly_reset.assert_called_once() # Убираем эту проверку, т.к. weekly_reset здесь не вызывается 
\ No newline at end of file
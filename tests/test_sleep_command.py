@@ -1,7 +1,6 @@
 import pytest
-import os
 import json
-from unittest.mock import patch, MagicMock, mock_open, AsyncMock, call
+from unittest.mock import patch, MagicMock, AsyncMock
 
 # Импортируем тестируемые функции
 try:
@@ -10,78 +9,60 @@ try:
         load_sleep_wishes,
         load_sleep_index,
         save_sleep_index,
-        SLEEP_WISHES_FILE,
-        SLEEP_INDEX_FILE
+        SLEEP_INDEX_KEY
     )
 except ImportError as e:
     pytest.skip(f"Пропуск тестов sleep_command: не удалось импортировать модуль handlers.sleep_command или его зависимости ({e}).", allow_module_level=True)
 
 # --- Тесты для вспомогательных функций ---
 
-@patch('os.path.exists')
-@patch('builtins.open', new_callable=mock_open, read_data="Пожелание 1\nПожелание 2\n\nПожелание 3")
-def test_load_sleep_wishes(mock_file, mock_exists):
+@pytest.fixture
+def wishes_file(tmp_path):
+    """Подменяет файл пожеланий временным файлом."""
+    path = tmp_path / "sleep_wishes.txt"
+    with patch('handlers.sleep_command.SLEEP_WISHES_FILE', str(path)):
+        yield path
+
+def test_load_sleep_wishes(wishes_file):
     """Тест загрузки пожеланий из файла"""
-    # Устанавливаем, что файл существует
-    mock_exists.return_value = True
-    
+    wishes_file.write_text("Пожелание 1\nПожелание 2\n\nПожелание 3", encoding="utf-8")
+
     # Вызываем функцию и проверяем результат
     wishes = load_sleep_wishes()
     assert wishes == ["Пожелание 1", "Пожелание 2", "Пожелание 3"]
-    
-    # Проверяем, что файл был открыт с правильными параметрами
-    mock_file.assert_called_once_with(SLEEP_WISHES_FILE, "r", encoding="utf-8")
 
-@patch('os.path.exists')
-def test_load_sleep_wishes_no_file(mock_exists):
+    # Повторный вызов берёт пожелания из кэша, не открывая файл
+    with patch('builtins.open') as mock_file:
+        assert load_sleep_wishes() == wishes
+    mock_file.assert_not_called()
+
+def test_load_sleep_wishes_no_file(wishes_file):
     """Тест загрузки пожеланий, когда файла нет"""
-    # Устанавливаем, что файл не существует
-    mock_exists.return_value = False
-    
-    # Вызываем функцию и проверяем результат
     wishes = load_sleep_wishes()
     assert wishes == []
 
-@patch('os.path.exists')
-@patch('builtins.open', new_callable=mock_open, read_data='{"sleep_index": 3}')
-def test_load_sleep_index(mock_file, mock_exists):
-    """Тест загрузки индекса из файла"""
-    # Устанавливаем, что файл существует
-    mock_exists.return_value = True
-    
+def test_load_sleep_index(kv_state):
+    """Тест загрузки индекса из хранилища состояния"""
+    kv_state.set(SLEEP_INDEX_KEY, 3)
+
     # Вызываем функцию и проверяем результат
     index = load_sleep_index()
     assert index == 3
-    
-    # Проверяем, что файл был открыт с правильными параметрами
-    mock_file.assert_called_once_with(SLEEP_INDEX_FILE, "r", encoding="utf-8")
-
-@patch('os.path.exists')
-def test_load_sleep_index_no_file(mock_exists):
-    """Тест загрузки индекса, когда файла нет"""
-    # Устанавливаем, что файл не существует
-    mock_exists.return_value = False
-    
-    # Вызываем функцию и проверяем результат
+
+def test_load_sleep_index_no_value():
+    """Тест загрузки индекса, когда он ещё не сохранён"""
     index = load_sleep_index()
     assert index == 0
 
-@patch('builtins.open', new_callable=mock_open)
-def test_save_sleep_index(mock_file):
-    """Тест сохранения индекса в файл"""
+def test_save_sleep_index(kv_state, doc_store):
+    """Тест сохранения индекса"""
     # Вызываем функцию
     save_sleep_index(5)
-    
-    # Проверяем, что файл был открыт с правильными параметрами
-    mock_file.assert_called_once_with(SLEEP_INDEX_FILE, "w", encoding="utf-8")
-    
-    # Проверяем, что в файл были записаны данные
-    # json.dump делает несколько вызовов write, поэтому нельзя использовать assert_called_once
-    assert mock_file().write.called
-    
-    # Проверяем, что все записанные данные в совокупности содержат нужную информацию
-    written_data = ''.join(call[0][0] for call in mock_file().write.call_args_list)
-    data = json.loads(written_data)
+
+    # Новый индекс доступен сразу, а в файл состояния попадает при сбросе хранилища
+    assert load_sleep_index() == 5
+    doc_store.flush_all()
+    data = json.loads(open(kv_state.path, encoding="utf-8").read())
     assert data == {"sleep_index": 5}
 
 # --- Тесты для основной функции ---
@@ -4,7 +4,7 @@ from unittest.mock import patch, MagicMock, AsyncMock, call
 # Импортируем тестируемый модуль и его функции
 try:
     import casino.slots as casino_slots
-    from casino.slots import handle_slots_callback, handle_slots_bet_callback, SLOT_SYMBOLS
+    from casino.slots import handle_slots_callback, handle_slots_bet_callback
     # Импортируем зависимости для мокирования
     import balance
     from telegram import Update, InlineKeyboardMarkup, User, CallbackQuery
@@ -90,10 +90,10 @@ async def test_handle_slots_callback_low_balance(mock_get_balance):
 # --- Тесты для handle_slots_bet_callback ---
 
 @pytest.mark.asyncio
-@patch('casino.slots.get_balance')
-@patch('casino.slots.update_balance')
+@patch('casino.slots.try_debit', new_callable=AsyncMock)
+@patch('casino.slots.credit', new_callable=AsyncMock)
 @patch('random.choice')
-async def test_handle_slots_bet_jackpot(mock_random_choice, mock_update_balance, mock_get_balance):
+async def test_handle_slots_bet_jackpot(mock_random_choice, mock_credit, mock_try_debit):
     update = MagicMock(spec=Update)
     query = MagicMock(spec=CallbackQuery)
     query.answer = AsyncMock()
@@ -107,8 +107,9 @@ async def test_handle_slots_bet_jackpot(mock_random_choice, mock_update_balance,
     context = MagicMock()
     context.user_data = {}
     
-    # Баланс до ставки, баланс после выигрыша
-    mock_get_balance.side_effect = [100, 100 - bet + (bet * 5)]
+    # Баланс после списания ставки, баланс после выигрыша
+    mock_try_debit.return_value = 100 - bet
+    mock_credit.return_value = 100 - bet + (bet * 5)
     # Результат игры - джекпот
     mock_random_choice.return_value = "💎"
     
@@ -118,10 +119,8 @@ async def test_handle_slots_bet_jackpot(mock_random_choice, mock_update_balance,
     assert context.user_data['slots_bet'] == bet
     
     # Проверяем списание ставки и начисление выигрыша
-    mock_update_balance.assert_has_calls([
-        call(777, -bet), # Списание ставки
-        call(777, bet * 5)  # Начисление выигрыша x5
-    ])
+    mock_try_debit.assert_awaited_once_with(777, bet, reason="slots") # Списание ставки
+    mock_credit.assert_awaited_once_with(777, bet * 5, reason="slots") # Начисление выигрыша x5
     
     # Проверяем результат в сообщении
     query.edit_message_text.assert_awaited_once()
@@ -139,10 +138,10 @@ async def test_handle_slots_bet_jackpot(mock_random_choice, mock_update_balance,
     assert keyboard[1][0].callback_data == "casino:menu"
 
 @pytest.mark.asyncio
-@patch('casino.slots.get_balance')
-@patch('casino.slots.update_balance')
+@patch('casino.slots.try_debit', new_callable=AsyncMock)
+@patch('casino.slots.credit', new_callable=AsyncMock)
 @patch('random.choice')
-async def test_handle_slots_bet_two_match(mock_random_choice, mock_update_balance, mock_get_balance):
+async def test_handle_slots_bet_two_match(mock_random_choice, mock_credit, mock_try_debit):
     update = MagicMock(spec=Update)
     query = MagicMock(spec=CallbackQuery)
     # ... (аналогичная настройка update/query/context) ...
@@ -156,16 +155,15 @@ async def test_handle_slots_bet_two_match(mock_random_choice, mock_update_balanc
     context = MagicMock()
     context.user_data = {}
 
-    mock_get_balance.side_effect = [50, 50 - bet + (bet * 2)]
+    mock_try_debit.return_value = 50 - bet
+    mock_credit.return_value = 50 - bet + (bet * 2)
     # Результат - два совпадения
     mock_random_choice.side_effect = ["🍒", "🍒", "🍋"]
     
     await handle_slots_bet_callback(update, context)
     
-    mock_update_balance.assert_has_calls([
-        call(888, -bet), 
-        call(888, bet * 2)  # Выигрыш x2
-    ])
+    mock_try_debit.assert_awaited_once_with(888, bet, reason="slots")
+    mock_credit.assert_awaited_once_with(888, bet * 2, reason="slots") # Выигрыш x2
     
     # Проверяем результат в сообщении
     args, kwargs = query.edit_message_text.call_args
@@ -176,10 +174,10 @@ async def test_handle_slots_bet_two_match(mock_random_choice, mock_update_balanc
     # ... (проверка кнопок) ...
 
 @pytest.mark.asyncio
-@patch('casino.slots.get_balance')
-@patch('casino.slots.update_balance')
+@patch('casino.slots.try_debit', new_callable=AsyncMock)
+@patch('casino.slots.credit', new_callable=AsyncMock)
 @patch('random.choice')
-async def test_handle_slots_bet_no_match(mock_random_choice, mock_update_balance, mock_get_balance):
+async def test_handle_slots_bet_no_match(mock_random_choice, mock_credit, mock_try_debit):
     update = MagicMock(spec=Update)
     query = MagicMock(spec=CallbackQuery)
     # ... (аналогичная настройка update/query/context) ...
@@ -193,14 +191,15 @@ async def test_handle_slots_bet_no_match(mock_random_choice, mock_update_balance
     context = MagicMock()
     context.user_data = {}
 
-    mock_get_balance.side_effect = [200, 200 - bet]
+    mock_try_debit.return_value = 200 - bet
     # Результат - нет совпадений
     mock_random_choice.side_effect = ["🔔", "🍀", "7️⃣"]
     
     await handle_slots_bet_callback(update, context)
     
     # Проверяем только списание ставки
-    mock_update_balance.assert_called_once_with(999, -bet)
+    mock_try_debit.assert_awaited_once_with(999, bet, reason="slots")
+    mock_credit.assert_not_called()
     
     # Проверяем результат в сообщении
     args, kwargs = query.edit_message_text.call_args
@@ -211,9 +210,9 @@ async def test_handle_slots_bet_no_match(mock_random_choice, mock_update_balance
     # ... (проверка кнопок) ...
 
 @pytest.mark.asyncio
-@patch('casino.slots.get_balance', return_value=5) # Баланс меньше ставки
-@patch('casino.slots.update_balance')
-async def test_handle_slots_bet_insufficient_balance(mock_update_balance, mock_get_balance):
+@patch('casino.slots.try_debit', new_callable=AsyncMock, return_value=None) # Баланс меньше ставки
+@patch('casino.slots.credit', new_callable=AsyncMock)
+async def test_handle_slots_bet_insufficient_balance(mock_credit, mock_try_debit):
     update = MagicMock(spec=Update)
     query = MagicMock(spec=CallbackQuery)
     # ... (настройка update/query/context) ...
@@ -230,8 +229,8 @@ async def test_handle_slots_bet_insufficient_balance(mock_update_balance, mock_g
     await handle_slots_bet_callback(update, context)
     
     query.answer.assert_awaited_once()
-    mock_get_balance.assert_called_once_with(111)
-    mock_update_balance.assert_not_called() # Баланс не должен меняться
+    mock_try_debit.assert_awaited_once_with(111, bet, reason="slots")
+    mock_credit.assert_not_called() # Баланс не должен меняться
     # Проверяем сообщение об ошибке
     query.edit_message_text.assert_awaited_once_with("Недостаточно монет для этой ставки!")
 
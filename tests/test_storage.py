@@ -0,0 +1,190 @@
+import pytest
+import json
+from unittest.mock import patch
+
+try:
+    import storage
+    from storage import SqliteStorage, get_storage
+    from balance import BalanceLedger
+except ImportError:
+    pytest.skip("Пропуск тестов storage: не удалось импортировать модуль storage.", allow_module_level=True)
+
+@pytest.fixture
+def db(tmp_path):
+    db = SqliteStorage(str(tmp_path / "bot.db"))
+    yield db
+    db.close()
+
+# --- Тесты для балансов ---
+
+def test_sqlite_uses_wal(db):
+    """Тестирует, что база открыта в режиме WAL."""
+    mode = db._conn.execute("PRAGMA journal_mode").fetchone()[0]
+    assert mode == "wal"
+
+def test_save_balances_touches_only_given_rows(db):
+    """Тестирует, что сохраняются и удаляются только указанные записи."""
+    db.save_balances({"1": {"balance": 10, "name": "A"}, "2": {"balance": 20, "name": "B"}}, {"1", "2"})
+    db.save_balances({"1": {"balance": 15, "name": "A"}, "2": {"balance": 999, "name": "B"}}, {"1"})
+    assert db.load_balances() == {"1": {"balance": 15, "name": "A"}, "2": {"balance": 20, "name": "B"}}
+
+    db.save_balances({}, {"2"})
+    assert db.load_balances() == {"1": {"balance": 15, "name": "A"}}
+
+def test_ledger_with_storage_flushes_dirty_rows(db):
+    """Тестирует, что реестр балансов пишет в базу только изменённые строки."""
+    db.save_balances({"1": {"balance": 10, "name": "A"}, "2": {"balance": 20, "name": "B"}}, {"1", "2"})
+    ledger = BalanceLedger(flush_delay=3600, storage=db)
+    ledger.apply(1, 5, reason="slots")
+    with patch.object(db, 'save_balances', wraps=db.save_balances) as mock_save:
+        assert ledger.flush() is True
+    balances, dirty, journal = mock_save.call_args[0]
+    assert balances == {"1": {"balance": 15, "name": "A"}}
+    assert dirty == {"1"}
+    assert db.load_balances()["1"]["balance"] == 15
+    # Журнал изменений сохраняется в той же базе
+    rows = db._conn.execute("SELECT user_id, delta, reason FROM balance_journal").fetchall()
+    assert [tuple(row) for row in rows] == [("1", 5, "slots")]
+
+# --- Тесты для ставок ---
+
+def test_betting_data_round_trip(db):
+    """Тестирует сохранение и загрузку данных о ставках в формате betting_data.json."""
+    data = {
+        "active_bets": {
+            "1": {"123": {"user_name": "User1", "bets": [
+                {"option_id": 2, "amount": 50, "time": "2025-04-10 15:30:00"}
+            ]}}
+        },
+        "win_streaks": {"123": {"streak": 2, "user_name": "User1"}},
+        "betting_stats": {"123": {"user_name": "User1", "wagered": 150, "won": 90, "events": 3, "wins": 1}},
+        "settled_events": {"5": "2025-04-09"}
+    }
+    db.save_betting_data(data)
+    # Пулы тотализатора пересчитываются по сохранённым ставкам
+    assert db.load_betting_data() == {
+        **data,
+        "pools": {"1": {"total": 50, "options": {"2": {"total": 50, "bettors": 1}}}}
+    }
+
+def test_betting_history_pages(db):
+    """Тестирует постраничное чтение истории ставок (от новых к старым)."""
+    db.append_history([{"event_id": i, "date": f"2025-04-0{i}"} for i in range(1, 6)])
+    assert db.count_history() == 5
+    assert [e["event_id"] for e in db.read_history(0, 2)] == [5, 4]
+    assert [e["event_id"] for e in db.read_history(4, 2)] == [1]
+    # Сохранение активных ставок историю не затрагивает
+    db.save_betting_data({"active_bets": {}, "win_streaks": {}})
+    assert db.count_history() == 5
+    db.replace_history([{"event_id": 9}])
+    assert db.read_history() == [{"event_id": 9}]
+
+def test_add_bet_appends_row(db):
+    """Тестирует добавление ставки одной строкой."""
+    db.add_bet(1, 123, "User1", {"option_id": "2", "amount": 10, "time": "t1"})
+    db.add_bet(1, 123, "User1", {"option_id": "1", "amount": 20, "time": "t2"})
+    bets = db.load_betting_data()["active_bets"]["1"]["123"]["bets"]
+    assert [b["option_id"] for b in bets] == ["2", "1"]
+    assert [b["amount"] for b in bets] == [10, 20]
+
+def test_add_bet_updates_pool(db):
+    """Тестирует обновление пула варианта вместе с добавлением ставки."""
+    db.add_bet(1, 123, "User1", {"option_id": "2", "amount": 10, "time": "t1"})
+    db.add_bet(1, 123, "User1", {"option_id": "2", "amount": 5, "time": "t2"})
+    db.add_bet(1, 456, "User2", {"option_id": "1", "amount": 20, "time": "t3"})
+    assert db.get_event_pool(1) == {"total": 35, "options": {
+        "2": {"total": 15, "bettors": 1},
+        "1": {"total": 20, "bettors": 1}
+    }}
+    assert db.get_event_pool(2) is None
+
+def test_event_bets_replaced_per_event(db):
+    """Тестирует замену ставок одного события без изменения остальных событий и серий побед."""
+    db.add_bet(1, 123, "User1", {"option_id": 1, "amount": 10, "time": "t1"})
+    db.add_bet(2, 456, "User2", {"option_id": 2, "amount": 20, "time": "t2"})
+    db.save_betting_data({"win_streaks": {"123": {"streak": 1, "user_name": "User1"}}})
+    assert db.load_event_bets(1) == {
+        "bets": {"123": {"user_name": "User1", "bets": [{"option_id": 1, "amount": 10, "time": "t1"}]}},
+        "pool": {"total": 10, "options": {"1": {"total": 10, "bettors": 1}}}
+    }
+    db.replace_event_bets(1, {})
+    assert db.load_event_bets(1) == {"bets": {}, "pool": {"total": 0, "options": {}}}
+    assert db.get_event_pool(2) == {"total": 20, "options": {"2": {"total": 20, "bettors": 1}}}
+    data = db.load_betting_data()
+    assert list(data["active_bets"]) == ["2"]
+    assert data["win_streaks"] == {"123": {"streak": 1, "user_name": "User1"}}
+
+def test_save_betting_data_upserts_given_users(db):
+    """Тестирует, что сохраняются только строки переданных пользователей, а остальные не затрагиваются."""
+    db.save_betting_data({
+        "win_streaks": {"1": {"streak": 1, "user_name": "A"}, "2": {"streak": 4, "user_name": "B"}},
+        "betting_stats": {"2": {"user_name": "B", "wagered": 50, "won": 80, "events": 2, "wins": 1}}
+    })
+    db.save_betting_data({
+        "win_streaks": {"1": {"streak": 2, "user_name": "A2"}},
+        "betting_stats": {"1": {"user_name": "A2", "wagered": 10, "won": 20, "events": 1, "wins": 1}},
+        "settled_events": {"7": "2025-04-10"}
+    })
+    assert db.load_users_betting_data(["1", 3]) == {
+        "win_streaks": {"1": {"streak": 2, "user_name": "A2"}},
+        "betting_stats": {"1": {"user_name": "A2", "wagered": 10, "won": 20, "events": 1, "wins": 1}}
+    }
+    assert db.load_betting_stats() == {
+        "win_streaks": {"1": {"streak": 2, "user_name": "A2"}, "2": {"streak": 4, "user_name": "B"}},
+        "betting_stats": {
+            "1": {"user_name": "A2", "wagered": 10, "won": 20, "events": 1, "wins": 1},
+            "2": {"user_name": "B", "wagered": 50, "won": 80, "events": 2, "wins": 1}
+        }
+    }
+    assert db.is_event_settled(7) and not db.is_event_settled(8)
+    # При переносе данных серии побед и статистика заменяются целиком
+    db.save_betting_data({"win_streaks": {"2": {"streak": 0, "user_name": "B"}}, "betting_stats": {}}, replace=True)
+    assert db.load_betting_stats() == {"win_streaks": {"2": {"streak": 0, "user_name": "B"}}, "betting_stats": {}}
+
+def test_load_users_betting_data_in_chunks(db):
+    """Тестирует чтение данных пользователей, число которых больше размера пакета запроса."""
+    streaks = {str(i): {"streak": i, "user_name": f"U{i}"} for i in range(storage.QUERY_CHUNK_SIZE + 5)}
+    db.save_betting_data({"win_streaks": streaks})
+    assert db.load_users_betting_data(streaks)["win_streaks"] == streaks
+
+def test_pools_filled_for_old_database(tmp_path):
+    """Тестирует заполнение пулов при открытии базы, созданной без таблицы пулов."""
+    path = str(tmp_path / "old.db")
+    old = SqliteStorage(path)
+    old.add_bet(1, 123, "User1", {"option_id": 1, "amount": 10, "time": "t1"})
+    with old._conn:
+        old._conn.execute("DELETE FROM bet_pools")
+    old.close()
+    reopened = SqliteStorage(path)
+    try:
+        assert reopened.get_event_pool(1) == {"total": 10, "options": {"1": {"total": 10, "bettors": 1}}}
+    finally:
+        reopened.close()
+
+# --- Тесты для рейтинга ---
+
+def test_add_stars_bulk_and_save_rating(db):
+    """Тестирует пакетное начисление звёзд одной транзакцией и полную замену рейтинга."""
+    db.add_stars_bulk({"1": {"stars": 1, "name": "A"}})
+    db.add_stars_bulk({"1": {"stars": 2, "name": "A2"}, "2": {"stars": 1, "name": "B"}})
+    assert db.load_rating() == {"1": {"stars": 3, "name": "A2"}, "2": {"stars": 1, "name": "B"}}
+    db.save_rating({"1": {"stars": 0, "name": "A2"}})
+    assert db.load_rating() == {"1": {"stars": 0, "name": "A2"}}
+
+# --- Тесты для get_storage ---
+
+def test_get_storage_json_by_default():
+    """Тестирует, что без настройки используется хранение в JSON-файлах."""
+    with patch('storage._storage', None), patch('storage.config.bot_config', {}):
+        assert get_storage() is None
+
+def test_get_storage_sqlite(tmp_path):
+    """Тестирует создание SQLite-хранилища по настройке из bot_config.json."""
+    path = str(tmp_path / "bot.db")
+    with patch('storage._storage', None), \
+         patch('storage.config.bot_config', {"storage": "sqlite", "sqlite_path": path}):
+        db = get_storage()
+        assert isinstance(db, SqliteStorage)
+        assert db.path == path
+        assert get_storage() is db
+        db.close()
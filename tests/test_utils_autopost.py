@@ -14,6 +14,7 @@ try:
         is_valid_file,
         get_top_anecdote_and_remove,
         count_anecdotes,
+        compact_anecdotes,
         get_random_file_from_folder,
         move_file_to_archive,
         count_files_in_folder,
@@ -109,80 +110,64 @@ def test_is_valid_file_invalid_extension(mock_logger, mock_access, mock_getsize,
 
 # --- Тесты для get_top_anecdote_and_remove ---
 
-@patch('utils_autopost.os.path.exists')
-@patch('utils_autopost.open', new_callable=mock_open)
-@patch('utils_autopost.random.randint') # Мок нужен, т.к. используется randint
+@pytest.fixture
+def anecdotes_file(tmp_path):
+    """Файл анекдотов во временном каталоге и пустой индекс анекдотов."""
+    path = tmp_path / "anecdotes.txt"
+    with patch('utils_autopost.config.ANECDOTES_FILE', path), \
+         patch('utils_autopost._anecdote_index', utils_autopost.AnecdoteIndex(SEPARATOR)):
+        yield path
+
 @patch('utils_autopost.logger')
-def test_get_top_anecdote_success(mock_logger, mock_randint, mock_file, mock_exists):
-    """Тест успешного получения и удаления анекдота."""
-    anec1 = "Анекдот 1"
-    anec2 = "Анекдот 2"
-    anec3 = "Анекдот 3"
-    file_content = f"{anec1}\n{SEPARATOR}\n{anec2}\n{SEPARATOR}\n{anec3}"
-    mock_exists.return_value = True
-    # Настраиваем mock_open для чтения и записи
-    mock_file.return_value.read.return_value = file_content
-    mock_randint.return_value = 1 # Выбираем второй анекдот (индекс 1)
+def test_get_top_anecdote_success(mock_logger, anecdotes_file):
+    """Тест выдачи анекдотов без повторов и без перезаписи файла."""
+    file_content = f"Анекдот 1\n{SEPARATOR}\nАнекдот 2\n{SEPARATOR}\n\n{SEPARATOR}\nАнекдот 3\n"
+    anecdotes_file.write_text(file_content, encoding="utf-8")
     
-    # Патчим путь к файлу анекдотов, чтобы использовать реальный путь из конфигурации
-    with patch('utils_autopost.config.ANECDOTES_FILE', Path('post_materials/anecdotes.txt')):
-        anecdote = get_top_anecdote_and_remove()
-        
-        assert anecdote == anec2
-        mock_exists.assert_called_once_with(Path('post_materials/anecdotes.txt'))
-        # Проверяем чтение
-        mock_file.assert_any_call(Path('post_materials/anecdotes.txt'), "r", encoding="utf-8")
-        # Проверяем запись оставшихся анекдотов
-        expected_remaining = f"{anec1}\n{SEPARATOR}\n{anec3}"
-        mock_file.assert_any_call(Path('post_materials/anecdotes.txt'), "w", encoding="utf-8")
-        # Получаем хэндл записи и проверяем, что было записано
-        write_handle = mock_file() 
-        write_handle.write.assert_called_once_with(expected_remaining)
-        mock_randint.assert_called_once_with(0, 2) # Был выбор из 3 элементов (индексы 0, 1, 2)
-        mock_logger.error.assert_not_called()
+    dealt = [get_top_anecdote_and_remove() for _ in range(3)]
+    
+    assert sorted(dealt) == ["Анекдот 1", "Анекдот 2", "Анекдот 3"]
+    assert get_top_anecdote_and_remove() is None
+    assert anecdotes_file.read_text(encoding="utf-8") == file_content
+    mock_logger.error.assert_not_called()
 
-@patch('utils_autopost.os.path.exists', return_value=False)
 @patch('utils_autopost.logger')
-def test_get_top_anecdote_file_not_exists(mock_logger, mock_exists):
-    # Патчим путь к файлу анекдотов
-    with patch('utils_autopost.config.ANECDOTES_FILE', Path('post_materials/anecdotes.txt')):
-        assert get_top_anecdote_and_remove() is None
-        mock_exists.assert_called_once_with(Path('post_materials/anecdotes.txt'))
-        mock_logger.warning.assert_called_once()
+def test_get_top_anecdote_file_not_exists(mock_logger, anecdotes_file):
+    assert get_top_anecdote_and_remove() is None
+    mock_logger.warning.assert_called_once()
 
-@patch('utils_autopost.os.path.exists', return_value=True)
-@patch('utils_autopost.open', new_callable=mock_open, read_data="") # Пустой файл
 @patch('utils_autopost.logger')
-def test_get_top_anecdote_empty_file(mock_logger, mock_file, mock_exists):
-    # Патчим путь к файлу анекдотов
-    with patch('utils_autopost.config.ANECDOTES_FILE', Path('post_materials/anecdotes.txt')):
-        assert get_top_anecdote_and_remove() is None
-        mock_file.assert_called_once_with(Path('post_materials/anecdotes.txt'), "r", encoding="utf-8")
-        mock_logger.warning.assert_called_once()
+def test_get_top_anecdote_empty_file(mock_logger, anecdotes_file):
+    anecdotes_file.write_text("", encoding="utf-8")
+    assert get_top_anecdote_and_remove() is None
+    mock_logger.warning.assert_called_once()
 
 # --- Тесты для count_anecdotes ---
 
-@patch('utils_autopost.os.path.exists')
-@patch('utils_autopost.open', new_callable=mock_open)
-def test_count_anecdotes_success(mock_file, mock_exists):
-    mock_exists.return_value = True
-    file_content = f"Anecdote 1\n{SEPARATOR}\nAnecdote 2"
-    mock_file.return_value.read.return_value = file_content
-    
-    # Патчим путь к файлу анекдотов
-    with patch('utils_autopost.config.ANECDOTES_FILE', Path('post_materials/anecdotes.txt')):
-        assert count_anecdotes() == 2
-        mock_file.assert_called_once_with(Path('post_materials/anecdotes.txt'), "r", encoding="utf-8")
+def test_count_anecdotes_success(anecdotes_file):
+    anecdotes_file.write_text(f"Anecdote 1\n{SEPARATOR}\nAnecdote 2", encoding="utf-8")
+    assert count_anecdotes() == 2
+    get_top_anecdote_and_remove()
+    assert count_anecdotes() == 1
 
-@patch('utils_autopost.os.path.exists', return_value=False)
-def test_count_anecdotes_no_file(mock_exists):
+def test_count_anecdotes_no_file(anecdotes_file):
     assert count_anecdotes() == 0
 
-@patch('utils_autopost.os.path.exists', return_value=True)
-@patch('utils_autopost.open', new_callable=mock_open, read_data="")
-def test_count_anecdotes_empty_file(mock_file, mock_exists):
+def test_count_anecdotes_empty_file(anecdotes_file):
+    anecdotes_file.write_text("", encoding="utf-8")
     assert count_anecdotes() == 0
 
+def test_compact_anecdotes(anecdotes_file):
+    """Тест уплотнения: выданные анекдоты вырезаются из файла, остаток сохраняется."""
+    anecdotes_file.write_text(f"A\n{SEPARATOR}\nB\n{SEPARATOR}\nC", encoding="utf-8")
+    dealt = get_top_anecdote_and_remove()
+    assert compact_anecdotes() is True
+    remaining = sorted({"A", "B", "C"} - {dealt})
+    assert sorted(anecdotes_file.read_text(encoding="utf-8").split(f"\n{SEPARATOR}\n")) == remaining
+    assert count_anecdotes() == 2
+    # Нечего вырезать - файл не переписывается
+    assert compact_anecdotes() is False
+
 # --- Тесты для get_random_file_from_folder ---
 
 @patch('utils_autopost.os.path.exists')
@@ -27,92 +27,113 @@ try:
 except ImportError as e:
     pytest.skip(f"Пропуск тестов wisdom: не удалось импортировать модуль wisdom или его зависимости ({e}).", allow_module_level=True)
 
+@pytest.fixture
+def wisdom_file(tmp_path):
+    """Подменяет файл мудростей временным файлом."""
+    path = tmp_path / "wisdom.json"
+    with patch('wisdom.WISDOM_FILE', str(path)):
+        yield path
+
 # --- Тесты для load_wisdoms ---
 
-@patch('os.path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data='["Wisdom 1", "Wisdom 2"]')
-def test_load_wisdoms_success(mock_file_open, mock_exists):
+def test_load_wisdoms_success(wisdom_file):
     """Тестирует успешную загрузку мудростей из JSON-файла."""
+    wisdom_file.write_text('["Wisdom 1", "Wisdom 2"]', encoding="utf-8")
     wisdoms = load_wisdoms()
-    mock_exists.assert_called_once_with(WISDOM_FILE)
-    mock_file_open.assert_called_once_with(WISDOM_FILE, "r", encoding="utf-8")
     assert wisdoms == ["Wisdom 1", "Wisdom 2"]
 
-@patch('os.path.exists', return_value=False)
-def test_load_wisdoms_file_not_exists(mock_exists):
+def test_load_wisdoms_file_not_exists(wisdom_file):
     """Тестирует случай, когда файл мудростей не существует."""
     wisdoms = load_wisdoms()
-    mock_exists.assert_called_once_with(WISDOM_FILE)
     assert wisdoms == []
 
-@patch('os.path.exists', return_value=True)
-@patch('builtins.open', new_callable=mock_open, read_data='invalid json')
-def test_load_wisdoms_invalid_json(mock_file_open, mock_exists):
+def test_load_wisdoms_invalid_json(wisdom_file):
     """Тестирует случай с невалидным JSON в файле (должен вернуть [])."""
+    wisdom_file.write_text('invalid json', encoding="utf-8")
     wisdoms = load_wisdoms()
-    mock_exists.assert_called_once_with(WISDOM_FILE)
-    mock_file_open.assert_called_once_with(WISDOM_FILE, "r", encoding="utf-8")
     assert wisdoms == [] # Ожидаем пустой список при ошибке
 
-@patch('os.path.exists', return_value=True)
 @patch('builtins.open', side_effect=IOError("Test Read Error"))
-def test_load_wisdoms_read_error(mock_file_open, mock_exists):
+def test_load_wisdoms_read_error(mock_file_open, wisdom_file):
     """Тестирует случай ошибки чтения файла (должен вернуть [])."""
+    wisdom_file.write_bytes(b'[]')
     wisdoms = load_wisdoms()
-    mock_exists.assert_called_once_with(WISDOM_FILE)
-    mock_file_open.assert_called_once_with(WISDOM_FILE, "r", encoding="utf-8")
+    mock_file_open.assert_called_once_with(str(wisdom_file), "r", encoding="utf-8")
     assert wisdoms == [] # Ожидаем пустой список при ошибке
 
 # --- Тесты для save_wisdoms ---
 
-@patch('builtins.open', new_callable=mock_open)
-@patch('json.dump')
-def test_save_wisdoms_success(mock_json_dump, mock_file_open):
+def test_save_wisdoms_success(wisdom_file, doc_store):
     """Тестирует успешное сохранение мудростей."""
     wisdoms_to_save = ["New Wisdom 1", "New Wisdom 2"]
     save_wisdoms(wisdoms_to_save)
-    mock_file_open.assert_called_once_with(WISDOM_FILE, "w", encoding="utf-8")
-    handle = mock_file_open() # Получаем file handle
-    mock_json_dump.assert_called_once_with(wisdoms_to_save, handle, ensure_ascii=False, indent=4)
-
-@patch('builtins.open', side_effect=IOError("Test Write Error"))
-def test_save_wisdoms_write_error(mock_file_open):
-    """Тестирует ошибку записи файла при сохранении."""
-    with pytest.raises(IOError): # Ожидаем ошибку ввода/вывода
-        save_wisdoms(["Wisdom"])
-    mock_file_open.assert_called_once_with(WISDOM_FILE, "w", encoding="utf-8")
+    assert load_wisdoms() == wisdoms_to_save
+    doc_store.flush_all()
+    assert json.loads(wisdom_file.read_text(encoding="utf-8")) == wisdoms_to_save
+
+def test_save_wisdoms_write_error(wisdom_file, doc_store):
+    """Тестирует ошибку записи файла: изменения не теряются и записываются при следующем сбросе."""
+    save_wisdoms(["Wisdom"])
+    with patch('builtins.open', side_effect=IOError("Test Write Error")):
+        assert doc_store.flush_all() is False
+    assert load_wisdoms() == ["Wisdom"]
+    assert doc_store.flush_all() is True
+    assert json.loads(wisdom_file.read_text(encoding="utf-8")) == ["Wisdom"]
 
 # --- Тесты для get_random_wisdom ---
 
-@patch('wisdom.load_wisdoms')
-@patch('wisdom.save_wisdoms')
-@patch('random.choice', return_value="Chosen Wisdom")
-def test_get_random_wisdom_success(mock_random_choice, mock_save_wisdoms, mock_load_wisdoms):
-    """Тестирует успешное получение и удаление мудрости."""
+def test_get_random_wisdom_success(wisdom_file, wisdom_deck):
+    """Тестирует выдачу мудростей без повторений: файл не изменяется, выданные пишутся в журнал."""
     initial_wisdoms = ["Wisdom 1", "Chosen Wisdom", "Wisdom 3"]
-    mock_load_wisdoms.return_value = initial_wisdoms.copy() # Возвращаем копию, т.к. список изменяется
-    
-    chosen = get_random_wisdom()
-    
-    assert chosen == "Chosen Wisdom"
-    mock_load_wisdoms.assert_called_once()
-    # Получаем копию списка без "Chosen Wisdom"
-    expected_list = initial_wisdoms.copy()
-    expected_list.remove("Chosen Wisdom")
-    # Проверяем, что сохраняется список без выбранной мудрости
-    mock_save_wisdoms.assert_called_once_with(expected_list)
+    wisdom_file.write_text(json.dumps(initial_wisdoms), encoding="utf-8")
+
+    assert wisdom.count_wisdoms() == 3
+    chosen = [get_random_wisdom() for _ in range(3)]
+
+    assert sorted(chosen) == sorted(initial_wisdoms)
+    assert wisdom.count_wisdoms() == 0
+    assert get_random_wisdom() is None
+    assert json.loads(wisdom_file.read_text(encoding="utf-8")) == initial_wisdoms
+    with open(wisdom_deck.used_path, encoding="utf-8") as f:
+        assert [json.loads(line)["text"] for line in f] == chosen
 
 @patch('wisdom.load_wisdoms', return_value=[])
-@patch('wisdom.save_wisdoms')
-@patch('random.choice')
-def test_get_random_wisdom_empty_list(mock_random_choice, mock_save_wisdoms, mock_load_wisdoms):
+def test_get_random_wisdom_empty_list(mock_load_wisdoms, wisdom_file):
     """Тестирует случай, когда список мудростей пуст."""
     chosen = get_random_wisdom()
     
     assert chosen is None
     mock_load_wisdoms.assert_called_once()
-    mock_random_choice.assert_not_called()
-    mock_save_wisdoms.assert_not_called()
+
+def test_get_random_wisdom_restores_from_journal(wisdom_file, wisdom_deck):
+    """Тестирует, что после перезапуска выданные по журналу мудрости не повторяются."""
+    wisdom_file.write_text(json.dumps(["A", "B", "C"]), encoding="utf-8")
+    first = get_random_wisdom()
+    wisdom_deck.invalidate()
+
+    assert wisdom.count_wisdoms() == 2
+    assert first not in {get_random_wisdom(), get_random_wisdom()}
+
+def test_get_random_wisdom_recycle(wisdom_file, wisdom_deck):
+    """Тестирует повторную раздачу: новый круг начинается, недавние мудрости не идут подряд."""
+    wisdoms = [f"W{i}" for i in range(6)]
+    wisdom_file.write_text(json.dumps(wisdoms), encoding="utf-8")
+    settings = (True, 3)
+    with patch('wisdom.get_recycle_settings', return_value=settings):
+        dealt = [get_random_wisdom() for _ in range(18)]
+
+    for i in range(0, 18, 6):
+        assert sorted(dealt[i:i + 6]) == wisdoms
+    # Между повторами одной мудрости проходит не меньше 3 других
+    for i, text in enumerate(dealt):
+        assert text not in dealt[i + 1:i + 4]
+
+def test_get_recycle_settings():
+    """Тестирует чтение настроек повторной раздачи из schedule_config."""
+    with patch.object(wisdom.config, 'schedule_config', {"wisdom": {"recycle": True, "min_reuse_gap": 5}}):
+        assert wisdom.get_recycle_settings() == (True, 5)
+    with patch.object(wisdom.config, 'schedule_config', {}):
+        assert wisdom.get_recycle_settings() == (False, wisdom.DEFAULT_MIN_REUSE_GAP)
 
 # --- Тесты для wisdom_post_callback ---
 
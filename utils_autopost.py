@@ -12,13 +12,13 @@ import random
 import shutil
 import logging
 import time
+import asyncio
 from pathlib import Path
 
 SEPARATOR = "=================================================="
 
 import config
 from config import (
-    ANECDOTES_FILE,
     ERO_ANIME_DIR,
     ERO_REAL_DIR,
     SINGLE_MEME_DIR,
@@ -37,8 +37,16 @@ from config import (
     ARCHIVE_VIDEO_AUTO_DIR,
 )
 
+from anecdote_index import AnecdoteIndex
+
 logger = logging.getLogger(__name__)
 
+# Индекс смещений файла анекдотов: выдача и подсчёт без перезаписи файла
+_anecdote_index = AnecdoteIndex(SEPARATOR)
+
+# Интервал (в секундах) фоновой проверки, не пора ли уплотнить файл анекдотов
+ANECDOTES_COMPACT_INTERVAL = 6 * 3600
+
 def is_valid_file(file_path):
     """
     Проверяет, что файл подходит для отправки в Telegram.
@@ -97,39 +105,22 @@ def is_valid_file(file_path):
 
 def get_top_anecdote_and_remove():
     """
-    Возвращает случайный анекдот из файла и удаляет его из файла.
-    Анекдоты в файле разделены строкой-разделителем SEPARATOR.
+    Возвращает случайный анекдот из файла и отмечает его выданным,
+    чтобы он не повторялся. Анекдоты в файле разделены строкой-разделителем SEPARATOR.
+    Файл не перезаписывается: выданные анекдоты отмечаются в индексе
+    (см. anecdote_index.py) и вырезаются из файла фоновым уплотнением.
     
     Returns:
         str|None: Текст анекдота или None, если анекдотов нет или произошла ошибка
     """
     try:
-        if not os.path.exists(ANECDOTES_FILE):
-            logger.warning(f"Файл анекдотов {ANECDOTES_FILE} не существует")
-            return None
-
-        with open(ANECDOTES_FILE, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-
-        if not content:
-            logger.warning(f"Файл анекдотов {ANECDOTES_FILE} пуст")
+        if not os.path.exists(config.ANECDOTES_FILE):
+            logger.warning(f"Файл анекдотов {config.ANECDOTES_FILE} не существует")
             return None
 
-        # Разбиваем контент на отдельные анекдоты по разделителю
-        parts = [x.strip() for x in content.split(SEPARATOR) if x.strip()]
-        if not parts:
-            logger.warning(f"В файле анекдотов {ANECDOTES_FILE} нет анекдотов")
-            return None
-
-        # Выбираем случайный индекс
-        idx = random.randint(0, len(parts) - 1)
-        anecdote = parts.pop(idx)
-
-        # Сохраняем оставшиеся анекдоты обратно в файл
-        remaining_str = f"\n{SEPARATOR}\n".join(parts)
-        with open(ANECDOTES_FILE, "w", encoding="utf-8") as f:
-            f.write(remaining_str.strip())
-
+        anecdote = _anecdote_index.pop_random(config.ANECDOTES_FILE)
+        if anecdote is None:
+            logger.warning(f"В файле анекдотов {config.ANECDOTES_FILE} нет анекдотов")
         return anecdote
     except Exception as e:
         logger.error(f"Ошибка при получении анекдота: {str(e)}")
@@ -138,24 +129,41 @@ def get_top_anecdote_and_remove():
 
 def count_anecdotes():
     """
-    Подсчитывает количество оставшихся анекдотов в файле.
+    Подсчитывает количество оставшихся (ещё не выданных) анекдотов по индексу файла.
     
     Returns:
         int: Количество анекдотов или 0, если файла нет или произошла ошибка
     """
     try:
-        if not os.path.exists(ANECDOTES_FILE):
-            return 0
-        with open(ANECDOTES_FILE, "r", encoding="utf-8") as f:
-            content = f.read().strip()
-        if not content:
+        if not os.path.exists(config.ANECDOTES_FILE):
             return 0
-        parts = [x.strip() for x in content.split(SEPARATOR) if x.strip()]
-        return len(parts)
+        return _anecdote_index.count(config.ANECDOTES_FILE)
     except Exception as e:
         logger.error(f"Ошибка при подсчете анекдотов: {str(e)}")
         return 0
 
+def compact_anecdotes() -> bool:
+    """
+    Вырезает выданные анекдоты из файла, если их накопилось достаточно.
+    
+    Returns:
+        bool: True, если файл был уплотнён
+    """
+    try:
+        if not os.path.exists(config.ANECDOTES_FILE):
+            return False
+        return _anecdote_index.compact(config.ANECDOTES_FILE)
+    except Exception as e:
+        logger.error(f"Ошибка при уплотнении файла анекдотов: {str(e)}")
+        return False
+
+async def compact_anecdotes_job(context):
+    """
+    Фоновая задача планировщика: периодическое уплотнение файла анекдотов.
+    Запись файла выполняется в отдельном потоке, чтобы не блокировать бота.
+    """
+    await asyncio.to_thread(compact_anecdotes)
+
 def get_random_file_from_folder(folder):
     """
     Возвращает путь к случайному файлу из указанной папки.
@@ -3,22 +3,34 @@
 Модуль для публикации "Мудрости дня" в Telegram-чате.
 Обеспечивает:
 - Загрузку и сохранение списка мудрых фраз
-- Случайный выбор фраз без повторений
+- Случайный выбор фраз без повторений из перемешанной колоды (deck.RecyclableDeck)
+- Повторную раздачу уже выданных фраз, когда они закончились (по настройке recycle)
 - Ежедневную публикацию мудрости по расписанию
 - Возможность включения/отключения функции
 """
 
 import os
 import datetime
-import json
-import random
 from telegram import Update
 from telegram.ext import ContextTypes
+import config
 from config import POST_CHAT_ID, MATERIALS_DIR
 from utils import random_time_in_range
 import state  # используется для проверки включена ли публикация
+from docstore import read_json, write_json, file_signature
+from deck import RecyclableDeck
 
 WISDOM_FILE = os.path.join(MATERIALS_DIR, "wisdom.json")
+# Журнал выданных мудростей (файл мудростей после выдачи не изменяется)
+WISDOM_USED_FILE = "state_data/wisdom_used.jsonl"
+# Минимальное количество других мудростей между повторами одной и той же
+DEFAULT_MIN_REUSE_GAP = 30
+
+_wisdom_deck = RecyclableDeck(
+    WISDOM_USED_FILE,
+    load_items=lambda: load_wisdoms(),
+    bank_signature=lambda: file_signature(WISDOM_FILE)
+)
 
 def load_wisdoms() -> list[str]:
     """
@@ -28,14 +40,11 @@ def load_wisdoms() -> list[str]:
         list[str]: Список строк с мудрыми фразами или пустой список,
                   если файл не существует или некорректен
     """
-    if not os.path.exists(WISDOM_FILE):
-        return []
     try:
-        with open(WISDOM_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            if isinstance(data, list):
-                # тут предполагаем, что это список строк
-                return data
+        data = read_json(WISDOM_FILE)
+        if isinstance(data, list):
+            # тут предполагаем, что это список строк
+            return data
     except:
         pass
     return []
@@ -47,44 +56,45 @@ def save_wisdoms(wisdoms: list[str]):
     Args:
         wisdoms: Список строк для сохранения
     """
-    with open(WISDOM_FILE, "w", encoding="utf-8") as f:
-        json.dump(wisdoms, f, ensure_ascii=False, indent=4)
+    write_json(WISDOM_FILE, wisdoms)
+
+def get_recycle_settings() -> tuple[bool, int]:
+    """
+    Читает настройки повторной раздачи из раздела 'wisdom' schedule_config.json.
+
+    Returns:
+        tuple: (включена ли повторная раздача, минимальный промежуток между повторами)
+    """
+    schedule_config = getattr(config, "schedule_config", None)
+    settings = schedule_config.get('wisdom') if isinstance(schedule_config, dict) else None
+    if not isinstance(settings, dict):
+        return False, DEFAULT_MIN_REUSE_GAP
+    return bool(settings.get('recycle', False)), int(settings.get('min_reuse_gap', DEFAULT_MIN_REUSE_GAP))
 
 def count_wisdoms() -> int:
     """
-    Подсчитывает количество оставшихся мудрых фраз в файле.
+    Подсчитывает количество ещё не выданных мудрых фраз в текущем круге колоды.
+    Файл мудростей читается только после его изменения.
     
     Returns:
         int: Количество мудрых фраз или 0, если файла нет или произошла ошибка
     """
     try:
-        wisdoms = load_wisdoms()
-        return len(wisdoms)
+        return _wisdom_deck.remaining()
     except Exception:
         return 0
 
 def get_random_wisdom() -> str | None:
     """
-    Выбирает случайную мудрую фразу из списка и удаляет её,
-    чтобы избежать повторений.
+    Выдаёт случайную мудрую фразу из колоды и записывает её в журнал выданных,
+    чтобы избежать повторений. Если фразы закончились и включена повторная
+    раздача (recycle), начинается новый круг из всех фраз.
     
     Returns:
-        str|None: Случайная мудрая фраза или None, если список пуст
+        str|None: Случайная мудрая фраза или None, если фразы закончились
     """
-    ws = load_wisdoms()
-    if not ws:
-        return None
-    
-    # Выбираем случайную мудрость
-    w = random.choice(ws)
-    
-    # Удаляем выбранную мудрость из списка
-    ws.remove(w)
-    
-    # Сохраняем обновлённый список
-    save_wisdoms(ws)
-    
-    return w
+    recycle, min_gap = get_recycle_settings()
+    return _wisdom_deck.deal(recycle=recycle, min_gap=min_gap)
 
 
 async def wisdom_post_callback(context: ContextTypes.DEFAULT_TYPE):